@@ -0,0 +1,9 @@
+"""
+In-process view benchmarks.
+
+Seeds a throwaway data set, drives every routed view through the Django test
+client as each user role and reports latency percentiles, query counts and
+allocated memory per view as JSON. Run with
+"python manage.py benchmark_views"; see benchmarks.runner and
+benchmarks.compare.
+"""
@@ -0,0 +1,35 @@
+"""
+Compare two benchmark reports (benchmarks.runner.run output).
+
+A (view, role) regresses when its p50 latency grew by more than
+`max_regression` (a ratio) and by at least `min_delta_ms`, or when it now
+runs more queries. The absolute floor keeps sub-millisecond views from
+flapping on timer noise.
+"""
+
+DEFAULT_MAX_REGRESSION = 0.25
+DEFAULT_MIN_DELTA_MS = 1.0
+
+
+def _index(report):
+    return {(r["name"], r["role"]): r for r in report["results"]}
+
+
+def compare_reports(baseline, current, max_regression=DEFAULT_MAX_REGRESSION, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """[{"name", "role", "metric", "baseline", "current"}] for every regression."""
+    previous = _index(baseline)
+    regressions = []
+    for key, result in _index(current).items():
+        before = previous.get(key)
+        if before is None:
+            continue
+        name, role = key
+        p50, old_p50 = result["p50_ms"], before["p50_ms"]
+        if p50 > old_p50 * (1 + max_regression) and p50 - old_p50 >= min_delta_ms:
+            regressions.append({"name": name, "role": role, "metric": "p50_ms", "baseline": old_p50, "current": p50})
+        if result["queries"] > before["queries"]:
+            regressions.append({
+                "name": name, "role": role, "metric": "queries",
+                "baseline": before["queries"], "current": result["queries"],
+            })
+    return regressions
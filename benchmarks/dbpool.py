@@ -0,0 +1,108 @@
+"""
+Connection-setup cost with and without the psycopg pool (core.postgresql_pool).
+
+connection_setup() times `iterations` connect -> SELECT 1 -> close cycles
+per thread through two throwaway database wrappers built from the default
+database's settings: the stock postgresql backend with CONN_MAX_AGE = 0 (a
+new server connection every time, as a fresh worker thread or a restarted
+worker pays) and the pooled backend (a checkout from a warm pool). The
+difference in the per-cycle percentiles is what pooling saves on each
+request that would otherwise open its own connection.
+
+Postgres only: SQLite "connections" are a file open, there is nothing to pool.
+"""
+
+import copy
+import threading
+import time
+
+import numpy as np
+from django.db import connections
+from django.db.utils import load_backend
+
+PERCENTILES = (50, 95, 99)
+
+DIRECT_ENGINE = "django.db.backends.postgresql"
+POOLED_ENGINE = "core.postgresql_pool"
+
+BENCH_ALIAS = "dbpool-benchmark"
+
+
+class PoolBenchmarkError(Exception):
+    """The benchmark cannot run with this database."""
+
+
+def _wrapper(engine, pool_options, alias=BENCH_ALIAS):
+    settings_dict = copy.deepcopy(connections["default"].settings_dict)
+    settings_dict.update({"ENGINE": engine, "CONN_MAX_AGE": 0})
+    settings_dict["OPTIONS"].pop("pool", None)
+    if pool_options is not None:
+        settings_dict["OPTIONS"]["pool"] = pool_options
+    return load_backend(engine).DatabaseWrapper(settings_dict, alias)
+
+
+def _cycles(engine, pool_options, iterations, threads):
+    """Per-cycle seconds from `threads` threads, each with its own wrapper (as Django does)."""
+    durations, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        wrapper = _wrapper(engine, pool_options)
+        mine = []
+        try:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                wrapper.close()
+                mine.append(time.perf_counter() - started)
+        except Exception as exc:  # reported, not raised, so the other mode still runs
+            errors.append(f"{type(exc).__name__}: {exc}")
+        with lock:
+            durations.extend(mine)
+
+    pool_threads = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool_threads:
+        thread.start()
+    for thread in pool_threads:
+        thread.join()
+    return durations, errors
+
+
+def _stats(durations, errors):
+    result = {"cycles": len(durations), "errors": len(errors)}
+    if durations:
+        values_ms = np.array(durations) * 1000.0
+        result.update({f"p{p}_ms": round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(values_ms, PERCENTILES))})
+        result["mean_ms"] = round(float(values_ms.mean()), 3)
+    if errors:
+        result["sample_error"] = errors[0]
+    return result
+
+
+def connection_setup(iterations=100, threads=4, pool_options=None):
+    """
+    {"direct": stats, "pooled": stats, "saved_p50_ms": ...} for the default
+    database. The pool gets max_size = threads unless pool_options says otherwise.
+    """
+    if connections["default"].vendor != "postgresql":
+        raise PoolBenchmarkError("the connection pool benchmark needs PostgreSQL (DATABASE_URL=postgres://...)")
+    options = dict({"min_size": threads, "max_size": threads}, **(pool_options or {}))
+
+    direct = _stats(*_cycles(DIRECT_ENGINE, None, iterations, threads))
+
+    pooled_wrapper = _wrapper(POOLED_ENGINE, options)
+    pool = pooled_wrapper.pool
+    try:
+        pool.open(wait=True)
+        pooled = _stats(*_cycles(POOLED_ENGINE, options, iterations, threads))
+        pooled["pool"] = pool.get_stats()
+    finally:
+        pooled_wrapper.close_pool()
+
+    report = {"iterations": iterations, "threads": threads, "direct": direct, "pooled": pooled}
+    if "p50_ms" in direct and "p50_ms" in pooled:
+        report["saved_p50_ms"] = round(direct["p50_ms"] - pooled["p50_ms"], 3)
+        report["saved_p95_ms"] = round(direct["p95_ms"] - pooled["p95_ms"], 3)
+    return report
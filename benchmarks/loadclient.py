@@ -0,0 +1,197 @@
+"""
+Load-generating client for benchmarks.loadtest.
+
+Standard library only (asyncio streams, no Django import), so each client
+process can be spawned cheaply and never touches the database. A process runs
+`concurrency` virtual users; each picks a scenario from the weighted traffic
+mix, plays it against the server and records one sample per request:
+(label, status, latency seconds, ok, error).
+
+Requests use "Connection: close" and read the response to EOF, which matches
+gunicorn's sync workers (they do not keep connections alive).
+"""
+
+import asyncio
+import random
+import ssl
+import time
+from urllib.parse import urlencode, urlsplit
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Share of A/B exposures followed by a click
+CLICK_RATE = 0.5
+
+REQUEST_TIMEOUT = 30.0
+
+
+class Target:
+    """Where to send requests, parsed from the base URL."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.base_url = base_url.rstrip("/")
+        self.secure = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.secure else 80)
+        self.host_header = parts.netloc
+
+
+async def fetch(target, method, path, headers=(), body=b"", timeout=REQUEST_TIMEOUT):
+    """One HTTP/1.1 request; returns (status, [(header, value)], body)."""
+    context = ssl.create_default_context() if target.secure else None
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(target.host, target.port, ssl=context), timeout
+    )
+    try:
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {target.host_header}",
+            f"User-Agent: {USER_AGENT}",
+            "Connection: close",
+            f"Content-Length: {len(body)}",
+            *(f"{name}: {value}" for name, value in headers),
+        ]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    status = int(status_line.split(" ", 2)[1])
+    response_headers = [tuple(part.strip() for part in line.split(":", 1)) for line in header_lines if ":" in line]
+    return status, response_headers, payload
+
+
+class VirtualUser:
+    """One simulated visitor: a cookie jar plus sample recording."""
+
+    def __init__(self, target, samples, cookies=None, csrf_cookie="csrftoken"):
+        self.target = target
+        self.samples = samples
+        self.cookies = dict(cookies or {})
+        self.csrf_cookie = csrf_cookie
+
+    async def request(self, label, method, path, expect=(200,), data=None, headers=()):
+        headers = list(headers)
+        body = b""
+        if self.cookies:
+            headers.append(("Cookie", "; ".join(f"{k}={v}" for k, v in self.cookies.items())))
+        if method == "POST":
+            # CSRF: the form token must match the csrftoken cookie; Referer is checked over HTTPS
+            data = dict(data or {}, csrfmiddlewaretoken=self.cookies.get(self.csrf_cookie, ""))
+            body = urlencode(data).encode()
+            headers += [
+                ("Content-Type", "application/x-www-form-urlencoded"),
+                ("Referer", f"{self.target.base_url}/"),
+            ]
+
+        started = time.perf_counter()
+        status, error = 0, None
+        try:
+            status, response_headers, _ = await fetch(self.target, method, path, headers, body)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError) as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        else:
+            for name, value in response_headers:
+                if name.lower() == "set-cookie":
+                    key, _, rest = value.partition("=")
+                    self.cookies[key] = rest.split(";", 1)[0]
+        latency = time.perf_counter() - started
+        ok = error is None and status in expect
+        self.samples.append((label, status, latency, ok, error))
+        return status
+
+
+async def browse(user, plan, rng, state):
+    await user.request("home", "GET", "/")
+    await user.request("category_list", "GET", f"/c/{rng.choice(plan['category_slugs'])}/")
+    await user.request("post_detail", "GET", f"/p/{rng.choice(plan['post_slugs'])}/")
+
+
+async def search(user, plan, rng, state):
+    await user.request("search", "GET", "/?" + urlencode({"q": rng.choice(plan["search_terms"])}))
+
+
+async def abtest(user, plan, rng, state):
+    # A new visitor each time: exposures are deduplicated per session
+    user.cookies.clear()
+    await user.request("abtest", "GET", "/218b7ae/", headers=[
+        ("Sec-Fetch-Dest", "document"), ("Sec-Fetch-Mode", "navigate"), ("Sec-Fetch-Site", "none"),
+    ])
+    if rng.random() < CLICK_RATE:
+        await user.request("abtest_click", "POST", "/218b7ae/click/", headers=[
+            ("Sec-Fetch-Mode", "cors"), ("Sec-Fetch-Site", "same-origin"),
+        ])
+    # Remembered so the events can be deleted after the run
+    if plan["session_cookie"] in user.cookies:
+        state["ab_sessions"].add(user.cookies[plan["session_cookie"]])
+
+
+async def submit(user, plan, rng, state):
+    state["submitted"] += 1
+    await user.request("submit_post", "POST", "/submit/", expect=(302,), data={
+        "title": f"{plan['title_prefix']} {state['process']} {state['submitted']}",
+        "content": "Load test submission. " * rng.randint(5, 60),
+        "category": rng.choice(plan["category_ids"]),
+        "status": "pending",
+    })
+
+
+async def approve(user, plan, rng, state):
+    if state["pending"]:
+        await user.request("approve_post", "POST", f"/dashboard/approve/{state['pending'].pop()}/", expect=(302,))
+    else:
+        await user.request("dashboard", "GET", "/dashboard/")
+
+
+# scenario -> (coroutine, role whose session cookie it uses)
+SCENARIOS = {
+    "browse": (browse, "anonymous"),
+    "search": (search, "anonymous"),
+    "abtest": (abtest, "anonymous"),
+    "submit": (submit, "contributor"),
+    "approve": (approve, "admin"),
+}
+
+
+async def _virtual_user(target, plan, rng, state, deadline, samples):
+    names = list(plan["mix"])
+    weights = [plan["mix"][name] for name in names]
+    users = {
+        role: VirtualUser(target, samples, cookies, plan["csrf_cookie"])
+        for role, cookies in plan["cookies"].items()
+    }
+    users["anonymous"] = VirtualUser(target, samples, csrf_cookie=plan["csrf_cookie"])
+    while time.monotonic() < deadline:
+        scenario, role = SCENARIOS[rng.choices(names, weights)[0]]
+        await scenario(users[role], plan, rng, state)
+        if plan["think_seconds"]:
+            await asyncio.sleep(rng.expovariate(1.0 / plan["think_seconds"]))
+
+
+async def _drive(plan, process_index):
+    target = Target(plan["url"])
+    samples = []
+    state = {
+        "process": process_index,
+        "submitted": 0,
+        "pending": list(plan["pending_ids"][process_index::plan["processes"]]),
+        "ab_sessions": set(),
+    }
+    deadline = time.monotonic() + plan["duration"]
+    await asyncio.gather(*(
+        _virtual_user(target, plan, random.Random(plan["seed"] * 1000 + process_index * 100 + i), state, deadline, samples)
+        for i in range(plan["concurrency"])
+    ))
+    return samples, sorted(state["ab_sessions"])
+
+
+def client_process(plan, process_index):
+    """Entry point for one client process; returns (samples, A/B session keys created)."""
+    return asyncio.run(_drive(plan, process_index))
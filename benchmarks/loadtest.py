@@ -0,0 +1,420 @@
+"""
+End-to-end load test against the real WSGI app under gunicorn.
+
+Unlike benchmarks.runner (in-process, one request at a time), this boots
+"gunicorn config.wsgi:application" on a local port with the same worker
+count as Render (or targets an already running server with `url`) and
+drives it from several client processes (benchmarks.loadclient), each
+running many asyncio virtual users through a weighted traffic mix:
+anonymous browsing and search, /218b7ae/ exposures and clicks, contributor
+submissions and admin approvals.
+
+The report has throughput, p50/p95/p99 latency and error rate per endpoint.
+On SQLite a SQLiteLockProbe repeatedly takes the database write lock during
+the run and reports how long it had to wait, and the server log is scanned
+for "database is locked" errors - the ceiling on SQLite is usually the
+single writer, not the workers. On PostgreSQL the report also has
+"connection_setup": the per-connection cost with and without the psycopg
+pool (benchmarks.dbpool), and db_pool runs the server with DB_POOL on or off
+so the two configurations can be compared end to end.
+
+Run with "python manage.py loadtest". Rows the run creates (posts, A/B events
+and their sessions, and the bench_* data set when this run seeded it) are
+deleted afterwards unless keep_data is set. A data set seeded by an earlier
+run (or by benchmark_views --keep-data) is reused and left in place.
+"""
+
+import importlib.util
+import multiprocessing
+import os
+import platform
+import secrets
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import nullcontext
+from importlib import import_module
+
+import django
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.utils import timezone
+
+from core.models import ABTestEvent, BackgroundJob, Category, Post
+from core.rollups import affected_cells, invalidate_rollups
+
+from .dbpool import PoolBenchmarkError, connection_setup
+from .loadclient import SCENARIOS, client_process
+from .seed import BENCH_PREFIX, _role_users, seed
+
+PERCENTILES = (50, 95, 99)
+
+DEFAULT_MIX = {"browse": 50, "search": 15, "abtest": 25, "submit": 7, "approve": 3}
+
+SEARCH_TERMS = ("housing", "food", "bench", "post", "ipsum", "bus", "bank", "doctor")
+
+# Render runs gunicorn with two workers
+DEFAULT_WORKERS = 2
+
+SERVER_START_TIMEOUT = 30.0
+
+LOCK_PROBE_INTERVAL = 0.05
+LOCK_PROBE_TIMEOUT = 5.0
+
+LOCKED_MARKER = "database is locked"
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def parse_mix(text):
+    """"browse=50,abtest=25" -> {"browse": 50.0, "abtest": 25.0}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise LoadTestError(f"Unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise LoadTestError(f"Bad weight for {name!r}: {weight!r}")
+        if mix[name] < 0:
+            raise LoadTestError(f"Negative weight for {name!r}")
+    if not any(mix.values()):
+        raise LoadTestError("The traffic mix needs at least one positive weight")
+    return mix
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _login_cookies(user):
+    """Session and CSRF cookies for a user, minted directly in the session store."""
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.create()
+    # An unmasked 32-character secret is accepted as both cookie and form token
+    return {settings.SESSION_COOKIE_NAME: store.session_key, settings.CSRF_COOKIE_NAME: secrets.token_hex(16)}
+
+
+def prepare(mix, url, processes, concurrency, duration, think_seconds, approvals, seed_posts, rng_seed):
+    """Seed the benchmark data set if needed and build the plan each client process gets."""
+    seeded = None
+    if not Category.objects.filter(slug=f"{BENCH_PREFIX}-category-0").exists():
+        existing = set(User.objects.filter(username__startswith=f"{BENCH_PREFIX}_").values_list("id", flat=True))
+        fixtures = seed(posts=seed_posts, events=0)
+        # Remember exactly what this run added so cleanup() removes it and nothing else
+        seeded = {
+            "user_ids": [u.pk for u in fixtures["users"].values() if u is not None and u.pk not in existing],
+            "job_id": fixtures["job"].pk,
+        }
+    users = _role_users()
+    run_id = timezone.now().strftime("%Y%m%d%H%M%S")
+
+    categories = list(Category.objects.filter(slug__startswith=f"{BENCH_PREFIX}-category-"))
+    Post.objects.bulk_create([
+        Post(
+            title=f"loadtest {run_id} approval {i}",
+            slug=f"loadtest-{run_id}-approval-{i}",
+            content="Waiting for approval.",
+            category=categories[i % len(categories)],
+            author=users["contributor"],
+            status="pending",
+        )
+        for i in range(approvals)
+    ])
+    pending_ids = list(
+        Post.objects.filter(slug__startswith=f"loadtest-{run_id}-approval-").values_list("id", flat=True)
+    )
+
+    return {
+        "url": url,
+        "mix": mix,
+        "processes": processes,
+        "concurrency": concurrency,
+        "duration": duration,
+        "think_seconds": think_seconds,
+        "seed": rng_seed,
+        "session_cookie": settings.SESSION_COOKIE_NAME,
+        "csrf_cookie": settings.CSRF_COOKIE_NAME,
+        "cookies": {role: _login_cookies(users[role]) for role in ("contributor", "admin")},
+        "category_slugs": [c.slug for c in categories],
+        "category_ids": [c.pk for c in categories],
+        "post_slugs": list(
+            Post.objects.filter(slug__startswith=f"{BENCH_PREFIX}-post-", status="approved")
+            .values_list("slug", flat=True)[:500]
+        ),
+        "search_terms": list(SEARCH_TERMS),
+        "pending_ids": pending_ids,
+        "title_prefix": f"loadtest {run_id}",
+        "run_id": run_id,
+        "seeded": seeded,
+    }
+
+
+def cleanup(plan, ab_sessions):
+    """
+    Delete what the run created: approval posts, submissions, A/B events and
+    sessions, plus the seeded bench_* posts, categories and users (including
+    the superuser bench_admin) when prepare() seeded them.
+    """
+    Post.objects.filter(slug__startswith=f"loadtest-{plan['run_id']}-").delete()
+    deleted = 0
+    stale_cells = set()
+    for start in range(0, len(ab_sessions), 500):
+        chunk = ab_sessions[start:start + 500]
+        events = ABTestEvent.objects.filter(session_id__in=chunk)
+        stale_cells |= affected_cells(events)
+        deleted += events.delete()[0]
+        Session.objects.filter(session_key__in=chunk).delete()
+    Session.objects.filter(
+        session_key__in=[cookies[plan["session_cookie"]] for cookies in plan["cookies"].values()]
+    ).delete()
+    if deleted:
+        invalidate_rollups(stale_cells)
+    seeded = plan.get("seeded")
+    if seeded:
+        Post.objects.filter(slug__startswith=f"{BENCH_PREFIX}-post-").delete()
+        Category.objects.filter(slug__startswith=f"{BENCH_PREFIX}-category-").delete()
+        BackgroundJob.objects.filter(pk=seeded["job_id"]).delete()
+        User.objects.filter(pk__in=seeded["user_ids"]).delete()
+
+
+class GunicornServer:
+    """gunicorn serving config.wsgi on a local port, logging to a temp file."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, port=None, db_pool=None):
+        if importlib.util.find_spec("gunicorn") is None:
+            raise LoadTestError("gunicorn is not installed (pip install -r requirements.txt)")
+        self.workers = workers
+        self.db_pool = db_pool
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.log = tempfile.NamedTemporaryFile(prefix="loadtest-gunicorn-", suffix=".log", delete=False)
+        self.process = None
+
+    def __enter__(self):
+        env = dict(os.environ)
+        hosts = [h for h in env.get("DJANGO_ALLOWED_HOSTS", "").split(",") if h]
+        env["DJANGO_ALLOWED_HOSTS"] = ",".join(hosts + ["127.0.0.1", "localhost"])
+        if self.db_pool is not None:
+            env["DB_POOL"] = "true" if self.db_pool else "false"
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", "config.wsgi:application",
+                "--bind", f"127.0.0.1:{self.port}",
+                "--workers", str(self.workers),
+                "--error-logfile", "-",
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            self._wait_until_ready()
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def _wait_until_ready(self):
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise LoadTestError(f"gunicorn exited with {self.process.returncode}:\n{self.log_text()[-2000:]}")
+            try:
+                urllib.request.urlopen(f"{self.url}/health/", timeout=2)
+                return
+            except urllib.error.HTTPError:
+                return  # Up, even if unhealthy
+            except OSError:
+                time.sleep(0.2)
+        raise LoadTestError(f"gunicorn did not answer within {SERVER_START_TIMEOUT:.0f}s")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+        os.unlink(self.log.name)
+
+    def log_text(self):
+        self.log.flush()
+        with open(self.log.name, errors="replace") as fh:
+            return fh.read()
+
+
+class SQLiteLockProbe(threading.Thread):
+    """
+    Repeatedly takes the SQLite write lock (BEGIN IMMEDIATE, then ROLLBACK)
+    and records how long each attempt waited; attempts that time out are
+    counted separately.
+    """
+
+    def __init__(self, path, interval=LOCK_PROBE_INTERVAL, timeout=LOCK_PROBE_TIMEOUT):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.timeout = timeout
+        self.waits = []
+        self.timeouts = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        try:
+            while not self._stop_event.wait(self.interval):
+                started = time.perf_counter()
+                try:
+                    db.execute("BEGIN IMMEDIATE")
+                except sqlite3.OperationalError:
+                    self.timeouts += 1
+                    continue
+                self.waits.append(time.perf_counter() - started)
+                db.execute("ROLLBACK")
+        finally:
+            db.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self):
+        waits_ms = np.array(self.waits) * 1000.0
+        result = {"probes": len(self.waits) + self.timeouts, "timeouts": self.timeouts}
+        if len(waits_ms):
+            result.update({f"p{p}_wait_ms": round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(waits_ms, PERCENTILES))})
+            result["max_wait_ms"] = round(float(waits_ms.max()), 3)
+        return result
+
+
+def summarise(samples, duration):
+    """Per-endpoint and overall throughput, latency percentiles and error rate."""
+    by_label = {}
+    for label, status, latency, ok, error in samples:
+        by_label.setdefault(label, []).append((status, latency, ok, error))
+
+    def stats(rows):
+        latencies_ms = np.array([latency for _, latency, _, _ in rows]) * 1000.0
+        errors = sum(1 for _, _, ok, _ in rows if not ok)
+        result = {
+            "requests": len(rows),
+            "rps": round(len(rows) / duration, 2) if duration else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4),
+        }
+        result.update({f"p{p}_ms": round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(latencies_ms, PERCENTILES))})
+        statuses = {}
+        for status, _, _, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        result["statuses"] = statuses
+        return result
+
+    endpoints = [dict({"endpoint": label}, **stats(rows)) for label, rows in sorted(by_label.items())]
+    total = stats([row for rows in by_label.values() for row in rows]) if samples else {"requests": 0}
+    first_errors = sorted({error for *_, error in samples if error})[:10]
+    return {"total": total, "endpoints": endpoints, "sample_errors": first_errors}
+
+
+def _sqlite_path(alias="default"):
+    if connections[alias].vendor != "sqlite":
+        return None
+    name = str(connections[alias].settings_dict["NAME"])
+    return None if name == ":memory:" or name.startswith("file:") else name
+
+
+def _drive(plan, probe, samples, ab_sessions):
+    """Run the client processes; returns the wall-clock duration."""
+    if probe:
+        probe.start()
+    started = time.monotonic()
+    try:
+        with multiprocessing.get_context("spawn").Pool(plan["processes"]) as pool:
+            for process_samples, sessions in pool.starmap(
+                client_process, [(plan, i) for i in range(plan["processes"])]
+            ):
+                samples.extend(process_samples)
+                ab_sessions.extend(sessions)
+    finally:
+        if probe:
+            probe.stop()
+    return time.monotonic() - started
+
+
+def run(mix=DEFAULT_MIX, workers=DEFAULT_WORKERS, url=None, processes=2, concurrency=25, duration=30.0,
+        think_seconds=0.0, approvals=500, seed_posts=200, rng_seed=0, keep_data=False, db_pool=None, log=None):
+    """
+    Run the load test and return the JSON-ready report.
+
+    With `url` the server at that address is used instead of booting
+    gunicorn; it must share this process's database (the logged-in sessions
+    and the approval queue are created here). db_pool (True/False) sets
+    DB_POOL for the booted server; None leaves the environment as it is.
+    """
+    server = GunicornServer(workers, db_pool=db_pool) if url is None else None
+    plan = prepare(mix, url, processes, concurrency, duration, think_seconds, approvals, seed_posts, rng_seed)
+    db_path = _sqlite_path()
+    probe = SQLiteLockProbe(db_path) if db_path else None
+    # Client processes are spawned (not forked) and the server is separate: no shared connections
+    connections.close_all()
+
+    samples, ab_sessions, server_log = [], [], ""
+    started = timezone.now()
+    try:
+        with server or nullcontext():
+            if server:
+                plan["url"] = server.url
+            if log:
+                log(f"Driving {plan['url']} for {duration:g}s with {processes}x{concurrency} virtual users...")
+            elapsed = _drive(plan, probe, samples, ab_sessions)
+            if server:
+                server_log = server.log_text()
+    finally:
+        if not keep_data:
+            cleanup(plan, ab_sessions)
+
+    report = summarise(samples, elapsed)
+    if connection.vendor == "postgresql":
+        try:
+            report["connection_setup"] = connection_setup(threads=min(concurrency, 10))
+        except (ImproperlyConfigured, PoolBenchmarkError) as exc:
+            report["connection_setup"] = {"error": str(exc)}
+    if probe:
+        report["sqlite"] = dict(probe.summary(), locked_errors_in_log=server_log.count(LOCKED_MARKER))
+    report["meta"] = {
+        "started_at": started.isoformat(),
+        "url": plan["url"],
+        "server": f"gunicorn config.wsgi:application --workers {workers}" if server else "external",
+        "db_pool": os.getenv("DB_POOL", "False").lower() == "true" if db_pool is None else db_pool,
+        "processes": processes,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "think_seconds": think_seconds,
+        "mix": mix,
+        "database": connection.vendor,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+    }
+    return report
@@ -0,0 +1,189 @@
+"""
+Drive every routed view through the test client and measure it.
+
+Targets are discovered from the root URLconf (so the guide URLs are included
+whenever the guide app is installed and routed), plus the A/B admin pages.
+For each (target, role) the runner makes `warmup` untimed requests, then
+`iterations` timed ones, then one more request under CaptureQueriesContext
+and tracemalloc for the query count and peak allocation - tracing is kept
+out of the timed loop because it slows Python down severalfold.
+"""
+
+import platform
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+import django
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from .seed import ROLES, seed
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Admin site views worth tracking (the rest of admin/ is stock Django)
+ADMIN_TARGETS = (
+    "admin:core_abtestevent_changelist",
+    "admin:core_abtestevent_abtest_summary",
+    "admin:core_abtestevent_abtest_report",
+)
+
+# Routes that change state when requested: with --keep-data (or a database
+# the rollback does not cover) they would log the user out, queue jobs for
+# run_jobs, moderate or delete posts and toggle bookmarks for real
+SKIP_TARGETS = {
+    "core:logout", "guide:logout",
+    "core:ab_purge_bots_run", "core:ab_purge_bots_dry_run", "core:admin_job_start",
+    "core:approve_post", "core:reject_post", "core:contributor_delete_post",
+    "core:bookmark_post", "guide:toggle_bookmark",
+}
+
+# Views that only accept POST
+POST_TARGETS = {"abtest_click"}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _routes(resolver, namespace=""):
+    for entry in resolver.url_patterns:
+        if isinstance(entry, URLResolver):
+            if entry.namespace == "admin":
+                continue
+            child_ns = f"{namespace}{entry.namespace}:" if entry.namespace else namespace
+            yield from _routes(entry, child_ns)
+        elif isinstance(entry, URLPattern) and entry.name:
+            yield f"{namespace}{entry.name}", tuple(getattr(entry.pattern, "converters", {}))
+
+
+def discover_targets():
+    """[(url name, route kwarg names)] for every named non-admin route, plus ADMIN_TARGETS."""
+    targets = [(name, params) for name, params in _routes(get_resolver()) if name not in SKIP_TARGETS]
+    return targets + [(name, ()) for name in ADMIN_TARGETS]
+
+
+def _kwargs_for(name, params, fixtures):
+    values = {
+        "slug": fixtures["category"].slug if "category" in name else fixtures["post"].slug,
+        "post_slug": fixtures["post"].slug,
+        "post_id": fixtures["pending_post"].pk,
+        "job_id": fixtures["job"].pk,
+    }
+    return {param: values[param] for param in params}
+
+
+def _summarise(latencies):
+    values = np.percentile(np.array(latencies) * 1000.0, PERCENTILES)
+    summary = {f"p{p}_ms": round(float(v), 3) for p, v in zip(PERCENTILES, values)}
+    summary["mean_ms"] = round(float(np.mean(latencies) * 1000.0), 3)
+    return summary
+
+
+def _request(client, method, path):
+    return getattr(client, method)(path, secure=True)
+
+
+def measure(client, method, path, iterations, warmup):
+    """Latency percentiles, query count and peak allocation for one path."""
+    for _ in range(warmup):
+        _request(client, method, path)
+
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = _request(client, method, path)
+        latencies.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            response = _request(client, method, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return dict(
+        _summarise(latencies),
+        status=response.status_code,
+        queries=len(queries),
+        peak_kb=round(peak / 1024.0, 1),
+    )
+
+
+def _run(posts, events, iterations, warmup, roles, only):
+    fixtures = seed(posts=posts, events=events)
+    targets = [
+        (name, params) for name, params in discover_targets()
+        if not only or any(term in name for term in only)
+    ]
+
+    results = []
+    for role in roles:
+        client = Client()
+        user = fixtures["users"][role]
+        for name, params in targets:
+            path = reverse(name, kwargs=_kwargs_for(name, params, fixtures))
+            method = "post" if name in POST_TARGETS else "get"
+            # Re-login each time: a view may have rotated or flushed the session
+            client.logout()
+            if user is not None:
+                client.force_login(user)
+            results.append(dict(
+                {"name": name, "path": path, "method": method.upper(), "role": role},
+                **measure(client, method, path, iterations, warmup),
+            ))
+    return results
+
+
+def run(posts=200, events=1000, iterations=20, warmup=2, roles=ROLES, only=(), keep_data=False):
+    """
+    Benchmark every target for every role and return the JSON-ready report.
+
+    All seeded rows (and anything the views write, on every configured
+    database alias) are rolled back unless keep_data is set.
+    """
+    results = []
+    started = timezone.now()
+    test_settings = override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    )
+    with test_settings:
+        try:
+            with ExitStack() as stack:
+                # Replica/analytics/abtest aliases too: views and routers may write there
+                for alias in connections:
+                    stack.enter_context(transaction.atomic(using=alias))
+                results = _run(posts, events, iterations, warmup, roles, only)
+                if not keep_data:
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+    skipped = []
+    if not apps.is_installed("guide"):
+        skipped.append("guide URLs (guide app not installed)")
+
+    return {
+        "meta": {
+            "started_at": started.isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "posts": posts,
+            "events": events,
+            "iterations": iterations,
+            "warmup": warmup,
+            "roles": list(roles),
+            "skipped": skipped,
+        },
+        "results": results,
+    }
@@ -0,0 +1,94 @@
+"""
+Data set for the view benchmarks.
+
+Everything is created with bulk_create inside the caller's transaction, so
+the runner can roll it back when the benchmark finishes.
+"""
+
+import random
+
+from django.contrib.auth.models import Group, User
+from django.utils import timezone
+
+from config.settings import ADMIN_GROUP, CONTRIBUTOR_GROUP, READER_GROUP
+from core.models import ABTestEvent, BackgroundJob, Bookmark, Category, Post
+
+ROLES = ("anonymous", "reader", "contributor", "admin")
+
+BENCH_PREFIX = "bench"
+
+
+def _role_users():
+    groups = {name: Group.objects.get_or_create(name=name)[0] for name in (READER_GROUP, CONTRIBUTOR_GROUP, ADMIN_GROUP)}
+    users = {"anonymous": None}
+    for role, group_name, is_staff in (
+        ("reader", READER_GROUP, False),
+        ("contributor", CONTRIBUTOR_GROUP, False),
+        ("admin", ADMIN_GROUP, True),
+    ):
+        user, _ = User.objects.get_or_create(
+            username=f"{BENCH_PREFIX}_{role}",
+            defaults={"is_staff": is_staff, "is_superuser": is_staff},
+        )
+        user.groups.add(groups[group_name])
+        users[role] = user
+    return users
+
+
+def seed(posts=200, events=1000, categories=7, seed=0):
+    """
+    Create the benchmark data set and return the fixtures the URL kwargs need:
+    {"users": {role: User|None}, "category", "post", "pending_post", "job"}.
+    """
+    rng = random.Random(seed)
+    users = _role_users()
+    author = users["contributor"]
+
+    Category.objects.bulk_create([
+        Category(name=f"{BENCH_PREFIX} category {i}", slug=f"{BENCH_PREFIX}-category-{i}")
+        for i in range(categories)
+    ])
+    category_list = list(Category.objects.filter(slug__startswith=f"{BENCH_PREFIX}-category-"))
+
+    now = timezone.now()
+    Post.objects.bulk_create([
+        Post(
+            title=f"{BENCH_PREFIX} post {i}",
+            slug=f"{BENCH_PREFIX}-post-{i}",
+            content="Lorem ipsum dolor sit amet. " * rng.randint(5, 80),
+            category=category_list[i % len(category_list)],
+            author=author,
+            status="approved" if i % 10 else "pending",
+            published_at=now if i % 10 else None,
+        )
+        for i in range(posts)
+    ], batch_size=1000)
+    post_list = list(Post.objects.filter(slug__startswith=f"{BENCH_PREFIX}-post-").order_by("id"))
+
+    Bookmark.objects.bulk_create([
+        Bookmark(user=users["reader"], post=post)
+        for post in rng.sample(post_list, min(20, len(post_list)))
+        if post.status == "approved"
+    ], ignore_conflicts=True)
+
+    ABTestEvent.objects.bulk_create([
+        ABTestEvent(
+            experiment_name="button_label_kudos_vs_thanks",
+            variant=rng.choice(("kudos", "thanks")),
+            event_type=ABTestEvent.EVENT_TYPE_CONVERSION if rng.random() < 0.1 else ABTestEvent.EVENT_TYPE_EXPOSURE,
+            endpoint="/218b7ae/",
+            session_id=f"{BENCH_PREFIX}{rng.getrandbits(64):016x}",
+        )
+        for _ in range(events)
+    ], batch_size=5000)
+
+    approved = next(p for p in post_list if p.status == "approved")
+    pending = next((p for p in post_list if p.status == "pending"), approved)
+    job = BackgroundJob.objects.create(command="ab_refresh_rollups", output="benchmark\n")
+    return {
+        "users": users,
+        "category": approved.category,
+        "post": approved,
+        "pending_post": pending,
+        "job": job,
+    }
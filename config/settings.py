@@ -74,10 +74,13 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RequestProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -117,6 +120,48 @@ DATABASES = {
     )
 }
 
+# Optional read replica for public pages and analytics database for A/B
+# analysis (core.db_routers); unset aliases fall back to default. Migrations
+# run on default only. In tests they mirror default.
+for _alias, _env in (('replica', 'DATABASE_REPLICA_URL'), ('analytics', 'DATABASE_ANALYTICS_URL')):
+    if os.getenv(_env):
+        DATABASES[_alias] = dj_database_url.parse(os.getenv(_env), conn_max_age=600, conn_health_checks=True)
+        DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+
+# Optional separate database for the A/B event log and its rollups, e.g.
+# sqlite:///app_data/abtest.sqlite3, so event inserts never wait on the main
+# SQLite write lock. Migrate it with "python manage.py migrate --database abtest".
+# Move the events recorded before it was set with "ab_move_events_to_abtest".
+if os.getenv('DATABASE_ABTEST_URL'):
+    DATABASES['abtest'] = dj_database_url.parse(os.getenv('DATABASE_ABTEST_URL'), conn_max_age=600, conn_health_checks=True)
+
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+
+# Seconds a browser reads from default after it wrote (replication lag cover)
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+# Optional Postgres connection pool (core.postgresql_pool, psycopg_pool): one
+# pool per gunicorn worker shared by its threads; connections go back to the
+# pool after each request instead of being held for CONN_MAX_AGE.
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default'].update({
+        'ENGINE': 'core.postgresql_pool',
+        'CONN_MAX_AGE': 0,
+        # The pool checks each connection before handing it out
+        'CONN_HEALTH_CHECKS': os.getenv('DB_POOL_HEALTH_CHECKS', 'True').lower() == 'true',
+    })
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        # Seconds a request waits for a free connection before failing
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        # Seconds before idle connections above min_size are closed
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+        # Seconds before a connection is replaced, however busy
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+    }
+
 # ============================================================================
 # PASSWORD VALIDATION
 # ============================================================================
@@ -169,6 +214,48 @@ READER_GROUP = 'Reader'
 CONTRIBUTOR_GROUP = 'Contributor'
 ADMIN_GROUP = 'Admin'
 
+# ============================================================================
+# CACHE
+# ============================================================================
+
+# Per-process memory cache; hits and misses are counted for /metrics
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.InstrumentedLocMemCache',
+    }
+}
+
+# Seconds a /healthz/ready probe result is reused by each worker
+HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS', '5'))
+
+# ============================================================================
+# REQUEST INSTRUMENTATION (core.middleware, /metrics)
+# ============================================================================
+
+# Share of requests whose SQL is traced for DB time and query counts (0-1)
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', '1.0'))
+# Requests slower than this are logged with their most expensive queries
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '500'))
+# Statements slower than this are stored in SlowQuery with an EXPLAIN (0 disables)
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+# Seconds between writes of the buffered slow queries (0: only run_jobs and explicit flushes)
+SLOW_QUERY_FLUSH_SECONDS = float(os.getenv('SLOW_QUERY_FLUSH_SECONDS', '30'))
+# Where each gunicorn worker writes its metrics snapshot (default: a temp dir per master)
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+# Seconds between a worker's snapshot writes
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+# Bearer token a Prometheus scraper can send instead of a staff session
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Share of all requests run under a profiler and stored as RequestProfile (0-1);
+# staff can always profile one request with ?_profile=1 (cProfile) or ?_profile=sample
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+# Profiler for sampled requests: "sample" (stack sampler) or "cprofile"
+PROFILE_SAMPLE_MODE = os.getenv('PROFILE_SAMPLE_MODE', 'sample')
+# Stack sampler interval
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+# Newest RequestProfile rows kept
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '200'))
+
 # ============================================================================
 # LOGGING (12-Factor: Logs to stdout)
 # ============================================================================
@@ -2,11 +2,31 @@
 Django admin configuration for core app.
 """
 
+import datetime
+
 from django.contrib import admin
-from django.urls import path
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.template.response import TemplateResponse
-from django.db.models import Count
-from .models import Category, Post, Bookmark, ExternalLink, ABTestEvent
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.html import format_html
+from .admin_pagination import EstimatedCountPaginator, KeysetChangeList
+from .bayes import posterior_summaries
+from .db_routers import ANALYTICS, reads_from
+from .experiments import EXPERIMENTS
+from .jobs import enqueue
+from .models import (
+    Category, Post, Bookmark, ExternalLink, ABTestEvent, ABHourlyRollup, ABReportSnapshot, BackgroundJob,
+    MaintenanceCheckpoint, RequestProfile, SlowQuery,
+)
+from .reports import DEFAULT_ENDPOINT, DEFAULT_EXPERIMENT, get_report
+from .rollups import current_state, rollups_behind
+from .slow_queries import is_full_scan
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -43,14 +63,220 @@ class ExternalLinkAdmin(admin.ModelAdmin):
     list_display = ("title", "url", "category")
     search_fields = ("title", "url")
 
+@admin.register(MaintenanceCheckpoint)
+class MaintenanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("name", "last_id", "started_at", "updated_at")
+    readonly_fields = ("started_at", "updated_at")
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    """
+    Queue management commands for the run_jobs worker. Superusers can add a
+    job (command, args, options); everything else is read-only.
+    """
+    list_display = ("id", "command", "status", "created_by", "created_at", "started_at", "finished_at")
+    list_filter = ("status", "command")
+    readonly_fields = (
+        "status", "output", "error", "created_by", "worker", "created_at", "started_at", "heartbeat_at", "finished_at",
+    )
+
+    def has_add_permission(self, request):
+        return request.user.is_superuser
+
+    def has_change_permission(self, request, obj=None):
+        return obj is None and super().has_change_permission(request, obj)
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ("command", "args", "options") + self.readonly_fields
+        return ()
+
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ("command", "args", "options")
+        return super().get_fields(request, obj)
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Statements slower than SLOW_QUERY_MS (core.slow_queries), worst total time first."""
+    list_display = ("short_sql", "source", "count", "total_ms", "mean", "max_ms", "full_scan", "last_seen")
+    list_filter = ("database",)
+    search_fields = ("sql", "source")
+    ordering = ("-total_ms",)
+    readonly_fields = (
+        "sql", "sample_params", "database", "source", "count", "total_ms", "max_ms",
+        "plan", "explained_at", "first_seen", "last_seen", "fingerprint",
+    )
+    exclude = ("explain",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="SQL")
+    def short_sql(self, obj):
+        return obj.sql[:120]
+
+    @admin.display(description="mean ms", ordering="total_ms")
+    def mean(self, obj):
+        return round(obj.mean_ms, 1)
+
+    @admin.display(boolean=True, description="full scan")
+    def full_scan(self, obj):
+        return is_full_scan(obj.explain)
+
+    @admin.display(description="EXPLAIN")
+    def plan(self, obj):
+        return format_html("<pre>{}</pre>", obj.explain or "(not captured)")
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Profiled requests (core.profiling), newest first. Each has a download:
+    a .prof file for pstats/snakeviz (cProfile) or collapsed stacks for
+    flamegraph.pl/speedscope (sampler).
+    """
+    list_display = ("created_at", "method", "path", "view_name", "status_code", "duration_ms", "mode", "trigger", "user", "download")
+    list_filter = ("mode", "trigger", "view_name")
+    search_fields = ("path", "view_name")
+    readonly_fields = (
+        "method", "path", "query_string", "view_name", "status_code", "duration_ms", "mode", "trigger",
+        "user", "samples", "created_at", "download", "report",
+    )
+    exclude = ("data", "collapsed", "summary")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        # Keep the profile payloads out of the changelist query
+        return super().get_queryset(request).select_related("user").defer("data", "collapsed", "summary")
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='core_requestprofile_download',
+            ),
+        ]
+        return custom_urls + urls
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if profile.mode == "cprofile":
+            if not profile.data:
+                raise Http404
+            response = HttpResponse(bytes(profile.data), content_type="application/octet-stream")
+        else:
+            response = HttpResponse(profile.collapsed, content_type="text/plain; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{profile.download_name}"'
+        return response
+
+    @admin.display(description="download")
+    def download(self, obj):
+        url = reverse("admin:core_requestprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.download_name)
+
+    @admin.display(description="summary")
+    def report(self, obj):
+        return format_html("<pre>{}</pre>", obj.summary or "(empty)")
+
+
+@admin.register(ABReportSnapshot)
+class ABReportSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("experiment_name", "endpoint", "rollup_version", "high_water_mark", "generated_at")
+    list_filter = ("experiment_name", "endpoint")
+    readonly_fields = ("experiment_name", "endpoint", "rollup_version", "high_water_mark", "data", "generated_at")
+
+class RegistryChoicesFilter(admin.SimpleListFilter):
+    """
+    Exact-match filter whose choices come from the experiment registry and
+    the hourly rollups rather than a DISTINCT over the events table.
+    """
+    def registry_values(self):
+        return []
+
+    def lookups(self, request, model_admin):
+        values = set(self.registry_values())
+        values.update(ABHourlyRollup.objects.order_by().values_list(self.parameter_name, flat=True).distinct())
+        return [(value, value) for value in sorted(values)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class ExperimentFilter(RegistryChoicesFilter):
+    title = "experiment name"
+    parameter_name = "experiment_name"
+
+    def registry_values(self):
+        return EXPERIMENTS.keys()
+
+
+class VariantFilter(RegistryChoicesFilter):
+    title = "variant"
+    parameter_name = "variant"
+
+    def registry_values(self):
+        return [variant for experiment in EXPERIMENTS.values() for variant in experiment.weights]
+
+
+class EndpointFilter(RegistryChoicesFilter):
+    title = "endpoint"
+    parameter_name = "endpoint"
+
+    def registry_values(self):
+        return [experiment.endpoint for experiment in EXPERIMENTS.values()]
+
+
 @admin.register(ABTestEvent)
 class ABTestEventAdmin(admin.ModelAdmin):
-    list_display = ("experiment_name", "variant", "event_type", "endpoint", "session_id", "created_at", "is_forced")
-    list_filter = ("experiment_name", "variant", "event_type", "endpoint", "is_forced")
-    search_fields = ("session_id", "ip_address", "user_agent")
+    """
+    Large-table mode: estimated counts, keyset pagination, filter choices
+    from the registry/rollups, and exact-match search on indexed columns
+    (see core.admin_pagination). date_hierarchy is replaced by the
+    created_at range filter, which needs no DISTINCT query to render.
+    """
+    list_display = ("experiment_name", "variant", "event_type", "endpoint", "session_id", "created_at", "is_forced", "traffic_class")
+    list_filter = (ExperimentFilter, VariantFilter, "event_type", EndpointFilter, "is_forced", "created_at")
+    search_fields = ("=session_id", "=ip_address")
+    search_help_text = "Exact session ID or IP address"
     readonly_fields = ("created_at",)  # created_at is auto-set, make it readonly
     list_per_page = 100  # Show more events per page
-    date_hierarchy = "created_at"  # Add date navigation
+    ordering = ("-id",)  # Keyset cursor follows the primary key
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """One indexed equality lookup: ip_address if the term is an IP, else session_id."""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        try:
+            validate_ipv46_address(term)
+        except ValidationError:
+            return queryset.filter(session_id=term), False
+        return queryset.filter(ip_address=term), False
 
     def get_urls(self):
         """Add custom URL for A/B test summary dashboard."""
@@ -61,6 +287,11 @@ class ABTestEventAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.abtest_summary_view),
                 name='core_abtestevent_abtest_summary',
             ),
+            path(
+                'abtest-report.json',
+                self.admin_site.admin_view(self.abtest_report_view),
+                name='core_abtestevent_abtest_report',
+            ),
         ]
         return custom_urls + urls
 
@@ -70,45 +301,85 @@ class ABTestEventAdmin(admin.ModelAdmin):
         extra_context['summary_url'] = 'admin:core_abtestevent_abtest_summary'
         return super().changelist_view(request, extra_context)
 
+    @reads_from(ANALYTICS)
+    def abtest_report_view(self, request):
+        """Latest persisted abtest_report snapshot as JSON (see core.reports)."""
+        data, from_cache = get_report(
+            request.GET.get("experiment", DEFAULT_EXPERIMENT),
+            request.GET.get("endpoint", DEFAULT_ENDPOINT),
+            refresh=False,
+        )
+        return JsonResponse(dict(data, from_cache=from_cache))
+
+    def _summary_filters(self, request):
+        """
+        ABHourlyRollup lookups for the summary page's GET filters.
+
+        start/end are inclusive local dates (YYYY-MM-DD); is_forced is "0" or "1".
+        Returns (lookups, selected) where selected echoes the valid values back.
+        """
+        lookups = {}
+        selected = {"start": "", "end": "", "endpoint": "", "is_forced": ""}
+
+        start = parse_date(request.GET.get("start", "") or "")
+        if start:
+            lookups["hour__gte"] = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+            selected["start"] = start.isoformat()
+        end = parse_date(request.GET.get("end", "") or "")
+        if end:
+            lookups["hour__lt"] = timezone.make_aware(
+                datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min)
+            )
+            selected["end"] = end.isoformat()
+        endpoint = request.GET.get("endpoint", "")
+        if endpoint:
+            lookups["endpoint"] = endpoint
+            selected["endpoint"] = endpoint
+        is_forced = request.GET.get("is_forced", "")
+        if is_forced in ("0", "1"):
+            lookups["is_forced"] = is_forced == "1"
+            selected["is_forced"] = is_forced
+        return lookups, selected
+
+    @reads_from(ANALYTICS)
     def abtest_summary_view(self, request):
         """
         A/B test summary dashboard view.
         
-        Uses a single aggregated query to efficiently fetch all counts.
-        Groups by experiment_name, variant, and event_type to avoid N+1 queries.
+        Reads the hourly rollups (core.rollups) as they are, with their "as of"
+        time, so a page load costs O(hours) rather than a scan of ABTestEvent.
+        If newer events are waiting, an ab_refresh_rollups job is queued for
+        the run_jobs worker instead of folding them in here. Supports
+        date-range, endpoint and is_forced filters, all served by the rollups.
         Uses ONLY canonical event types: EVENT_TYPE_EXPOSURE and EVENT_TYPE_CONVERSION.
         """
-        # Single aggregated query - no loops with filter().count()
+        state = current_state()
+        refresh_job = None
+        if rollups_behind(state):
+            refresh_job = enqueue("ab_refresh_rollups", user=request.user, dedupe=True)
+        filters, selected = self._summary_filters(request)
+
+        # Single aggregated query over the rollups - no loops with filter().count()
         qs = (
-            ABTestEvent.objects
-            .values("experiment_name", "variant", "event_type")
-            .annotate(count=Count("id"))
+            ABHourlyRollup.objects
+            .filter(**filters)
+            .values("experiment_name", "variant")
+            .annotate(impressions=Sum("exposures"), conversions=Sum("conversions"))
+            .order_by("experiment_name", "variant")
         )
         
         # Build in-memory structure from aggregated results
         experiments = {}
         
         for row in qs:
-            exp = row["experiment_name"]
-            variant = row["variant"]
-            etype = row["event_type"]
-            count = row["count"]
-            
-            # Initialize nested dicts if needed
-            if exp not in experiments:
-                experiments[exp] = {}
-            if variant not in experiments[exp]:
-                experiments[exp][variant] = {
-                    "impressions": 0,
-                    "conversions": 0,
-                }
-            
-            # Populate counts based on event type
-            if etype == ABTestEvent.EVENT_TYPE_EXPOSURE:
-                experiments[exp][variant]["impressions"] = count
-            elif etype == ABTestEvent.EVENT_TYPE_CONVERSION:
-                experiments[exp][variant]["conversions"] = count
+            experiments.setdefault(row["experiment_name"], {})[row["variant"]] = {
+                "impressions": row["impressions"],
+                "conversions": row["conversions"],
+            }
         
+        # Beta posteriors per experiment, cached per rollup version (see core.bayes)
+        posteriors = posterior_summaries(refresh=False, filters=filters) if experiments else {}
+
         # Compute conversion rates and build summary data
         summary_data = []
         
@@ -162,6 +433,8 @@ class ABTestEventAdmin(admin.ModelAdmin):
                     else:
                         uplift_display = "N/A"
                 
+                posterior = posteriors.get(exp, {}).get(variant_name)
+                
                 summary_data.append({
                     "experiment_name": exp,
                     "variant": variant_name,
@@ -171,6 +444,8 @@ class ABTestEventAdmin(admin.ModelAdmin):
                     "conversion_rate_display": f"{rate * 100:.2f}%",
                     "uplift_display": uplift_display,
                     "is_baseline": is_baseline,
+                    "prob_best_display": f"{posterior['prob_best'] * 100:.1f}%" if posterior else "N/A",
+                    "expected_loss_display": f"{posterior['expected_loss'] * 100:.3f} pp" if posterior else "N/A",
                 })
         
         # Build context
@@ -178,6 +453,15 @@ class ABTestEventAdmin(admin.ModelAdmin):
             self.admin_site.each_context(request),
             title="A/B Test Summary",
             summary_data=summary_data,
+            selected=selected,
+            # Evaluated here: the template renders after the reads_from block has exited
+            endpoints=list(
+                ABHourlyRollup.objects.order_by("endpoint")
+                .values_list("endpoint", flat=True).distinct()
+            ),
+            as_of=state.refreshed_at,
+            high_water_mark=state.high_water_mark,
+            refresh_job=refresh_job,
         )
         
         return TemplateResponse(request, "admin/abtest_summary.html", context)
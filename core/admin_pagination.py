@@ -0,0 +1,93 @@
+"""
+Changelist plumbing for very large admin tables (used by ABTestEventAdmin).
+
+The stock changelist runs an exact COUNT(*) for the paginator (and a second
+one for the unfiltered total) and pages with OFFSET, all of which grow with
+the table. Here:
+
+- EstimatedCountPaginator counts an unfiltered table from the planner's
+  estimate (pg_class.reltuples on PostgreSQL, a cached exact count elsewhere)
+  and a filtered one only up to COUNT_CAP rows.
+- KeysetChangeList adds a "?before=<id>" cursor, so the "Older" link walks
+  the primary-key index instead of an ever-larger OFFSET.
+"""
+
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+CURSOR_VAR = "before"
+
+# Filtered querysets are counted up to this many rows ("10,000+" beyond)
+COUNT_CAP = 10000
+
+# How long a cached exact table count stands in for an estimate
+ESTIMATE_CACHE_SECONDS = 300
+
+
+def estimated_row_count(model, using="default"):
+    """Approximate number of rows in a model's table, without a full scan."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+            row = cursor.fetchone()
+        # -1 (or 0) until the table has been vacuumed/analyzed at least once
+        if row and row[0] > 0:
+            return row[0]
+
+    key = f"estimated_row_count:{using}:{table}"
+    return cache.get_or_set(key, lambda: model._default_manager.using(using).count(), ESTIMATE_CACHE_SECONDS)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count never scans more than COUNT_CAP rows."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return estimated_row_count(queryset.model, queryset.db)
+        # SELECT COUNT(*) FROM (SELECT ... LIMIT cap)
+        return queryset.order_by()[:COUNT_CAP + 1].count()
+
+    @property
+    def count_is_capped(self):
+        return self.count > COUNT_CAP
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList that pages by primary-key cursor when sorted by the default order.
+
+    next_cursor_url links to the rows older than the last one shown; it is
+    None when the user sorted by a column or this is the last page.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    @property
+    def keyset_active(self):
+        return ORDER_VAR not in self.params
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        cursor = self.params.get(CURSOR_VAR, "")
+        if self.keyset_active and cursor.isdigit():
+            qs = qs.filter(pk__lt=int(cursor))
+        return qs
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.result_list = list(self.result_list)
+        self.next_cursor_url = None
+        if self.keyset_active and len(self.result_list) >= self.list_per_page:
+            self.next_cursor_url = self.get_query_string(
+                {CURSOR_VAR: self.result_list[-1].pk}, remove=[PAGE_VAR]
+            )
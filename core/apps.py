@@ -8,12 +8,22 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         """
-        Startup hook that ensures admin user exists and is up-to-date.
+        Startup hook that installs the slow-query watcher on every database
+        connection (core.slow_queries), detaches A/B events from deleted users
+        and ensures admin user exists and is up-to-date.
         
         Requires DJANGO_ADMIN_INITIAL_PASSWORD environment variable to be set.
         Creates admin user if it doesn't exist, or updates password and flags if it does.
         """
         import os
+        from django.contrib.auth.models import User
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete
+        from .models import detach_deleted_user
+        from .slow_queries import install
+
+        connection_created.connect(install, dispatch_uid="core.slow_queries.install")
+        post_delete.connect(detach_deleted_user, sender=User, dispatch_uid="core.models.detach_deleted_user")
         
         # Only proceed if password environment variable is set
         admin_password = os.environ.get('DJANGO_ADMIN_INITIAL_PASSWORD', '').strip()
@@ -0,0 +1,74 @@
+"""
+Cached Bayesian summaries of every experiment, for the admin dashboard.
+
+Posterior sampling (core.stats.beta_posterior) is cheap but not free, and the
+summary page is reloaded often. Results are cached under the rollup version
+and high-water mark, so the page only re-samples after new events have been
+folded into the rollups (by ab_refresh_rollups, not the page itself) or the
+rollups were rebuilt.
+Filtered views (date range, endpoint, forced flag) get their own cache entry.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import ABHourlyRollup
+from .rollups import current_state, refresh_rollups
+from .stats import DEFAULT_POSTERIOR_SAMPLES, beta_posterior
+
+POSTERIOR_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def posterior_cache_key(state, samples, seed, filters=None):
+    key = f"ab_posteriors:v{state.version}:{state.high_water_mark}:{samples}:{seed}"
+    if filters:
+        key += ":" + hashlib.md5(repr(sorted(filters.items())).encode()).hexdigest()
+    return key
+
+
+def posterior_summaries(refresh=False, samples=DEFAULT_POSTERIOR_SAMPLES, seed=0, filters=None):
+    """
+    {experiment: {variant: {"prob_best", "expected_loss", "ci_lower", "ci_upper"}}}.
+
+    Counts cover all traffic, like the admin summary table they sit next to.
+    `filters` are ABHourlyRollup lookups (e.g. {"endpoint": "/218b7ae/"}).
+    Served from the rollups as they are unless refresh=True.
+    """
+    state = refresh_rollups() if refresh else current_state()
+    key = posterior_cache_key(state, samples, seed, filters)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    totals = {}
+    rows = (
+        ABHourlyRollup.objects.filter(**(filters or {}))
+        .values("experiment_name", "variant")
+        .annotate(exposures=Sum("exposures"), conversions=Sum("conversions"))
+        .order_by("experiment_name", "variant")
+    )
+    for row in rows:
+        totals.setdefault(row["experiment_name"], []).append(row)
+
+    summaries = {}
+    for experiment, variants in totals.items():
+        posterior = beta_posterior(
+            [v["conversions"] for v in variants],
+            [v["exposures"] for v in variants],
+            samples=samples,
+            seed=seed,
+        )
+        summaries[experiment] = {
+            v["variant"]: {
+                "prob_best": float(posterior.prob_best[i]),
+                "expected_loss": float(posterior.expected_loss[i]),
+                "ci_lower": float(posterior.ci_lower[i]),
+                "ci_upper": float(posterior.ci_upper[i]),
+            }
+            for i, v in enumerate(variants)
+        }
+
+    cache.set(key, summaries, POSTERIOR_CACHE_TIMEOUT)
+    return summaries
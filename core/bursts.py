@@ -0,0 +1,226 @@
+"""
+Single-pass sliding-window burst detection for A/B test traffic.
+
+Walks ABTestEvent rows once in created_at order and keeps a deque of recent
+events per session, per IP and globally. Whenever a key has more than its
+threshold of events inside the window, every event in that window is flagged.
+Each event is touched O(1) times per key, so arbitrary historic ranges are
+scanned in one ordered pass instead of repeated GROUP BY passes.
+
+The stored created_minute bucket is used first to skip quiet stretches: a
+window can only exceed a threshold if the minute buckets it overlaps do.
+Flagged events are re-labelled "suspect" so purges and analysis pick them up
+through the indexed traffic_class column, and get burst_flagged=True so
+ab_reclassify_traffic, which re-scores from the stateless rules in
+core.traffic, keeps them suspect instead of turning them back into humans.
+"""
+
+import math
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.db.models import Count
+
+from .models import ABTestEvent
+from .rollups import affected_cells, invalidate_rollups
+from .traffic import TRAFFIC_CLASS_HUMAN, TRAFFIC_CLASS_SUSPECT
+
+DEFAULT_WINDOW = timedelta(minutes=1)
+
+# Events per window above which a key is bursting (0 disables that dimension).
+# The global default matches the historic ">50 events per minute" purge rule.
+DEFAULT_PER_SESSION_THRESHOLD = 20
+DEFAULT_PER_IP_THRESHOLD = 30
+DEFAULT_GLOBAL_THRESHOLD = 50
+
+# Minute buckets fetched per ordered scan query
+BUCKETS_PER_QUERY = 500
+
+
+class _Window:
+    """Events of one key inside the sliding window; entries are [ts, id, flagged]."""
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        self.entries = deque()
+
+
+class SlidingWindowBurstDetector:
+    """
+    Streaming burst detector. Feed events in non-decreasing timestamp order.
+
+    feed() returns the ids that became flagged because of that event (possibly
+    including earlier events that are part of the same burst window).
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW,
+                 per_session=DEFAULT_PER_SESSION_THRESHOLD,
+                 per_ip=DEFAULT_PER_IP_THRESHOLD,
+                 global_threshold=DEFAULT_GLOBAL_THRESHOLD):
+        self.window = window
+        self.thresholds = {
+            "session": per_session,
+            "ip": per_ip,
+            "global": global_threshold,
+        }
+        self._windows = {"session": {}, "ip": {}, "global": {}}
+        self._fed = 0
+        self.flag_counts = {"session": 0, "ip": 0, "global": 0}
+        # Set by scan_for_bursts when it stops at its deadline
+        self.stopped_early = False
+        # Peak window size seen per bursting key, for reporting
+        self.bursts = {}
+
+    def feed(self, event_id, ts, session_id, ip_address):
+        newly_flagged = []
+        keys = (
+            ("session", session_id),
+            ("ip", ip_address),
+            ("global", None),
+        )
+        for dimension, key in keys:
+            threshold = self.thresholds[dimension]
+            if not threshold or (dimension != "global" and not key):
+                continue
+
+            windows = self._windows[dimension]
+            win = windows.get(key)
+            if win is None:
+                win = windows[key] = _Window()
+            entries = win.entries
+            entries.append([ts, event_id, False])
+
+            cutoff = ts - self.window
+            while entries[0][0] <= cutoff:
+                entries.popleft()
+
+            if len(entries) > threshold:
+                # Flag right-to-left until we reach the part of the window already flagged
+                for entry in reversed(entries):
+                    if entry[2]:
+                        break
+                    entry[2] = True
+                    newly_flagged.append(entry[1])
+                    self.flag_counts[dimension] += 1
+                burst_key = (dimension, key)
+                self.bursts[burst_key] = max(self.bursts.get(burst_key, 0), len(entries))
+
+        self._fed += 1
+        if self._fed % 10000 == 0:
+            self._evict(ts)
+        return newly_flagged
+
+    def _evict(self, now):
+        """Drop keys whose newest event has left the window (bounds memory)."""
+        cutoff = now - self.window
+        for windows in self._windows.values():
+            stale = [k for k, w in windows.items() if w.entries[-1][0] <= cutoff]
+            for k in stale:
+                del windows[k]
+
+
+def candidate_minutes(queryset, window, min_threshold):
+    """
+    Minute buckets that could hold a bursting window.
+
+    A window of W seconds overlaps at most ceil(W/60)+1 consecutive buckets, so
+    only runs of buckets whose combined count exceeds the smallest threshold
+    need to be scanned. Uses one GROUP BY over the indexed created_minute column.
+    """
+    counts = dict(
+        queryset.values_list("created_minute").annotate(n=Count("id")).order_by()
+    )
+    if not counts:
+        return []
+
+    span = math.ceil(window.total_seconds() / 60) + 1
+    step = timedelta(minutes=1)
+    candidates = set()
+    for minute in counts:
+        # Every run of `span` consecutive buckets that contains this one
+        for offset in range(span):
+            start = minute - offset * step
+            run = [start + i * step for i in range(span)]
+            if sum(counts.get(m, 0) for m in run) > min_threshold:
+                candidates.update(m for m in run if m in counts)
+    return sorted(candidates)
+
+
+def scan_for_bursts(since=None, until=None, window=DEFAULT_WINDOW,
+                    per_session=DEFAULT_PER_SESSION_THRESHOLD,
+                    per_ip=DEFAULT_PER_IP_THRESHOLD,
+                    global_threshold=DEFAULT_GLOBAL_THRESHOLD,
+                    on_flagged=None, chunk_size=2000, deadline=None):
+    """
+    Run the detector over ABTestEvent rows in [since, until).
+
+    on_flagged(ids) is called with each batch of newly flagged ids as the scan
+    progresses, so callers can persist verdicts without holding every id.
+    With a deadline (a time.monotonic() value) the scan stops once it passes
+    and sets detector.stopped_early; ids flagged so far are still reported.
+    Returns the detector (for flag_counts / bursts reporting).
+    """
+    detector = SlidingWindowBurstDetector(
+        window=window,
+        per_session=per_session,
+        per_ip=per_ip,
+        global_threshold=global_threshold,
+    )
+    active = [t for t in (per_session, per_ip, global_threshold) if t]
+    if not active:
+        return detector
+
+    qs = ABTestEvent.objects.all()
+    if since is not None:
+        qs = qs.filter(created_at__gte=since)
+    if until is not None:
+        qs = qs.filter(created_at__lt=until)
+
+    minutes = candidate_minutes(qs, window, min(active))
+
+    pending = []
+    fed = 0
+    for i in range(0, len(minutes), BUCKETS_PER_QUERY):
+        if deadline is not None and time.monotonic() >= deadline:
+            detector.stopped_early = True
+            break
+        rows = (
+            qs.filter(created_minute__in=minutes[i:i + BUCKETS_PER_QUERY])
+            .order_by("created_at", "id")
+            .values_list("id", "created_at", "session_id", "ip_address")
+            .iterator(chunk_size=chunk_size)
+        )
+        for event_id, ts, session_id, ip_address in rows:
+            pending.extend(detector.feed(event_id, ts, session_id, ip_address))
+            if on_flagged and len(pending) >= chunk_size:
+                on_flagged(pending)
+                pending = []
+            fed += 1
+            if deadline is not None and fed % chunk_size == 0 and time.monotonic() >= deadline:
+                detector.stopped_early = True
+                break
+        if detector.stopped_early:
+            break
+
+    if on_flagged and pending:
+        on_flagged(pending)
+    return detector
+
+
+def mark_suspect(ids):
+    """
+    Persist burst verdicts: every event among `ids` is marked burst_flagged and
+    the human ones become suspect. Returns the number re-labelled.
+    """
+    ids = set(ids)
+    ABTestEvent.objects.filter(id__in=ids, burst_flagged=False).update(burst_flagged=True)
+    events = ABTestEvent.objects.filter(
+        id__in=ids,
+        traffic_class=TRAFFIC_CLASS_HUMAN,
+    )
+    cells = affected_cells(events)
+    marked = events.update(traffic_class=TRAFFIC_CLASS_SUSPECT)
+    if marked:
+        invalidate_rollups(cells)
+    return marked
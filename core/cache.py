@@ -0,0 +1,24 @@
+"""
+Cache backends that count hits and misses into core.metrics.REGISTRY.
+
+Configured in settings.CACHES; every lookup goes through get() (get_many
+and get_or_set included), which records cache_requests_total{result=...}.
+"""
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from .metrics import REGISTRY
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        hit = value is not _MISSING
+        REGISTRY.inc("cache_requests_total", {"result": "hit" if hit else "miss"})
+        return value if hit else default
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    pass
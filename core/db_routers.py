@@ -0,0 +1,189 @@
+"""
+Database routing for an optional read replica, analytics database and
+separate A/B event database.
+
+Writes go to "default" (for the A/B tables see below). Reads go to
+"default" too, except inside a reads_from() block:
+
+- read-only public views (core.views.home, category_list, post_detail) are
+  wrapped with replica_reads and read from REPLICA;
+- A/B analysis commands and the admin A/B summaries use
+  reads_from(ANALYTICS), so a heavy ab_analyze run never competes with page
+  traffic for the same database.
+
+An alias that is not configured falls back (ANALYTICS -> REPLICA ->
+"default"), so with neither DATABASE_REPLICA_URL nor DATABASE_ANALYTICS_URL
+set nothing changes.
+
+Read-your-writes: once anything is written inside a reads_from() block the
+rest of the block reads from "default", and ReplicaPinMiddleware sets a
+short-lived cookie after a request that wrote (or was a POST), so that
+browser's next requests skip the replica for REPLICA_PIN_SECONDS while the
+replica catches up. Sessions and the app's own bookkeeping tables never leave
+"default" and never pin.
+
+The A/B tables (AB_MODELS: events, rollups and their state) can live in
+their own database, ABTEST (DATABASE_ABTEST_URL): on SQLite a second file,
+so the high-rate exposure/click inserts take a different write lock than
+content edits and session saves. When it is configured every read and write
+of those tables goes there - it is its own isolation, so replica and
+analytics routing do not apply to them - and allow_migrate creates them only
+there (run "migrate --database abtest" as well as plain "migrate"). The
+user foreign key is not enforced by the database (db_constraint=False).
+Configuring ABTEST later does not move existing events by itself: run
+ab_move_events_to_abtest before traffic reaches the new database, or they
+stay in "default", unread.
+
+Migrations run against "default" (and ABTEST); replicas get the schema
+through replication.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import connections
+
+DEFAULT = "default"
+REPLICA = "replica"
+ANALYTICS = "analytics"
+ABTEST = "abtest"
+
+# Where each alias's reads go when it is not configured
+FALLBACKS = {ANALYTICS: REPLICA, REPLICA: DEFAULT, ABTEST: DEFAULT}
+
+AB_MODELS = frozenset({
+    "core.abtestevent",
+    "core.abhourlyrollup",
+    "core.abrollupstate",
+    "core.absequentialstate",
+    "core.abreportsnapshot",
+})
+
+# Read and written on "default" only; writes to them do not pin
+PRIMARY_MODELS = frozenset({
+    "sessions.session",
+    "core.backgroundjob",
+    "core.requestprofile",
+    "core.slowquery",
+    # Read-modify-write caches of the A/B analyses
+    "core.absequentialstate",
+    "core.abreportsnapshot",
+})
+# Writing these does not pin: append-only event logs nobody reads back in the
+# same request, and the rollups, which ab_refresh_rollups maintains outside
+# any reads_from() block so analyses keep reading them from ANALYTICS
+NO_PIN_MODELS = PRIMARY_MODELS | {"core.abtestevent", "core.abhourlyrollup", "core.abrollupstate"}
+
+PIN_COOKIE = "db_pin"
+DEFAULT_PIN_SECONDS = 5
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class _Route:
+    def __init__(self, alias, wrote=False):
+        self.alias = alias
+        self.wrote = wrote
+
+
+_route = ContextVar("db_route", default=None)
+
+
+def configured(alias):
+    """`alias`, or the first configured alias it falls back to."""
+    while alias != DEFAULT and alias not in connections.settings:
+        alias = FALLBACKS[alias]
+    return alias
+
+
+@contextmanager
+def reads_from(alias):
+    """
+    Route reads in this block to `alias` (None: "default", but still track
+    writes). Usable as a decorator. Yields the route; route.wrote tells
+    whether anything was written.
+    """
+    parent = _route.get()
+    route = _Route(alias, wrote=parent.wrote if parent else False)
+    token = _route.set(route)
+    try:
+        yield route
+    finally:
+        _route.reset(token)
+        if parent is not None and route.wrote:
+            parent.wrote = True
+
+
+def is_pinned(request):
+    return PIN_COOKIE in request.COOKIES
+
+
+def replica_reads(view):
+    """Serve a read-only view from REPLICA unless the request writes or this browser just wrote."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or is_pinned(request):
+            return view(request, *args, **kwargs)
+        with reads_from(REPLICA):
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def abtest_database():
+    """Alias holding the A/B tables, or None when they are in "default"."""
+    alias = configured(ABTEST)
+    return None if alias == DEFAULT else alias
+
+
+class PrimaryReplicaRouter:
+    """
+    A/B tables to ABTEST when configured; other reads per the current
+    reads_from() block; everything else to "default".
+    """
+
+    def db_for_read(self, model, **hints):
+        abtest = abtest_database()
+        instance = hints.get("instance")
+        if abtest is not None:
+            if _label(model) in AB_MODELS:
+                return abtest
+            if instance is not None and instance._state.db == abtest:
+                # e.g. event.user: users are not in the A/B database
+                instance = None
+        route = _route.get()
+        if route is None or route.alias is None or _label(model) in PRIMARY_MODELS:
+            return DEFAULT
+        if instance is not None and instance._state.db:
+            # Follow relations on the database the instance came from
+            return instance._state.db
+        if route.wrote:
+            return DEFAULT
+        return configured(route.alias)
+
+    def db_for_write(self, model, **hints):
+        abtest = abtest_database()
+        if abtest is not None and _label(model) in AB_MODELS:
+            return abtest
+        route = _route.get()
+        if route is not None and _label(model) not in NO_PIN_MODELS:
+            route.wrote = True
+        return DEFAULT
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data; events only point at users by id
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        abtest = abtest_database()
+        if abtest is None:
+            return None
+        is_ab = f"{app_label}.{model_name}" in AB_MODELS
+        if db == abtest:
+            # Only the A/B tables (RunPython without a model_name hint is skipped)
+            return is_ab
+        return False if is_ab else None
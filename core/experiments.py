@@ -0,0 +1,45 @@
+"""
+Registry of running A/B experiments and their configured traffic weights.
+
+The views assign variants uniformly, so the weights here are what the sample
+ratio mismatch check (ab_check_traffic_split) tests the observed split against.
+Experiments missing from the registry are assumed to split evenly across the
+variants actually observed.
+"""
+
+from collections import namedtuple
+
+Experiment = namedtuple("Experiment", ["name", "endpoint", "weights"])
+
+EXPERIMENTS = {
+    "button_label_kudos_vs_thanks": Experiment(
+        name="button_label_kudos_vs_thanks",
+        endpoint="/218b7ae/",
+        weights={"kudos": 0.5, "thanks": 0.5},
+    ),
+}
+
+
+def get_experiment(name):
+    """Registered Experiment, or None."""
+    return EXPERIMENTS.get(name)
+
+
+def expected_weights(name, observed_variants=()):
+    """
+    {variant: weight} (normalised) to test an experiment's split against.
+
+    Registered variants that received no traffic keep their weight, which is
+    exactly what an SRM check needs to flag. Unregistered variants that did
+    receive traffic get weight 0 under a registered experiment.
+    """
+    experiment = get_experiment(name)
+    if experiment is None:
+        variants = sorted(set(observed_variants))
+        return {variant: 1 / len(variants) for variant in variants} if variants else {}
+
+    weights = dict(experiment.weights)
+    for variant in observed_variants:
+        weights.setdefault(variant, 0.0)
+    total = sum(weights.values())
+    return {variant: weight / total for variant, weight in sorted(weights.items())}
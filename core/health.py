@@ -0,0 +1,154 @@
+"""
+Readiness probe for /healthz/ready (core.views_health).
+
+readiness() checks every configured database (SELECT 1), the default cache
+(a set/get round trip) and whether any migration on disk is unapplied to
+"default" or the A/B event database, and
+reports each database connection's age and, when the backend keeps a pool,
+its pool statistics. The result is cached per process for
+HEALTH_CACHE_SECONDS, so a monitor polling every second costs at most one
+probe per worker per interval.
+
+Only "default" and, when configured, the A/B event database gate readiness:
+an unreachable replica or analytics database is reported but does not take
+the web service out of rotation. public() trims a result to statuses and
+exception class names for anonymous callers.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .db_routers import DEFAULT, abtest_database
+
+DEFAULT_CACHE_SECONDS = 5.0
+
+CACHE_KEY = "healthz:ready"
+
+_lock = threading.Lock()
+_cached = None  # (monotonic expiry, result)
+_leaf_nodes = None
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000.0, 2)
+
+
+def _failure(exc):
+    return {"status": "error", "error": type(exc).__name__}
+
+
+def connection_age(connection):
+    """Seconds since this worker opened `connection`, or None if unknown."""
+    max_age = connection.settings_dict.get("CONN_MAX_AGE")
+    if connection.connection is None or connection.close_at is None or max_age is None:
+        return None
+    return round(time.monotonic() - (connection.close_at - max_age), 1)
+
+
+def check_database(alias):
+    connection = connections[alias]
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except Exception as exc:
+        return _failure(exc)
+    result = {
+        "status": "ok",
+        "vendor": connection.vendor,
+        "latency_ms": _elapsed_ms(started),
+        "connection_age_seconds": connection_age(connection),
+    }
+    pool_stats = getattr(connection, "pool_stats", None)
+    if callable(pool_stats):
+        result["pool"] = pool_stats()
+    return result
+
+
+def check_cache():
+    started = time.perf_counter()
+    token = get_random_string(12)
+    try:
+        cache.set(CACHE_KEY, token, 30)
+        if cache.get(CACHE_KEY) != token:
+            return {"status": "error", "error": "cache round trip returned a different value"}
+    except Exception as exc:
+        return _failure(exc)
+    return {"status": "ok", "latency_ms": _elapsed_ms(started)}
+
+
+def _migration_leaves():
+    """Latest migration of every app, read from disk once per process."""
+    global _leaf_nodes
+    if _leaf_nodes is None:
+        _leaf_nodes = set(MigrationLoader(None, ignore_no_migrations=True).graph.leaf_nodes())
+    return _leaf_nodes
+
+
+def check_migrations(alias=DEFAULT):
+    try:
+        applied = MigrationRecorder(connections[alias]).applied_migrations()
+    except Exception as exc:
+        return _failure(exc)
+    pending = sorted(f"{app}.{name}" for app, name in _migration_leaves() - set(applied))
+    return {"status": "error" if pending else "ok", "unapplied": pending}
+
+
+def required_databases():
+    """Aliases the app cannot serve without: "default" and the A/B event database."""
+    return {DEFAULT, abtest_database() or DEFAULT}
+
+
+def probe():
+    """Run every check now; optional databases are marked required=False."""
+    required = required_databases()
+    checks = {}
+    for alias in connections:
+        checks[f"db:{alias}"] = dict(check_database(alias), required=alias in required)
+    checks["cache"] = check_cache()
+    # Every database migrate writes to; an unmigrated A/B database would 500 on every exposure
+    for alias in sorted(required):
+        checks["migrations" if alias == DEFAULT else f"migrations:{alias}"] = check_migrations(alias)
+    ready = all(check["status"] == "ok" for check in checks.values() if check.get("required", True))
+    return {
+        "status": "ok" if ready else "error",
+        "checked_at": timezone.now().isoformat(),
+        "checks": checks,
+    }
+
+
+def public(result):
+    """`result` without backend vendors, pool stats, latencies or migration names."""
+    return dict(result, checks={
+        name: {key: value for key, value in check.items() if key in ("status", "error", "required")}
+        for name, check in result["checks"].items()
+    })
+
+
+def readiness():
+    """(result, cached) - probe() at most once per HEALTH_CACHE_SECONDS in this process."""
+    global _cached
+    ttl = getattr(settings, "HEALTH_CACHE_SECONDS", DEFAULT_CACHE_SECONDS)
+    with _lock:
+        now = time.monotonic()
+        if _cached is not None and _cached[0] > now:
+            return _cached[1], True
+        result = probe()
+        _cached = (now + ttl, result)
+        return result, False
+
+
+def reset():
+    """Forget the cached result (tests)."""
+    global _cached
+    with _lock:
+        _cached = None
@@ -0,0 +1,222 @@
+"""
+Database-backed queue for running management commands off the web workers.
+
+enqueue() inserts a BackgroundJob; "python manage.py run_jobs" claims queued
+jobs one at a time and runs them with call_command(). The claim is a
+conditional UPDATE (queued -> running), so several workers can poll the same
+table without running a job twice, on SQLite as well as PostgreSQL.
+
+While a job runs, its output is appended to BackgroundJob.output in batches
+(at most every OUTPUT_FLUSH_SECONDS), which is what the admin-tools log-tail
+endpoint polls, and a side thread touches heartbeat_at every
+HEARTBEAT_SECONDS. A worker that dies without recording an outcome (SIGKILL,
+a deploy that outlives the shutdown grace period) leaves its job "running"
+with a heartbeat that stops moving; reap_stale_jobs() marks such jobs failed
+after STALE_JOB_SECONDS, before any claim or dedupe looks at the queue.
+
+Only BackgroundJob.ALLOWED_COMMANDS can be queued.
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.core.management import call_command, get_commands
+from django.db import connections
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils import timezone
+
+from .models import BackgroundJob
+from .slow_queries import reset_source, set_source
+
+OUTPUT_FLUSH_SECONDS = 1.0
+
+HEARTBEAT_SECONDS = 30.0
+
+# A running job whose heartbeat is older than this is assumed dead
+STALE_JOB_SECONDS = 5 * 60
+
+
+class UnknownCommand(ValueError):
+    pass
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def enqueue(command, args=(), options=None, user=None, dedupe=False):
+    """
+    Queue a management command and return its BackgroundJob.
+
+    With dedupe=True an identical job that is still queued or running is
+    returned instead of queueing another one (e.g. a double-clicked purge).
+    Raises UnknownCommand for anything outside BackgroundJob.ALLOWED_COMMANDS.
+    """
+    if command not in BackgroundJob.ALLOWED_COMMANDS or command not in get_commands():
+        raise UnknownCommand(f"Not available as a background job: {command}")
+    args, options = list(args), dict(options or {})
+
+    if dedupe:
+        # A dead worker's job must not block the command forever
+        reap_stale_jobs()
+        for job in BackgroundJob.objects.filter(
+            command=command,
+            status__in=[BackgroundJob.STATUS_QUEUED, BackgroundJob.STATUS_RUNNING],
+        ):
+            if job.args == args and job.options == options:
+                return job
+
+    return BackgroundJob.objects.create(
+        command=command,
+        args=args,
+        options=options,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def reap_stale_jobs(stale_seconds=STALE_JOB_SECONDS):
+    """Mark running jobs whose worker stopped sending heartbeats as failed; returns how many."""
+    now = timezone.now()
+    return (
+        BackgroundJob.objects.filter(status=BackgroundJob.STATUS_RUNNING)
+        .annotate(last_seen=Coalesce("heartbeat_at", "started_at", "created_at"))
+        .filter(last_seen__lt=now - timedelta(seconds=stale_seconds))
+        .update(
+            status=BackgroundJob.STATUS_FAILED,
+            error=f"Worker stopped responding (no heartbeat for {stale_seconds}s)\n",
+            finished_at=now,
+        )
+    )
+
+
+def claim_next_job(worker=None):
+    """Mark the oldest queued job as running and return it (None if the queue is empty)."""
+    worker = worker or worker_name()
+    reap_stale_jobs()
+    while True:
+        job = (
+            BackgroundJob.objects.filter(status=BackgroundJob.STATUS_QUEUED)
+            .order_by("created_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = BackgroundJob.objects.filter(pk=job.pk, status=BackgroundJob.STATUS_QUEUED).update(
+            status=BackgroundJob.STATUS_RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            worker=worker,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Another worker got it first; try the next one
+
+
+class JobOutput:
+    """File-like sink that appends to BackgroundJob.output in periodic batches."""
+
+    def __init__(self, job_id, flush_seconds=OUTPUT_FLUSH_SECONDS):
+        self.job_id = job_id
+        self.flush_seconds = flush_seconds
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def write(self, text):
+        self._buffer.append(text)
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        chunk = "".join(self._buffer)
+        self._buffer = []
+        BackgroundJob.objects.filter(pk=self.job_id).update(output=Concat(F("output"), Value(chunk)))
+
+
+class Heartbeat:
+    """Context manager that touches a running job's heartbeat_at from a side thread."""
+
+    def __init__(self, job_id, interval=HEARTBEAT_SECONDS):
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-{job_id}-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        beats = 0
+        try:
+            while not self._stop.wait(self.interval):
+                BackgroundJob.objects.filter(pk=self.job_id, status=BackgroundJob.STATUS_RUNNING).update(
+                    heartbeat_at=timezone.now(),
+                )
+                beats += 1
+        finally:
+            if beats:
+                # This thread's own connections
+                connections.close_all()
+
+
+def run_job(job):
+    """Run a claimed job to completion and record its outcome."""
+    stream = JobOutput(job.pk)
+    status, error = BackgroundJob.STATUS_SUCCEEDED, ""
+    source = set_source(f"job:{job.command}")
+    try:
+        with Heartbeat(job.pk):
+            call_command(job.command, *job.args, stdout=stream, stderr=stream, **job.options)
+    except Exception:
+        status, error = BackgroundJob.STATUS_FAILED, traceback.format_exc()
+    except BaseException:
+        # Worker shutting down mid-job: record it rather than leave it "running"
+        _finish(job, stream, BackgroundJob.STATUS_FAILED, "Interrupted: worker stopped\n")
+        raise
+    finally:
+        reset_source(source)
+    _finish(job, stream, status, error)
+    job.refresh_from_db()
+    return job
+
+
+def _finish(job, stream, status, error):
+    stream.flush()
+    BackgroundJob.objects.filter(pk=job.pk).update(status=status, error=error, finished_at=timezone.now())
+
+
+def tail(text, lines):
+    """Last `lines` lines of text."""
+    return "\n".join(text.splitlines()[-lines:]) if lines > 0 else ""
+
+
+def job_to_dict(job):
+    return {
+        "id": job.pk,
+        "command": job.command,
+        "args": job.args,
+        "options": job.options,
+        "status": job.status,
+        "finished": job.is_finished,
+        "worker": job.worker,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.error,
+    }
@@ -6,12 +6,67 @@ executive/managerial interpretation.
 
 Usage:
     python manage.py ab_analyze --experiment=button_label_kudos_vs_thanks
+    python manage.py ab_analyze --bootstrap=10000 [--bootstrap-workers=4] [--seed=0]
+    python manage.py ab_analyze --method=sequential [--tau=0.02]
+    python manage.py ab_analyze --method=bayes [--samples=20000] [--seed=0]
+    python manage.py ab_analyze --segment=device|browser|os
 """
 
+from collections import Counter
 from django.core.management.base import BaseCommand
 from django.db.models import Count, Q
+from core.db_routers import ANALYTICS, reads_from
 from core.models import ABTestEvent
+from core.rollups import refresh_rollups
+from core.sequential import DEFAULT_TAU, sequential_analysis
+from core.stats import (
+    DEFAULT_POSTERIOR_SAMPLES,
+    bayesian_ab_test,
+    bootstrap_rate_difference,
+    describe_effect_size,
+    two_proportion_ztest,
+)
+from core.traffic import TRAFFIC_CLASS_HUMAN
 import math
+import os
+
+import numpy as np
+
+# --segment choice -> ABTestEvent column filled by core.user_agents
+SEGMENT_FIELDS = {
+    'device': 'device_class',
+    'browser': 'browser_family',
+    'os': 'os_family',
+}
+
+
+def session_outcome_counts(base_query, variants):
+    """
+    Per-session outcomes as {variant: (values, counts)} for bootstrapping.
+
+    Each exposed session contributes its number of conversions (0 if none).
+    One GROUP BY (variant, session_id) query is streamed and collapsed into a
+    histogram of outcome values, so memory grows with distinct values, not sessions.
+    """
+    rows = (
+        ABTestEvent.objects
+        .filter(base_query)
+        .values('variant', 'session_id')
+        .annotate(
+            exposures=Count('id', filter=Q(event_type=ABTestEvent.EVENT_TYPE_EXPOSURE)),
+            conversions=Count('id', filter=Q(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)),
+        )
+        .order_by()
+        .values_list('variant', 'exposures', 'conversions')
+    )
+    histograms = {variant: Counter() for variant in variants}
+    for variant, exposures, conversions in rows.iterator(chunk_size=5000):
+        if exposures and variant in histograms:
+            histograms[variant][conversions] += 1
+    return {
+        variant: (sorted(hist), [hist[value] for value in sorted(hist)])
+        for variant, hist in histograms.items()
+    }
 
 
 class Command(BaseCommand):
@@ -29,16 +84,73 @@ class Command(BaseCommand):
             action='store_true',
             help='Exclude forced variants (from ?force_variant parameter)',
         )
+        parser.add_argument(
+            '--include-non-human',
+            action='store_true',
+            help='Include events classified as bot/monitor/suspect (default: humans only)',
+        )
         parser.add_argument(
             '--confidence-level',
             type=float,
             default=0.95,
             help='Confidence level for intervals (default: 0.95 for 95%%)',
         )
+        parser.add_argument(
+            '--method',
+            choices=['ztest', 'sequential', 'bayes'],
+            default='ztest',
+            help='ztest: fixed-horizon z-test on raw events (default); '
+                 'sequential: always-valid mSPRT from hourly rollups, safe to check repeatedly; '
+                 'bayes: Beta-Binomial posteriors (P(B > A), expected loss, credible intervals)',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=DEFAULT_POSTERIOR_SAMPLES,
+            help=f'Bayes mode: posterior draws per variant (default: {DEFAULT_POSTERIOR_SAMPLES})',
+        )
+        parser.add_argument(
+            '--tau',
+            type=float,
+            default=DEFAULT_TAU,
+            help=f'Sequential mode: prior scale of the true rate difference (default: {DEFAULT_TAU})',
+        )
+        parser.add_argument(
+            '--segment',
+            choices=sorted(SEGMENT_FIELDS),
+            default=None,
+            help='Also break results down by device class, browser family or OS',
+        )
+        parser.add_argument(
+            '--bootstrap',
+            type=int,
+            default=0,
+            help='Also compute percentile and BCa intervals from N bootstrap resamples of sessions',
+        )
+        parser.add_argument(
+            '--bootstrap-workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processes used for bootstrap resampling (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for bootstrap resampling and posterior sampling (default: 0)',
+        )
 
     def handle(self, *args, **options):
+        if options['method'] == 'sequential':
+            # On "default", before the analytics block: a write inside it pins reads back to default
+            refresh_rollups()
+        self._analyze(options)
+
+    @reads_from(ANALYTICS)
+    def _analyze(self, options):
         experiment_name = options['experiment']
         exclude_forced = options['exclude_forced']
+        include_non_human = options['include_non_human']
         confidence_level = options['confidence_level']
 
         self.stdout.write(self.style.SUCCESS('\n=== A/B Test Statistical Analysis ==='))
@@ -46,13 +158,22 @@ class Command(BaseCommand):
         self.stdout.write(f'Confidence Level: {confidence_level * 100:.1f}%')
         self.stdout.write(f'Exclude Forced: {exclude_forced}\n')
 
+        if options['method'] == 'sequential':
+            self._handle_sequential(experiment_name, include_non_human, exclude_forced, confidence_level, options)
+            return
+
         # Build query
-        exposure_query = Q(experiment_name=experiment_name, event_type='exposure')
-        click_query = Q(experiment_name=experiment_name, event_type='click')
+        exposure_query = Q(experiment_name=experiment_name, event_type=ABTestEvent.EVENT_TYPE_EXPOSURE)
+        click_query = Q(experiment_name=experiment_name, event_type=ABTestEvent.EVENT_TYPE_CONVERSION)
         
         if exclude_forced:
             exposure_query &= Q(is_forced=False)
             click_query &= Q(is_forced=False)
+        
+        if not include_non_human:
+            # Indexed ingest-time verdict (see core.traffic)
+            exposure_query &= Q(traffic_class=TRAFFIC_CLASS_HUMAN)
+            click_query &= Q(traffic_class=TRAFFIC_CLASS_HUMAN)
 
         # Get exposure and click counts per variant
         exposure_counts = (
@@ -111,59 +232,26 @@ class Command(BaseCommand):
         self.stdout.write('-' * 60)
         self.stdout.write('')
 
-        # Statistical calculations
-        # Two-proportion z-test
-        p_pooled = (clicks_a + clicks_b) / (n_a + n_b)
-        se_pooled = math.sqrt(p_pooled * (1 - p_pooled) * (1/n_a + 1/n_b))
-        
-        if se_pooled == 0:
-            self.stdout.write(self.style.ERROR('Cannot calculate statistics: standard error is zero.'))
+        if options['method'] == 'bayes':
+            self._write_bayes(variant_a, variant_b, clicks_a, n_a, clicks_b, n_b, confidence_level, options)
             return
 
-        # Z-score
-        z_score = (p_b - p_a) / se_pooled if se_pooled > 0 else 0
-
-        # P-value (two-tailed test) using standard normal CDF approximation
-        # Using error function approximation for normal CDF
-        def norm_cdf(x):
-            """Approximate standard normal CDF using error function."""
-            return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+        # Statistical calculations (shared engine: pooled z-test, Wald CI, Cohen's h)
+        result = two_proportion_ztest(clicks_a, n_a, clicks_b, n_b, confidence_level=confidence_level)
         
-        p_value = 2 * (1 - norm_cdf(abs(z_score)))
-
-        # Effect size (Cohen's h for proportions)
-        h = 2 * (math.asin(math.sqrt(p_b)) - math.asin(math.sqrt(p_a)))
+        if math.isnan(result.z_score):
+            self.stdout.write(self.style.ERROR('Cannot calculate statistics: standard error is zero.'))
+            return
 
-        # Confidence interval for difference in proportions
-        se_diff = math.sqrt((p_a * (1 - p_a) / n_a) + (p_b * (1 - p_b) / n_b))
-        
-        # Z-critical value for confidence level (using inverse normal CDF approximation)
-        def norm_ppf(p):
-            """Approximate inverse standard normal CDF (quantile function)."""
-            # Approximation using Beasley-Springer-Moro algorithm (simplified)
-            # For common confidence levels, use lookup table
-            lookup = {
-                0.90: 1.64485,
-                0.95: 1.95996,
-                0.99: 2.57583,
-            }
-            if p in lookup:
-                return lookup[p]
-            # Simple approximation for other values
-            # Using Winitzki's approximation
-            sign = 1 if p > 0.5 else -1
-            p_adj = p if p <= 0.5 else 1 - p
-            t = math.sqrt(-2 * math.log(p_adj))
-            return sign * (t - (0.010328 * t + 0.802853) * t / (1 + 1.432788 * t + 0.189269 * t * t))
-        
-        z_critical = norm_ppf((1 + confidence_level) / 2)
-        margin_error = z_critical * se_diff
-        diff = p_b - p_a
-        ci_lower = diff - margin_error
-        ci_upper = diff + margin_error
+        z_score = result.z_score
+        p_value = result.p_value
+        h = result.cohens_h
+        diff = result.diff
+        ci_lower = result.ci_lower
+        ci_upper = result.ci_upper
 
         # Relative improvement
-        relative_improvement = ((p_b - p_a) / p_a * 100) if p_a > 0 else 0
+        relative_improvement = (result.relative_lift * 100) if p_a > 0 else 0
 
         # Display statistical results
         self.stdout.write('Statistical Results:')
@@ -180,6 +268,16 @@ class Command(BaseCommand):
         self.stdout.write('-' * 60)
         self.stdout.write('')
 
+        if options['segment']:
+            self._write_segments(
+                exposure_query | click_query, variant_a, variant_b, confidence_level, options['segment'],
+            )
+
+        if options['bootstrap'] > 0:
+            self._write_bootstrap(
+                exposure_query | click_query, variant_a, variant_b, confidence_level, options,
+            )
+
         # Interpretation
         self.stdout.write('Interpretation:')
         self.stdout.write('-' * 60)
@@ -202,14 +300,7 @@ class Command(BaseCommand):
 
         # Effect size interpretation
         abs_h = abs(h)
-        if abs_h < 0.2:
-            effect_size_desc = "negligible"
-        elif abs_h < 0.5:
-            effect_size_desc = "small"
-        elif abs_h < 0.8:
-            effect_size_desc = "medium"
-        else:
-            effect_size_desc = "large"
+        effect_size_desc = describe_effect_size(h)
         
         self.stdout.write(f'Effect Size: {effect_size_desc} (|h| = {abs_h:.4f})')
 
@@ -280,3 +371,202 @@ class Command(BaseCommand):
 
         self.stdout.write('')
 
+    def _handle_sequential(self, experiment_name, include_non_human, exclude_forced, confidence_level, options):
+        """Always-valid analysis from hourly rollups (see core.sequential)."""
+        try:
+            result = sequential_analysis(
+                experiment_name,
+                include_non_human=include_non_human,
+                exclude_forced=exclude_forced,
+                confidence_level=confidence_level,
+                tau=options['tau'],
+                refresh=False,
+            )
+        except ValueError as exc:
+            self.stdout.write(self.style.ERROR(str(exc)))
+            return
+
+        variant_a, variant_b = result.variant_a, result.variant_b
+        n_a, c_a, n_b, c_b = result.exposures_a, result.conversions_a, result.exposures_b, result.conversions_b
+        if n_a == 0 or n_b == 0:
+            self.stdout.write(
+                self.style.ERROR('Insufficient data: one or both variants have zero exposures.')
+            )
+            return
+
+        self.stdout.write(f'Rollups as of: {result.rollups_as_of:%Y-%m-%d %H:%M:%S %Z}')
+        self.stdout.write('Raw Data:')
+        self.stdout.write('-' * 60)
+        self.stdout.write(f'{variant_a:10s}: {c_a:6d} clicks / {n_a:6d} exposures = {c_a / n_a * 100:5.2f}% conversion')
+        self.stdout.write(f'{variant_b:10s}: {c_b:6d} clicks / {n_b:6d} exposures = {c_b / n_b * 100:5.2f}% conversion')
+        self.stdout.write('-' * 60)
+        self.stdout.write('')
+
+        alpha = 1 - confidence_level
+        self.stdout.write(f'Sequential Results (mSPRT, tau={options["tau"]:g}):')
+        self.stdout.write('-' * 60)
+        self.stdout.write(f'Looks (hours evaluated):  {result.looks}')
+        self.stdout.write(f'Difference (B - A):       {result.diff*100:+.2f} percentage points')
+        self.stdout.write(f'Always-valid P-Value:     {result.p_value:.6f}')
+        if result.ci_lower is None or result.ci_upper is None:
+            self.stdout.write(f'Confidence Sequence ({confidence_level*100:.1f}%): not enough data yet')
+        else:
+            self.stdout.write(
+                f'Confidence Sequence ({confidence_level*100:.1f}%): '
+                f'[{result.ci_lower*100:+.2f}%, {result.ci_upper*100:+.2f}%]'
+            )
+        self.stdout.write('-' * 60)
+        self.stdout.write('')
+
+        if result.p_value < alpha:
+            winner = variant_b if result.diff > 0 else variant_a
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ Stop: {winner.upper()} wins (always-valid p < {alpha:.3f})')
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'✗ Continue: no decision yet (always-valid p >= {alpha:.3f}). '
+                    'Safe to check again later.'
+                )
+            )
+        self.stdout.write('')
+
+    def _write_bayes(self, variant_a, variant_b, clicks_a, n_a, clicks_b, n_b, confidence_level, options):
+        """Beta-Binomial posterior summary with uniform Beta(1, 1) priors."""
+        result = bayesian_ab_test(
+            clicks_a, n_a, clicks_b, n_b,
+            samples=max(1, options['samples']),
+            seed=options['seed'],
+            confidence_level=confidence_level,
+        )
+        level = f'{confidence_level*100:.1f}%'
+        posterior = result.posterior
+
+        self.stdout.write(f'Bayesian Results ({options["samples"]} posterior draws, seed {options["seed"]}):')
+        self.stdout.write('-' * 60)
+        for i, variant in enumerate((variant_a, variant_b)):
+            self.stdout.write(
+                f'{variant:10s}: rate {posterior.mean[i]*100:5.2f}%, '
+                f'{level} credible interval [{posterior.ci_lower[i]*100:.2f}%, {posterior.ci_upper[i]*100:.2f}%]'
+            )
+        self.stdout.write(f'P({variant_b} > {variant_a}):      {result.prob_b_beats_a*100:.2f}%')
+        self.stdout.write(
+            f'Difference (B - A) credible interval ({level}): '
+            f'[{result.diff_ci[0]*100:+.2f}%, {result.diff_ci[1]*100:+.2f}%]'
+        )
+        self.stdout.write(
+            f'Relative lift credible interval ({level}):      '
+            f'[{result.lift_ci[0]*100:+.2f}%, {result.lift_ci[1]*100:+.2f}%]'
+        )
+        self.stdout.write(f'Expected loss choosing {variant_a}: {result.expected_loss_a*100:.4f} percentage points')
+        self.stdout.write(f'Expected loss choosing {variant_b}: {result.expected_loss_b*100:.4f} percentage points')
+        self.stdout.write('-' * 60)
+        self.stdout.write('')
+
+        if result.prob_b_beats_a >= confidence_level:
+            winner = variant_b
+        elif 1 - result.prob_b_beats_a >= confidence_level:
+            winner = variant_a
+        else:
+            winner = None
+        if winner:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✓ {winner.upper()} is better with at least {level} posterior probability'
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(f'✗ Neither variant is better with {level} posterior probability yet')
+            )
+        self.stdout.write('')
+
+    def _write_segments(self, base_query, variant_a, variant_b, confidence_level, segment):
+        """Per-segment z-tests from one GROUP BY over the stored segment column."""
+        field = SEGMENT_FIELDS[segment]
+        rows = (
+            ABTestEvent.objects
+            .filter(base_query)
+            .values(field, 'variant')
+            .annotate(
+                exposures=Count('id', filter=Q(event_type=ABTestEvent.EVENT_TYPE_EXPOSURE)),
+                conversions=Count('id', filter=Q(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)),
+            )
+            .order_by()
+        )
+        cells = {}
+        for row in rows:
+            counts = cells.setdefault(row[field], {variant_a: (0, 0), variant_b: (0, 0)})
+            if row['variant'] in counts:
+                counts[row['variant']] = (row['exposures'], row['conversions'])
+
+        segments = sorted(cells, key=lambda name: -sum(n for n, _ in cells[name].values()))
+        n_a = np.array([cells[name][variant_a][0] for name in segments])
+        c_a = np.array([cells[name][variant_a][1] for name in segments])
+        n_b = np.array([cells[name][variant_b][0] for name in segments])
+        c_b = np.array([cells[name][variant_b][1] for name in segments])
+        # All segments in one vectorized call; empty cells come back as NaN
+        result = two_proportion_ztest(c_a, n_a, c_b, n_b, confidence_level=confidence_level)
+
+        self.stdout.write(f'Results by {segment}:')
+        self.stdout.write('-' * 78)
+        self.stdout.write(
+            f'{"Segment":18s} {variant_a[:8]:>8s} {"rate":>7s} {variant_b[:8]:>8s} {"rate":>7s} '
+            f'{"diff":>8s} {"p-value":>9s}'
+        )
+        for i, name in enumerate(segments):
+            if np.isnan(result.p_value[i]):
+                diff_text, p_text = 'N/A', 'N/A'
+            else:
+                diff_text, p_text = f'{result.diff[i]*100:+.2f}%', f'{result.p_value[i]:.4f}'
+            rate_a = f'{result.p_a[i]*100:.2f}%' if n_a[i] else 'N/A'
+            rate_b = f'{result.p_b[i]*100:.2f}%' if n_b[i] else 'N/A'
+            self.stdout.write(
+                f'{(name or "(not parsed)")[:18]:18s} {n_a[i]:8d} {rate_a:>7s} {n_b[i]:8d} {rate_b:>7s} '
+                f'{diff_text:>8s} {p_text:>9s}'
+            )
+        self.stdout.write('-' * 78)
+        self.stdout.write(
+            'Note: segment p-values are not corrected for multiple comparisons.'
+        )
+        self.stdout.write('')
+
+    def _write_bootstrap(self, base_query, variant_a, variant_b, confidence_level, options):
+        """Bootstrap CIs for the difference and relative lift, resampling sessions."""
+        outcomes = session_outcome_counts(base_query, [variant_a, variant_b])
+        try:
+            boot = bootstrap_rate_difference(
+                outcomes[variant_a],
+                outcomes[variant_b],
+                iterations=options['bootstrap'],
+                confidence_level=confidence_level,
+                seed=options['seed'],
+                workers=options['bootstrap_workers'],
+            )
+        except ValueError as exc:
+            self.stdout.write(self.style.WARNING(f'Bootstrap skipped: {exc}'))
+            self.stdout.write('')
+            return
+
+        level = f'{confidence_level*100:.1f}%'
+        diff, lift = boot['diff'], boot['lift']
+        self.stdout.write(f'Bootstrap ({boot["iterations"]} resamples of sessions, seed {options["seed"]}):')
+        self.stdout.write('-' * 60)
+        self.stdout.write(
+            f'Difference percentile CI ({level}): [{diff.percentile[0]*100:+.2f}%, {diff.percentile[1]*100:+.2f}%]'
+        )
+        self.stdout.write(
+            f'Difference BCa CI ({level}):        [{diff.bca[0]*100:+.2f}%, {diff.bca[1]*100:+.2f}%]'
+        )
+        if math.isnan(lift.estimate):
+            self.stdout.write('Relative lift: undefined (control has no conversions)')
+        else:
+            self.stdout.write(
+                f'Lift percentile CI ({level}):       [{lift.percentile[0]*100:+.2f}%, {lift.percentile[1]*100:+.2f}%]'
+            )
+            self.stdout.write(
+                f'Lift BCa CI ({level}):              [{lift.bca[0]*100:+.2f}%, {lift.bca[1]*100:+.2f}%]'
+            )
+        self.stdout.write('-' * 60)
+        self.stdout.write('')
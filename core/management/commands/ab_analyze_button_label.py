@@ -5,11 +5,15 @@ Performs two-proportion z-test and provides executive summary.
 
 Usage:
     python manage.py ab_analyze_button_label --experiment=button_label_kudos_vs_thanks
+    python manage.py ab_analyze_button_label --method=bayes [--samples=20000] [--seed=0]
 """
 
 from django.core.management.base import BaseCommand
 from django.db.models import Count, Q
+from core.db_routers import ANALYTICS, reads_from
 from core.models import ABTestEvent
+from core.stats import DEFAULT_POSTERIOR_SAMPLES, bayesian_ab_test, two_proportion_ztest
+from core.traffic import TRAFFIC_CLASS_HUMAN
 import math
 
 
@@ -28,16 +32,41 @@ class Command(BaseCommand):
             action='store_true',
             help='Exclude forced variants (from ?force_variant parameter)',
         )
+        parser.add_argument(
+            '--include-non-human',
+            action='store_true',
+            help='Include events classified as bot/monitor/suspect (default: humans only)',
+        )
         parser.add_argument(
             '--confidence-level',
             type=float,
             default=0.95,
             help='Confidence level for intervals (default: 0.95 for 95%%)',
         )
+        parser.add_argument(
+            '--method',
+            choices=['ztest', 'bayes'],
+            default='ztest',
+            help='ztest: two-proportion z-test (default); bayes: Beta-Binomial posteriors',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=DEFAULT_POSTERIOR_SAMPLES,
+            help=f'Bayes mode: posterior draws per variant (default: {DEFAULT_POSTERIOR_SAMPLES})',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Bayes mode: random seed for posterior sampling (default: 0)',
+        )
 
+    @reads_from(ANALYTICS)
     def handle(self, *args, **options):
         experiment_name = options['experiment']
         exclude_forced = options['exclude_forced']
+        include_non_human = options['include_non_human']
         confidence_level = options['confidence_level']
 
         self.stdout.write(self.style.SUCCESS('\n=== A/B Test Statistical Analysis ==='))
@@ -70,6 +99,11 @@ class Command(BaseCommand):
         if exclude_forced:
             exposure_query &= Q(is_forced=False)
             conversion_query &= Q(is_forced=False)
+        
+        if not include_non_human:
+            # Indexed ingest-time verdict (see core.traffic)
+            exposure_query &= Q(traffic_class=TRAFFIC_CLASS_HUMAN)
+            conversion_query &= Q(traffic_class=TRAFFIC_CLASS_HUMAN)
 
         # Get exposure and conversion counts per variant
         exposure_counts = (
@@ -169,54 +203,26 @@ class Command(BaseCommand):
             self.stdout.write(f'  Relative Improvement:        {relative_improvement:+.2f}%')
         self.stdout.write('')
 
+        if options['method'] == 'bayes':
+            self._write_bayes(variant_a, variant_b, cA, nA, cB, nB, confidence_level, options)
+            return
+
         # ====================================================================
         # 4. STATISTICAL TEST (Two-Proportion Z-Test)
         # ====================================================================
-        # Pooled proportion
-        p_pooled = (cA + cB) / (nA + nB)
-        
-        # Standard error under null hypothesis (pooled)
-        se_pooled = math.sqrt(p_pooled * (1 - p_pooled) * (1/nA + 1/nB))
+        # Shared engine: pooled standard error for z, unpooled for the CI
+        result = two_proportion_ztest(cA, nA, cB, nB, confidence_level=confidence_level)
         
-        if se_pooled == 0:
+        if math.isnan(result.z_score):
             self.stdout.write(
                 self.style.ERROR('ERROR: Cannot calculate statistics. Standard error is zero.')
             )
             return
 
-        # Z-score
-        z_score = (pB - pA) / se_pooled
-
-        # P-value (two-tailed test)
-        def norm_cdf(x):
-            """Approximate standard normal CDF using error function."""
-            return 0.5 * (1 + math.erf(x / math.sqrt(2)))
-        
-        p_value = 2 * (1 - norm_cdf(abs(z_score)))
-
-        # Confidence interval for difference in proportions
-        se_diff = math.sqrt((pA * (1 - pA) / nA) + (pB * (1 - pB) / nB))
-        
-        # Z-critical value for confidence level
-        def norm_ppf(p):
-            """Approximate inverse standard normal CDF."""
-            lookup = {
-                0.90: 1.64485,
-                0.95: 1.95996,
-                0.99: 2.57583,
-            }
-            if p in lookup:
-                return lookup[p]
-            # Simple approximation for other values
-            sign = 1 if p > 0.5 else -1
-            p_adj = p if p <= 0.5 else 1 - p
-            t = math.sqrt(-2 * math.log(p_adj))
-            return sign * (t - (0.010328 * t + 0.802853) * t / (1 + 1.432788 * t + 0.189269 * t * t))
-        
-        z_critical = norm_ppf((1 + confidence_level) / 2)
-        margin_error = z_critical * se_diff
-        ci_lower = effect_size - margin_error
-        ci_upper = effect_size + margin_error
+        z_score = result.z_score
+        p_value = result.p_value
+        ci_lower = result.ci_lower
+        ci_upper = result.ci_upper
 
         self.stdout.write('Statistical Test Results:')
         self.stdout.write(f'  Z-Score:                     {z_score:+.6f}')
@@ -317,3 +323,70 @@ class Command(BaseCommand):
 
         self.stdout.write('')
 
+    def _write_bayes(self, variant_a, variant_b, cA, nA, cB, nB, confidence_level, options):
+        """Bayesian results and executive summary (uniform Beta(1, 1) priors)."""
+        result = bayesian_ab_test(
+            cA, nA, cB, nB,
+            samples=max(1, options['samples']),
+            seed=options['seed'],
+            confidence_level=confidence_level,
+        )
+        level = f'{confidence_level*100:.0f}%'
+        prob_b = result.prob_b_beats_a
+
+        # ====================================================================
+        # 4. BAYESIAN ANALYSIS (Beta-Binomial posteriors)
+        # ====================================================================
+        self.stdout.write(f'Bayesian Results ({options["samples"]:,} posterior draws, seed {options["seed"]}):')
+        self.stdout.write(f'  P(B > A):                    {prob_b*100:.2f}%')
+        self.stdout.write(
+            f'  {level} Credible Interval (pB - pA): '
+            f'[{result.diff_ci[0]*100:+.4f}%, {result.diff_ci[1]*100:+.4f}%]'
+        )
+        self.stdout.write(
+            f'  {level} Credible Interval (lift):    '
+            f'[{result.lift_ci[0]*100:+.2f}%, {result.lift_ci[1]*100:+.2f}%]'
+        )
+        self.stdout.write(f'  Expected Loss if "{variant_a}":  {result.expected_loss_a*100:.4f} percentage points')
+        self.stdout.write(f'  Expected Loss if "{variant_b}": {result.expected_loss_b*100:.4f} percentage points')
+        self.stdout.write('-' * 70)
+        self.stdout.write('')
+
+        # ====================================================================
+        # 5. EXECUTIVE SUMMARY (Plain English)
+        # ====================================================================
+        self.stdout.write('EXECUTIVE SUMMARY:')
+        self.stdout.write('-' * 70)
+        if prob_b >= confidence_level:
+            self.stdout.write(
+                f'There is a {prob_b*100:.1f}% probability that Variant B ("{variant_b}") converts better '
+                f'than Variant A ("{variant_a}").'
+            )
+            self.stdout.write('')
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'RECOMMENDATION: We recommend rolling out "{variant_b}" to 100% of users for this button.'
+                )
+            )
+        elif 1 - prob_b >= confidence_level:
+            self.stdout.write(
+                f'There is a {(1 - prob_b)*100:.1f}% probability that Variant A ("{variant_a}") converts better '
+                f'than Variant B ("{variant_b}").'
+            )
+            self.stdout.write('')
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'RECOMMENDATION: We recommend keeping "{variant_a}" for 100% of users for this button.'
+                )
+            )
+        else:
+            self.stdout.write(
+                f'Neither label is better with {level} probability yet (P(B > A) = {prob_b*100:.1f}%).'
+            )
+            self.stdout.write('')
+            self.stdout.write(
+                'RECOMMENDATION: Keep collecting data, or pick the label with the lower expected loss '
+                'if the loss is acceptably small.'
+            )
+        self.stdout.write('-' * 70)
+        self.stdout.write('')
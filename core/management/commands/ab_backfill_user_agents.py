@@ -0,0 +1,118 @@
+"""
+Django management command to fill the device/browser/OS segment columns of
+stored AB test events from their raw user_agent (core.user_agents).
+
+Walks the table in id-ordered chunks, parses each distinct UA string once
+(memoized) and writes one UPDATE per distinct verdict per chunk. Progress is
+checkpointed after every chunk, so an interrupted run resumes where it stopped.
+
+Usage:
+    python manage.py ab_backfill_user_agents [--all] [--chunk-size=5000]
+                                             [--max-seconds=N] [--restart]
+"""
+
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from core.models import ABTestEvent, MaintenanceCheckpoint
+from core.user_agents import parse_user_agent
+
+CHECKPOINT_NAME = 'ab_backfill_user_agents'
+
+
+class Command(BaseCommand):
+    help = 'Parse stored user agents into device_class / browser_family / os_family, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-parse every event, not just ones without segment columns',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Events read and updated per chunk (default: 5000)',
+        )
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            default=None,
+            help='Stop after this many seconds and leave a checkpoint to resume from',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore any saved checkpoint and start from the lowest id',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        max_seconds = options['max_seconds']
+
+        self.stdout.write(self.style.SUCCESS('\n=== A/B Test User-Agent Backfill ==='))
+
+        if options['restart']:
+            MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+        checkpoint = MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+        last_id = checkpoint.last_id if checkpoint else 0
+        if checkpoint:
+            self.stdout.write(self.style.WARNING(f'Resuming from checkpoint at id {last_id}\n'))
+
+        qs = ABTestEvent.objects.all()
+        if not options['all']:
+            qs = qs.filter(device_class='')
+
+        started = time.monotonic()
+        updated = 0
+        finished = True
+
+        while True:
+            if max_seconds is not None and time.monotonic() - started >= max_seconds:
+                finished = False
+                self._save_checkpoint(last_id)
+                break
+
+            rows = list(
+                qs.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'user_agent')[:chunk_size]
+            )
+            if not rows:
+                break
+
+            ids_by_segment = defaultdict(list)
+            for event_id, user_agent in rows:
+                ids_by_segment[parse_user_agent(user_agent or '')].append(event_id)
+
+            for info, ids in ids_by_segment.items():
+                ABTestEvent.objects.filter(id__in=ids).update(**info._asdict())
+
+            updated += len(rows)
+            last_id = rows[-1][0]
+            self._save_checkpoint(last_id)
+            self.stdout.write(f'  Parsed {updated} events (last id {last_id})')
+
+        cache = parse_user_agent.cache_info()
+        self.stdout.write('\n' + '=' * 50)
+        if finished:
+            MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+            self.stdout.write(self.style.SUCCESS(f'Backfilled {updated} events'))
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Stopped after {max_seconds}s at id {last_id} ({updated} events). '
+                    'Run again to resume from the checkpoint.'
+                )
+            )
+        self.stdout.write(f'Distinct user agents parsed: {cache.currsize} (cache hits: {cache.hits})')
+        self.stdout.write('=' * 50 + '\n')
+
+    def _save_checkpoint(self, last_id):
+        """Persist the resume point after each chunk (and when stopping early)."""
+        MaintenanceCheckpoint.objects.update_or_create(
+            name=CHECKPOINT_NAME,
+            defaults={'last_id': last_id},
+        )
@@ -1,13 +1,31 @@
 """
 Django management command to check A/B test traffic split and sample ratio.
 
+The split is tested with a chi-square goodness-of-fit test against the
+weights registered in core.experiments. --window=hour|day repeats the test for
+every time window (one grouped query over the hourly rollups), to pinpoint
+when a split broke.
+
 Usage:
     python manage.py ab_check_traffic_split --experiment=button_label_kudos_vs_thanks
+                                            [--window=hour|day] [--srm-alpha=0.001]
 """
 
+import math
+
+import numpy as np
 from django.core.management.base import BaseCommand
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+from core.db_routers import ANALYTICS, reads_from
+from core.experiments import expected_weights
 from core.models import ABTestEvent
+from core.rollups import refresh_rollups, rollup_queryset
+from core.stats import srm_chi_square, z_critical
+
+# Windows listed individually before the output switches to mismatches only
+MAX_WINDOWS_LISTED = 48
 
 
 class Command(BaseCommand):
@@ -32,8 +50,27 @@ class Command(BaseCommand):
             action='store_true',
             help='Exclude forced variants (from ?force_variant parameter)',
         )
+        parser.add_argument(
+            '--srm-alpha',
+            type=float,
+            default=0.001,
+            help='Significance level for flagging a sample ratio mismatch (default: 0.001)',
+        )
+        parser.add_argument(
+            '--window',
+            choices=['hour', 'day'],
+            default=None,
+            help='Also test every hour/day window separately',
+        )
 
     def handle(self, *args, **options):
+        if options['window']:
+            # On "default", before the analytics block: a write inside it pins reads back to default
+            refresh_rollups()
+        self._analyze(options)
+
+    @reads_from(ANALYTICS)
+    def _analyze(self, options):
         experiment_name = options['experiment']
         event_type = options['event_type']
         exclude_forced = options['exclude_forced']
@@ -91,54 +128,45 @@ class Command(BaseCommand):
         self.stdout.write('-' * 50)
         self.stdout.write('')
 
-        # Sample ratio mismatch check (expecting 50/50 split)
-        if len(variant_data) == 2:
-            variants = sorted(variant_data.keys())
-            var_a = variants[0]
-            var_b = variants[1]
-            
-            pct_a = variant_data[var_a]['percentage']
-            pct_b = variant_data[var_b]['percentage']
-            
-            # Flag if any variant is < 40% or > 60% (expecting 50/50)
-            threshold_low = 40.0
-            threshold_high = 60.0
-            
+        # Sample ratio mismatch check: chi-square goodness of fit against the
+        # configured weights (core.experiments), any number of variants
+        weights = expected_weights(experiment_name, variant_data.keys())
+        srm_alpha = options['srm_alpha']
+        if len(weights) >= 2:
+            variants = list(weights)
+            observed = [variant_data.get(v, {'count': 0})['count'] for v in variants]
+            srm = srm_chi_square(observed, [weights[v] for v in variants])
+            z = float(z_critical(1 - srm_alpha))
+
             self.stdout.write('Sample Ratio Mismatch Check:')
             self.stdout.write('-' * 50)
-            
-            mismatch_detected = False
-            if pct_a < threshold_low or pct_a > threshold_high:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"  ⚠️  {var_a}: {pct_a:.2f}% is outside expected range "
-                        f"({threshold_low}% - {threshold_high}%)"
-                    )
-                )
-                mismatch_detected = True
-            else:
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"  ✓  {var_a}: {pct_a:.2f}% is within expected range"
+
+            for variant, count in zip(variants, observed):
+                weight = weights[variant]
+                pct = count / total * 100
+                # Acceptance band for this variant's share at the same alpha
+                margin = z * math.sqrt(weight * (1 - weight) / total)
+                low, high = max(0.0, weight - margin) * 100, min(1.0, weight + margin) * 100
+                if low <= pct <= high:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"  ✓  {variant}: {pct:.2f}% is within expected range "
+                            f"({weight*100:.0f}% target)"
+                        )
                     )
-                )
-            
-            if pct_b < threshold_low or pct_b > threshold_high:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"  ⚠️  {var_b}: {pct_b:.2f}% is outside expected range "
-                        f"({threshold_low}% - {threshold_high}%)"
+                else:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"  ⚠️  {variant}: {pct:.2f}% is outside expected range "
+                            f"({low:.2f}% - {high:.2f}%, {weight*100:.0f}% target)"
+                        )
                     )
-                )
-                mismatch_detected = True
-            else:
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"  ✓  {var_b}: {pct_b:.2f}% is within expected range"
-                    )
-                )
-            
-            if not mismatch_detected:
+
+            self.stdout.write(
+                f'\n  Chi-square = {srm.chi_square:.4f} (df = {srm.df}), p = {srm.p_value:.6g}, '
+                f'alpha = {srm_alpha:g}'
+            )
+            if srm.p_value >= srm_alpha:
                 self.stdout.write(self.style.SUCCESS('\n✓ No sample ratio mismatch detected.'))
             else:
                 self.stdout.write(
@@ -147,10 +175,13 @@ class Command(BaseCommand):
                         'This may indicate issues with variant assignment logic.'
                     )
                 )
+
+            if options['window']:
+                self._check_windows(experiment_name, event_type, exclude_forced, variants, weights, options)
         else:
             self.stdout.write(
                 self.style.WARNING(
-                    f'Expected 2 variants, found {len(variant_data)}. '
+                    f'Expected at least 2 variants, found {len(variant_data)}. '
                     'Cannot perform sample ratio check.'
                 )
             )
@@ -194,3 +225,59 @@ class Command(BaseCommand):
 
         self.stdout.write('')
 
+    def _check_windows(self, experiment_name, event_type, exclude_forced, variants, weights, options):
+        """Chi-square SRM per time window, all windows tested in one vectorized call."""
+        qs = rollup_queryset(experiment_name, include_non_human=True, exclude_forced=exclude_forced)
+        period_field = 'hour'
+        if options['window'] == 'day':
+            qs = qs.annotate(period=TruncDay('hour', tzinfo=timezone.get_current_timezone()))
+            period_field = 'period'
+
+        if event_type == ABTestEvent.EVENT_TYPE_EXPOSURE:
+            count_expr = Sum('exposures')
+        elif event_type == ABTestEvent.EVENT_TYPE_CONVERSION:
+            count_expr = Sum('conversions')
+        else:
+            count_expr = Sum('exposures') + Sum('conversions')
+
+        rows = qs.values(period_field, 'variant').annotate(n=count_expr).order_by(period_field)
+        windows = {}
+        column = {variant: i for i, variant in enumerate(variants)}
+        for row in rows:
+            counts = windows.setdefault(row[period_field], [0] * len(variants))
+            if row['variant'] in column:
+                counts[column[row['variant']]] += row['n']
+
+        self.stdout.write(f'\nSample Ratio Mismatch by {options["window"]}:')
+        self.stdout.write('-' * 50)
+        if not windows:
+            self.stdout.write('  No rollup data.')
+            return
+
+        periods = list(windows)
+        srm = srm_chi_square(np.array([windows[p] for p in periods]), [weights[v] for v in variants])
+        flagged = srm.p_value < options['srm_alpha']
+        listed = len(periods) <= MAX_WINDOWS_LISTED
+
+        for i, period in enumerate(periods):
+            if not (listed or flagged[i]):
+                continue
+            counts = ' '.join(f'{v}={n}' for v, n in zip(variants, windows[period]))
+            marker = '⚠️ ' if flagged[i] else '✓ '
+            line = (
+                f'  {marker} {timezone.localtime(period):%Y-%m-%d %H:%M}  {counts}  '
+                f'chi2={srm.chi_square[i]:.2f} p={srm.p_value[i]:.4g}'
+            )
+            self.stdout.write(self.style.WARNING(line) if flagged[i] else line)
+
+        n_flagged = int(np.count_nonzero(flagged))
+        if n_flagged:
+            first = periods[int(np.argmax(flagged))]
+            self.stdout.write(
+                self.style.WARNING(
+                    f'\n  {n_flagged} of {len(periods)} windows show a mismatch; '
+                    f'first at {timezone.localtime(first):%Y-%m-%d %H:%M}'
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f'\n  No mismatch in any of {len(periods)} windows'))
@@ -0,0 +1,133 @@
+"""
+Django management command to find bot bursts in AB test traffic with a
+single-pass sliding-window scan (see core.bursts).
+
+Events inside a bursting window are re-labelled "suspect", which makes them
+visible to ab_purge_bots and excluded from humans-only analysis.
+
+Usage:
+    python manage.py ab_detect_bursts [--since=2025-12-01] [--until=2025-12-08]
+                                      [--window-seconds=60] [--per-session=20]
+                                      [--per-ip=30] [--global=50] [--dry-run]
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from core.bursts import (
+    DEFAULT_GLOBAL_THRESHOLD,
+    DEFAULT_PER_IP_THRESHOLD,
+    DEFAULT_PER_SESSION_THRESHOLD,
+    mark_suspect,
+    scan_for_bursts,
+)
+from core.models import ABTestEvent
+from core.timeutils import parse_moment
+from core.traffic import TRAFFIC_CLASS_HUMAN
+
+
+class Command(BaseCommand):
+    help = 'Detect traffic bursts with a sliding window and mark their events as suspect'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            default=None,
+            help='Start of the range (ISO date/datetime, default: beginning of data)',
+        )
+        parser.add_argument(
+            '--until',
+            type=str,
+            default=None,
+            help='End of the range, exclusive (ISO date/datetime, default: now)',
+        )
+        parser.add_argument(
+            '--window-seconds',
+            type=int,
+            default=60,
+            help='Sliding window length in seconds (default: 60)',
+        )
+        parser.add_argument(
+            '--per-session',
+            type=int,
+            default=DEFAULT_PER_SESSION_THRESHOLD,
+            help=f'Max events per session per window, 0 disables (default: {DEFAULT_PER_SESSION_THRESHOLD})',
+        )
+        parser.add_argument(
+            '--per-ip',
+            type=int,
+            default=DEFAULT_PER_IP_THRESHOLD,
+            help=f'Max events per IP per window, 0 disables (default: {DEFAULT_PER_IP_THRESHOLD})',
+        )
+        parser.add_argument(
+            '--global',
+            dest='global_threshold',
+            type=int,
+            default=DEFAULT_GLOBAL_THRESHOLD,
+            help=f'Max events overall per window, 0 disables (default: {DEFAULT_GLOBAL_THRESHOLD})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report bursts without changing any traffic_class',
+        )
+
+    def handle(self, *args, **options):
+        since = parse_moment(options['since'])
+        until = parse_moment(options['until'])
+        window = timedelta(seconds=max(1, options['window_seconds']))
+        dry_run = options['dry_run']
+
+        self.stdout.write(self.style.SUCCESS('\n=== A/B Test Burst Detection ==='))
+        self.stdout.write(f'Range: {since or "beginning"} → {until or "now"}')
+        self.stdout.write(
+            f'Window: {int(window.total_seconds())}s | thresholds: '
+            f'session>{options["per_session"]} ip>{options["per_ip"]} global>{options["global_threshold"]}'
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be changed'))
+        self.stdout.write('')
+
+        flagged_humans = set()
+        marked = 0
+
+        def on_flagged(ids):
+            nonlocal marked
+            if dry_run:
+                flagged_humans.update(
+                    ABTestEvent.objects.filter(id__in=ids, traffic_class=TRAFFIC_CLASS_HUMAN)
+                    .values_list('id', flat=True)
+                )
+            else:
+                marked += mark_suspect(ids)
+
+        detector = scan_for_bursts(
+            since=since,
+            until=until,
+            window=window,
+            per_session=options['per_session'],
+            per_ip=options['per_ip'],
+            global_threshold=options['global_threshold'],
+            on_flagged=on_flagged,
+        )
+
+        self.stdout.write('Bursting keys (peak events in one window):')
+        self.stdout.write('-' * 60)
+        if not detector.bursts:
+            self.stdout.write('  none')
+        top = sorted(detector.bursts.items(), key=lambda item: item[1], reverse=True)[:20]
+        for (dimension, key), peak in top:
+            self.stdout.write(f'  {dimension:8s} {str(key or "*"):40s} {peak:6d}')
+        self.stdout.write('-' * 60)
+        for dimension, count in detector.flag_counts.items():
+            self.stdout.write(f'  Flagged by {dimension:8s}: {count}')
+
+        self.stdout.write('')
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING(f'DRY RUN: Would mark {len(flagged_humans)} human events as suspect')
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Marked {marked} human events as suspect'))
+        self.stdout.write('')
@@ -0,0 +1,102 @@
+"""
+Django management command to move the A/B event history from "default" into
+the separate A/B database (DATABASE_ABTEST_URL, core.db_routers.ABTEST).
+
+Once DATABASE_ABTEST_URL is set every read and write of ABTestEvent goes to
+that database, so events recorded before stay behind in "default" where
+nothing reads them. Run this after "migrate --database abtest" and before
+the web service starts writing there (render.yaml's build command does):
+events are copied in id-ordered chunks with their original ids and
+timestamps, deleted from "default" chunk by chunk, and the rollups are then
+rebuilt in the A/B database. With nothing left in "default" it does nothing,
+so it is safe to run on every deploy.
+
+It refuses to start when the A/B database already holds events and no move
+is in progress: their ids would collide with the history being copied.
+
+Usage:
+    python manage.py ab_move_events_to_abtest [--chunk-size=5000]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from core.db_routers import DEFAULT, abtest_database
+from core.models import ABTestEvent, MaintenanceCheckpoint
+from core.rollups import invalidate_rollups, refresh_rollups
+
+CHECKPOINT_NAME = 'ab_move_events_to_abtest'
+
+
+class Command(BaseCommand):
+    help = 'Move A/B events recorded in the default database into the separate A/B database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Events copied and deleted per chunk (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        target = abtest_database()
+        if target is None:
+            raise CommandError('DATABASE_ABTEST_URL is not set: the A/B events already live in "default".')
+        chunk_size = max(1, options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS('\n=== Move A/B Events to the A/B Database ==='))
+        source = ABTestEvent.objects.using(DEFAULT)
+        in_progress = MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME).exists()
+        if not in_progress and not source.exists():
+            self.stdout.write('No events left in "default"; nothing to move.\n')
+            return
+
+        if not in_progress and ABTestEvent.objects.using(target).exists():
+            raise CommandError(
+                f'The "{target}" database already holds events, so the history in "default" '
+                'cannot be copied with its ids. Move it before traffic reaches the new database.'
+            )
+        MaintenanceCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+
+        fields = ABTestEvent._meta.concrete_fields
+        connection = connections[target]
+        quote = connection.ops.quote_name
+        insert_sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(ABTestEvent._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+
+        moved = 0
+        while True:
+            rows = list(source.order_by('id').values_list(*(field.attname for field in fields))[:chunk_size])
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            # Rows copied by an interrupted run are already there
+            copied = set(ABTestEvent.objects.using(target).filter(id__in=ids).values_list('id', flat=True))
+            params = [
+                [field.get_db_prep_save(value, connection) for field, value in zip(fields, row)]
+                for row in rows if row[0] not in copied
+            ]
+            with transaction.atomic(using=target), connection.cursor() as cursor:
+                cursor.executemany(insert_sql, params)
+            source.filter(id__in=ids).delete()
+            moved += len(params)
+            self.stdout.write(f'  Moved {moved} events (last id {ids[-1]})')
+
+        # Later inserts must continue above the copied ids (SQLite tracks this itself)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [ABTestEvent]):
+                cursor.execute(sql)
+
+        invalidate_rollups()
+        state = refresh_rollups()
+        MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+
+        self.stdout.write('\n' + '=' * 50)
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} events to "{target}"; rollups rebuilt up to id {state.high_water_mark}'
+        ))
+        self.stdout.write('=' * 50 + '\n')
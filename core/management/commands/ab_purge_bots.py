@@ -1,16 +1,30 @@
 """
 Django management command to purge bot-generated AB test events.
 
+Deletes in bounded primary-key ranges (one short DELETE per batch, committed
+individually) and records a checkpoint after every batch, so a run that is
+interrupted - or stopped by --max-seconds - resumes where it left off.
+
+Burst traffic is found first with the sliding-window detector (core.bursts),
+which re-labels it "suspect", so the delete itself is a single indexed filter.
+
 Usage:
-    python manage.py ab_purge_bots [--dry-run]
+    python manage.py ab_purge_bots [--dry-run] [--batch-size=1000] [--sleep=0.05]
+                                   [--max-seconds=N] [--restart]
 """
 
+import time
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
-from django.db.models import Count
-from django.db.models.functions import Length, TruncMinute
+from django.db.models import Max, Min
 from django.utils import timezone
-from datetime import timedelta
-from core.models import ABTestEvent
+from core.bursts import mark_suspect, scan_for_bursts
+from core.models import ABTestEvent, MaintenanceCheckpoint
+from core.rollups import affected_cells, invalidate_rollups
+from core.traffic import NON_HUMAN_TRAFFIC_CLASSES, TRAFFIC_CLASS_HUMAN
+
+CHECKPOINT_NAME = 'ab_purge_bots'
 
 
 class Command(BaseCommand):
@@ -22,96 +36,197 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be deleted without actually deleting',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Width of each primary-key range deleted per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.05,
+            help='Seconds to pause between batches to let other writers in (default: 0.05)',
+        )
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            default=None,
+            help='Stop after this many seconds and leave a checkpoint to resume from',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore any saved checkpoint and start from the lowest id',
+        )
+        parser.add_argument(
+            '--burst-hours',
+            type=float,
+            default=24,
+            help='How far back to run burst detection before purging, 0 skips it (default: 24)',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
-        
+        batch_size = max(1, options['batch_size'])
+        sleep_seconds = max(0.0, options['sleep'])
+        max_seconds = options['max_seconds']
+
         self.stdout.write(self.style.SUCCESS('\n=== A/B Test Bot Data Purge ==='))
         if dry_run:
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be deleted\n'))
         else:
             self.stdout.write(self.style.WARNING('LIVE MODE - Data will be permanently deleted\n'))
-        
-        total_deleted = 0
-        
-        # 1. Delete events where session_id starts with "e5e6" (Render bot pattern)
-        qs1 = ABTestEvent.objects.filter(session_id__startswith='e5e6')
-        count1 = qs1.count()
-        if count1 > 0:
-            self.stdout.write(f'1. Events with session_id starting with "e5e6": {count1}')
-            if not dry_run:
-                deleted1 = qs1.delete()[0]
-                total_deleted += deleted1
-                self.stdout.write(self.style.SUCCESS(f'   ✓ Deleted {deleted1} events'))
-            else:
-                self.stdout.write(f'   [DRY RUN] Would delete {count1} events')
-        else:
-            self.stdout.write('1. Events with session_id starting with "e5e6": 0')
-        
-        # 2. Delete events where user_id is NULL AND session_id length < 10
-        # Filter by checking session_id length using annotation
-        qs2 = ABTestEvent.objects.filter(user__isnull=True).annotate(sid_len=Length('session_id')).filter(sid_len__lt=10)
-        count2 = qs2.count()
-        if count2 > 0:
-            self.stdout.write(f'\n2. Events with NULL user_id and session_id length < 10: {count2}')
-            if not dry_run:
-                deleted2 = qs2.delete()[0]
-                total_deleted += deleted2
-                self.stdout.write(self.style.SUCCESS(f'   ✓ Deleted {deleted2} events'))
-            else:
-                self.stdout.write(f'   [DRY RUN] Would delete {count2} events')
+
+        # 0. Events written before ingest-time classification have no verdict yet
+        unclassified = ABTestEvent.objects.filter(classifier_version=0).count()
+        if unclassified:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{unclassified} events have never been classified and are not covered by step 2. '
+                    'Run "python manage.py ab_reclassify_traffic" first.\n'
+                )
+            )
+
+        # The time budget covers the burst pre-scan as well as the deletes
+        started = time.monotonic()
+        deadline = started + max_seconds if max_seconds is not None else None
+
+        # Resume state: the id window is frozen when a run starts, so a resumed
+        # run deletes exactly the range the original run would have.
+        checkpoint = None
+        if options['restart'] and not dry_run:
+            # A dry run never touches a real run's resume point
+            MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+        elif not dry_run:
+            checkpoint = MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+
+        if checkpoint:
+            last_id = checkpoint.last_id
+            max_id = checkpoint.state['max_id']
+            totals = checkpoint.state['totals']
+            self.stdout.write(
+                self.style.WARNING(f'Resuming from checkpoint at id {last_id} (of {max_id})\n')
+            )
         else:
-            self.stdout.write('\n2. Events with NULL user_id and session_id length < 10: 0')
-        
-        # 3. Delete events with >50 events per minute (burst pattern indicates bot)
-        # Check for events created in 1-minute windows with >50 events
-        # Group by minute and find suspicious bursts
-        now = timezone.now()
-        one_day_ago = now - timedelta(days=1)
-        
-        # Get all events from the last day, grouped by minute
-        events_by_minute = (
-            ABTestEvent.objects
-            .filter(created_at__gte=one_day_ago)
-            .annotate(minute=TruncMinute('created_at'))
-            .values('minute')
-            .annotate(count=Count('id'))
-            .filter(count__gt=50)
+            bounds = ABTestEvent.objects.aggregate(min_id=Min('id'), max_id=Max('id'))
+            last_id = (bounds['min_id'] or 1) - 1
+            max_id = bounds['max_id'] or 0
+            totals = {'classified': 0, 'burst': 0}
+
+            # 1. Sliding-window burst detection over recent traffic; bursting human
+            #    events become "suspect" so step 2 deletes them with everything else.
+            if options['burst_hours'] > 0:
+                since = timezone.now() - timedelta(hours=options['burst_hours'])
+                if dry_run:
+                    burst_ids = set()
+                    detector = scan_for_bursts(since=since, on_flagged=burst_ids.update, deadline=deadline)
+                    totals['burst'] = ABTestEvent.objects.filter(
+                        id__in=burst_ids, traffic_class=TRAFFIC_CLASS_HUMAN
+                    ).count() if burst_ids else 0
+                else:
+                    # Verdicts are persisted batch by batch as the scan streams
+                    def on_flagged(ids):
+                        totals['burst'] += mark_suspect(ids)
+                    detector = scan_for_bursts(since=since, on_flagged=on_flagged, deadline=deadline)
+                self.stdout.write(
+                    f'1. Events in traffic bursts (last {options["burst_hours"]:g}h, '
+                    f'not already classified as bots): {totals["burst"]}'
+                )
+                if totals['burst'] and not dry_run:
+                    self.stdout.write(self.style.SUCCESS(f'   ✓ Marked {totals["burst"]} events as suspect'))
+                if detector.stopped_early:
+                    self.stdout.write(
+                        self.style.WARNING(f'   Burst scan stopped after {max_seconds}s; later windows were not checked')
+                    )
+
+        # 2. Events classified as bot/monitor/suspect (indexed traffic_class).
+        #    This covers the Render "e5e6" session pattern, short anonymous session ids,
+        #    bot/monitor user agents (see core.traffic) and the bursts from step 1.
+        if dry_run:
+            count = ABTestEvent.objects.filter(traffic_class__in=NON_HUMAN_TRAFFIC_CLASSES).count()
+            count += totals['burst']
+            self.stdout.write(f'2. Events classified as bot/monitor/suspect: {count}')
+            self.stdout.write('\n' + '=' * 50)
+            self.stdout.write(self.style.WARNING(f'DRY RUN: Would delete {count} events'))
+            self.stdout.write('\nRun without --dry-run to actually delete the data.')
+            self.stdout.write('=' * 50 + '\n')
+            return
+
+        self.stdout.write(
+            f'\n2. Deleting bot/monitor/suspect events in ids {last_id + 1}..{max_id}, '
+            f'batches of {batch_size}'
         )
-        
-        count3 = 0
-        if events_by_minute.exists():
-            # Get all events in those high-volume minutes
-            suspicious_minutes = [e['minute'] for e in events_by_minute]
-            qs3 = (
-                ABTestEvent.objects
-                .filter(created_at__gte=one_day_ago)
-                .annotate(minute=TruncMinute('created_at'))
-                .filter(minute__in=suspicious_minutes)
+
+        run_deleted = 0
+        stale_cells = set()
+        finished = True
+
+        while last_id < max_id:
+            if deadline is not None and time.monotonic() >= deadline:
+                finished = False
+                self._save_checkpoint(last_id, max_id, totals)
+                break
+
+            # Skip straight over id gaps left by earlier purges (one index seek)
+            next_id = (
+                ABTestEvent.objects.filter(id__gt=last_id, id__lte=max_id)
+                .order_by('id').values_list('id', flat=True).first()
             )
-            count3 = qs3.count()
-        
-        if count3 > 0:
-            self.stdout.write(f'\n3. Events in high-volume minutes (>50 per minute): {count3}')
-            if not dry_run:
-                # We need to delete the original objects, not the annotated ones
-                # So we get the IDs and delete those
-                event_ids = list(qs3.values_list('id', flat=True))
-                deleted3 = ABTestEvent.objects.filter(id__in=event_ids).delete()[0]
-                total_deleted += deleted3
-                self.stdout.write(self.style.SUCCESS(f'   ✓ Deleted {deleted3} events'))
-            else:
-                self.stdout.write(f'   [DRY RUN] Would delete {count3} events')
-        else:
-            self.stdout.write('\n3. Events in high-volume minutes (>50 per minute): 0')
-        
+            if next_id is None:
+                break
+
+            hi = min(next_id - 1 + batch_size, max_id)
+            id_range = ABTestEvent.objects.filter(id__gte=next_id, id__lte=hi)
+
+            doomed = id_range.filter(traffic_class__in=NON_HUMAN_TRAFFIC_CLASSES)
+            stale_cells |= affected_cells(doomed)
+            deleted = doomed.delete()[0]
+            totals['classified'] += deleted
+            run_deleted += deleted
+            last_id = hi
+            self._save_checkpoint(last_id, max_id, totals)
+
+            elapsed = time.monotonic() - started
+            rate = run_deleted / elapsed if elapsed > 0 else 0.0
+            self.stdout.write(
+                f'   ids {next_id}..{last_id}: deleted {deleted} '
+                f'(run total {run_deleted}, {rate:,.0f} rows/sec)'
+            )
+            self.stdout.flush()
+
+            if sleep_seconds and last_id < max_id:
+                time.sleep(sleep_seconds)
+
+        elapsed = time.monotonic() - started
+        rate = run_deleted / elapsed if elapsed > 0 else 0.0
+
+        if run_deleted:
+            # Hourly rollups still count the deleted rows; re-fold those hours
+            invalidate_rollups(stale_cells)
+
         # Summary
         self.stdout.write('\n' + '=' * 50)
-        if dry_run:
-            total_would_delete = count1 + count2 + count3
-            self.stdout.write(self.style.WARNING(f'DRY RUN: Would delete {total_would_delete} events'))
-            self.stdout.write('\nRun without --dry-run to actually delete the data.')
+        self.stdout.write(f'Events in traffic bursts: {totals["burst"]} (included below)')
+        if finished:
+            MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+            self.stdout.write(self.style.SUCCESS(f'Total deleted: {totals["classified"]} events'))
         else:
-            self.stdout.write(self.style.SUCCESS(f'Total deleted: {total_deleted} events'))
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Stopped after {max_seconds}s at id {last_id} of {max_id}. '
+                    'Run again to resume from the checkpoint.'
+                )
+            )
+        self.stdout.write(f'This run: {run_deleted} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)')
         self.stdout.write('=' * 50 + '\n')
 
+    def _save_checkpoint(self, last_id, max_id, totals):
+        """Persist the resume point after each batch (and when stopping early)."""
+        MaintenanceCheckpoint.objects.update_or_create(
+            name=CHECKPOINT_NAME,
+            defaults={
+                'last_id': last_id,
+                'state': {'max_id': max_id, 'totals': totals},
+            },
+        )
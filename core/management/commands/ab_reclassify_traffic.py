@@ -0,0 +1,111 @@
+"""
+Django management command to re-score stored AB test events with the current
+traffic classifier (core.traffic).
+
+By default only events scored by an older classifier version (or never scored)
+are touched, so it is safe to re-run after every rule change.
+Events flagged by burst detection (burst_flagged) stay suspect when the rules
+alone would call them human.
+
+Usage:
+    python manage.py ab_reclassify_traffic [--all] [--chunk-size=5000] [--dry-run]
+"""
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from core.models import ABTestEvent
+from core.rollups import affected_cells, invalidate_rollups
+from core.traffic import CLASSIFIER_VERSION, TRAFFIC_CLASS_HUMAN, TRAFFIC_CLASS_SUSPECT, classify_traffic
+
+
+class Command(BaseCommand):
+    help = 'Re-score AB test events with the current traffic classifier, in id-ordered chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-score every event, not just ones from an older classifier version',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Events read and updated per chunk (default: 5000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how verdicts would change without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        rescore_all = options['all']
+        chunk_size = max(1, options['chunk_size'])
+        dry_run = options['dry_run']
+
+        self.stdout.write(self.style.SUCCESS('\n=== A/B Test Traffic Reclassification ==='))
+        self.stdout.write(f'Classifier version: {CLASSIFIER_VERSION}')
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be changed\n'))
+
+        qs = ABTestEvent.objects.all()
+        if not rescore_all:
+            qs = qs.filter(classifier_version__lt=CLASSIFIER_VERSION)
+
+        scanned = 0
+        changed = 0
+        last_id = 0
+        totals = defaultdict(int)
+        stale_cells = set()
+
+        while True:
+            # Keyset pagination on the primary key: each chunk is an index range scan
+            rows = list(
+                qs.filter(id__gt=last_id)
+                .order_by('id')
+                .values('id', 'user_agent', 'session_id', 'user_id', 'traffic_class', 'burst_flagged')[:chunk_size]
+            )
+            if not rows:
+                break
+
+            ids_by_class = defaultdict(list)
+            changed_ids = []
+            for row in rows:
+                verdict = classify_traffic(row['user_agent'], row['session_id'], user_id=row['user_id'])
+                if verdict == TRAFFIC_CLASS_HUMAN and row['burst_flagged']:
+                    # Burst verdicts come from ab_detect_bursts, not the stateless rules
+                    verdict = TRAFFIC_CLASS_SUSPECT
+                ids_by_class[verdict].append(row['id'])
+                totals[verdict] += 1
+                if verdict != row['traffic_class']:
+                    changed_ids.append(row['id'])
+            changed += len(changed_ids)
+
+            if not dry_run:
+                if changed_ids:
+                    stale_cells |= affected_cells(ABTestEvent.objects.filter(id__in=changed_ids))
+                # One UPDATE per verdict keeps the write count per chunk tiny
+                for verdict, ids in ids_by_class.items():
+                    ABTestEvent.objects.filter(id__in=ids).update(
+                        traffic_class=verdict,
+                        classifier_version=CLASSIFIER_VERSION,
+                    )
+
+            scanned += len(rows)
+            last_id = rows[-1]['id']
+            self.stdout.write(f'  Scanned {scanned} events (last id {last_id})')
+
+        if changed and not dry_run:
+            # Hourly rollups are keyed on traffic_class; re-fold the changed hours
+            invalidate_rollups(stale_cells)
+
+        self.stdout.write('\n' + '=' * 50)
+        for verdict in sorted(totals):
+            self.stdout.write(f'  {verdict:10s}: {totals[verdict]} events')
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: {changed} of {scanned} verdicts would change'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reclassified {scanned} events ({changed} verdicts changed)'))
+        self.stdout.write('=' * 50 + '\n')
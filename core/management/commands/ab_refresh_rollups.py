@@ -0,0 +1,48 @@
+"""
+Django management command to fold new A/B test events into the hourly rollups.
+
+Only events above the stored high-water mark are read, so this is cheap to run
+from cron (or before a dashboard refresh). --rebuild drops and recomputes them.
+
+Usage:
+    python manage.py ab_refresh_rollups [--rebuild] [--batch-size=50000]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from core.models import ABHourlyRollup
+from core.rollups import DEFAULT_BATCH_SIZE, invalidate_rollups, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Incrementally refresh the hourly A/B test rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Drop all rollups and rebuild them from scratch',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Width of each event id range folded in per transaction (default: {DEFAULT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            invalidate_rollups()
+            self.stdout.write(self.style.WARNING('Dropped existing rollups'))
+
+        started = time.monotonic()
+        state = refresh_rollups(batch_size=max(1, options['batch_size']))
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rollups v{state.version} up to event id {state.high_water_mark} '
+                f'({ABHourlyRollup.objects.count()} rows, {elapsed:.2f}s)'
+            )
+        )
@@ -0,0 +1,167 @@
+"""
+Django management command to show how an A/B test evolves over time.
+
+Reads the hourly rollups (refreshed incrementally first), so the cost is one
+grouped query over O(hours) rows no matter how many events are stored.
+
+Usage:
+    python manage.py ab_timeseries --experiment=button_label_kudos_vs_thanks
+                                   [--granularity=hour|day] [--format=table|csv|json]
+                                   [--since=2025-12-01] [--until=2025-12-08]
+"""
+
+import csv
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+from core.db_routers import ANALYTICS, reads_from
+from core.rollups import refresh_rollups, rollup_queryset
+from core.timeutils import parse_moment
+
+COLUMNS = [
+    'period', 'variant', 'exposures', 'conversions', 'converting_sessions', 'conversion_rate',
+    'cumulative_exposures', 'cumulative_conversions', 'cumulative_converting_sessions',
+    'cumulative_conversion_rate', 'cumulative_session_conversion_rate',
+]
+
+
+def _rate(numerator, denominator):
+    return numerator / denominator if denominator else None
+
+
+class Command(BaseCommand):
+    help = 'Per-variant exposures, conversions and cumulative rates by hour or day'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--experiment',
+            type=str,
+            default='button_label_kudos_vs_thanks',
+            help='Experiment name (default: button_label_kudos_vs_thanks)',
+        )
+        parser.add_argument(
+            '--granularity',
+            choices=['hour', 'day'],
+            default='day',
+            help='Bucket size; days follow the site time zone (default: day)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['table', 'csv', 'json'],
+            default='table',
+            help='Output format (default: table)',
+        )
+        parser.add_argument('--since', type=str, default=None, help='Start (ISO date/datetime)')
+        parser.add_argument('--until', type=str, default=None, help='End, exclusive (ISO date/datetime)')
+        parser.add_argument(
+            '--exclude-forced',
+            action='store_true',
+            help='Exclude forced variants (from ?force_variant parameter)',
+        )
+        parser.add_argument(
+            '--include-non-human',
+            action='store_true',
+            help='Include events classified as bot/monitor/suspect (default: humans only)',
+        )
+        parser.add_argument(
+            '--no-refresh',
+            action='store_true',
+            help='Read the rollups as they are instead of folding in new events first',
+        )
+
+    def handle(self, *args, **options):
+        if not options['no_refresh']:
+            # On "default", before the analytics block: a write inside it pins reads back to default
+            refresh_rollups()
+        self._report(options)
+
+    @reads_from(ANALYTICS)
+    def _report(self, options):
+        qs = rollup_queryset(
+            options['experiment'],
+            include_non_human=options['include_non_human'],
+            exclude_forced=options['exclude_forced'],
+        )
+        since = parse_moment(options['since'])
+        until = parse_moment(options['until'])
+        if since is not None:
+            qs = qs.filter(hour__gte=since)
+        if until is not None:
+            qs = qs.filter(hour__lt=until)
+
+        period_field = 'hour'
+        if options['granularity'] == 'day':
+            # Rollup hours nest exactly inside local days (whole-hour UTC offsets)
+            qs = qs.annotate(period=TruncDay('hour', tzinfo=timezone.get_current_timezone()))
+            period_field = 'period'
+
+        grouped = (
+            qs.values(period_field, 'variant')
+            .annotate(
+                exposures=Sum('exposures'),
+                conversions=Sum('conversions'),
+                converting_sessions=Sum('converting_sessions'),
+            )
+            .order_by(period_field, 'variant')
+        )
+
+        rows = []
+        cumulative = defaultdict(lambda: [0, 0, 0])
+        for row in grouped:
+            totals = cumulative[row['variant']]
+            totals[0] += row['exposures']
+            totals[1] += row['conversions']
+            totals[2] += row['converting_sessions']
+            rows.append({
+                'period': timezone.localtime(row[period_field]).isoformat(),
+                'variant': row['variant'],
+                'exposures': row['exposures'],
+                'conversions': row['conversions'],
+                'converting_sessions': row['converting_sessions'],
+                'conversion_rate': _rate(row['conversions'], row['exposures']),
+                'cumulative_exposures': totals[0],
+                'cumulative_conversions': totals[1],
+                'cumulative_converting_sessions': totals[2],
+                'cumulative_conversion_rate': _rate(totals[1], totals[0]),
+                'cumulative_session_conversion_rate': _rate(totals[2], totals[0]),
+            })
+
+        output_format = options['format']
+        if output_format == 'json':
+            self.stdout.write(json.dumps(rows, indent=2))
+        elif output_format == 'csv':
+            writer = csv.DictWriter(self.stdout, fieldnames=COLUMNS, lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            self._write_table(rows, options)
+
+    def _write_table(self, rows, options):
+        self.stdout.write(self.style.SUCCESS('\n=== A/B Test Time Series ==='))
+        self.stdout.write(f'Experiment: {options["experiment"]} (per {options["granularity"]})')
+        self.stdout.write('')
+        if not rows:
+            self.stdout.write(self.style.WARNING('No data for this experiment and range.'))
+            return
+
+        header = (
+            f'{"Period":25s} {"Variant":10s} {"Exp":>7s} {"Conv":>6s} {"Sess":>6s} '
+            f'{"Rate":>7s} {"CumExp":>8s} {"CumRate":>8s}'
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in rows:
+            rate = row['conversion_rate']
+            cum_rate = row['cumulative_conversion_rate']
+            self.stdout.write(
+                f'{row["period"]:25s} {row["variant"]:10s} {row["exposures"]:7d} {row["conversions"]:6d} '
+                f'{row["converting_sessions"]:6d} '
+                f'{(f"{rate*100:.2f}%" if rate is not None else "N/A"):>7s} '
+                f'{row["cumulative_exposures"]:8d} '
+                f'{(f"{cum_rate*100:.2f}%" if cum_rate is not None else "N/A"):>8s}'
+            )
+        self.stdout.write('')
@@ -1,64 +1,86 @@
 """
 Django management command to generate an A/B test summary report.
 
-Queries ABTestEvent table and computes exposure/conversion statistics per variant.
+Reads the hourly rollups and computes exposure/conversion statistics per
+variant. Each report is persisted as an ABReportSnapshot keyed by the rollup
+high-water mark, so repeated runs with no new events return instantly.
 
 Usage:
-    python manage.py abtest_report
+    python manage.py abtest_report [--experiment=button_label_kudos_vs_thanks]
+                                   [--endpoint=/218b7ae/] [--format=text|json|csv]
 """
 
+import csv
+import json
+
 from django.core.management.base import BaseCommand
-from django.db.models import Count
-from django.utils import timezone
-from core.models import ABTestEvent
+from django.utils.dateparse import parse_datetime
+from core.db_routers import ANALYTICS, reads_from
+from core.reports import DEFAULT_ENDPOINT, DEFAULT_EXPERIMENT, get_report
+from core.rollups import refresh_rollups
 
 
 class Command(BaseCommand):
     help = 'Generate A/B test summary report from ABTestEvent table'
 
-    def handle(self, *args, **options):
-        experiment_name = "button_label_kudos_vs_thanks"
-        endpoint = "/218b7ae/"
-        
-        # Query events for this experiment and endpoint
-        events = ABTestEvent.objects.filter(
-            experiment_name=experiment_name,
-            endpoint=endpoint
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--experiment',
+            type=str,
+            default=DEFAULT_EXPERIMENT,
+            help=f'Experiment name (default: {DEFAULT_EXPERIMENT})',
         )
-        
-        total_events = events.count()
-        
-        # Get exposure and conversion counts per variant
-        exposure_counts = (
-            events
-            .filter(event_type=ABTestEvent.EVENT_TYPE_EXPOSURE)
-            .values('variant')
-            .annotate(count=Count('id'))
+        parser.add_argument(
+            '--endpoint',
+            type=str,
+            default=DEFAULT_ENDPOINT,
+            help=f'Endpoint path (default: {DEFAULT_ENDPOINT})',
         )
-        
-        conversion_counts = (
-            events
-            .filter(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)
-            .values('variant')
-            .annotate(count=Count('id'))
+        parser.add_argument(
+            '--format',
+            choices=['text', 'json', 'csv'],
+            default='text',
+            help='Output format (default: text)',
         )
-        
-        # Build dictionaries for easy lookup
-        exposure_dict = {item['variant']: item['count'] for item in exposure_counts}
-        conversion_dict = {item['variant']: item['count'] for item in conversion_counts}
-        
-        # Get all variants (should be "kudos" and "thanks")
-        all_variants = sorted(set(list(exposure_dict.keys()) + list(conversion_dict.keys())))
-        
+
+    def handle(self, *args, **options):
+        # On "default", before the analytics block: a write inside it pins reads back to default
+        refresh_rollups()
+        self._report(options)
+
+    @reads_from(ANALYTICS)
+    def _report(self, options):
+        report, _ = get_report(options['experiment'], options['endpoint'], refresh=False)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if options['format'] == 'csv':
+            writer = csv.DictWriter(
+                self.stdout,
+                fieldnames=['variant', 'exposures', 'conversions', 'conversion_rate'],
+                lineterminator='\n',
+            )
+            writer.writeheader()
+            writer.writerows(report['variants'])
+            return
+
+        self._write_text(report)
+
+    def _write_text(self, report):
+        experiment_name = report['experiment']
+        endpoint = report['endpoint']
+        generated = parse_datetime(report['generated_at'])
+
         # Print report header
         self.stdout.write(self.style.SUCCESS('\n=== A/B Test Summary Report ==='))
-        self.stdout.write(f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M:%S %Z")}')
+        self.stdout.write(f'Generated: {generated.strftime("%Y-%m-%d %H:%M:%S %Z")}')
         self.stdout.write(f'Experiment: {experiment_name}')
         self.stdout.write(f'Endpoint: {endpoint}')
-        self.stdout.write(f'Total Events: {total_events:,}')
+        self.stdout.write(f'Total Events: {report["total_events"]:,}')
         self.stdout.write('')
         
-        if not all_variants:
+        if not report['variants']:
             self.stdout.write(self.style.WARNING('No data found for this experiment/endpoint.'))
             return
         
@@ -67,62 +89,44 @@ class Command(BaseCommand):
         self.stdout.write(f'{"Variant":<15} {"Exposures":<15} {"Conversions":<15} {"Conversion Rate":<20}')
         self.stdout.write('-' * 70)
         
-        # Calculate and display stats per variant
-        variant_stats = []
-        total_exposures = 0
-        
-        for variant in sorted(all_variants):
-            exposures = exposure_dict.get(variant, 0)
-            conversions = conversion_dict.get(variant, 0)
-            conversion_rate = (conversions / exposures * 100) if exposures > 0 else 0.0
-            
-            total_exposures += exposures
-            variant_stats.append({
-                'variant': variant,
-                'exposures': exposures,
-                'conversions': conversions,
-                'conversion_rate': conversion_rate,
-            })
-            
+        for stats in report['variants']:
+            rate = stats['conversion_rate']
             # Format conversion rate as percentage
-            rate_str = f'{conversion_rate:.2f}%' if exposures > 0 else 'N/A'
+            rate_str = f'{rate:.2f}%' if rate is not None else 'N/A'
             
             self.stdout.write(
-                f'{variant:<15} {exposures:<15,} {conversions:<15,} {rate_str:<20}'
+                f'{stats["variant"]:<15} {stats["exposures"]:<15,} {stats["conversions"]:<15,} {rate_str:<20}'
             )
         
         self.stdout.write('-' * 70)
         self.stdout.write('')
         
-        # Determine winner
-        if len(variant_stats) >= 2:
-            # Sort by conversion rate (descending)
-            sorted_stats = sorted(variant_stats, key=lambda x: x['conversion_rate'], reverse=True)
-            winner = sorted_stats[0]
-            runner_up = sorted_stats[1]
-            
-            if winner['conversion_rate'] == runner_up['conversion_rate']:
-                self.stdout.write(self.style.WARNING('Result: TIE (equal conversion rates)'))
-            else:
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Winner: "{winner["variant"]}" '
-                        f'(conversion rate: {winner["conversion_rate"]:.2f}% vs '
-                        f'{runner_up["conversion_rate"]:.2f}%)'
-                    )
+        # Winner (computed with the snapshot)
+        rates = {v['variant']: v['conversion_rate'] or 0.0 for v in report['variants']}
+        result = report['result'] or {}
+        if result.get('outcome') == 'tie':
+            self.stdout.write(self.style.WARNING('Result: TIE (equal conversion rates)'))
+        elif result.get('outcome') == 'winner':
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Winner: "{result["winner"]}" '
+                    f'(conversion rate: {rates[result["winner"]]:.2f}% vs '
+                    f'{rates[result["runner_up"]]:.2f}%)'
                 )
-        elif len(variant_stats) == 1:
+            )
+        elif result.get('outcome') == 'single_variant':
             self.stdout.write(
                 self.style.WARNING(
-                    f'Only one variant found: "{variant_stats[0]["variant"]}" '
-                    f'(conversion rate: {variant_stats[0]["conversion_rate"]:.2f}%)'
+                    f'Only one variant found: "{result["variant"]}" '
+                    f'(conversion rate: {rates[result["variant"]]:.2f}%)'
                 )
             )
         
         self.stdout.write('')
         
         # Sample size caution
-        if total_exposures < 30:
+        total_exposures = report['total_exposures']
+        if not report['sufficient_sample']:
             self.stdout.write(
                 self.style.WARNING(
                     f'⚠️  CAUTION: Total exposures ({total_exposures}) is less than 30. '
@@ -137,4 +141,3 @@ class Command(BaseCommand):
             )
         
         self.stdout.write('')
-
@@ -0,0 +1,90 @@
+"""
+Django management command to run the in-process view benchmarks (benchmarks/).
+
+Seeds a throwaway data set inside a transaction that is rolled back
+afterwards, requests every routed view as anonymous, reader, contributor and
+admin users, and writes latency percentiles, query counts and peak allocated
+memory per view as JSON. With --compare, exits non-zero if any view regressed
+against a previous report.
+
+Usage:
+    python manage.py benchmark_views [--posts=200] [--events=1000]
+                                     [--iterations=20] [--warmup=2]
+                                     [--roles=anonymous,reader,...] [--only=abtest]
+                                     [--output=bench.json] [--compare=baseline.json]
+                                     [--max-regression=0.25] [--keep-data]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.compare import DEFAULT_MAX_REGRESSION, compare_reports
+from benchmarks.runner import run
+from benchmarks.seed import ROLES
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every view (latency, queries, memory) and emit JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=200, help='Posts to seed (default: 200)')
+        parser.add_argument('--events', type=int, default=1000, help='AB test events to seed (default: 1000)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per view and role (default: 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests first (default: 2)')
+        parser.add_argument(
+            '--roles',
+            type=str,
+            default=','.join(ROLES),
+            help=f'Comma-separated roles (default: {",".join(ROLES)})',
+        )
+        parser.add_argument(
+            '--only',
+            type=str,
+            default='',
+            help='Comma-separated substrings; only URL names containing one are run',
+        )
+        parser.add_argument('--output', type=str, default=None, help='Write the JSON report here instead of stdout')
+        parser.add_argument('--compare', type=str, default=None, help='Baseline report to check for regressions')
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=DEFAULT_MAX_REGRESSION,
+            help=f'Allowed p50 slowdown as a ratio (default: {DEFAULT_MAX_REGRESSION})',
+        )
+        parser.add_argument('--keep-data', action='store_true', help='Commit the seeded data instead of rolling back')
+
+    def handle(self, *args, **options):
+        roles = [role.strip() for role in options['roles'].split(',') if role.strip()]
+        unknown = set(roles) - set(ROLES)
+        if unknown:
+            raise CommandError(f'Unknown role(s): {", ".join(sorted(unknown))}')
+
+        report = run(
+            posts=max(1, options['posts']),
+            events=max(0, options['events']),
+            iterations=max(1, options['iterations']),
+            warmup=max(0, options['warmup']),
+            roles=roles,
+            only=[term for term in options['only'].split(',') if term],
+            keep_data=options['keep_data'],
+        )
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Wrote {len(report["results"])} results to {options["output"]}'))
+        else:
+            self.stdout.write(payload)
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)
+            regressions = compare_reports(baseline, report, max_regression=options['max_regression'])
+            for r in regressions:
+                self.stderr.write(self.style.ERROR(
+                    f'REGRESSION {r["name"]} [{r["role"]}] {r["metric"]}: {r["baseline"]} -> {r["current"]}'
+                ))
+            if regressions:
+                raise CommandError(f'{len(regressions)} benchmark regression(s)')
+            self.stderr.write(self.style.SUCCESS('No regressions against baseline'))
@@ -0,0 +1,150 @@
+"""
+Django management command to load-test the app under gunicorn (benchmarks.loadtest).
+
+Boots "gunicorn config.wsgi:application" locally with --workers (2, like
+Render), drives it from --processes client processes of --concurrency
+asyncio virtual users each for --duration seconds, and reports throughput,
+p50/p95/p99 latency and error rate per endpoint, plus write-lock waits when
+the database is SQLite. On PostgreSQL it also reports what the psycopg
+connection pool saves per connection; --db-pool=on/off boots the server with
+DB_POOL set either way for an end-to-end comparison. The traffic mix is a
+comma-separated list of scenario=weight (browse, search, abtest, submit,
+approve).
+
+Do not point --url at production: the run creates and then deletes posts,
+A/B events and sessions in the database this command is configured for.
+If the bench_* data set (users including a superuser bench_admin, categories
+and about 200 approved public posts) is missing it is seeded and removed
+again afterwards; an existing one is reused and left in place.
+
+Usage:
+    python manage.py loadtest [--workers=2] [--processes=2] [--concurrency=25]
+                              [--duration=30] [--think=0]
+                              [--mix=browse=50,search=15,abtest=25,submit=7,approve=3]
+                              [--url=http://127.0.0.1:8000] [--output=load.json]
+                              [--db-pool=on|off] [--keep-data]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.loadtest import DEFAULT_MIX, DEFAULT_WORKERS, LoadTestError, parse_mix, run
+
+
+class Command(BaseCommand):
+    help = 'Load-test the app under gunicorn and report throughput, latency and errors per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help=f'gunicorn workers (default: {DEFAULT_WORKERS}, as on Render)',
+        )
+        parser.add_argument('--processes', type=int, default=2, help='Client processes (default: 2)')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=25,
+            help='Virtual users per client process (default: 25)',
+        )
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run (default: 30)')
+        parser.add_argument(
+            '--think',
+            type=float,
+            default=0.0,
+            help='Mean pause between scenarios in seconds (default: 0, closed loop)',
+        )
+        parser.add_argument(
+            '--mix',
+            type=str,
+            default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+            help='Traffic mix as scenario=weight pairs',
+        )
+        parser.add_argument(
+            '--approvals',
+            type=int,
+            default=500,
+            help='Pending posts queued for the approve scenario (default: 500)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the clients (default: 0)')
+        parser.add_argument(
+            '--url',
+            type=str,
+            default=None,
+            help='Use a running server on this database instead of booting gunicorn',
+        )
+        parser.add_argument('--output', type=str, default=None, help='Also write the JSON report here')
+        parser.add_argument(
+            '--db-pool',
+            choices=['on', 'off'],
+            default=None,
+            help='Boot the server with the Postgres connection pool on or off (default: DB_POOL as set)',
+        )
+        parser.add_argument('--keep-data', action='store_true', help='Keep the rows the run created, including a freshly seeded bench_* data set')
+
+    def handle(self, *args, **options):
+        try:
+            report = run(
+                mix=parse_mix(options['mix']),
+                workers=max(1, options['workers']),
+                url=options['url'],
+                processes=max(1, options['processes']),
+                concurrency=max(1, options['concurrency']),
+                duration=max(1.0, options['duration']),
+                think_seconds=max(0.0, options['think']),
+                approvals=max(0, options['approvals']),
+                rng_seed=options['seed'],
+                keep_data=options['keep_data'],
+                db_pool=None if options['db_pool'] is None else options['db_pool'] == 'on',
+                log=self.stdout.write,
+            )
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        self._write_table(report)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote report to {options["output"]}'))
+
+    def _write_table(self, report):
+        self.stdout.write('')
+        self.stdout.write(f'{"endpoint":<16} {"reqs":>7} {"rps":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"errors":>8}')
+        rows = report['endpoints'] + ([dict(report['total'], endpoint='TOTAL')] if report['total']['requests'] else [])
+        for row in rows:
+            line = (
+                f'{row["endpoint"]:<16} {row["requests"]:>7} {row["rps"]:>8.1f} {row["p50_ms"]:>9.1f} '
+                f'{row["p95_ms"]:>9.1f} {row["p99_ms"]:>9.1f} {row["error_rate"]:>8.1%}'
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+
+        for error in report['sample_errors']:
+            self.stdout.write(self.style.WARNING(f'  {error}'))
+
+        setup = report.get('connection_setup')
+        if setup and 'error' in setup:
+            self.stdout.write(self.style.WARNING(f'\nConnection setup benchmark skipped: {setup["error"]}'))
+        elif setup:
+            self.stdout.write(f'\nConnection setup ({setup["threads"]} threads):')
+            for mode in ('direct', 'pooled'):
+                row = setup[mode]
+                if 'p50_ms' in row:
+                    self.stdout.write(f'  {mode:<7} p50 {row["p50_ms"]:.2f} ms, p95 {row["p95_ms"]:.2f} ms ({row["errors"]} errors)')
+                else:
+                    self.stdout.write(self.style.ERROR(f'  {mode:<7} failed: {row.get("sample_error", "no cycles")}'))
+            if 'saved_p50_ms' in setup:
+                self.stdout.write(self.style.SUCCESS(f'  pool saves {setup["saved_p50_ms"]:.2f} ms per connection at p50'))
+
+        sqlite = report.get('sqlite')
+        if sqlite:
+            waits = (
+                f'p50 {sqlite["p50_wait_ms"]:.1f} ms, p95 {sqlite["p95_wait_ms"]:.1f} ms, max {sqlite["max_wait_ms"]:.1f} ms'
+                if 'p50_wait_ms' in sqlite else 'no successful probes'
+            )
+            line = (
+                f'\nSQLite write lock: {waits}; {sqlite["timeouts"]} probe timeouts, '
+                f'{sqlite["locked_errors_in_log"]} "database is locked" errors in the server log'
+            )
+            locked = sqlite['timeouts'] or sqlite['locked_errors_in_log']
+            self.stdout.write(self.style.WARNING(line) if locked else line)
@@ -0,0 +1,70 @@
+"""
+Django management command that runs queued BackgroundJobs (core.jobs).
+
+Polls the queue, runs one job at a time and streams its output into the job
+row. Run it as a separate process next to gunicorn (render.yaml and the
+Dockerfile start it in the background on the same host), so the web workers
+only enqueue and both see the same database - on SQLite, the same file.
+
+Usage:
+    python manage.py run_jobs [--once] [--poll-interval=2] [--max-jobs=N]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from core.jobs import claim_next_job, run_job, worker_name
+from core.models import BackgroundJob
+from core.slow_queries import flush as flush_slow_queries
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (management commands launched from the admin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty (default: 2)',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Exit after running this many jobs',
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        max_jobs = options['max_jobs']
+        ran = 0
+
+        self.stdout.write(self.style.SUCCESS(f'Job worker {worker} started'))
+
+        while max_jobs is None or ran < max_jobs:
+            job = claim_next_job(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running job #{job.pk}: {job.command} {job.args} {job.options}')
+            started = time.monotonic()
+            job = run_job(job)
+            ran += 1
+            flush_slow_queries()
+
+            message = f'Job #{job.pk} {job.status} in {time.monotonic() - started:.1f}s'
+            if job.status == BackgroundJob.STATUS_SUCCEEDED:
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stdout.write(self.style.ERROR(message))
+
+        self.stdout.write(f'Ran {ran} job(s)')
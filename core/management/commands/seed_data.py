@@ -1,18 +1,54 @@
 """
 Management command to seed initial data.
 
-Creates categories, sample users, and sample posts.
+Creates categories, sample users, and sample posts. For capacity testing,
+--scale and --events add bulk synthetic data on top (see core.synthetic):
+--scale 1 is 100k users, 1M posts and Zipf-distributed bookmarks, and
+--events defaults to 10M AB test events per unit of scale.
+
+Usage:
+    python manage.py seed_data [--scale=1] [--events=10000000] [--seed=42]
+                               [--batch-size=5000]
 """
 
+import time
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User, Group
-from core.models import Category, Post
+from core.models import Bookmark, Category, Post
+from core.synthetic import DEFAULT_BATCH_SIZE, DEFAULT_SEED, EVENTS_PER_SCALE, ContentModels, generate
 from config.settings import READER_GROUP, CONTRIBUTOR_GROUP, ADMIN_GROUP
 
 
 class Command(BaseCommand):
     help = 'Seed initial data: groups, categories, users, and posts'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=0.0,
+            help='Bulk synthetic data: 100k users and 1M posts per unit (default: 0, samples only)',
+        )
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=None,
+            help=f'Synthetic AB test events (default: {EVENTS_PER_SCALE:,} x scale)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=DEFAULT_SEED,
+            help=f'Random seed for synthetic data (default: {DEFAULT_SEED})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows per bulk INSERT (default: {DEFAULT_BATCH_SIZE})',
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Seeding initial data...\n')
 
@@ -130,5 +166,25 @@ Good luck with your search!''',
             if created:
                 self.stdout.write(self.style.SUCCESS(f'  ✓ Created pending post: {pending_post.title}'))
 
-        self.stdout.write(self.style.SUCCESS('\n✓ Seeding complete!'))
+        scale = max(0.0, options['scale'])
+        events = options['events']
+        if events is None:
+            events = int(EVENTS_PER_SCALE * scale)
+        if scale or events:
+            self.stdout.write(f'\nGenerating synthetic data (scale={scale}, events={events:,}, seed={options["seed"]})...')
+            started = time.monotonic()
+            counts = generate(
+                scale=scale,
+                events=max(0, events),
+                seed=options['seed'],
+                models=ContentModels(Category, Post, Bookmark),
+                role_groups={'reader': READER_GROUP, 'contributor': CONTRIBUTOR_GROUP, 'admin': ADMIN_GROUP},
+                batch_size=max(1, options['batch_size']),
+                log=self.stdout.write,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'  ✓ {counts["users"]:,} users, {counts["posts"]:,} posts, {counts["bookmarks"]:,} bookmarks, '
+                f'{counts["events"]:,} events in {time.monotonic() - started:.1f}s'
+            ))
 
+        self.stdout.write(self.style.SUCCESS('\n✓ Seeding complete!'))
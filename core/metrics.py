@@ -0,0 +1,344 @@
+"""
+In-memory request and application metrics (fed by core.middleware).
+
+Each view gets histograms of wall time (overall and per status code), DB
+time, query count and response size plus request, error and duplicate-query
+counters. Other code can bump labelled counters (inc) and histograms
+(observe), e.g. cache hits and rollup refresh times. Histograms use fixed
+cumulative buckets (Prometheus style), so recording is O(log buckets) with
+no per-request allocation, and percentiles are estimated from the buckets.
+
+Every gunicorn worker has its own REGISTRY. WorkerStore writes a snapshot of
+it to METRICS_DIR/worker-<pid>.json at most every METRICS_FLUSH_SECONDS (by
+rename, so readers never see a partial file), and collect() merges all
+snapshots into one registry for the /metrics endpoint. Snapshots of workers
+that have exited are kept so counters never go backwards.
+"""
+
+import glob
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+# Upper bounds; every histogram also has an implicit +Inf bucket
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000)
+
+DEFAULT_FLUSH_SECONDS = 5.0
+
+
+class Histogram:
+    """Fixed-bucket histogram; `counts[i]` holds values <= buckets[i] (last is +Inf)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """[(upper bound, observations <= bound)], ending with (inf, count)."""
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """
+        Estimate the q-quantile by linear interpolation inside its bucket
+        (what Prometheus' histogram_quantile does). None when empty; values
+        in the +Inf bucket are reported as the largest finite bound.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, previous = 0.0, 0
+        for bound, cumulative in self.cumulative():
+            if cumulative >= rank:
+                if bound == float("inf"):
+                    return self.buckets[-1]
+                in_bucket = cumulative - previous
+                return lower + (bound - lower) * ((rank - previous) / in_bucket if in_bucket else 0.0)
+            lower, previous = bound, cumulative
+        return self.buckets[-1]
+
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def to_state(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    def merge_state(self, state):
+        """Add another histogram's state; ignored if its buckets differ (e.g. mid-deploy)."""
+        if tuple(state["buckets"]) != self.buckets:
+            return
+        self.counts = [a + b for a, b in zip(self.counts, state["counts"])]
+        self.count += state["count"]
+        self.sum += state["sum"]
+
+    @classmethod
+    def from_state(cls, state):
+        hist = cls(state["buckets"])
+        hist.merge_state(state)
+        return hist
+
+
+class ViewMetrics:
+    """Everything recorded for one view name."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.sampled = 0
+        self.duplicate_queries = 0
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        # status code -> wall-time histogram
+        self.statuses = {}
+
+    def summary(self):
+        def ms(value):
+            return None if value is None else round(value * 1000.0, 2)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "sampled": self.sampled,
+            "p50_ms": ms(self.duration.quantile(0.5)),
+            "p95_ms": ms(self.duration.quantile(0.95)),
+            "p99_ms": ms(self.duration.quantile(0.99)),
+            "mean_ms": ms(self.duration.mean()),
+            "mean_db_ms": ms(self.db_time.mean()),
+            "mean_queries": None if not self.queries.count else round(self.queries.mean(), 2),
+            "duplicate_queries": self.duplicate_queries,
+            "mean_response_bytes": None if not self.response_size.count else round(self.response_size.mean()),
+        }
+
+    _COUNTERS = ("requests", "errors", "sampled", "duplicate_queries")
+    _HISTOGRAMS = ("duration", "db_time", "queries", "response_size")
+
+    def to_state(self):
+        state = {name: getattr(self, name) for name in self._COUNTERS}
+        state.update({name: getattr(self, name).to_state() for name in self._HISTOGRAMS})
+        state["statuses"] = {str(status): hist.to_state() for status, hist in self.statuses.items()}
+        return state
+
+    def merge_state(self, state):
+        for name in self._COUNTERS:
+            setattr(self, name, getattr(self, name) + state[name])
+        for name in self._HISTOGRAMS:
+            getattr(self, name).merge_state(state[name])
+        for status, hist_state in state["statuses"].items():
+            hist = self.statuses.setdefault(int(status), Histogram(LATENCY_BUCKETS))
+            hist.merge_state(hist_state)
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+class MetricsRegistry:
+    """Thread-safe per-view metrics plus labelled counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        # (name, ((label, value), ...)) -> float / Histogram
+        self._counters = {}
+        self._histograms = {}
+
+    def record(self, view, status, duration, response_size, db_time=None, queries=None, duplicates=0):
+        """
+        Record one request. db_time/queries are None when the request was not
+        sampled for query tracing.
+        """
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.requests += 1
+            if status >= 500:
+                metrics.errors += 1
+            metrics.duration.observe(duration)
+            by_status = metrics.statuses.get(status)
+            if by_status is None:
+                by_status = metrics.statuses[status] = Histogram(LATENCY_BUCKETS)
+            by_status.observe(duration)
+            if response_size is not None:
+                metrics.response_size.observe(response_size)
+            if queries is not None:
+                metrics.sampled += 1
+                metrics.db_time.observe(db_time)
+                metrics.queries.observe(queries)
+                metrics.duplicate_queries += duplicates
+
+    def inc(self, name, labels=None, amount=1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, labels=None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def views(self):
+        """[(view name, ViewMetrics)] sorted by name (the live objects; read under no lock)."""
+        with self._lock:
+            return sorted(self._views.items())
+
+    def counters(self):
+        """[((name, labels), value)] sorted."""
+        with self._lock:
+            return sorted(self._counters.items())
+
+    def histograms(self):
+        """[((name, labels), Histogram)] sorted."""
+        with self._lock:
+            return sorted(self._histograms.items(), key=lambda item: item[0])
+
+    def summary(self):
+        """{view name: ViewMetrics.summary()}, slowest total time first."""
+        items = sorted(self.views(), key=lambda item: item[1].duration.sum, reverse=True)
+        return {view: metrics.summary() for view, metrics in items}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_state(self):
+        """JSON-ready snapshot."""
+        with self._lock:
+            return {
+                "views": {view: metrics.to_state() for view, metrics in self._views.items()},
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [
+                    [name, list(labels), hist.to_state()] for (name, labels), hist in self._histograms.items()
+                ],
+            }
+
+    def merge_state(self, state):
+        """Add a snapshot (from to_state) into this registry."""
+        with self._lock:
+            for view, view_state in state["views"].items():
+                self._views.setdefault(view, ViewMetrics()).merge_state(view_state)
+            for name, labels, value in state["counters"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, hist_state in state["histograms"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if key in self._histograms:
+                    self._histograms[key].merge_state(hist_state)
+                else:
+                    self._histograms[key] = Histogram.from_state(hist_state)
+
+
+REGISTRY = MetricsRegistry()
+
+
+def current_rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is KiB on Linux, bytes on macOS; this fallback is only a rough guide
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def metrics_dir():
+    """
+    Where worker snapshots go: settings.METRICS_DIR, or a temp directory per
+    parent process (the gunicorn master), so each server instance gets its own.
+    """
+    return getattr(settings, "METRICS_DIR", None) or os.path.join(
+        tempfile.gettempdir(), "far-storm-metrics", str(os.getppid())
+    )
+
+
+class WorkerStore:
+    """Persists one process's registry snapshot for collect()."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._last_write = 0.0
+        self._write_lock = threading.Lock()
+
+    def maybe_persist(self):
+        flush_seconds = getattr(settings, "METRICS_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS)
+        if time.monotonic() - self._last_write >= flush_seconds:
+            self.persist()
+
+    def persist(self):
+        with self._write_lock:
+            self._last_write = time.monotonic()
+            directory = metrics_dir()
+            os.makedirs(directory, exist_ok=True)
+            pid = os.getpid()
+            payload = {
+                "pid": pid,
+                "rss_bytes": current_rss_bytes(),
+                "written_at": time.time(),
+                "state": self.registry.to_state(),
+            }
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "w") as fh:
+                json.dump(payload, fh)
+            os.replace(tmp_path, os.path.join(directory, f"worker-{pid}.json"))
+
+
+STORE = WorkerStore(REGISTRY)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect(directory=None):
+    """
+    Merge every worker snapshot in `directory` into a fresh registry.
+
+    Returns (registry, workers) where workers is
+    [{"pid", "rss_bytes", "written_at", "alive"}]; unreadable files are skipped.
+    """
+    merged, workers = MetricsRegistry(), []
+    for path in sorted(glob.glob(os.path.join(directory or metrics_dir(), "worker-*.json"))):
+        try:
+            with open(path) as fh:
+                payload = json.load(fh)
+            merged.merge_state(payload["state"])
+        except (OSError, ValueError, KeyError):
+            continue
+        workers.append({
+            "pid": payload["pid"],
+            "rss_bytes": payload["rss_bytes"],
+            "written_at": payload["written_at"],
+            "alive": _is_alive(payload["pid"]),
+        })
+    return merged, workers
@@ -0,0 +1,217 @@
+"""
+Per-request instrumentation.
+
+RequestMetricsMiddleware records, for every request, the resolved view name,
+wall time and response size into core.metrics.REGISTRY. A sampled share of
+requests (settings.REQUEST_METRICS_SAMPLE_RATE) also has its SQL traced with
+connection.execute_wrapper - no DEBUG cursor, just a timer around each
+execute - for DB time, query count and duplicate count. Requests slower than
+settings.SLOW_REQUEST_MS are logged to "core.requests" with their most
+expensive statements. The registry is periodically written out for the
+multi-worker /metrics endpoint (core.metrics.WorkerStore).
+
+RequestProfilingMiddleware runs a request under a profiler when a staff user
+asks for it with ?_profile= or when PROFILE_SAMPLE_RATE picks it, and stores
+the result as a RequestProfile (core.profiling).
+
+ReplicaPinMiddleware gives read-your-writes on top of core.db_routers: after
+a request that wrote to the database, that browser reads from the primary
+for REPLICA_PIN_SECONDS.
+"""
+
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .db_routers import DEFAULT_PIN_SECONDS, PIN_COOKIE, REPLICA, SAFE_METHODS, configured, reads_from
+from .metrics import REGISTRY, STORE
+from .profiling import CPROFILE, SAMPLE, profile_call, save_profile
+from .slow_queries import reset_source, set_source
+
+logger = logging.getLogger("core.requests")
+
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_SLOW_REQUEST_MS = 500.0
+DEFAULT_PROFILE_SAMPLE_MODE = SAMPLE
+
+PROFILE_PARAM = "_profile"
+# ?_profile= values; anything else truthy means cProfile
+PROFILE_FLAG_MODES = {"sample": SAMPLE, "cprofile": CPROFILE}
+
+# Statements listed in a slow-request log line
+TOP_QUERIES = 3
+SQL_PREVIEW_CHARS = 200
+
+UNRESOLVED_VIEW = "<unresolved>"
+
+
+class QueryRecorder:
+    """execute_wrapper that times every statement run through a connection."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    @property
+    def duplicates(self):
+        """Executions of a statement already run in this request (N+1 patterns)."""
+        return len(self.queries) - len({sql for sql, _ in self.queries})
+
+    def top(self, n=TOP_QUERIES):
+        """[(sql, executions, total seconds)] for the n statements with the most total time."""
+        grouped = {}
+        for sql, duration in self.queries:
+            count, total = grouped.get(sql, (0, 0.0))
+            grouped[sql] = (count + 1, total + duration)
+        ranked = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)[:n]
+        return [(sql, count, total) for sql, (count, total) in ranked]
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else UNRESOLVED_VIEW
+
+
+def response_size(response):
+    if response.streaming:
+        length = response.get("Content-Length")
+        return int(length) if length and length.isdigit() else None
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, "REQUEST_METRICS_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)
+        recorder = QueryRecorder() if random.random() < sample_rate else None
+
+        # Slow queries are attributed to the view (resolved once they are slow)
+        source = set_source(lambda: f"view:{view_name(request)}")
+        started = time.perf_counter()
+        try:
+            if recorder is None:
+                response = self.get_response(request)
+            else:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(recorder))
+                    response = self.get_response(request)
+        finally:
+            reset_source(source)
+        duration = time.perf_counter() - started
+
+        view = view_name(request)
+        REGISTRY.record(
+            view,
+            response.status_code,
+            duration,
+            response_size(response),
+            db_time=recorder.db_time if recorder else None,
+            queries=len(recorder.queries) if recorder else None,
+            duplicates=recorder.duplicates if recorder else 0,
+        )
+        STORE.maybe_persist()
+
+        slow_ms = getattr(settings, "SLOW_REQUEST_MS", DEFAULT_SLOW_REQUEST_MS)
+        if duration * 1000.0 >= slow_ms:
+            self._log_slow(request, view, response, duration, recorder)
+        return response
+
+    def _log_slow(self, request, view, response, duration, recorder):
+        message = f"Slow request {request.method} {request.path} ({view}) {response.status_code} in {duration * 1000.0:.0f} ms"
+        if recorder is None:
+            logger.warning("%s (queries not sampled)", message)
+            return
+        lines = [
+            f"{message}: db {recorder.db_time * 1000.0:.0f} ms in {len(recorder.queries)} queries "
+            f"({recorder.duplicates} duplicate)"
+        ]
+        for sql, count, total in recorder.top():
+            lines.append(f"  {total * 1000.0:.1f} ms x{count}: {sql[:SQL_PREVIEW_CHARS]}")
+        logger.warning("\n".join(lines))
+
+
+class RequestProfilingMiddleware:
+    """
+    Profile requests on demand. Must come after AuthenticationMiddleware: the
+    ?_profile= flag is only honoured for staff users.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _choose(self, request):
+        """(mode, trigger) for this request, or None to run it normally."""
+        flag = request.GET.get(PROFILE_PARAM)
+        if flag and flag != "0" and request.user.is_staff:
+            return PROFILE_FLAG_MODES.get(flag.lower(), CPROFILE), "flag"
+        sample_rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+        if sample_rate > 0 and random.random() < sample_rate:
+            return getattr(settings, "PROFILE_SAMPLE_MODE", DEFAULT_PROFILE_SAMPLE_MODE), "sampled"
+        return None
+
+    def __call__(self, request):
+        choice = self._choose(request)
+        if choice is None:
+            return self.get_response(request)
+
+        mode, trigger = choice
+        response, elapsed, result = profile_call(mode, self.get_response, request)
+        user = request.user if request.user.is_authenticated else None
+        profile = save_profile(
+            method=request.method,
+            path=request.path[:500],
+            query_string=request.META.get("QUERY_STRING", "")[:500],
+            view_name=view_name(request)[:200],
+            status_code=response.status_code,
+            duration_ms=elapsed * 1000.0,
+            mode=mode,
+            trigger=trigger,
+            user=user,
+            **result,
+        )
+        if profile is not None and trigger == "flag":
+            response["X-Profile-Id"] = str(profile.pk)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Track writes for the whole request (core.db_routers.reads_from) and, when
+    a replica is configured, set a short-lived cookie after a request that
+    wrote or used an unsafe method; replica_reads views skip the replica while
+    it is present.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with reads_from(None) as route:
+            response = self.get_response(request)
+        if (route.wrote or request.method not in SAFE_METHODS) and configured(REPLICA) == REPLICA:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_PIN_SECONDS", DEFAULT_PIN_SECONDS),
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
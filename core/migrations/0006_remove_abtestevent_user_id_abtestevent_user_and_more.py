@@ -5,6 +5,26 @@ from django.db import migrations, models
 import django.db.models.deletion
 
 
+class AddUserField(migrations.AddField):
+    """
+    AddField as shipped, except that a separate A/B database (which has no
+    auth_user table to reference) gets the column without the foreign key.
+    The migration state is unchanged; 0018 drops the constraint elsewhere.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        from core.db_routers import abtest_database
+
+        if schema_editor.connection.alias == abtest_database():
+            name, path, args, kwargs = self.field.deconstruct()
+            unconstrained = migrations.AddField(self.model_name, self.name, self.field.__class__(
+                *args, **dict(kwargs, db_constraint=False),
+            ))
+            to_state = from_state.clone()
+            unconstrained.state_forwards(app_label, to_state)
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
 class Migration(migrations.Migration):
 
     dependencies = [
@@ -17,7 +37,7 @@ class Migration(migrations.Migration):
             model_name='abtestevent',
             name='user_id',
         ),
-        migrations.AddField(
+        AddUserField(
             model_name='abtestevent',
             name='user',
             field=models.ForeignKey(blank=True, help_text='Django User if authenticated', null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
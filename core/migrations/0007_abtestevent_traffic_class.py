@@ -0,0 +1,27 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_remove_abtestevent_user_id_abtestevent_user_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abtestevent',
+            name='classifier_version',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, help_text='core.traffic.CLASSIFIER_VERSION that produced traffic_class (0 = unclassified)'),
+        ),
+        migrations.AddField(
+            model_name='abtestevent',
+            name='traffic_class',
+            field=models.CharField(choices=[('human', 'Human'), ('bot', 'Bot'), ('monitor', 'Monitor'), ('suspect', 'Suspect')], db_index=True, default='human', help_text='Ingest-time verdict: human, bot, monitor or suspect', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='abtestevent',
+            index=models.Index(fields=['experiment_name', 'traffic_class', 'event_type', 'variant'], name='core_abtest_experim_19cbe0_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_abtestevent_traffic_class'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="Command/task name, e.g. 'ab_purge_bots'", max_length=100, unique=True)),
+                ('last_id', models.BigIntegerField(default=0, help_text='Highest primary key already processed')),
+                ('state', models.JSONField(blank=True, default=dict, help_text='Command-specific resume state')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:21
+
+import datetime
+
+import core.models
+from django.db import migrations
+from django.db.models.functions import TruncMinute
+
+
+def backfill_created_minute(apps, schema_editor):
+    """Fill the minute bucket for existing events in one set-based UPDATE."""
+    ABTestEvent = apps.get_model("core", "ABTestEvent")
+    ABTestEvent.objects.filter(created_minute__isnull=True).update(
+        created_minute=TruncMinute("created_at", tzinfo=datetime.timezone.utc)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_maintenancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abtestevent',
+            name='created_minute',
+            field=core.models.MinuteBucketField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(
+            backfill_created_minute, migrations.RunPython.noop, hints={'model_name': 'abtestevent'},
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_abtestevent_created_minute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ABRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('high_water_mark', models.BigIntegerField(default=0)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'AB Rollup State',
+            },
+        ),
+        migrations.CreateModel(
+            name='ABSequentialState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Experiment plus analysis options', max_length=200, unique=True)),
+                ('rollup_version', models.PositiveIntegerField(default=0)),
+                ('last_hour', models.DateTimeField(blank=True, help_text='Last completed hour folded in', null=True)),
+                ('state', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'AB Sequential Test State',
+                'ordering': ['key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ABHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('experiment_name', models.CharField(max_length=100)),
+                ('endpoint', models.CharField(max_length=200)),
+                ('variant', models.CharField(max_length=20)),
+                ('traffic_class', models.CharField(choices=[('human', 'Human'), ('bot', 'Bot'), ('monitor', 'Monitor'), ('suspect', 'Suspect')], max_length=16)),
+                ('is_forced', models.BooleanField(default=False)),
+                ('hour', models.DateTimeField(help_text='Start of the UTC hour')),
+                ('exposures', models.PositiveIntegerField(default=0)),
+                ('conversions', models.PositiveIntegerField(default=0)),
+                ('converting_sessions', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'AB Hourly Rollup',
+                'verbose_name_plural': 'AB Hourly Rollups',
+                'ordering': ['experiment_name', 'hour', 'variant'],
+                'indexes': [models.Index(fields=['experiment_name', 'hour'], name='core_abhour_experim_c0ddc5_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='abhourlyrollup',
+            constraint=models.UniqueConstraint(fields=('experiment_name', 'endpoint', 'variant', 'traffic_class', 'is_forced', 'hour'), name='unique_ab_hourly_rollup_cell'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_abhourlyrollup_abrollupstate_absequentialstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abtestevent',
+            name='browser_family',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='abtestevent',
+            name='device_class',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='abtestevent',
+            name='os_family',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_abtestevent_user_agent_segments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ABReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('experiment_name', models.CharField(max_length=100)),
+                ('endpoint', models.CharField(max_length=200)),
+                ('rollup_version', models.PositiveIntegerField()),
+                ('high_water_mark', models.BigIntegerField()),
+                ('data', models.JSONField(default=dict)),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'AB Report Snapshot',
+                'verbose_name_plural': 'AB Report Snapshots',
+                'ordering': ['-generated_at'],
+                'indexes': [models.Index(fields=['experiment_name', 'endpoint', 'rollup_version', 'high_water_mark'], name='core_abrepo_experim_5cf5f0_idx')],
+            },
+        ),
+    ]
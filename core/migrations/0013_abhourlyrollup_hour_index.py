@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_abreportsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='abhourlyrollup',
+            index=models.Index(fields=['hour', 'endpoint'], name='core_abhour_hour_60fef7_idx'),
+        ),
+    ]
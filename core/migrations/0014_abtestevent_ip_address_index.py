@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_abhourlyrollup_hour_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='abtestevent',
+            name='ip_address',
+            field=models.GenericIPAddressField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.26 on 2026-10-19 12:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0014_abtestevent_ip_address_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.CharField(help_text="Management command name, e.g. 'ab_purge_bots'", max_length=100)),
+                ('args', models.JSONField(blank=True, default=list, help_text='Positional arguments')),
+                ('options', models.JSONField(blank=True, default=dict, help_text='Keyword options, e.g. {"dry_run": true}')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], db_index=True, default='queued', max_length=16)),
+                ('output', models.TextField(blank=True, help_text='Combined stdout/stderr, appended while running')),
+                ('error', models.TextField(blank=True, help_text='Traceback if the command raised')),
+                ('worker', models.CharField(blank=True, help_text='host:pid of the worker that ran the job', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='core_backgr_status_e66a68_idx')],
+            },
+        ),
+    ]
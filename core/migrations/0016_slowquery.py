@@ -0,0 +1,37 @@
+# Generated by Django 4.2.26 on 2026-10-19 13:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(help_text='SHA-1 of the normalised SQL', max_length=40, unique=True)),
+                ('sql', models.TextField(help_text='Latest statement seen with this fingerprint')),
+                ('sample_params', models.TextField(blank=True, help_text='Parameters of the latest occurrence (truncated)')),
+                ('database', models.CharField(default='default', max_length=50)),
+                ('source', models.CharField(blank=True, help_text='View, job or command that ran it last', max_length=200)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0.0)),
+                ('max_ms', models.FloatField(default=0.0)),
+                ('explain', models.TextField(blank=True)),
+                ('explained_at', models.DateTimeField(blank=True, null=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Slow Query',
+                'verbose_name_plural': 'Slow Queries',
+                'ordering': ['-total_ms'],
+            },
+        ),
+    ]
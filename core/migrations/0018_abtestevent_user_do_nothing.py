@@ -0,0 +1,24 @@
+# Generated by Django 4.2.26 on 2026-10-19 13:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0017_requestprofile'),
+    ]
+
+    operations = [
+        # Drops the auth_user foreign key created by 0006, so databases migrated
+        # before and fresh ones end up the same (0006 never creates it in a
+        # separate A/B database, which has no auth_user table)
+        migrations.AlterField(
+            model_name='abtestevent',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Django User if authenticated', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.26 on 2026-10-19 14:05
+
+from collections import defaultdict
+
+from django.db import migrations
+
+CHUNK_SIZE = 5000
+
+
+def classify_legacy_events(apps, schema_editor):
+    """
+    Score events written before ingest-time classification (classifier_version=0).
+
+    0007 gave them traffic_class="human", so humans-only analysis counted every
+    historical bot until ab_reclassify_traffic was run. Same rules and keyset
+    chunks as that command.
+    """
+    # Local import: the classifier is a pure function of the stored fields
+    from core.traffic import CLASSIFIER_VERSION, classify_traffic
+
+    ABTestEvent = apps.get_model("core", "ABTestEvent")
+    ABHourlyRollup = apps.get_model("core", "ABHourlyRollup")
+    ABRollupState = apps.get_model("core", "ABRollupState")
+    db_alias = schema_editor.connection.alias
+
+    events = ABTestEvent.objects.using(db_alias).filter(classifier_version=0)
+    changed = 0
+    last_id = 0
+    while True:
+        rows = list(
+            events.filter(id__gt=last_id)
+            .order_by("id")
+            .values("id", "user_agent", "session_id", "user_id", "traffic_class")[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        ids_by_class = defaultdict(list)
+        for row in rows:
+            verdict = classify_traffic(row["user_agent"], row["session_id"], user_id=row["user_id"])
+            ids_by_class[verdict].append(row["id"])
+            if verdict != row["traffic_class"]:
+                changed += 1
+        for verdict, ids in ids_by_class.items():
+            ABTestEvent.objects.using(db_alias).filter(id__in=ids).update(
+                traffic_class=verdict,
+                classifier_version=CLASSIFIER_VERSION,
+            )
+        last_id = rows[-1]["id"]
+
+    if changed:
+        # Rollups built so far counted those rows as human; rebuild on next refresh
+        ABHourlyRollup.objects.using(db_alias).all().delete()
+        state = ABRollupState.objects.using(db_alias).filter(pk=1).first()
+        if state is not None:
+            state.high_water_mark = 0
+            state.version += 1
+            state.save(using=db_alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_abtestevent_user_do_nothing'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            classify_legacy_events, migrations.RunPython.noop, hints={'model_name': 'abtestevent'},
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.26 on 2026-10-19 13:57
+
+from django.db import migrations, models
+
+CHUNK_SIZE = 5000
+
+
+def flag_existing_bursts(apps, schema_editor):
+    """
+    Mark suspect events the stateless rules would call human: only burst
+    detection can have labelled them, so re-scoring must keep them suspect.
+    """
+    from core.traffic import TRAFFIC_CLASS_HUMAN, classify_traffic
+
+    ABTestEvent = apps.get_model("core", "ABTestEvent")
+    db_alias = schema_editor.connection.alias
+
+    events = ABTestEvent.objects.using(db_alias).filter(traffic_class="suspect")
+    last_id = 0
+    while True:
+        rows = list(
+            events.filter(id__gt=last_id)
+            .order_by("id")
+            .values("id", "user_agent", "session_id", "user_id")[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        ids = [
+            row["id"] for row in rows
+            if classify_traffic(row["user_agent"], row["session_id"], user_id=row["user_id"]) == TRAFFIC_CLASS_HUMAN
+        ]
+        ABTestEvent.objects.using(db_alias).filter(id__in=ids).update(burst_flagged=True)
+        last_id = rows[-1]["id"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_backgroundjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abtestevent',
+            name='burst_flagged',
+            field=models.BooleanField(default=False, help_text='Part of a traffic burst found by ab_detect_bursts/ab_purge_bots'),
+        ),
+        migrations.RunPython(
+            flag_existing_bursts, migrations.RunPython.noop, hints={'model_name': 'abtestevent'},
+        ),
+    ]
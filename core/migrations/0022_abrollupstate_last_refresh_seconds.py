@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_abtestevent_burst_flagged'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abrollupstate',
+            name='last_refresh_seconds',
+            field=models.FloatField(blank=True, help_text='Duration of the last refresh', null=True),
+        ),
+    ]
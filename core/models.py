@@ -1,15 +1,25 @@
 """
 Models for Yale Newcomer Survival Guide.
 
-Defines Category, Post, Bookmark, and ExternalLink models.
+Defines Category, Post, Bookmark, and ExternalLink models, plus the A/B test
+event log and the bookkeeping tables used by its maintenance commands.
 """
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import get_commands
 from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 
+from .traffic import (
+    TRAFFIC_CLASS_HUMAN,
+    TRAFFIC_CLASS_BOT,
+    TRAFFIC_CLASS_MONITOR,
+    TRAFFIC_CLASS_SUSPECT,
+)
+
 
 class Category(models.Model):
     """Category model for organizing posts."""
@@ -119,6 +129,32 @@ class ExternalLink(models.Model):
         return self.title
 
 
+class MinuteBucketField(models.DateTimeField):
+    """
+    DateTimeField holding another datetime field truncated to the minute.
+
+    Filled in pre_save (which also runs for bulk_create), after the source
+    field's own auto_now_add value has been assigned, so the bucket always
+    matches the stored timestamp.
+    """
+
+    def __init__(self, *args, source_field='created_at', **kwargs):
+        self.source_field = source_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.source_field != 'created_at':
+            kwargs['source_field'] = self.source_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        source = getattr(model_instance, self.source_field)
+        value = source.replace(second=0, microsecond=0) if source else None
+        setattr(model_instance, self.attname, value)
+        return value
+
+
 class ABTestEvent(models.Model):
     """
     Model to store A/B test events server-side for traffic split analysis.
@@ -134,6 +170,13 @@ class ABTestEvent(models.Model):
         (EVENT_TYPE_CONVERSION, "Conversion"),
     ]
     
+    TRAFFIC_CLASS_CHOICES = [
+        (TRAFFIC_CLASS_HUMAN, "Human"),
+        (TRAFFIC_CLASS_BOT, "Bot"),
+        (TRAFFIC_CLASS_MONITOR, "Monitor"),
+        (TRAFFIC_CLASS_SUSPECT, "Suspect"),
+    ]
+    
     # Using experiment_name instead of experiment for clarity, but serves same purpose
     experiment_name = models.CharField(max_length=100, db_index=True, help_text="Experiment identifier, e.g. 'button_label_kudos_vs_thanks'")
     variant = models.CharField(max_length=20, db_index=True, help_text="Variant identifier, e.g. 'kudos' or 'thanks'")
@@ -144,11 +187,44 @@ class ABTestEvent(models.Model):
     )
     endpoint = models.CharField(max_length=200, default='/218b7ae/', help_text="Endpoint path, e.g. '/218b7ae/'")
     session_id = models.CharField(max_length=100, db_index=True, help_text="Cookie-based session identifier")
-    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True, db_index=True)
     user_agent = models.TextField(blank=True)
-    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, help_text="Django User if authenticated")
+    # No database constraint or cascade: events may live in their own database
+    # (core.db_routers.ABTEST); detach_deleted_user() does what SET_NULL would
+    user = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        help_text="Django User if authenticated",
+    )
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # created_at truncated to the minute: sargable bucket for burst detection
+    created_minute = MinuteBucketField(null=True, blank=True, editable=False, db_index=True)
     is_forced = models.BooleanField(default=False, help_text="True if variant was forced via ?force_variant parameter")
+    # Set at ingest by core.traffic; classifier_version=0 means "never scored"
+    traffic_class = models.CharField(
+        max_length=16,
+        choices=TRAFFIC_CLASS_CHOICES,
+        default=TRAFFIC_CLASS_HUMAN,
+        db_index=True,
+        help_text="Ingest-time verdict: human, bot, monitor or suspect",
+    )
+    classifier_version = models.PositiveSmallIntegerField(
+        default=0,
+        db_index=True,
+        help_text="core.traffic.CLASSIFIER_VERSION that produced traffic_class (0 = unclassified)",
+    )
+    # Set by core.bursts.mark_suspect; re-scoring keeps these events suspect
+    burst_flagged = models.BooleanField(
+        default=False,
+        help_text="Part of a traffic burst found by ab_detect_bursts/ab_purge_bots",
+    )
+    # Segment dimensions parsed from user_agent by core.user_agents ('' = not parsed yet)
+    device_class = models.CharField(max_length=16, blank=True, default='', db_index=True)
+    browser_family = models.CharField(max_length=32, blank=True, default='', db_index=True)
+    os_family = models.CharField(max_length=32, blank=True, default='', db_index=True)
     
     class Meta:
         ordering = ['-created_at']
@@ -156,6 +232,7 @@ class ABTestEvent(models.Model):
             models.Index(fields=['experiment_name', 'variant', 'event_type']),
             models.Index(fields=['experiment_name', 'created_at']),
             models.Index(fields=['endpoint', 'event_type']),
+            models.Index(fields=['experiment_name', 'traffic_class', 'event_type', 'variant']),
         ]
         verbose_name = "AB Test Event"
         verbose_name_plural = "AB Test Events"
@@ -163,3 +240,296 @@ class ABTestEvent(models.Model):
     def __str__(self):
         return f"{self.experiment_name} - {self.variant} - {self.event_type} ({self.created_at})"
 
+
+def detach_deleted_user(sender, instance, **kwargs):
+    """post_delete receiver for User: null ABTestEvent.user, wherever the events are stored."""
+    ABTestEvent.objects.filter(user_id=instance.pk).update(user=None)
+
+
+
+class MaintenanceCheckpoint(models.Model):
+    """
+    Resume point for long-running, batched maintenance commands.
+
+    A command that walks a table in id order stores the last id it finished,
+    so a run killed by a timeout (e.g. the admin-tools HTTP endpoints) picks up
+    where it stopped. The row is deleted once the run completes.
+    """
+    name = models.CharField(max_length=100, unique=True, help_text="Command/task name, e.g. 'ab_purge_bots'")
+    last_id = models.BigIntegerField(default=0, help_text="Highest primary key already processed")
+    state = models.JSONField(default=dict, blank=True, help_text="Command-specific resume state")
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} @ id {self.last_id}"
+
+
+class ABHourlyRollup(models.Model):
+    """
+    Pre-aggregated A/B counts per hour and dimension (maintained by core.rollups).
+
+    converting_sessions counts sessions in the hour of their *first* conversion
+    for that (experiment, endpoint, variant, traffic_class, is_forced) cell, so
+    it can be summed across hours like the other counters.
+    """
+    experiment_name = models.CharField(max_length=100)
+    endpoint = models.CharField(max_length=200)
+    variant = models.CharField(max_length=20)
+    traffic_class = models.CharField(max_length=16, choices=ABTestEvent.TRAFFIC_CLASS_CHOICES)
+    is_forced = models.BooleanField(default=False)
+    hour = models.DateTimeField(help_text="Start of the UTC hour")
+    exposures = models.PositiveIntegerField(default=0)
+    conversions = models.PositiveIntegerField(default=0)
+    converting_sessions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['experiment_name', 'hour', 'variant']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['experiment_name', 'endpoint', 'variant', 'traffic_class', 'is_forced', 'hour'],
+                name='unique_ab_hourly_rollup_cell',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['experiment_name', 'hour']),
+            # Admin summary: all experiments over a date range
+            models.Index(fields=['hour', 'endpoint']),
+        ]
+        verbose_name = "AB Hourly Rollup"
+        verbose_name_plural = "AB Hourly Rollups"
+
+    def __str__(self):
+        return f"{self.experiment_name} - {self.variant} @ {self.hour:%Y-%m-%d %H:00}"
+
+
+class ABRollupState(models.Model):
+    """
+    Single-row bookkeeping for ABHourlyRollup.
+
+    high_water_mark is the highest ABTestEvent id already folded into the
+    rollups. version is bumped whenever the rollups are rebuilt (after purges
+    or reclassification), so anything derived from them can tell it is stale.
+    """
+    high_water_mark = models.BigIntegerField(default=0)
+    version = models.PositiveIntegerField(default=1)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    # Stored rather than only observed in memory: refreshes run in run_jobs and
+    # commands, whose metrics registries /metrics never sees
+    last_refresh_seconds = models.FloatField(null=True, blank=True, help_text="Duration of the last refresh")
+
+    class Meta:
+        verbose_name = "AB Rollup State"
+
+    def __str__(self):
+        return f"rollups v{self.version} @ id {self.high_water_mark}"
+
+    @classmethod
+    def load(cls):
+        state, _ = cls.objects.get_or_create(pk=1)
+        return state
+
+
+class ABSequentialState(models.Model):
+    """
+    Running mSPRT state for one analysis configuration (see core.sequential).
+
+    Only completed hours are folded in, so each refresh costs O(new hours).
+    """
+    key = models.CharField(max_length=200, unique=True, help_text="Experiment plus analysis options")
+    rollup_version = models.PositiveIntegerField(default=0)
+    last_hour = models.DateTimeField(null=True, blank=True, help_text="Last completed hour folded in")
+    state = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['key']
+        verbose_name = "AB Sequential Test State"
+
+    def __str__(self):
+        return f"{self.key} @ {self.last_hour}"
+
+
+class ABReportSnapshot(models.Model):
+    """
+    Persisted abtest_report output (see core.reports).
+
+    Keyed by the rollup version and high-water mark it was computed from, so
+    the latest report is served as-is until new events have been folded in.
+    """
+    experiment_name = models.CharField(max_length=100)
+    endpoint = models.CharField(max_length=200)
+    rollup_version = models.PositiveIntegerField()
+    high_water_mark = models.BigIntegerField()
+    data = models.JSONField(default=dict)
+    generated_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-generated_at']
+        indexes = [
+            models.Index(fields=['experiment_name', 'endpoint', 'rollup_version', 'high_water_mark']),
+        ]
+        verbose_name = "AB Report Snapshot"
+        verbose_name_plural = "AB Report Snapshots"
+
+    def __str__(self):
+        return f"{self.experiment_name} {self.endpoint} @ id {self.high_water_mark}"
+
+
+class BackgroundJob(models.Model):
+    """
+    A management command queued from the admin and run by "manage.py run_jobs".
+
+    The web request only inserts a row; a worker claims it, streams the
+    command's output into `output` while it runs (see core.jobs) and records
+    the outcome, so long maintenance commands never hold up a web worker.
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    # The only commands that may be queued from the web (admin and admin-tools):
+    # A/B maintenance and reporting, never flush/shell/migrate and friends
+    ALLOWED_COMMANDS = (
+        "ab_analyze",
+        "ab_analyze_button_label",
+        "ab_backfill_user_agents",
+        "ab_check_traffic_split",
+        "ab_detect_bursts",
+        "ab_purge_bots",
+        "ab_reclassify_traffic",
+        "ab_refresh_rollups",
+        "ab_timeseries",
+        "abtest_report",
+    )
+
+    command = models.CharField(max_length=100, help_text="Management command name, e.g. 'ab_purge_bots'")
+    args = models.JSONField(default=list, blank=True, help_text="Positional arguments")
+    options = models.JSONField(default=dict, blank=True, help_text="Keyword options, e.g. {\"dry_run\": true}")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    output = models.TextField(blank=True, help_text="Combined stdout/stderr, appended while running")
+    error = models.TextField(blank=True, help_text="Traceback if the command raised")
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    worker = models.CharField(max_length=100, blank=True, help_text="host:pid of the worker that ran the job")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True, help_text="Last sign of life from the worker while running",
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.command} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    def clean(self):
+        if self.command not in get_commands() or self.command not in self.ALLOWED_COMMANDS:
+            raise ValidationError(
+                {"command": f"Not available as a background job: {self.command} "
+                            f"(allowed: {', '.join(self.ALLOWED_COMMANDS)})"}
+            )
+        if not isinstance(self.args, list):
+            raise ValidationError({"args": "Must be a JSON list."})
+        if not isinstance(self.options, dict):
+            raise ValidationError({"options": "Must be a JSON object."})
+
+
+class SlowQuery(models.Model):
+    """
+    A SQL statement that ran slower than settings.SLOW_QUERY_MS (see
+    core.slow_queries).
+
+    One row per statement shape: literals and IN-list lengths are normalised
+    away before hashing, so repeats only bump the counters. The EXPLAIN plan
+    is captured the first time and refreshed periodically.
+    """
+    fingerprint = models.CharField(max_length=40, unique=True, help_text="SHA-1 of the normalised SQL")
+    sql = models.TextField(help_text="Latest statement seen with this fingerprint")
+    sample_params = models.TextField(blank=True, help_text="Parameters of the latest occurrence (truncated)")
+    database = models.CharField(max_length=50, default='default')
+    source = models.CharField(max_length=200, blank=True, help_text="View, job or command that ran it last")
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0.0)
+    max_ms = models.FloatField(default=0.0)
+    explain = models.TextField(blank=True)
+    explained_at = models.DateTimeField(null=True, blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-total_ms']
+        verbose_name = "Slow Query"
+        verbose_name_plural = "Slow Queries"
+
+    def __str__(self):
+        return f"{self.sql[:80]} ({self.count}x)"
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+
+class RequestProfile(models.Model):
+    """
+    One request run under a profiler (see core.profiling): on demand by a
+    staff user (?_profile=...) or picked by PROFILE_SAMPLE_RATE.
+
+    cProfile runs keep the marshalled pstats data (a .prof file); sampler
+    runs keep collapsed stacks for flamegraph tools.
+    """
+    MODE_CHOICES = [
+        ('cprofile', 'cProfile'),
+        ('sample', 'Stack sampler'),
+    ]
+    TRIGGER_CHOICES = [
+        ('flag', 'Staff flag'),
+        ('sampled', 'Random sample'),
+    ]
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    query_string = models.CharField(max_length=500, blank=True)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_ms = models.FloatField(help_text="Wall time under the profiler")
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    data = models.BinaryField(null=True, blank=True, help_text="Marshalled pstats data (cProfile runs)")
+    collapsed = models.TextField(blank=True, help_text="Collapsed stacks (sampler runs)")
+    samples = models.PositiveIntegerField(default=0)
+    summary = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Request Profile"
+        verbose_name_plural = "Request Profiles"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.get_mode_display()}, {self.duration_ms:.0f} ms)"
+
+    @property
+    def download_name(self):
+        suffix = "prof" if self.mode == 'cprofile' else "collapsed"
+        return f"profile-{self.pk}.{suffix}"
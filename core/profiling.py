@@ -0,0 +1,191 @@
+"""
+On-demand request profiling (fed by core.middleware.RequestProfilingMiddleware).
+
+A staff user adds ?_profile=1 (or =cprofile) to any URL to run that request
+under cProfile, or ?_profile=sample for the low-overhead stack sampler.
+settings.PROFILE_SAMPLE_RATE additionally profiles that share of all
+requests with PROFILE_SAMPLE_MODE, so production hot spots show up without
+anyone having to reproduce them.
+
+Each run is stored as a RequestProfile (listed in the admin) with:
+
+- cProfile: the marshalled stats, byte-for-byte what Profile.dump_stats()
+  writes, so the download opens in pstats, snakeviz or gprof2dot;
+- sampler: collapsed stacks ("outer;inner;leaf count" per line), the input
+  format of flamegraph.pl, speedscope and inferno;
+- a plain-text top-N summary shown on the admin page.
+
+Only the newest PROFILE_KEEP profiles are kept.
+"""
+
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, router
+
+logger = logging.getLogger("core.profiling")
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+
+DEFAULT_SAMPLE_INTERVAL_MS = 5.0
+DEFAULT_KEEP = 200
+
+SUMMARY_LINES = 30
+
+# Strip the project root from frame names to keep collapsed stacks short
+_ROOT = str(settings.BASE_DIR) + os.sep
+
+
+def _frame_name(code):
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT):]
+    # ';' separates frames and the last space separates the count
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a helper
+    thread and counts identical stacks. The profiled code runs at full speed
+    apart from the GIL hand-off each sample costs.
+    """
+
+    def __init__(self, thread_id=None, interval=DEFAULT_SAMPLE_INTERVAL_MS / 1000.0):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(_frame_name(frame.f_code))
+            frame = frame.f_back
+        if stack:
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Collapsed-stack text, most frequent stack first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit=SUMMARY_LINES):
+        """Functions by samples on top of the stack (self) and anywhere in it (total)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        lines = [f"{self.samples} samples every {self.interval * 1000.0:g} ms", "", f"{'self':>7} {'total':>7}  function"]
+        for name, count in own.most_common(limit):
+            lines.append(f"{count:>7} {total[name]:>7}  {name}")
+        return "\n".join(lines)
+
+
+class _LoadedStats:
+    """Adapter so pstats.Stats can read a stats dict without a file."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def load_stats(data):
+    """pstats.Stats for the marshalled bytes stored by a cProfile run."""
+    return pstats.Stats(_LoadedStats(marshal.loads(bytes(data))))
+
+
+def cprofile_summary(stats, limit=SUMMARY_LINES):
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(limit)
+    return out.getvalue().strip()
+
+
+def profile_call(mode, func, *args):
+    """
+    Run func(*args) under the given profiler.
+
+    Returns (result, elapsed seconds, {"data", "collapsed", "summary", "samples"})
+    with the RequestProfile fields for this run.
+    """
+    if mode == SAMPLE:
+        interval_ms = getattr(settings, "PROFILE_SAMPLE_INTERVAL_MS", DEFAULT_SAMPLE_INTERVAL_MS)
+        sampler = StackSampler(interval=max(interval_ms, 0.1) / 1000.0)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            result = func(*args)
+        finally:
+            sampler.stop()
+        elapsed = time.perf_counter() - started
+        return result, elapsed, {
+            "data": None,
+            "collapsed": sampler.collapsed(),
+            "summary": sampler.summary(),
+            "samples": sampler.samples,
+        }
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        result = func(*args)
+    finally:
+        profiler.disable()
+    elapsed = time.perf_counter() - started
+    profiler.create_stats()
+    data = marshal.dumps(profiler.stats)
+    return result, elapsed, {
+        "data": data,
+        "collapsed": "",
+        "summary": cprofile_summary(load_stats(data)),
+        "samples": 0,
+    }
+
+
+def save_profile(**fields):
+    """Store one run and prune to PROFILE_KEEP; returns the row, or None on a DB error."""
+    from .models import RequestProfile
+
+    using = router.db_for_write(RequestProfile)
+    keep = getattr(settings, "PROFILE_KEEP", DEFAULT_KEEP)
+    try:
+        profile = RequestProfile.objects.using(using).create(**fields)
+        stale = RequestProfile.objects.using(using).order_by("-created_at", "-id").values_list("id", flat=True)[keep:]
+        stale_ids = list(stale)
+        if stale_ids:
+            RequestProfile.objects.using(using).filter(id__in=stale_ids).delete()
+    except DatabaseError as exc:
+        logger.warning("Could not store request profile for %s: %s", fields.get("path"), exc)
+        return None
+    return profile
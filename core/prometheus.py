@@ -0,0 +1,128 @@
+"""
+Prometheus text exposition (format 0.0.4) for the /metrics endpoint.
+
+render() turns a merged core.metrics registry, the per-worker list from
+core.metrics.collect() and a few gauges read from the database at scrape
+time into the plain-text format Prometheus scrapes.
+
+There is no in-memory A/B ingestion buffer (events are written as they
+arrive), so "ingestion backlog" here is the gap between the newest
+ABTestEvent id and the rollup high-water mark - the events that analyses
+served from ABHourlyRollup do not see yet - and "flush latency" is
+ab_rollup_last_refresh_duration_seconds, stored on ABRollupState by
+refresh_rollups() wherever it ran (usually run_jobs or a command, whose
+in-memory ab_rollup_refresh_seconds histogram never reaches a web worker).
+"""
+
+import math
+
+from django.db.models import Max
+
+from .models import ABRollupState, ABTestEvent
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name -> (type, help) for everything render() can emit
+FAMILIES = {
+    "http_requests_total": ("counter", "Requests handled, by view and status code."),
+    "http_request_duration_seconds": ("histogram", "Request wall time, by view and status code."),
+    "http_response_size_bytes": ("histogram", "Response body size, by view."),
+    "db_queries_per_request": ("histogram", "SQL statements per sampled request, by view."),
+    "db_time_seconds": ("histogram", "Time spent in SQL per sampled request, by view."),
+    "db_duplicate_queries_total": ("counter", "Repeated SQL statements within a sampled request, by view."),
+    "cache_requests_total": ("counter", "Cache lookups, by result (hit/miss)."),
+    "ab_rollup_refresh_seconds": ("histogram", "Time to fold new A/B events into the hourly rollups."),
+    "ab_rollup_backlog_events": ("gauge", "A/B event ids above the rollup high-water mark."),
+    "ab_rollup_last_refresh_timestamp_seconds": ("gauge", "Unix time of the last rollup refresh."),
+    "ab_rollup_last_refresh_duration_seconds": ("gauge", "Duration of the last rollup refresh."),
+    "process_resident_memory_bytes": ("gauge", "Resident memory of each live web worker."),
+    "metrics_workers": ("gauge", "Worker snapshots merged into this scrape, by state."),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+class _Exposition:
+    def __init__(self):
+        self.samples = {name: [] for name in FAMILIES}
+
+    def sample(self, name, labels, value):
+        self.samples[name].append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name, labels, hist):
+        labels = list(labels)
+        for bound, count in hist.cumulative():
+            self.samples[name].append(f"{name}_bucket{_labels(labels + [('le', _number(float(bound)))])} {count}")
+        self.samples[name].append(f"{name}_sum{_labels(labels)} {_number(float(hist.sum))}")
+        self.samples[name].append(f"{name}_count{_labels(labels)} {hist.count}")
+
+    def text(self):
+        lines = []
+        for name, (kind, help_text) in FAMILIES.items():
+            if not self.samples[name]:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(self.samples[name])
+        return "\n".join(lines) + "\n"
+
+
+def rollup_gauges():
+    """{gauge name: value} for the A/B ingestion backlog."""
+    state = ABRollupState.objects.filter(pk=1).first()
+    max_id = ABTestEvent.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+    gauges = {"ab_rollup_backlog_events": max(0, max_id - (state.high_water_mark if state else 0))}
+    if state and state.refreshed_at:
+        gauges["ab_rollup_last_refresh_timestamp_seconds"] = state.refreshed_at.timestamp()
+    if state and state.last_refresh_seconds is not None:
+        gauges["ab_rollup_last_refresh_duration_seconds"] = state.last_refresh_seconds
+    return gauges
+
+
+def render(registry, workers=(), gauges=None):
+    """Prometheus text for a (merged) MetricsRegistry."""
+    out = _Exposition()
+    for view, metrics in registry.views():
+        for status, hist in sorted(metrics.statuses.items()):
+            labels = [("view", view), ("status", str(status))]
+            out.sample("http_requests_total", labels, hist.count)
+            out.histogram("http_request_duration_seconds", labels, hist)
+        out.histogram("http_response_size_bytes", [("view", view)], metrics.response_size)
+        if metrics.sampled:
+            out.histogram("db_queries_per_request", [("view", view)], metrics.queries)
+            out.histogram("db_time_seconds", [("view", view)], metrics.db_time)
+            out.sample("db_duplicate_queries_total", [("view", view)], metrics.duplicate_queries)
+
+    for (name, labels), value in registry.counters():
+        if name in FAMILIES:
+            out.sample(name, labels, value)
+    for (name, labels), hist in registry.histograms():
+        if name in FAMILIES:
+            out.histogram(name, labels, hist)
+
+    for name, value in (gauges or {}).items():
+        out.sample(name, [], value)
+
+    live = [worker for worker in workers if worker["alive"]]
+    for worker in live:
+        out.sample("process_resident_memory_bytes", [("pid", worker["pid"])], worker["rss_bytes"])
+    if workers:
+        out.sample("metrics_workers", [("state", "live")], len(live))
+        out.sample("metrics_workers", [("state", "exited")], len(workers) - len(live))
+    return out.text()
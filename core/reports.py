@@ -0,0 +1,108 @@
+"""
+Persisted A/B report snapshots.
+
+get_report() returns the stored ABReportSnapshot for the current (rollup
+version, high-water mark) if there is one, and only computes a new report
+otherwise. The abtest_report command folds new events into the hourly
+rollups first; the admin JSON view serves them as they are (refresh=False). Computing one reads
+the rollups, so even a miss costs O(hours), not O(events).
+
+Reports cover all traffic classes, matching what abtest_report has always
+printed; use ab_analyze for humans-only statistics.
+"""
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ABReportSnapshot
+from .rollups import current_state, refresh_rollups, rollup_queryset
+
+DEFAULT_EXPERIMENT = "button_label_kudos_vs_thanks"
+DEFAULT_ENDPOINT = "/218b7ae/"
+
+# Snapshots kept per (experiment, endpoint); older ones are pruned
+SNAPSHOTS_KEPT = 20
+
+# Below this many exposures in total the report carries a caution
+MIN_TOTAL_EXPOSURES = 30
+
+
+def build_report(experiment_name, endpoint, state):
+    """Compute the report dict from the rollups (no caching)."""
+    rows = (
+        rollup_queryset(experiment_name, include_non_human=True, endpoint=endpoint)
+        .values("variant")
+        .annotate(exposures=Sum("exposures"), conversions=Sum("conversions"))
+        .order_by("variant")
+    )
+    variants = []
+    for row in rows:
+        exposures, conversions = row["exposures"], row["conversions"]
+        variants.append({
+            "variant": row["variant"],
+            "exposures": exposures,
+            "conversions": conversions,
+            # Percent, None when the variant has no exposures
+            "conversion_rate": conversions / exposures * 100 if exposures else None,
+        })
+
+    result = None
+    if len(variants) >= 2:
+        ranked = sorted(variants, key=lambda v: v["conversion_rate"] or 0.0, reverse=True)
+        if (ranked[0]["conversion_rate"] or 0.0) == (ranked[1]["conversion_rate"] or 0.0):
+            result = {"outcome": "tie"}
+        else:
+            result = {"outcome": "winner", "winner": ranked[0]["variant"], "runner_up": ranked[1]["variant"]}
+    elif len(variants) == 1:
+        result = {"outcome": "single_variant", "variant": variants[0]["variant"]}
+
+    total_exposures = sum(v["exposures"] for v in variants)
+    return {
+        "experiment": experiment_name,
+        "endpoint": endpoint,
+        "generated_at": timezone.now().isoformat(),
+        "rollup_version": state.version,
+        "high_water_mark": state.high_water_mark,
+        "total_events": sum(v["exposures"] + v["conversions"] for v in variants),
+        "total_exposures": total_exposures,
+        "sufficient_sample": total_exposures >= MIN_TOTAL_EXPOSURES,
+        "variants": variants,
+        "result": result,
+    }
+
+
+def get_report(experiment_name=DEFAULT_EXPERIMENT, endpoint=DEFAULT_ENDPOINT, refresh=True):
+    """
+    Latest report for an experiment/endpoint, recomputed only after new events.
+
+    Returns (data, from_cache).
+    """
+    state = refresh_rollups() if refresh else current_state()
+    snapshot = (
+        ABReportSnapshot.objects.filter(
+            experiment_name=experiment_name,
+            endpoint=endpoint,
+            rollup_version=state.version,
+            high_water_mark=state.high_water_mark,
+        )
+        .order_by("-generated_at")
+        .first()
+    )
+    if snapshot is not None:
+        return snapshot.data, True
+
+    data = build_report(experiment_name, endpoint, state)
+    ABReportSnapshot.objects.create(
+        experiment_name=experiment_name,
+        endpoint=endpoint,
+        rollup_version=state.version,
+        high_water_mark=state.high_water_mark,
+        data=data,
+    )
+    stale = (
+        ABReportSnapshot.objects.filter(experiment_name=experiment_name, endpoint=endpoint)
+        .order_by("-generated_at", "-id")
+        .values_list("id", flat=True)[SNAPSHOTS_KEPT:]
+    )
+    ABReportSnapshot.objects.filter(id__in=list(stale)).delete()
+    return data, False
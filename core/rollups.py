@@ -0,0 +1,318 @@
+"""
+Incremental hourly rollups of A/B test events.
+
+ABHourlyRollup holds exposures, conversions and first-conversion session counts
+per (experiment, endpoint, variant, traffic_class, is_forced, UTC hour).
+refresh_rollups() folds in only events with an id above the stored high-water
+mark, a bounded id range at a time, so a refresh costs O(new events) and the
+analysis commands read O(hours) rows instead of scanning ABTestEvent.
+
+Anything that rewrites history (purges, burst marking, reclassification)
+collects the (experiment, hour) cells it touches with affected_cells() before
+the change and passes them to invalidate_rollups(), which re-folds just those
+hours and bumps ABRollupState.version so cached results keyed on the old
+version are ignored. invalidate_rollups() with no cells drops everything and
+the next refresh rebuilds from scratch.
+
+Note: the high-water mark assumes ids become visible in order. That holds for
+SQLite, which serialises writers; on Postgres a long-running insert could
+commit a lower id after a refresh, and would be picked up by the next rebuild.
+"""
+
+import datetime
+import time
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .metrics import REGISTRY
+from .models import ABHourlyRollup, ABRollupState, ABTestEvent
+from .traffic import TRAFFIC_CLASS_HUMAN
+
+ROLLUP_DIMENSIONS = ("experiment_name", "endpoint", "variant", "traffic_class", "is_forced")
+
+# Width of the event id range folded in per transaction
+DEFAULT_BATCH_SIZE = 50000
+
+# session_id__in chunk used when checking for earlier conversions
+SESSION_LOOKUP_CHUNK = 500
+
+# Hours OR-ed into one query when re-folding invalidated cells
+HOURS_PER_QUERY = 100
+
+ONE_HOUR = datetime.timedelta(hours=1)
+
+
+def truncate_to_hour(moment):
+    """Start of the UTC hour containing `moment` (matches TruncHour(tzinfo=utc))."""
+    return moment.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _hour():
+    return TruncHour("created_at", tzinfo=datetime.timezone.utc)
+
+
+def _fold_range(low, high):
+    """Aggregate events with low < id <= high and add them to the rollups."""
+    batch = ABTestEvent.objects.filter(id__gt=low, id__lte=high).order_by()
+    cells = defaultdict(lambda: [0, 0, 0])
+
+    grouped = (
+        batch.annotate(hour=_hour())
+        .values(*ROLLUP_DIMENSIONS, "hour")
+        .annotate(
+            exposures=Count("id", filter=Q(event_type=ABTestEvent.EVENT_TYPE_EXPOSURE)),
+            conversions=Count("id", filter=Q(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)),
+        )
+    )
+    for row in grouped:
+        key = tuple(row[d] for d in ROLLUP_DIMENSIONS) + (row["hour"],)
+        cells[key][0] += row["exposures"]
+        cells[key][1] += row["conversions"]
+
+    # First conversion per session: earliest one in this range, unless the
+    # session already converted in a range folded earlier.
+    firsts = defaultdict(dict)
+    converting = (
+        batch.filter(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)
+        .values(*ROLLUP_DIMENSIONS, "session_id")
+        .annotate(first_at=Min("created_at"))
+    )
+    for row in converting:
+        dims = tuple(row[d] for d in ROLLUP_DIMENSIONS)
+        firsts[dims][row["session_id"]] = row["first_at"]
+
+    for dims, sessions in firsts.items():
+        session_ids = list(sessions)
+        for i in range(0, len(session_ids), SESSION_LOOKUP_CHUNK):
+            chunk = session_ids[i:i + SESSION_LOOKUP_CHUNK]
+            seen = set(
+                ABTestEvent.objects.filter(
+                    id__lte=low,
+                    event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+                    session_id__in=chunk,
+                    **dict(zip(ROLLUP_DIMENSIONS, dims)),
+                ).values_list("session_id", flat=True).distinct()
+            )
+            for session_id in chunk:
+                if session_id not in seen:
+                    cells[dims + (truncate_to_hour(sessions[session_id]),)][2] += 1
+
+    for key, (exposures, conversions, converting_sessions) in cells.items():
+        fields = dict(zip(ROLLUP_DIMENSIONS + ("hour",), key))
+        updated = ABHourlyRollup.objects.filter(**fields).update(
+            exposures=F("exposures") + exposures,
+            conversions=F("conversions") + conversions,
+            converting_sessions=F("converting_sessions") + converting_sessions,
+        )
+        if not updated:
+            ABHourlyRollup.objects.create(
+                exposures=exposures,
+                conversions=conversions,
+                converting_sessions=converting_sessions,
+                **fields,
+            )
+
+
+def refresh_rollups(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Fold events above the high-water mark into ABHourlyRollup.
+
+    Each id range is committed together with the new high-water mark, so an
+    interrupted refresh resumes cleanly. Returns the ABRollupState.
+    """
+    started = time.perf_counter()
+    max_id = ABTestEvent.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+
+    while True:
+        with transaction.atomic(using=router.db_for_write(ABRollupState)):
+            state = ABRollupState.objects.select_for_update().filter(pk=1).first()
+            if state is None:
+                state = ABRollupState.objects.create(pk=1)
+            low = state.high_water_mark
+            if low >= max_id:
+                break
+
+            # Skip id gaps left by purges with one index seek
+            next_id = (
+                ABTestEvent.objects.filter(id__gt=low, id__lte=max_id)
+                .order_by("id").values_list("id", flat=True).first()
+            )
+            high = max_id if next_id is None else min(next_id - 1 + batch_size, max_id)
+            if next_id is not None:
+                _fold_range(low, high)
+
+            state.high_water_mark = high
+            state.save(update_fields=["high_water_mark"])
+
+    # "As of" time for anything rendered from the rollups
+    elapsed = time.perf_counter() - started
+    state.refreshed_at = timezone.now()
+    state.last_refresh_seconds = elapsed
+    state.save(update_fields=["refreshed_at", "last_refresh_seconds"])
+    REGISTRY.observe("ab_rollup_refresh_seconds", elapsed)
+    return state
+
+
+def affected_cells(events):
+    """
+    (experiment_name, hour) rollup cells that change if `events` (a queryset)
+    are deleted or re-labelled; call it before making the change.
+
+    Includes later hours in which their converting sessions convert again,
+    since a session's first conversion can move there.
+    """
+    events = events.order_by()
+    cells = set(events.annotate(hour=_hour()).values_list("experiment_name", "hour").distinct())
+
+    sessions = defaultdict(set)
+    converting = (
+        events.filter(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)
+        .values_list("experiment_name", "session_id").distinct()
+    )
+    for experiment_name, session_id in converting:
+        sessions[experiment_name].add(session_id)
+    for experiment_name, session_ids in sessions.items():
+        session_ids = list(session_ids)
+        for i in range(0, len(session_ids), SESSION_LOOKUP_CHUNK):
+            cells.update(
+                ABTestEvent.objects.filter(
+                    experiment_name=experiment_name,
+                    event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+                    session_id__in=session_ids[i:i + SESSION_LOOKUP_CHUNK],
+                )
+                .order_by()
+                .annotate(hour=_hour())
+                .values_list("experiment_name", "hour").distinct()
+            )
+    return cells
+
+
+def _refold_hours(experiment_name, hours, high_water_mark):
+    """Recompute one experiment's rollups for `hours` from events up to the high-water mark."""
+    for i in range(0, len(hours), HOURS_PER_QUERY):
+        chunk = hours[i:i + HOURS_PER_QUERY]
+        in_chunk = Q()
+        for hour in chunk:
+            in_chunk |= Q(created_at__gte=hour, created_at__lt=hour + ONE_HOUR)
+        batch = ABTestEvent.objects.filter(
+            in_chunk, experiment_name=experiment_name, id__lte=high_water_mark,
+        ).order_by()
+        cells = defaultdict(lambda: [0, 0, 0])
+
+        grouped = (
+            batch.annotate(hour=_hour())
+            .values(*ROLLUP_DIMENSIONS, "hour")
+            .annotate(
+                exposures=Count("id", filter=Q(event_type=ABTestEvent.EVENT_TYPE_EXPOSURE)),
+                conversions=Count("id", filter=Q(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)),
+            )
+        )
+        for row in grouped:
+            key = tuple(row[d] for d in ROLLUP_DIMENSIONS) + (row["hour"],)
+            cells[key][0] += row["exposures"]
+            cells[key][1] += row["conversions"]
+
+        # A session counts in the hour of its earliest folded conversion, which
+        # may lie outside these hours
+        sessions = defaultdict(list)
+        converting = (
+            batch.filter(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)
+            .values_list(*ROLLUP_DIMENSIONS, "session_id").distinct()
+        )
+        for row in converting:
+            sessions[row[:-1]].append(row[-1])
+        hour_set = set(chunk)
+        for dims, session_ids in sessions.items():
+            for j in range(0, len(session_ids), SESSION_LOOKUP_CHUNK):
+                firsts = (
+                    ABTestEvent.objects.filter(
+                        id__lte=high_water_mark,
+                        event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+                        session_id__in=session_ids[j:j + SESSION_LOOKUP_CHUNK],
+                        **dict(zip(ROLLUP_DIMENSIONS, dims)),
+                    )
+                    .values("session_id").annotate(first_at=Min("created_at"))
+                    .order_by().values_list("first_at", flat=True)
+                )
+                for first_at in firsts:
+                    hour = truncate_to_hour(first_at)
+                    if hour in hour_set:
+                        cells[dims + (hour,)][2] += 1
+
+        ABHourlyRollup.objects.filter(experiment_name=experiment_name, hour__in=chunk).delete()
+        ABHourlyRollup.objects.bulk_create([
+            ABHourlyRollup(
+                exposures=exposures,
+                conversions=conversions,
+                converting_sessions=converting_sessions,
+                **dict(zip(ROLLUP_DIMENSIONS + ("hour",), key)),
+            )
+            for key, (exposures, conversions, converting_sessions) in cells.items()
+        ])
+
+
+def current_state():
+    """The stored ABRollupState, read without writing (an unsaved blank one before the first refresh)."""
+    return ABRollupState.objects.filter(pk=1).first() or ABRollupState(pk=1)
+
+
+def rollups_behind(state):
+    """True when events above the high-water mark are still waiting to be folded in."""
+    max_id = ABTestEvent.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+    return max_id > state.high_water_mark
+
+
+def invalidate_rollups(cells=None):
+    """
+    Bring the rollups back in line after history changed and bump the version.
+
+    cells are (experiment_name, hour) pairs from affected_cells(); only those
+    hours are re-folded. With no cells every rollup is dropped and the
+    high-water mark reset, so the next refresh rebuilds them all.
+    """
+    with transaction.atomic(using=router.db_for_write(ABRollupState)):
+        state = ABRollupState.objects.select_for_update().filter(pk=1).first()
+        if state is None:
+            state = ABRollupState(pk=1, version=0)
+        if cells is None:
+            ABHourlyRollup.objects.all().delete()
+            state.high_water_mark = 0
+        else:
+            hours = defaultdict(set)
+            for experiment_name, hour in cells:
+                hours[experiment_name].add(hour)
+            for experiment_name, experiment_hours in hours.items():
+                _refold_hours(experiment_name, sorted(experiment_hours), state.high_water_mark)
+        state.version += 1
+        state.save()
+    return state
+
+
+def rollup_queryset(experiment_name, include_non_human=False, exclude_forced=False, endpoint=None):
+    """Rollup rows for an experiment, filtered the same way as the raw-event analyses."""
+    qs = ABHourlyRollup.objects.filter(experiment_name=experiment_name)
+    if not include_non_human:
+        qs = qs.filter(traffic_class=TRAFFIC_CLASS_HUMAN)
+    if exclude_forced:
+        qs = qs.filter(is_forced=False)
+    if endpoint:
+        qs = qs.filter(endpoint=endpoint)
+    return qs
+
+
+def hourly_variant_counts(queryset):
+    """[(hour, variant, exposures, conversions, converting_sessions)] in hour order."""
+    return list(
+        queryset.values("hour", "variant")
+        .annotate(
+            exposures=Sum("exposures"),
+            conversions=Sum("conversions"),
+            converting_sessions=Sum("converting_sessions"),
+        )
+        .order_by("hour", "variant")
+        .values_list("hour", "variant", "exposures", "conversions", "converting_sessions")
+    )
@@ -0,0 +1,141 @@
+"""
+Always-valid sequential analysis of A/B experiments from hourly rollups.
+
+A fixed-horizon z-test is only valid if you look once; checking it every day
+inflates false positives. The mixture SPRT (core.stats.msprt_looks) gives a
+p-value and confidence sequence that stay valid however often you look.
+
+Each completed UTC hour is one "look". ABSequentialState stores the cumulative
+counts and the running p-value / interval after the last completed hour, so a
+refresh only reads rollup rows for hours after that (O(new hours)). The
+current, still-filling hour is evaluated provisionally and never persisted.
+If the rollups are rebuilt (version bump), the state is recomputed from scratch.
+"""
+
+from collections import namedtuple
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+from django.utils import timezone
+
+from .models import ABRollupState, ABSequentialState
+from .rollups import hourly_variant_counts, refresh_rollups, rollup_queryset, truncate_to_hour
+from .stats import msprt_looks
+
+# Prior scale of the true difference in conversion rate (mixing distribution)
+DEFAULT_TAU = 0.02
+
+SequentialResult = namedtuple(
+    "SequentialResult",
+    [
+        "variant_a", "variant_b",
+        "exposures_a", "conversions_a", "exposures_b", "conversions_b",
+        "diff",
+        "p_value",               # always-valid (running minimum)
+        "ci_lower", "ci_upper",  # confidence sequence (running intersection)
+        "looks",                 # completed hours evaluated
+        "last_hour",             # last completed hour folded into the state
+        "rollups_as_of",
+    ],
+)
+
+
+def state_key(experiment_name, include_non_human, exclude_forced, confidence_level, tau):
+    return (
+        f"{experiment_name}|non_human={int(include_non_human)}|exclude_forced={int(exclude_forced)}"
+        f"|confidence={confidence_level:g}|tau={tau:g}"
+    )
+
+
+def _fold(state, rows, confidence_level, tau):
+    """Return a new state with hourly rows (in hour order) folded in, one look per hour."""
+    counts = {variant: list(cell) for variant, cell in state.get("counts", {}).items()}
+    looks = []
+    for _hour, group in groupby(rows, key=itemgetter(0)):
+        for _, variant, exposures, conversions, _sessions in group:
+            cell = counts.setdefault(variant, [0, 0])
+            cell[0] += exposures
+            cell[1] += conversions
+        if len(counts) == 2:
+            variant_a, variant_b = sorted(counts)
+            looks.append((counts[variant_a][1], counts[variant_a][0],
+                          counts[variant_b][1], counts[variant_b][0]))
+
+    p_value = state.get("p_value", 1.0)
+    ci_lower = state.get("ci_lower")
+    ci_upper = state.get("ci_upper")
+    if looks:
+        result = msprt_looks(*np.array(looks, dtype=float).T, tau=tau, confidence_level=confidence_level)
+        p_value = min(p_value, float(result.p_value.min()))
+        lower, upper = float(result.ci_lower.max()), float(result.ci_upper.min())
+        if np.isfinite(lower):
+            ci_lower = lower if ci_lower is None else max(ci_lower, lower)
+        if np.isfinite(upper):
+            ci_upper = upper if ci_upper is None else min(ci_upper, upper)
+
+    return {
+        "counts": counts,
+        "p_value": p_value,
+        "ci_lower": ci_lower,
+        "ci_upper": ci_upper,
+        "looks": state.get("looks", 0) + len(looks),
+    }
+
+
+def sequential_analysis(experiment_name, include_non_human=False, exclude_forced=False,
+                        confidence_level=0.95, tau=DEFAULT_TAU, now=None, refresh=True):
+    """
+    Update the stored mSPRT state with newly completed hours and return a SequentialResult.
+
+    Raises ValueError unless the experiment has exactly two variants.
+    """
+    rollup_state = refresh_rollups() if refresh else ABRollupState.load()
+    current_hour = truncate_to_hour(now or timezone.now())
+
+    row, _ = ABSequentialState.objects.get_or_create(
+        key=state_key(experiment_name, include_non_human, exclude_forced, confidence_level, tau)
+    )
+    if row.rollup_version != rollup_state.version:
+        row.rollup_version = rollup_state.version
+        row.last_hour = None
+        row.state = {}
+
+    qs = rollup_queryset(experiment_name, include_non_human=include_non_human, exclude_forced=exclude_forced)
+    if row.last_hour is not None:
+        qs = qs.filter(hour__gt=row.last_hour)
+    rows = hourly_variant_counts(qs)
+    complete = [r for r in rows if r[0] < current_hour]
+    partial = [r for r in rows if r[0] >= current_hour]
+
+    if complete:
+        row.state = _fold(row.state, complete, confidence_level, tau)
+        row.last_hour = complete[-1][0]
+    row.save()
+
+    # The current hour counts towards the numbers shown, but only as a provisional look
+    state = _fold(row.state, partial, confidence_level, tau)
+    counts = state["counts"]
+    if len(counts) != 2:
+        raise ValueError(
+            f"Expected exactly 2 variants, found {len(counts)}. Cannot perform sequential analysis."
+        )
+
+    variant_a, variant_b = sorted(counts)
+    (n_a, c_a), (n_b, c_b) = counts[variant_a], counts[variant_b]
+    diff = (c_b / n_b if n_b else float("nan")) - (c_a / n_a if n_a else float("nan"))
+    return SequentialResult(
+        variant_a=variant_a,
+        variant_b=variant_b,
+        exposures_a=n_a,
+        conversions_a=c_a,
+        exposures_b=n_b,
+        conversions_b=c_b,
+        diff=diff,
+        p_value=state["p_value"],
+        ci_lower=state["ci_lower"],
+        ci_upper=state["ci_upper"],
+        looks=state["looks"],
+        last_hour=row.last_hour,
+        rollups_as_of=rollup_state.refreshed_at,
+    )
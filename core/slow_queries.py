@@ -0,0 +1,280 @@
+"""
+Slow-query log with automatic EXPLAIN capture.
+
+install() (called from CoreConfig.ready via connection_created) adds an
+execute_wrapper to every database connection, so views, management commands
+and background jobs are all covered. A statement that takes longer than
+settings.SLOW_QUERY_MS is buffered in memory by record() and stored in
+SlowQuery by flush(), which a per-process daemon thread runs every
+SLOW_QUERY_FLUSH_SECONDS (run_jobs also flushes after each job), so the
+slow request itself never writes:
+
+- deduplicated by fingerprint: the SQL with string/number literals and
+  IN-list lengths normalised away, so "id IN (1, 2)" and "id IN (3)" are
+  the same entry and only bump count/total_ms/max_ms;
+- with the caller (view name, job or management command) - see set_source();
+- with an EXPLAIN plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN (FORMAT JSON)
+  on PostgreSQL) taken the first time and again after EXPLAIN_REFRESH.
+  EXPLAIN without ANALYZE never executes the statement.
+
+Only successful single statements (not executemany) are considered.
+Observations still buffered when a process exits are lost; flush() logs
+and skips database errors rather than raising them.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger("core.slow_queries")
+
+DEFAULT_SLOW_QUERY_MS = 200.0
+
+DEFAULT_FLUSH_SECONDS = 30.0
+
+# Distinct fingerprints buffered between flushes; new ones beyond this are dropped
+MAX_PENDING = 500
+
+EXPLAIN_REFRESH = timedelta(hours=6)
+
+SAMPLE_PARAMS_CHARS = 2000
+
+# Statements worth an EXPLAIN (and worth logging at all)
+EXPLAINABLE = ("select", "with", "update", "delete")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Set while recording, so our own EXPLAIN/INSERT are not timed
+_capturing = ContextVar("slow_query_capturing", default=False)
+# Caller description, or a callable returning one (evaluated only when slow)
+_source = ContextVar("slow_query_source", default=None)
+
+# fingerprint -> aggregated observations since the last flush()
+_pending = {}
+_pending_lock = threading.Lock()
+_dropped = 0
+_flusher = None
+
+
+def normalize(sql):
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()
+
+
+def set_source(source):
+    """Describe the current caller; returns a token for reset_source()."""
+    return _source.set(source)
+
+
+def reset_source(token):
+    _source.reset(token)
+
+
+def current_source():
+    source = _source.get()
+    if callable(source):
+        source = source()
+    if source:
+        return str(source)[:200]
+    if len(sys.argv) > 1 and sys.argv[0].endswith("manage.py"):
+        return f"command:{sys.argv[1]}"
+    return ""
+
+
+def _format_sqlite_plan(rows):
+    """EXPLAIN QUERY PLAN rows (id, parent, notused, detail) as an indented tree."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def explain(connection, sql, params):
+    """The database's plan for `sql` as text."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return _format_sqlite_plan(cursor.fetchall())
+        if connection.vendor == "postgresql":
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            return json.dumps(json.loads(plan) if isinstance(plan, str) else plan, indent=2)
+        cursor.execute(f"EXPLAIN {sql}", params)
+        return "\n".join(" | ".join(str(col) for col in row) for row in cursor.fetchall())
+
+
+def is_full_scan(plan):
+    """
+    True if a captured plan walks a whole table: a SQLite SCAN step (even one
+    "USING INDEX", which only avoids a sort) or a PostgreSQL Seq Scan.
+    """
+    for line in plan.splitlines():
+        line = line.strip()
+        if line.startswith("SCAN ") and line != "SCAN CONSTANT ROW":
+            return True
+    return '"Node Type": "Seq Scan"' in plan
+
+
+def record(connection, sql, params, duration_ms):
+    """
+    Buffer one slow execution (called by SlowQueryWatcher).
+
+    Nothing is written here: the caller is already waiting on a slow
+    database, and on SQLite a write would queue behind (and then hold) the
+    global write lock. flush() stores the buffered observations.
+    """
+    global _dropped
+
+    key = fingerprint(sql)
+    source = current_source()
+    with _pending_lock:
+        entry = _pending.get(key)
+        if entry is None:
+            if len(_pending) >= MAX_PENDING:
+                _dropped += 1
+                return
+            entry = _pending[key] = {"database": connection.alias, "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["sql"] = sql
+        entry["params"] = tuple(params) if isinstance(params, list) else params
+        entry["source"] = source
+        entry["last_seen"] = timezone.now()
+        entry["count"] += 1
+        entry["total_ms"] += duration_ms
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+    _start_flusher()
+
+
+def flush():
+    """
+    Store the buffered observations in SlowQuery and EXPLAIN new or stale
+    fingerprints. Returns the number of fingerprints written.
+
+    Runs on the flusher thread, after each job in run_jobs, or directly.
+    Database errors are logged per fingerprint and never raised.
+    """
+    from .models import SlowQuery
+
+    global _pending, _dropped
+
+    with _pending_lock:
+        pending, _pending = _pending, {}
+        dropped, _dropped = _dropped, 0
+    if dropped:
+        logger.warning("Slow-query buffer full: dropped %d new statement(s)", dropped)
+
+    token = _capturing.set(True)
+    written = 0
+    try:
+        using = router.db_for_write(SlowQuery)
+        for key, entry in pending.items():
+            sql = entry["sql"]
+            try:
+                with transaction.atomic(using=using):
+                    # get_or_create retries the lookup if another process inserted the fingerprint first
+                    row, _ = SlowQuery.objects.using(using).get_or_create(
+                        fingerprint=key,
+                        defaults={"sql": sql, "database": entry["database"], "last_seen": entry["last_seen"]},
+                    )
+                    SlowQuery.objects.using(using).filter(pk=row.pk).update(
+                        sql=sql,
+                        sample_params=repr(entry["params"])[:SAMPLE_PARAMS_CHARS],
+                        source=entry["source"],
+                        count=F("count") + entry["count"],
+                        total_ms=F("total_ms") + entry["total_ms"],
+                        max_ms=Greatest("max_ms", Value(entry["max_ms"])),
+                        last_seen=entry["last_seen"],
+                    )
+                written += 1
+
+                now = timezone.now()
+                if row.explained_at is None or row.explained_at < now - EXPLAIN_REFRESH:
+                    target = connections[entry["database"]]
+                    with transaction.atomic(using=target.alias):
+                        plan = explain(target, sql, entry["params"])
+                    SlowQuery.objects.using(using).filter(pk=row.pk).update(explain=plan, explained_at=now)
+            except DatabaseError as exc:
+                logger.warning("Could not record slow query (%s): %s", exc, sql[:200])
+    finally:
+        _capturing.reset(token)
+    return written
+
+
+def _flush_forever(interval):
+    while True:
+        time.sleep(interval)
+        if flush():
+            # This thread's own connections
+            connections.close_all()
+
+
+def _start_flusher():
+    """Start this process's flusher thread (once, and again after a fork)."""
+    global _flusher
+
+    if _flusher is not None and _flusher.is_alive():
+        return
+    interval = getattr(settings, "SLOW_QUERY_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS)
+    if interval <= 0:
+        return
+    with _pending_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(
+                target=_flush_forever, args=(interval,), name="slow-query-flusher", daemon=True,
+            )
+            _flusher.start()
+
+
+class SlowQueryWatcher:
+    """execute_wrapper that hands statements slower than SLOW_QUERY_MS to record()."""
+
+    def __call__(self, execute, sql, params, many, context):
+        if _capturing.get():
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000.0
+
+        threshold = getattr(settings, "SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS)
+        if (
+            threshold > 0
+            and duration_ms >= threshold
+            and not many
+            and sql.lstrip()[:6].lower().startswith(EXPLAINABLE)
+            and not context["connection"].needs_rollback
+        ):
+            record(context["connection"], sql, params, duration_ms)
+        return result
+
+
+WATCHER = SlowQueryWatcher()
+
+
+def install(sender=None, connection=None, **kwargs):
+    """connection_created receiver: add the watcher once per connection wrapper."""
+    # First in the list: execute_wrapper() context managers pop from the end,
+    # and a connection opened inside one must not pop the watcher instead
+    if WATCHER not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, WATCHER)
@@ -0,0 +1,543 @@
+"""
+Shared statistics engine for A/B test analysis.
+
+Every function accepts scalars or NumPy arrays and broadcasts, so one call can
+evaluate hundreds of (experiment, variant, segment, day) cells at once:
+
+    counts = np.array([[120, 1000, 150, 1000], [30, 400, 41, 410]])
+    result = two_proportion_ztest(*counts.T)
+    result.p_value  # -> array of two p-values
+
+Cells with no exposures (or zero variance) come back as NaN rather than raising.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Acklam's rational approximation of the inverse normal CDF
+# (relative error < 1.15e-9 over the whole open interval (0, 1)).
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00)
+_PPF_LOW = 0.02425
+
+# math.erfc applied elementwise: exact to double precision, including far in
+# the tails where tiny p-values come from
+_erfc = np.vectorize(math.erfc, otypes=[float])
+
+ProportionTest = namedtuple(
+    "ProportionTest",
+    [
+        "p_a", "p_b",          # conversion rates
+        "diff",                # p_b - p_a
+        "relative_lift",       # (p_b - p_a) / p_a
+        "z_score",             # pooled two-proportion z statistic
+        "p_value",             # two-sided
+        "ci_lower", "ci_upper",  # unpooled (Wald) CI for diff
+        "cohens_h",            # effect size
+    ],
+)
+
+
+def _polyval(coeffs, x):
+    """Horner evaluation, highest-order coefficient first."""
+    result = np.zeros_like(x) + coeffs[0]
+    for c in coeffs[1:]:
+        result = result * x + c
+    return result
+
+
+def erfc(x):
+    """Complementary error function, vectorized."""
+    out = _erfc(np.asarray(x, dtype=float))
+    return out[()] if out.ndim == 0 else out
+
+
+def norm_cdf(x):
+    """Standard normal CDF."""
+    return 0.5 * erfc(-np.asarray(x, dtype=float) / np.sqrt(2.0))
+
+
+def norm_sf(x):
+    """Standard normal survival function 1 - CDF, accurate in the upper tail."""
+    return 0.5 * erfc(np.asarray(x, dtype=float) / np.sqrt(2.0))
+
+
+def norm_ppf(p):
+    """
+    Inverse standard normal CDF (quantile function), vectorized.
+
+    Returns -inf/inf at 0/1 and NaN outside [0, 1].
+    """
+    p = np.asarray(p, dtype=float)
+    out = np.full(p.shape, np.nan)
+
+    lower = (p > 0) & (p < _PPF_LOW)
+    upper = (p > 1 - _PPF_LOW) & (p < 1)
+    central = (p >= _PPF_LOW) & (p <= 1 - _PPF_LOW)
+
+    if np.any(lower):
+        q = np.sqrt(-2 * np.log(p[lower]))
+        out[lower] = _polyval(_PPF_C, q) / (_polyval(_PPF_D, q) * q + 1)
+    if np.any(upper):
+        q = np.sqrt(-2 * np.log1p(-p[upper]))
+        out[upper] = -_polyval(_PPF_C, q) / (_polyval(_PPF_D, q) * q + 1)
+    if np.any(central):
+        q = p[central] - 0.5
+        r = q * q
+        out[central] = _polyval(_PPF_A, r) * q / (_polyval(_PPF_B, r) * r + 1)
+
+    out[p == 0] = -np.inf
+    out[p == 1] = np.inf
+    return out[()] if out.ndim == 0 else out
+
+
+def z_critical(confidence_level):
+    """Two-sided critical value, e.g. 0.95 -> 1.95996."""
+    return norm_ppf((1 + np.asarray(confidence_level, dtype=float)) / 2)
+
+
+def cohens_h(p_a, p_b):
+    """Cohen's h effect size for two proportions (b relative to a)."""
+    p_a = np.clip(np.asarray(p_a, dtype=float), 0, 1)
+    p_b = np.clip(np.asarray(p_b, dtype=float), 0, 1)
+    return 2 * (np.arcsin(np.sqrt(p_b)) - np.arcsin(np.sqrt(p_a)))
+
+
+def describe_effect_size(h):
+    """Conventional label for |h|: negligible, small, medium or large."""
+    abs_h = abs(float(h))
+    if abs_h < 0.2:
+        return "negligible"
+    if abs_h < 0.5:
+        return "small"
+    if abs_h < 0.8:
+        return "medium"
+    return "large"
+
+
+def _safe_divide(num, den):
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den != 0, num / np.where(den != 0, den, 1), np.nan)
+
+
+def two_proportion_ztest(conversions_a, exposures_a, conversions_b, exposures_b,
+                         confidence_level=0.95):
+    """
+    Two-proportion z-test of B against A over arrays of cells.
+
+    The z statistic uses the pooled standard error (the null hypothesis), the
+    confidence interval for p_b - p_a uses the unpooled one. Returns a
+    ProportionTest of arrays (or floats for scalar input).
+    """
+    c_a = np.asarray(conversions_a, dtype=float)
+    n_a = np.asarray(exposures_a, dtype=float)
+    c_b = np.asarray(conversions_b, dtype=float)
+    n_b = np.asarray(exposures_b, dtype=float)
+
+    p_a = _safe_divide(c_a, n_a)
+    p_b = _safe_divide(c_b, n_b)
+    diff = p_b - p_a
+
+    p_pooled = _safe_divide(c_a + c_b, n_a + n_b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        se_pooled = np.sqrt(p_pooled * (1 - p_pooled) * (1 / n_a + 1 / n_b))
+        se_diff = np.sqrt(p_a * (1 - p_a) / n_a + p_b * (1 - p_b) / n_b)
+
+    z_score = _safe_divide(diff, se_pooled)
+    p_value = 2 * norm_sf(np.abs(z_score))
+
+    margin = z_critical(confidence_level) * se_diff
+    result = ProportionTest(
+        p_a=p_a,
+        p_b=p_b,
+        diff=diff,
+        relative_lift=_safe_divide(diff, p_a),
+        z_score=z_score,
+        p_value=p_value,
+        ci_lower=diff - margin,
+        ci_upper=diff + margin,
+        cohens_h=cohens_h(p_a, p_b),
+    )
+    if np.ndim(result.diff) == 0:
+        return ProportionTest(*(float(v) for v in result))
+    return result
+
+
+# ----------------------------------------------------------------------------
+# Bootstrap confidence intervals
+# ----------------------------------------------------------------------------
+
+BootstrapInterval = namedtuple("BootstrapInterval", ["estimate", "percentile", "bca"])
+
+# Upper bound on the (iterations x distinct outcome values) block drawn at once
+DEFAULT_BOOTSTRAP_CHUNK_BYTES = 32 * 1024 * 1024
+
+
+def value_counts(outcomes):
+    """Collapse per-session outcomes into (distinct values, frequencies)."""
+    values, counts = np.unique(np.asarray(outcomes, dtype=float), return_counts=True)
+    return values, counts
+
+
+def _bootstrap_means(values, counts, size, rng):
+    """
+    Means of `size` bootstrap resamples of the sessions behind (values, counts).
+
+    Resampling n sessions with replacement is a multinomial draw over the
+    distinct outcome values, so each iteration costs O(distinct values)
+    rather than O(sessions) and the whole chunk is one array operation.
+    """
+    n = int(counts.sum())
+    draws = rng.multinomial(n, counts / n, size=size)
+    return draws @ values / n
+
+
+def _bootstrap_chunk(task):
+    """Worker entry point (module-level so it pickles for the process pool)."""
+    values_a, counts_a, values_b, counts_b, size, seed = task
+    rng = np.random.default_rng(seed)
+    mean_a = _bootstrap_means(values_a, counts_a, size, rng)
+    mean_b = _bootstrap_means(values_b, counts_b, size, rng)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift = np.where(mean_a > 0, mean_b / np.where(mean_a > 0, mean_a, 1) - 1, np.nan)
+    return mean_b - mean_a, lift
+
+
+def _jackknife_acceleration(groups):
+    """
+    BCa acceleration from leave-one-out estimates over several samples.
+
+    `groups` is a list of (leave-one-out estimates per distinct value,
+    frequency of that value, sample size); sums are frequency-weighted so
+    the jackknife never materialises one row per session.
+    """
+    num = 0.0
+    den = 0.0
+    for theta_loo, freq, n in groups:
+        theta_dot = np.sum(freq * theta_loo) / n
+        u = (n - 1) * (theta_dot - theta_loo)
+        num += np.sum(freq * u ** 3) / n ** 3
+        den += np.sum(freq * u ** 2) / n ** 2
+    if den <= 0:
+        return 0.0
+    return num / (6.0 * den ** 1.5)
+
+
+def _intervals(boot, observed, acceleration, confidence_level):
+    """Percentile and BCa intervals from a vector of bootstrap statistics."""
+    boot = boot[np.isfinite(boot)]
+    alpha = (1 - confidence_level) / 2
+    if boot.size == 0 or not np.isfinite(observed):
+        nan_pair = (float("nan"), float("nan"))
+        return BootstrapInterval(float(observed), nan_pair, nan_pair)
+
+    percentile = tuple(float(q) for q in np.quantile(boot, [alpha, 1 - alpha]))
+
+    # Bias correction: how far the bootstrap median sits from the estimate
+    frac_below = (np.sum(boot < observed) + 0.5 * np.sum(boot == observed)) / boot.size
+    frac_below = np.clip(frac_below, 1.0 / (boot.size + 1), boot.size / (boot.size + 1.0))
+    z0 = norm_ppf(frac_below)
+    z = norm_ppf(np.array([alpha, 1 - alpha]))
+    adjusted = norm_cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+    bca = tuple(float(q) for q in np.quantile(boot, np.clip(adjusted, 0, 1)))
+
+    return BootstrapInterval(float(observed), percentile, bca)
+
+
+def bootstrap_rate_difference(outcomes_a, outcomes_b, iterations=10000, confidence_level=0.95,
+                              seed=0, workers=1, max_chunk_bytes=DEFAULT_BOOTSTRAP_CHUNK_BYTES):
+    """
+    Bootstrap CIs for the difference and relative lift of mean outcome per session.
+
+    outcomes_a / outcomes_b are per-session values (e.g. conversions per exposed
+    session, zeros included) or already-collapsed (values, counts) pairs.
+    Iterations are split into at least `workers` chunks, none larger than
+    max_chunk_bytes; chunks run on a process pool when workers > 1. Each chunk
+    gets its own child seed, so results are reproducible for a given `seed`
+    and number of workers.
+
+    Returns {"diff": BootstrapInterval, "lift": BootstrapInterval, "iterations": n}.
+    """
+    values_a, counts_a = outcomes_a if isinstance(outcomes_a, tuple) else value_counts(outcomes_a)
+    values_b, counts_b = outcomes_b if isinstance(outcomes_b, tuple) else value_counts(outcomes_b)
+    values_a, counts_a = np.asarray(values_a, dtype=float), np.asarray(counts_a, dtype=float)
+    values_b, counts_b = np.asarray(values_b, dtype=float), np.asarray(counts_b, dtype=float)
+    n_a, n_b = counts_a.sum(), counts_b.sum()
+    if n_a < 2 or n_b < 2:
+        raise ValueError("Each variant needs at least two sessions to bootstrap.")
+
+    sum_a, sum_b = values_a @ counts_a, values_b @ counts_b
+    mean_a, mean_b = sum_a / n_a, sum_b / n_b
+    observed_diff = mean_b - mean_a
+    observed_lift = mean_b / mean_a - 1 if mean_a > 0 else float("nan")
+
+    # Chunking: one chunk per worker, split further if the widest array drawn
+    # per chunk (size x distinct values) would exceed max_chunk_bytes
+    widest = max(values_a.size, values_b.size)
+    per_worker = math.ceil(iterations / max(1, workers or 1))
+    chunk = max(1, min(per_worker, int(max_chunk_bytes // (8 * widest))))
+    sizes = [min(chunk, iterations - start) for start in range(0, iterations, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(values_a, counts_a, values_b, counts_b, size, s) for size, s in zip(sizes, seeds)]
+
+    if workers and workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            parts = list(pool.map(_bootstrap_chunk, tasks))
+    else:
+        parts = [_bootstrap_chunk(task) for task in tasks]
+
+    boot_diff = np.concatenate([p[0] for p in parts])
+    boot_lift = np.concatenate([p[1] for p in parts])
+
+    # Jackknife (leave one session out) per distinct value, for the BCa acceleration
+    loo_a = (sum_a - values_a) / (n_a - 1)
+    loo_b = (sum_b - values_b) / (n_b - 1)
+    accel_diff = _jackknife_acceleration([
+        (mean_b - loo_a, counts_a, n_a),
+        (loo_b - mean_a, counts_b, n_b),
+    ])
+    accel_lift = 0.0
+    if mean_a > 0 and np.all(loo_a > 0):
+        accel_lift = _jackknife_acceleration([
+            (mean_b / loo_a - 1, counts_a, n_a),
+            (loo_b / mean_a - 1, counts_b, n_b),
+        ])
+
+    return {
+        "diff": _intervals(boot_diff, observed_diff, accel_diff, confidence_level),
+        "lift": _intervals(boot_lift, observed_lift, accel_lift, confidence_level),
+        "iterations": int(boot_diff.size),
+    }
+
+
+# ----------------------------------------------------------------------------
+# Sequential testing (mixture SPRT)
+# ----------------------------------------------------------------------------
+
+SequentialLook = namedtuple("SequentialLook", ["diff", "p_value", "ci_lower", "ci_upper"])
+
+
+def msprt_looks(conversions_a, exposures_a, conversions_b, exposures_b, tau=0.02,
+                confidence_level=0.95):
+    """
+    Mixture SPRT for p_b - p_a at a sequence of looks (cumulative counts).
+
+    Uses the normal-mixture likelihood ratio of Johari et al. (2017) with a
+    N(0, tau^2) mixing distribution over the true difference. Returns per-look
+    p-values (1 / likelihood ratio) and confidence-sequence bounds; the
+    always-valid values are their running min / max / min over all looks so far,
+    which callers accumulate so that peeking at any time keeps the error rate.
+    """
+    c_a = np.asarray(conversions_a, dtype=float)
+    n_a = np.asarray(exposures_a, dtype=float)
+    c_b = np.asarray(conversions_b, dtype=float)
+    n_b = np.asarray(exposures_b, dtype=float)
+    p_a = _safe_divide(c_a, n_a)
+    p_b = _safe_divide(c_b, n_b)
+    diff = p_b - p_a
+    tau2 = float(tau) ** 2
+    alpha = 1 - confidence_level
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = p_a * (1 - p_a) / n_a + p_b * (1 - p_b) / n_b
+        valid = np.isfinite(variance) & (variance > 0)
+        v = np.where(valid, variance, 1.0)
+        log_lr = 0.5 * np.log(v / (v + tau2)) + tau2 * diff ** 2 / (2 * v * (v + tau2))
+        half_width = np.sqrt(v * (v + tau2) / tau2 * (np.log((v + tau2) / v) - 2 * np.log(alpha)))
+
+    p_value = np.where(valid, np.minimum(1.0, np.exp(-log_lr)), 1.0)
+    ci_lower = np.where(valid, diff - half_width, -np.inf)
+    ci_upper = np.where(valid, diff + half_width, np.inf)
+    result = SequentialLook(diff, p_value, ci_lower, ci_upper)
+    if np.ndim(diff) == 0:
+        return SequentialLook(*(float(v) for v in result))
+    return result
+
+
+# ----------------------------------------------------------------------------
+# Bayesian (Beta-Binomial) analysis
+# ----------------------------------------------------------------------------
+
+DEFAULT_POSTERIOR_SAMPLES = 20000
+
+BetaPosterior = namedtuple(
+    "BetaPosterior",
+    [
+        "mean",                  # posterior mean conversion rate per variant
+        "ci_lower", "ci_upper",  # equal-tailed credible interval per variant
+        "prob_best",             # P(variant has the highest rate)
+        "expected_loss",         # E[max rate - this variant's rate]
+    ],
+)
+
+BayesTest = namedtuple(
+    "BayesTest",
+    [
+        "prob_b_beats_a",
+        "expected_loss_a", "expected_loss_b",  # cost of shipping A / B if it is the worse one
+        "diff_ci",   # credible interval for p_b - p_a
+        "lift_ci",   # credible interval for p_b / p_a - 1
+        "posterior",  # BetaPosterior over (A, B)
+    ],
+)
+
+
+def _beta_draws(conversions, exposures, samples, seed, prior):
+    """(samples x variants) matrix of posterior draws, one vectorized call."""
+    n = np.asarray(exposures, dtype=float)
+    # Repeat conversions can outnumber exposures; the likelihood needs c <= n
+    c = np.clip(np.asarray(conversions, dtype=float), 0, n)
+    alpha = prior[0] + c
+    beta = prior[1] + (n - c)
+    rng = np.random.default_rng(seed)
+    return alpha, beta, rng.beta(alpha, beta, size=(int(samples), alpha.size))
+
+
+def beta_posterior(conversions, exposures, samples=DEFAULT_POSTERIOR_SAMPLES, seed=0,
+                   confidence_level=0.95, prior=(1.0, 1.0)):
+    """
+    Posterior summaries for any number of variants under Beta(prior) priors.
+
+    conversions / exposures are 1-D arrays over variants. Returns a BetaPosterior
+    of arrays; results are reproducible for a given seed and sample count.
+    """
+    alpha, beta, draws = _beta_draws(conversions, exposures, samples, seed, prior)
+    tail = (1 - confidence_level) / 2
+    lower, upper = np.quantile(draws, [tail, 1 - tail], axis=0)
+    best = draws.max(axis=1, keepdims=True)
+    return BetaPosterior(
+        mean=alpha / (alpha + beta),
+        ci_lower=lower,
+        ci_upper=upper,
+        prob_best=np.bincount(draws.argmax(axis=1), minlength=alpha.size) / draws.shape[0],
+        expected_loss=(best - draws).mean(axis=0),
+    )
+
+
+def bayesian_ab_test(conversions_a, exposures_a, conversions_b, exposures_b,
+                     samples=DEFAULT_POSTERIOR_SAMPLES, seed=0, confidence_level=0.95,
+                     prior=(1.0, 1.0)):
+    """P(B > A), expected loss and credible intervals for two variants."""
+    _, _, draws = _beta_draws(
+        [conversions_a, conversions_b], [exposures_a, exposures_b], samples, seed, prior,
+    )
+    p_a, p_b = draws[:, 0], draws[:, 1]
+    tail = (1 - confidence_level) / 2
+    quantiles = [tail, 1 - tail]
+    lower, upper = np.quantile(draws, quantiles, axis=0)
+    best = np.maximum(p_a, p_b)
+    posterior = BetaPosterior(
+        mean=draws.mean(axis=0),
+        ci_lower=lower,
+        ci_upper=upper,
+        prob_best=np.array([np.mean(p_a > p_b), np.mean(p_b > p_a)]),
+        expected_loss=np.array([np.mean(best - p_a), np.mean(best - p_b)]),
+    )
+    return BayesTest(
+        prob_b_beats_a=float(posterior.prob_best[1]),
+        expected_loss_a=float(posterior.expected_loss[0]),
+        expected_loss_b=float(posterior.expected_loss[1]),
+        diff_ci=tuple(float(q) for q in np.quantile(p_b - p_a, quantiles)),
+        lift_ci=tuple(float(q) for q in np.quantile(p_b / p_a - 1, quantiles)),
+        posterior=posterior,
+    )
+
+
+# ----------------------------------------------------------------------------
+# Chi-square goodness of fit (sample ratio mismatch)
+# ----------------------------------------------------------------------------
+
+SRMTest = namedtuple("SRMTest", ["chi_square", "df", "p_value", "expected"])
+
+_GAMMA_ITERATIONS = 300
+_TINY = 1e-300
+
+
+def regularized_gamma_q(a, x):
+    """
+    Regularized upper incomplete gamma Q(a, x) = Gamma(a, x) / Gamma(a), vectorized.
+
+    Series expansion of P below x = a + 1, Lentz continued fraction above
+    (Numerical Recipes "gammq"), with a fixed iteration count so every element
+    is computed in the same array operations.
+    """
+    a, x = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(x, dtype=float))
+    a = np.where(a > 0, a, np.nan)
+    safe_x = np.where(x > 0, x, 1.0)
+    log_gamma_a = np.vectorize(math.lgamma, otypes=[float])(np.where(np.isnan(a), 1.0, a))
+    log_prefix = -safe_x + a * np.log(safe_x) - log_gamma_a
+
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore", under="ignore"):
+        # Series: P(a, x) = e^-x x^a / Gamma(a) * sum x^n / (a (a+1) ... (a+n))
+        denom = a.copy()
+        term = 1.0 / a
+        total = term.copy()
+        for _ in range(_GAMMA_ITERATIONS):
+            denom = denom + 1
+            term = term * safe_x / denom
+            total = total + term
+        q_series = 1.0 - total * np.exp(log_prefix)
+
+        # Continued fraction for Q(a, x)
+        b = safe_x + 1 - a
+        c = np.full(b.shape, 1 / _TINY)
+        d = 1.0 / np.where(np.abs(b) < _TINY, _TINY, b)
+        h = d.copy()
+        for i in range(1, _GAMMA_ITERATIONS):
+            an = -i * (i - a)
+            b = b + 2
+            d = an * d + b
+            d = 1.0 / np.where(np.abs(d) < _TINY, _TINY, d)
+            c = b + an / c
+            c = np.where(np.abs(c) < _TINY, _TINY, c)
+            h = h * d * c
+        q_fraction = np.exp(log_prefix) * h
+
+    q = np.where(safe_x < a + 1, q_series, q_fraction)
+    q = np.where(x <= 0, 1.0, np.clip(q, 0.0, 1.0))
+    q = np.where(np.isnan(a), np.nan, q)
+    return q[()] if q.ndim == 0 else q
+
+
+def chi2_sf(x, df):
+    """Chi-square survival function P(X >= x) for df degrees of freedom."""
+    return regularized_gamma_q(np.asarray(df, dtype=float) / 2, np.asarray(x, dtype=float) / 2)
+
+
+def srm_chi_square(observed, weights):
+    """
+    Chi-square goodness-of-fit test of observed variant counts against weights.
+
+    observed has variants on the last axis and may carry any leading axes
+    (e.g. one row per time window), so every window is tested in one call.
+    weights are normalised; zero-weight variants do not add degrees of freedom
+    but any traffic to one is a mismatch (p = 0). Rows with no events come back
+    with p_value NaN.
+    """
+    observed = np.asarray(observed, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+    totals = observed.sum(axis=-1, keepdims=True)
+    expected = totals * weights
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cells = np.where(expected > 0, (observed - expected) ** 2 / np.where(expected > 0, expected, 1), 0.0)
+    # Traffic to a variant that should get none is an outright mismatch
+    cells = np.where((expected == 0) & (observed > 0), np.inf, cells)
+    chi_square = cells.sum(axis=-1)
+    df = max(int(np.count_nonzero(weights)) - 1, 1)
+    p_value = np.where(np.isinf(chi_square), 0.0, chi2_sf(np.where(np.isinf(chi_square), 0, chi_square), df))
+    p_value = np.where(totals[..., 0] > 0, p_value, np.nan)
+    if np.ndim(chi_square) == 0:
+        return SRMTest(float(chi_square), df, float(p_value), expected)
+    return SRMTest(chi_square, df, p_value, expected)
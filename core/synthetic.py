@@ -0,0 +1,311 @@
+"""
+Large-scale synthetic data for capacity testing ("seed_data --scale/--events").
+
+Everything is written in fixed-size batches (bulk_create for users, a raw
+executemany for the high-volume tables) from a seeded numpy Generator, so a
+run is reproducible and never makes one round trip per row. At --scale 1
+that is 100k users, 1M posts and about 500k bookmarks; ABTestEvent volume
+is set separately (10M per unit of scale by default).
+
+Shapes:
+- post bodies have log-normal lengths (median ~150 words, long tail), sliced
+  from a pre-generated word corpus so no per-post text generation is needed;
+- bookmarks pick posts from a Zipf distribution over a shuffled post order,
+  so a few posts are very popular and most are rarely saved;
+- events come from a weighted user-agent mix with ~10% bot and monitor
+  traffic, classified with the same rules as live ingest (core.traffic),
+  spread over the last EVENT_DAYS days.
+
+The content models are passed in (ContentModels) so the guide app's
+seed_data can reuse the generator with its own Category/Post/Bookmark;
+only generate_events() needs core's models.
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .traffic import CLASSIFIER_VERSION, classify_traffic
+from .user_agents import user_agent_fields
+
+DEFAULT_SEED = 42
+DEFAULT_BATCH_SIZE = 5000
+
+USERS_PER_SCALE = 100_000
+POSTS_PER_SCALE = 1_000_000
+EVENTS_PER_SCALE = 10_000_000
+BOOKMARKS_PER_USER = 5
+ZIPF_EXPONENT = 1.3
+EVENT_DAYS = 30
+
+# Username prefix; its presence means the bulk data was already generated
+USER_PREFIX = "synth_user_"
+
+# (role, share of users)
+ROLE_MIX = (("reader", 0.80), ("contributor", 0.18), ("admin", 0.02))
+
+STATUS_MIX = (("approved", 0.85), ("pending", 0.08), ("draft", 0.05), ("rejected", 0.02))
+
+# (user agent, share of events)
+USER_AGENT_MIX = (
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36", 0.30),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36", 0.14),
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1", 0.20),
+    ("Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36", 0.08),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 14_1) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15", 0.06),
+    ("Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0", 0.05),
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0", 0.07),
+    ("Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)", 0.04),
+    ("python-requests/2.31.0", 0.02),
+    ("curl/8.4.0", 0.01),
+    ("Mozilla/5.0+(compatible; UptimeRobot/2.0; http://www.uptimerobot.com/)", 0.03),
+)
+
+VARIANT_CONVERSION_RATES = {"kudos": 0.10, "thanks": 0.12}
+
+WORDS = (
+    "housing campus yale new haven apartment lease rent roommate shuttle bus grocery store "
+    "dining hall coffee library study class registration advisor gym pool trail park "
+    "neighborhood safety winter coat bike parking downtown chapel street east rock wooster "
+    "square pizza festival museum concert office hours deadline visa bank account phone plan "
+    "insurance clinic pharmacy laundry utilities heating internet furniture move in checklist "
+    "tip advice recommend budget cheap quiet close walk minutes weekend friends community"
+).split()
+
+TOPICS = ("Housing", "Food", "Transport", "Academics", "Groceries", "Entertainment", "Athletics")
+
+ContentModels = namedtuple("ContentModels", ["category", "post", "bookmark"])
+
+
+def _choose(rng, mix, size):
+    """Indices into `mix` drawn with its weights."""
+    weights = np.array([w for _, w in mix], dtype=float)
+    return rng.choice(len(mix), size=size, p=weights / weights.sum())
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+
+def generate_users(count, rng, groups, batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """Create `count` users; returns {role: np.array of user ids}."""
+    password = make_password("synthetic123")  # hashed once, shared by all rows
+    roles = _choose(rng, ROLE_MIX, count)
+    ids = np.empty(count, dtype=np.int64)
+    Membership = User.groups.through
+
+    for start, size in _batches(count, batch_size):
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    username=f"{USER_PREFIX}{start + i}",
+                    email=f"{USER_PREFIX}{start + i}@example.com",
+                    password=password,
+                    is_staff=ROLE_MIX[roles[start + i]][0] == "admin",
+                )
+                for i in range(size)
+            ])
+            ids[start:start + size] = [u.pk for u in users]
+            Membership.objects.bulk_create([
+                Membership(user_id=u.pk, group_id=groups[ROLE_MIX[roles[start + i]][0]].pk)
+                for i, u in enumerate(users)
+            ])
+        if log:
+            log(f"  users: {start + size:,}/{count:,}")
+
+    return {role: ids[roles == index] for index, (role, _) in enumerate(ROLE_MIX)}
+
+
+def _corpus(rng, words=400_000):
+    return " ".join(np.array(WORDS)[rng.integers(len(WORDS), size=words)])
+
+
+def _column_defaults(model, provided, now, connection):
+    """DB-ready values for every concrete column not in `provided` (constant per run)."""
+    defaults = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.name in provided:
+            continue
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            value = now
+        else:
+            value = field.get_default()
+        defaults[field.column] = field.get_db_prep_save(value, connection)
+    return defaults
+
+
+def insert_rows(model, columns, rows, using="default"):
+    """
+    INSERT plain tuples with one executemany per call.
+
+    `columns` are field names and the values must already be DB-ready
+    (datetimes through connection.ops.adapt_datetimefield_value); every
+    other concrete column gets its default. This skips the ORM's per-value
+    SQL compilation, which dominates bulk_create's cost at millions of rows.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    defaults = _column_defaults(model, set(columns), timezone.now(), connection)
+    names = [model._meta.get_field(name).column for name in columns] + list(defaults)
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(model._meta.db_table),
+        ", ".join(quote(name) for name in names),
+        ", ".join(["%s"] * len(names)),
+    )
+    tail = tuple(defaults.values())
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.executemany(sql, [row + tail for row in rows])
+
+
+def generate_posts(count, rng, models, author_ids, category_ids, batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """Create `count` posts with log-normal body lengths; returns np.array of post ids."""
+    corpus = _corpus(rng)
+    # ~6 characters per word; median 150 words, clipped to 20..4000 words
+    lengths = (np.clip(rng.lognormal(np.log(150), 0.8, size=count), 20, 4000) * 6).astype(int)
+    offsets = rng.integers(0, len(corpus) - lengths.max() - 1, size=count)
+    authors = author_ids[rng.integers(len(author_ids), size=count)]
+    categories = np.asarray(category_ids)[rng.integers(len(category_ids), size=count)]
+    statuses = _choose(rng, STATUS_MIX, count)
+    ages = rng.uniform(0, 365 * 24 * 3600, size=count)
+    now = timezone.now()
+    Post = models.post
+    columns = ("title", "slug", "content", "category", "author", "status", "updated_at", "published_at")
+    adapt = connections["default"].ops.adapt_datetimefield_value
+
+    for start, size in _batches(count, batch_size):
+        rows = []
+        for i in range(start, start + size):
+            status = STATUS_MIX[statuses[i]][0]
+            updated = adapt(now - timedelta(seconds=float(ages[i])))
+            body = corpus[offsets[i]:offsets[i] + lengths[i]]
+            rows.append((
+                f"{TOPICS[i % len(TOPICS)]}: {' '.join(body.split()[:6]).capitalize()}",
+                f"synthetic-post-{i}",
+                body,
+                int(categories[i]),
+                int(authors[i]),
+                status,
+                updated,
+                updated if status == "approved" else None,
+            ))
+        insert_rows(Post, columns, rows)
+        if log:
+            log(f"  posts: {start + size:,}/{count:,}")
+
+    return np.fromiter(
+        Post.objects.filter(slug__startswith="synthetic-post-").values_list("id", flat=True).iterator(),
+        dtype=np.int64,
+    )
+
+
+def generate_bookmarks(rng, models, user_ids, post_ids, per_user=BOOKMARKS_PER_USER, batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """Zipf-distributed bookmarks, about `per_user` per user; returns rows created."""
+    popularity = rng.permutation(post_ids)
+    per_user_counts = rng.poisson(per_user, size=len(user_ids))
+    users = np.repeat(user_ids, per_user_counts)
+    ranks = np.minimum(rng.zipf(ZIPF_EXPONENT, size=len(users)) - 1, len(popularity) - 1)
+    # Repeat picks of a popular post by the same user collapse to one bookmark
+    pairs = np.unique(np.stack([users, popularity[ranks]], axis=1), axis=0)
+    total = len(pairs)
+
+    for start, size in _batches(total, batch_size):
+        insert_rows(models.bookmark, ("user", "post"), [(int(u), int(p)) for u, p in pairs[start:start + size]])
+        if log:
+            log(f"  bookmarks: {start + size:,}/{total:,}")
+    return total
+
+
+def generate_events(count, rng, batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """Create `count` ABTestEvents with a realistic UA/bot mix; returns count."""
+    # Imported here so the guide project (core not installed) can use the rest
+    from .models import ABTestEvent
+
+    # Session ids are 32 hex chars, so the verdict depends on the UA alone
+    profiles = [
+        (user_agent, classify_traffic(user_agent, "0" * 32), *user_agent_fields(user_agent).values())
+        for user_agent, _ in USER_AGENT_MIX
+    ]
+    columns = (
+        "experiment_name", "variant", "event_type", "endpoint", "session_id", "ip_address",
+        "created_at", "created_minute", "user_agent", "traffic_class", "device_class",
+        "browser_family", "os_family", "classifier_version",
+    )
+
+    sessions = max(1, count // 3)
+    session_agents = _choose(rng, USER_AGENT_MIX, sessions)
+    session_variants = rng.integers(2, size=sessions)
+    variants = ("kudos", "thanks")
+    rates = np.array([VARIANT_CONVERSION_RATES[v] for v in variants])
+    now = timezone.now()
+    # Events may live in their own database (core.db_routers.ABTEST)
+    using = router.db_for_write(ABTestEvent)
+    adapt = connections[using].ops.adapt_datetimefield_value
+    span = EVENT_DAYS * 24 * 3600
+
+    for start, size in _batches(count, batch_size):
+        session_idx = rng.integers(sessions, size=size)
+        created = now - np.array(rng.uniform(0, span, size=size) * 1e6, dtype="timedelta64[us]").astype(timedelta)
+        converted = rng.random(size=size) < rates[session_variants[session_idx]]
+        rows = []
+        for j in range(size):
+            s = int(session_idx[j])
+            moment = created[j]
+            rows.append((
+                "button_label_kudos_vs_thanks",
+                variants[session_variants[s]],
+                ABTestEvent.EVENT_TYPE_CONVERSION if converted[j] else ABTestEvent.EVENT_TYPE_EXPOSURE,
+                "/218b7ae/",
+                f"{s:032x}",
+                f"10.{(s >> 16) & 255}.{(s >> 8) & 255}.{s & 255}",
+                adapt(moment),
+                adapt(moment.replace(second=0, microsecond=0)),
+                *profiles[session_agents[s]],
+                CLASSIFIER_VERSION,
+            ))
+        insert_rows(ABTestEvent, columns, rows, using)
+        if log:
+            log(f"  events: {start + size:,}/{count:,}")
+    return count
+
+
+def generate(scale=0.0, events=0, seed=DEFAULT_SEED, models=None, role_groups=None,
+             batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """
+    Generate users, posts and bookmarks for `scale`, plus `events` ABTestEvents.
+
+    `role_groups` maps reader/contributor/admin to Group names. Returns
+    {"users", "posts", "bookmarks", "events"} counts. User/post generation is
+    skipped if synthetic users already exist, so reruns only add events.
+    """
+    rng = np.random.default_rng(seed)
+    counts = {"users": 0, "posts": 0, "bookmarks": 0, "events": 0}
+
+    n_users, n_posts = int(USERS_PER_SCALE * scale), int(POSTS_PER_SCALE * scale)
+    if n_users and n_posts:
+        if User.objects.filter(username__startswith=USER_PREFIX).exists():
+            if log:
+                log("  synthetic users already exist; skipping users, posts and bookmarks")
+        else:
+            groups = {role: Group.objects.get_or_create(name=name)[0] for role, name in role_groups.items()}
+            category_ids = list(models.category.objects.values_list("id", flat=True))
+            users = generate_users(n_users, rng, groups, batch_size, log)
+            authors = np.concatenate([users["contributor"], users["admin"]])
+            if not len(authors):
+                authors = np.concatenate(list(users.values()))
+            post_ids = generate_posts(n_posts, rng, models, authors, category_ids, batch_size, log)
+            all_users = np.concatenate(list(users.values()))
+            counts.update(
+                users=n_users,
+                posts=n_posts,
+                bookmarks=generate_bookmarks(rng, models, all_users, post_ids, batch_size=batch_size, log=log),
+            )
+
+    if events:
+        counts["events"] = generate_events(events, rng, batch_size, log)
+    return counts
@@ -0,0 +1,102 @@
+"""
+Tests for the large-table ABTestEvent admin changelist
+(core.admin_pagination and ABTestEventAdmin).
+"""
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from core import admin_pagination
+from core.admin_pagination import EstimatedCountPaginator, estimated_row_count
+from core.models import ABTestEvent
+
+CHANGELIST_URL = '/admin/core/abtestevent/'
+
+
+def create_events(count, **fields):
+    ABTestEvent.objects.bulk_create([
+        ABTestEvent(
+            experiment_name=fields.get('experiment_name', 'button_label_kudos_vs_thanks'),
+            variant=fields.get('variant', 'kudos'),
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+            endpoint='/218b7ae/',
+            session_id=f'session_{i}',
+            ip_address=fields.get('ip_address'),
+        )
+        for i in range(count)
+    ])
+
+
+class EstimatedCountTest(TestCase):
+    """Test estimated and capped counts."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unfiltered_count_is_cached(self):
+        create_events(3)
+        self.assertEqual(estimated_row_count(ABTestEvent), 3)
+
+        create_events(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(estimated_row_count(ABTestEvent), 3)
+        self.assertEqual(len(queries), 0)
+
+    def test_filtered_count_is_capped(self):
+        create_events(5)
+        with mock.patch.object(admin_pagination, 'COUNT_CAP', 3):
+            paginator = EstimatedCountPaginator(ABTestEvent.objects.filter(variant='kudos'), 2)
+            self.assertEqual(paginator.count, 4)
+            self.assertTrue(paginator.count_is_capped)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ABTestEventChangelistTest(TestCase):
+    """Test the changelist pages, filters and search."""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@test.com', password='testpass123')
+        self.client = Client()
+        self.client.login(username='admin', password='testpass123')
+
+    def test_keyset_pagination(self):
+        create_events(150)
+
+        response = self.client.get(CHANGELIST_URL)
+        self.assertEqual(response.status_code, 200)
+        cl = response.context['cl']
+        self.assertEqual(len(cl.result_list), 100)
+        self.assertIsNotNone(cl.next_cursor_url)
+        self.assertContains(response, 'Older events')
+
+        response = self.client.get(CHANGELIST_URL + cl.next_cursor_url)
+        self.assertEqual(response.status_code, 200)
+        older = response.context['cl'].result_list
+        self.assertEqual(len(older), 50)
+        self.assertLess(older[0].pk, cl.result_list[-1].pk)
+        self.assertIsNone(response.context['cl'].next_cursor_url)
+
+    def test_filter_choices_come_from_registry(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(CHANGELIST_URL)
+        self.assertContains(response, 'button_label_kudos_vs_thanks')
+        self.assertContains(response, '?variant=thanks')
+        self.assertFalse(any(
+            'DISTINCT' in q['sql'] and '"core_abtestevent"' in q['sql'] for q in queries.captured_queries
+        ))
+
+    def test_exact_search_by_session_and_ip(self):
+        create_events(3, ip_address='10.0.0.1')
+        create_events(1, variant='thanks', ip_address='10.0.0.2')
+
+        response = self.client.get(CHANGELIST_URL, {'q': '10.0.0.2'})
+        self.assertEqual([e.variant for e in response.context['cl'].result_list], ['thanks'])
+
+        response = self.client.get(CHANGELIST_URL, {'q': 'session_0'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+        response = self.client.get(CHANGELIST_URL, {'q': 'session_'})
+        self.assertEqual(len(response.context['cl'].result_list), 0)
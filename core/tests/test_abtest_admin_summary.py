@@ -5,7 +5,10 @@ Tests the /admin/core/abtestevent/abtest-summary/ endpoint.
 """
 from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
-from core.models import ABTestEvent
+from core.models import ABTestEvent, BackgroundJob
+from core.rollups import refresh_rollups
+
+SUMMARY_URL = '/admin/core/abtestevent/abtest-summary/'
 
 
 @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
@@ -25,6 +28,11 @@ class ABTestAdminSummaryTest(TestCase):
         self.client.login(username='admin', password='testpass123')
         # Clear all events
         ABTestEvent.objects.all().delete()
+
+    def get_summary(self, params=None):
+        """The summary page as served once the background rollup refresh has run."""
+        refresh_rollups()
+        return self.client.get(SUMMARY_URL, params)
     
     def test_summary_with_two_variants(self):
         """Test summary page with valid exposure and conversion data for both variants."""
@@ -75,7 +83,7 @@ class ABTestAdminSummaryTest(TestCase):
             )
         
         # GET the summary page
-        response = self.client.get('/admin/core/abtestevent/abtest-summary/')
+        response = self.get_summary()
         
         # Should not crash
         self.assertEqual(response.status_code, 200, 
@@ -116,7 +124,7 @@ class ABTestAdminSummaryTest(TestCase):
             )
         
         # GET the summary page
-        response = self.client.get('/admin/core/abtestevent/abtest-summary/')
+        response = self.get_summary()
         
         # Should not crash
         self.assertEqual(response.status_code, 200,
@@ -165,7 +173,7 @@ class ABTestAdminSummaryTest(TestCase):
             )
         
         # GET the summary page
-        response = self.client.get('/admin/core/abtestevent/abtest-summary/')
+        response = self.get_summary()
         
         # Should not crash
         self.assertEqual(response.status_code, 200,
@@ -179,7 +187,7 @@ class ABTestAdminSummaryTest(TestCase):
     def test_summary_no_events(self):
         """Test summary page when no events exist."""
         # GET the summary page
-        response = self.client.get('/admin/core/abtestevent/abtest-summary/')
+        response = self.get_summary()
         
         # Should not crash
         self.assertEqual(response.status_code, 200,
@@ -237,7 +245,7 @@ class ABTestAdminSummaryTest(TestCase):
                 is_forced=False,
             )
         
-        response = self.client.get('/admin/core/abtestevent/abtest-summary/')
+        response = self.get_summary()
         self.assertEqual(response.status_code, 200)
         
         content = response.content.decode('utf-8')
@@ -271,7 +279,7 @@ class ABTestAdminSummaryTest(TestCase):
                 is_forced=False,
             )
         
-        response = self.client.get('/admin/core/abtestevent/abtest-summary/')
+        response = self.get_summary()
         self.assertEqual(response.status_code, 200)
         
         content = response.content.decode('utf-8')
@@ -280,3 +288,97 @@ class ABTestAdminSummaryTest(TestCase):
         # Should show N/A for uplift
         self.assertIn('N/A', content)
 
+
+    def test_summary_posteriors_are_cached_per_rollup_version(self):
+        """Posterior sampling only reruns when the rollups change."""
+        from unittest import mock
+        from django.core.cache import cache
+        from core import bayes
+
+        cache.clear()
+        for variant in ('kudos', 'thanks'):
+            ABTestEvent.objects.create(
+                experiment_name='button_label_kudos_vs_thanks',
+                variant=variant,
+                event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                endpoint='/218b7ae/',
+                session_id=f'session_{variant}',
+            )
+
+        with mock.patch.object(bayes, 'beta_posterior', wraps=bayes.beta_posterior) as sampler:
+            response = self.get_summary()
+            self.get_summary()
+            self.assertEqual(sampler.call_count, 1)
+
+            ABTestEvent.objects.create(
+                experiment_name='button_label_kudos_vs_thanks',
+                variant='thanks',
+                event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+                endpoint='/218b7ae/',
+                session_id='session_thanks',
+            )
+            self.get_summary()
+            self.assertEqual(sampler.call_count, 2)
+
+        self.assertContains(response, 'P(best)')
+        rows = {row['variant']: row for row in response.context['summary_data']}
+        self.assertTrue(rows['kudos']['prob_best_display'].endswith('%'))
+
+    def test_summary_filters_and_freshness(self):
+        """Endpoint, is_forced and date filters are served from the rollups."""
+        import datetime
+        from django.utils import timezone
+
+        experiment_name = 'button_label_kudos_vs_thanks'
+        for endpoint, is_forced, count in (('/218b7ae/', False, 4), ('/218b7ae/', True, 3), ('/other/', False, 2)):
+            for i in range(count):
+                ABTestEvent.objects.create(
+                    experiment_name=experiment_name,
+                    variant='kudos',
+                    event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                    endpoint=endpoint,
+                    session_id=f'session_{endpoint}_{is_forced}_{i}',
+                    is_forced=is_forced,
+                )
+        old = ABTestEvent.objects.filter(endpoint='/other/').first()
+        ABTestEvent.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=10))
+
+        def impressions(**params):
+            response = self.get_summary(params)
+            self.assertEqual(response.status_code, 200)
+            return sum(row['impressions'] for row in response.context['summary_data'])
+
+        self.assertEqual(impressions(), 9)
+        self.assertEqual(impressions(endpoint='/218b7ae/'), 7)
+        self.assertEqual(impressions(endpoint='/218b7ae/', is_forced='0'), 4)
+        self.assertEqual(impressions(start=timezone.localdate().isoformat()), 8)
+        self.assertEqual(impressions(start='not-a-date'), 9)
+
+        response = self.get_summary()
+        self.assertContains(response, 'As of')
+        self.assertIsNotNone(response.context['as_of'])
+        self.assertIn('/other/', list(response.context['endpoints']))
+
+    def test_summary_serves_existing_rollups_and_queues_refresh(self):
+        """A page load never folds events in itself; it queues a job for the worker."""
+        ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks',
+            variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+            endpoint='/218b7ae/',
+            session_id='session_kudos',
+        )
+
+        response = self.client.get(SUMMARY_URL)
+        self.client.get(SUMMARY_URL)
+
+        self.assertEqual(response.context['summary_data'], [])
+        self.assertIsNone(response.context['as_of'])
+        job = BackgroundJob.objects.get()
+        self.assertEqual(job.command, 'ab_refresh_rollups')
+        self.assertContains(response, f'background job #{job.pk}')
+
+        refresh_rollups()
+        response = self.client.get(SUMMARY_URL)
+        self.assertIsNone(response.context['refresh_job'])
+        self.assertEqual(response.context['summary_data'][0]['impressions'], 1)
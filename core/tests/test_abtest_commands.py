@@ -153,6 +153,53 @@ class ABTestTrafficSplitCommandTest(TestCase):
         self.assertIn('30/100', output)  # thanks: 30 conversions / 100 exposures
 
 
+    def test_traffic_split_three_variants_chi_square(self):
+        """Test SRM check for an unregistered experiment with three variants."""
+        for variant, count in (('a', 100), ('b', 100), ('c', 40)):
+            for i in range(count):
+                ABTestEvent.objects.create(
+                    experiment_name='three_way_test',
+                    variant=variant,
+                    event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                    endpoint='/218b7ae/',
+                    session_id=f'session_{variant}_{i}',
+                )
+
+        out = StringIO()
+        call_command('ab_check_traffic_split', experiment='three_way_test', stdout=out)
+        output = out.getvalue()
+
+        self.assertIn('Chi-square', output)
+        self.assertIn('(df = 2)', output)
+        self.assertIn('c: 16.67% is outside expected range', output)
+        self.assertIn('Sample ratio mismatch detected', output)
+
+    def test_traffic_split_per_window_pinpoints_broken_hour(self):
+        """Test --window=hour finds the hour where the split broke."""
+        from datetime import datetime, timedelta, timezone as dt_timezone
+
+        start = datetime(2025, 12, 1, 9, tzinfo=dt_timezone.utc)
+        for hour, (kudos, thanks) in enumerate(((50, 50), (52, 48), (90, 10))):
+            for variant, count in (('kudos', kudos), ('thanks', thanks)):
+                for i in range(count):
+                    event = ABTestEvent.objects.create(
+                        experiment_name=self.experiment_name,
+                        variant=variant,
+                        event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                        endpoint='/218b7ae/',
+                        session_id=f'session_{variant}_{hour}_{i}',
+                    )
+                    ABTestEvent.objects.filter(pk=event.pk).update(created_at=start + timedelta(hours=hour))
+
+        out = StringIO()
+        call_command('ab_check_traffic_split', experiment=self.experiment_name, window='hour', stdout=out)
+        output = out.getvalue()
+
+        self.assertIn('Sample Ratio Mismatch by hour', output)
+        self.assertIn('kudos=90 thanks=10', output)
+        self.assertIn('1 of 3 windows show a mismatch', output)
+
+
 class ABTestAnalyzeCommandTest(TestCase):
     """Test ab_analyze_button_label management command."""
     
@@ -427,3 +474,42 @@ class ABTestAnalyzeCommandTest(TestCase):
         self.assertIn('Relative Improvement', output)
         self.assertIn('percentage points', output)
 
+
+    def test_analyze_bayes_method(self):
+        """Test --method=bayes reports posterior probabilities instead of a z-test."""
+        for variant, conversions in (('kudos', 10), ('thanks', 40)):
+            for i in range(100):
+                ABTestEvent.objects.create(
+                    experiment_name=self.experiment_name,
+                    variant=variant,
+                    event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                    endpoint='/218b7ae/',
+                    session_id=f'session_{variant}_{i}',
+                    is_forced=False,
+                )
+            for i in range(conversions):
+                ABTestEvent.objects.create(
+                    experiment_name=self.experiment_name,
+                    variant=variant,
+                    event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+                    endpoint='/218b7ae/',
+                    session_id=f'session_{variant}_{i}',
+                    is_forced=False,
+                )
+
+        out = StringIO()
+        call_command(
+            'ab_analyze_button_label',
+            experiment=self.experiment_name,
+            method='bayes',
+            samples=5000,
+            seed=1,
+            stdout=out
+        )
+        output = out.getvalue()
+
+        self.assertIn('Bayesian Results (5,000 posterior draws, seed 1)', output)
+        self.assertIn('P(B > A)', output)
+        self.assertIn('Expected Loss if "kudos"', output)
+        self.assertIn('RECOMMENDATION: We recommend rolling out "thanks"', output)
+        self.assertNotIn('Z-Score', output)
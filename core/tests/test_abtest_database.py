@@ -0,0 +1,132 @@
+"""
+Tests for keeping the A/B tables in their own database (core.db_routers.ABTEST).
+
+A temporary SQLite file is registered as the "abtest" alias and migrated
+with --database abtest, as a deployment would.
+"""
+import copy
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import TestCase
+from core.db_routers import ABTEST, DEFAULT
+from core.models import ABHourlyRollup, ABTestEvent
+from core.rollups import refresh_rollups
+
+BROWSER_HEADERS = {
+    'HTTP_USER_AGENT': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'HTTP_SEC_FETCH_DEST': 'document',
+    'HTTP_SEC_FETCH_MODE': 'navigate',
+    'HTTP_SEC_FETCH_SITE': 'same-origin',
+}
+
+
+class ABTestDatabaseTest(TestCase):
+    """Test routing, migrations and the user link across databases."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered here, not as a class attribute: the test runner checks
+        # class-level databases against settings before any setUpClass runs
+        cls.databases = {DEFAULT, ABTEST}
+        cls.tmpdir = tempfile.mkdtemp(prefix='far-storm-abtest-')
+        settings_dict = copy.deepcopy(connections[DEFAULT].settings_dict)
+        settings_dict.update({
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'{cls.tmpdir}/abtest.sqlite3',
+            'OPTIONS': {},
+            'TEST': {'MIRROR': None, 'NAME': None},
+        })
+        connections.settings[ABTEST] = settings_dict
+        call_command('migrate', database=ABTEST, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[ABTEST].close()
+        del connections[ABTEST]
+        del connections.settings[ABTEST]
+        shutil.rmtree(cls.tmpdir)
+
+    def test_only_ab_tables_are_migrated_there(self):
+        tables = set(connections[ABTEST].introspection.table_names())
+
+        self.assertTrue({'core_abtestevent', 'core_abhourlyrollup', 'core_abrollupstate'} <= tables)
+        self.assertNotIn('auth_user', tables)
+        self.assertNotIn('core_post', tables)
+        self.assertNotIn('django_session', tables)
+
+    def test_event_user_has_no_foreign_key_in_either_database(self):
+        for alias in (DEFAULT, ABTEST):
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, 'core_abtestevent')
+            self.assertFalse(
+                [name for name, info in constraints.items() if info['foreign_key']], f'foreign key in {alias}',
+            )
+
+    def test_exposures_are_written_to_the_abtest_database(self):
+        response = self.client.get('/218b7ae/', **BROWSER_HEADERS)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ABTestEvent.objects.using(ABTEST).count(), 1)
+        self.assertEqual(ABTestEvent.objects.using(DEFAULT).count(), 0)
+
+    def test_rollups_refresh_inside_the_abtest_database(self):
+        self.client.get('/218b7ae/', **BROWSER_HEADERS)
+        refresh_rollups()
+
+        self.assertEqual(ABHourlyRollup.objects.using(ABTEST).get().exposures, 1)
+        self.assertFalse(ABHourlyRollup.objects.using(DEFAULT).exists())
+
+    def test_event_user_is_read_from_default_and_detached_on_delete(self):
+        user = User.objects.create_user(username='reader', password='x')
+        event = ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks', variant='kudos', event_type='exposure', user=user,
+        )
+        self.assertEqual(event._state.db, ABTEST)
+        self.assertEqual(ABTestEvent.objects.get(pk=event.pk).user, user)
+
+        user.delete()
+        event.refresh_from_db()
+        self.assertIsNone(event.user_id)
+
+    def test_move_copies_history_and_rebuilds_rollups(self):
+        old = [
+            ABTestEvent.objects.using(DEFAULT).create(
+                experiment_name='button_label_kudos_vs_thanks', variant='kudos', event_type='exposure',
+                session_id=f'session-{i}',
+            )
+            for i in range(3)
+        ]
+        out = StringIO()
+
+        call_command('ab_move_events_to_abtest', chunk_size=2, stdout=out)
+
+        self.assertIn('Moved 3 events', out.getvalue())
+        self.assertFalse(ABTestEvent.objects.using(DEFAULT).exists())
+        moved = {event.pk: event for event in ABTestEvent.objects.using(ABTEST).all()}
+        self.assertEqual(sorted(moved), sorted(event.pk for event in old))
+        self.assertEqual(moved[old[0].pk].created_at, old[0].created_at)
+        self.assertEqual(ABHourlyRollup.objects.using(ABTEST).get().exposures, 3)
+        # New events continue above the moved ids
+        self.client.get('/218b7ae/', **BROWSER_HEADERS)
+        self.assertGreater(ABTestEvent.objects.using(ABTEST).latest('id').pk, old[-1].pk)
+
+        call_command('ab_move_events_to_abtest', stdout=out)
+        self.assertIn('nothing to move', out.getvalue())
+
+    def test_move_refuses_once_the_abtest_database_has_traffic(self):
+        ABTestEvent.objects.using(DEFAULT).create(
+            experiment_name='button_label_kudos_vs_thanks', variant='kudos', event_type='exposure',
+        )
+        self.client.get('/218b7ae/', **BROWSER_HEADERS)
+
+        with self.assertRaises(CommandError):
+            call_command('ab_move_events_to_abtest', stdout=StringIO())
+        self.assertEqual(ABTestEvent.objects.using(DEFAULT).count(), 1)
@@ -2,10 +2,12 @@
 Tests for the abtest_report management command.
 """
 
+import json
 from io import StringIO
 from django.core.management import call_command
 from django.test import TestCase
-from core.models import ABTestEvent
+from core.models import ABTestEvent, ABReportSnapshot
+from core.reports import get_report
 
 
 class ABTestReportCommandTest(TestCase):
@@ -242,3 +244,55 @@ class ABTestReportCommandTest(TestCase):
         self.assertIn('kudos', output)
         self.assertIn('thanks', output)
 
+
+
+class ABTestReportSnapshotTest(TestCase):
+    """Test machine-readable output and snapshot reuse."""
+
+    def setUp(self):
+        for i in range(10):
+            ABTestEvent.objects.create(
+                experiment_name="button_label_kudos_vs_thanks",
+                variant="kudos" if i % 2 else "thanks",
+                event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                endpoint="/218b7ae/",
+                session_id=f"session_{i}",
+            )
+
+    def test_json_format(self):
+        out = StringIO()
+        call_command("abtest_report", format="json", stdout=out)
+
+        data = json.loads(out.getvalue())
+        self.assertEqual(data["total_exposures"], 10)
+        self.assertEqual([v["variant"] for v in data["variants"]], ["kudos", "thanks"])
+        self.assertFalse(data["sufficient_sample"])
+
+    def test_csv_format(self):
+        out = StringIO()
+        call_command("abtest_report", format="csv", stdout=out)
+
+        lines = out.getvalue().strip().splitlines()
+        self.assertEqual(lines[0], "variant,exposures,conversions,conversion_rate")
+        self.assertTrue(lines[1].startswith("kudos,5,0,"))
+
+    def test_snapshot_reused_until_new_events(self):
+        first, from_cache = get_report()
+        self.assertFalse(from_cache)
+
+        second, from_cache = get_report()
+        self.assertTrue(from_cache)
+        self.assertEqual(second, first)
+        self.assertEqual(ABReportSnapshot.objects.count(), 1)
+
+        ABTestEvent.objects.create(
+            experiment_name="button_label_kudos_vs_thanks",
+            variant="kudos",
+            event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+            endpoint="/218b7ae/",
+            session_id="session_1",
+        )
+        third, from_cache = get_report()
+        self.assertFalse(from_cache)
+        self.assertEqual(third["variants"][0]["conversions"], 1)
+        self.assertEqual(ABReportSnapshot.objects.count(), 2)
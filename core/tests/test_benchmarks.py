@@ -0,0 +1,125 @@
+"""
+Tests for the in-process view benchmarks (benchmarks/) and the
+benchmark_views command.
+"""
+import copy
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import TestCase
+from benchmarks.compare import compare_reports
+from benchmarks.runner import discover_targets
+from core.db_routers import ABTEST, DEFAULT
+from core.models import ABTestEvent, Post
+
+
+class DiscoverTargetsTest(TestCase):
+    """Test URL discovery."""
+
+    def test_includes_core_and_abtest_routes(self):
+        names = dict(discover_targets())
+        self.assertIn('abtest', names)
+        self.assertIn('core:home', names)
+        self.assertEqual(names['core:post_detail'], ('slug',))
+        self.assertIn('admin:core_abtestevent_abtest_summary', names)
+        self.assertNotIn('core:logout', names)
+
+    def test_skips_routes_that_change_state(self):
+        names = dict(discover_targets())
+        for name in ('core:ab_purge_bots_run', 'core:approve_post', 'core:reject_post',
+                     'core:contributor_delete_post', 'core:bookmark_post', 'core:admin_job_start'):
+            self.assertNotIn(name, names)
+
+
+class BenchmarkCommandTest(TestCase):
+    """Test a small end-to-end run."""
+
+    def test_reports_every_role_and_rolls_back(self):
+        out = StringIO()
+        call_command(
+            'benchmark_views', posts=5, events=20, iterations=1, warmup=0,
+            only='abtest,core:home', stdout=out, stderr=StringIO(),
+        )
+
+        report = json.loads(out.getvalue())
+        roles = {r['role'] for r in report['results']}
+        self.assertEqual(roles, {'anonymous', 'reader', 'contributor', 'admin'})
+        home = next(r for r in report['results'] if r['name'] == 'core:home' and r['role'] == 'anonymous')
+        self.assertEqual(home['status'], 200)
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kb'):
+            self.assertIn(key, home)
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(ABTestEvent.objects.exists())
+
+    def test_compare_fails_on_regression(self):
+        out = StringIO()
+        call_command('benchmark_views', posts=2, events=0, iterations=1, warmup=0, only='health', stdout=out)
+        baseline = json.loads(out.getvalue())
+        for result in baseline['results']:
+            result['queries'] = 0
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            with open(path, 'w') as fh:
+                json.dump(baseline, fh)
+            with self.assertRaises(CommandError):
+                call_command(
+                    'benchmark_views', posts=2, events=0, iterations=1, warmup=0, only='health',
+                    compare=path, stdout=StringIO(), stderr=StringIO(),
+                )
+
+
+class BenchmarkRollbackAcrossDatabasesTest(TestCase):
+    """Test that the rollback covers every alias, not just "default"."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered here, not as a class attribute: the test runner checks
+        # class-level databases against settings before any setUpClass runs
+        cls.databases = {DEFAULT, ABTEST}
+        cls.tmpdir = tempfile.mkdtemp(prefix='far-storm-bench-')
+        settings_dict = copy.deepcopy(connections[DEFAULT].settings_dict)
+        settings_dict.update({
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'{cls.tmpdir}/abtest.sqlite3',
+            'OPTIONS': {},
+            'TEST': {'MIRROR': None, 'NAME': None},
+        })
+        connections.settings[ABTEST] = settings_dict
+        call_command('migrate', database=ABTEST, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[ABTEST].close()
+        del connections[ABTEST]
+        del connections.settings[ABTEST]
+        shutil.rmtree(cls.tmpdir)
+
+    def test_events_in_the_abtest_database_are_rolled_back(self):
+        call_command(
+            'benchmark_views', posts=2, events=20, iterations=1, warmup=0, roles='anonymous',
+            only='abtest', stdout=StringIO(), stderr=StringIO(),
+        )
+
+        self.assertFalse(ABTestEvent.objects.using(ABTEST).exists())
+
+
+class CompareReportsTest(TestCase):
+    """Test the regression rules."""
+
+    def _report(self, p50, queries):
+        return {'results': [{'name': 'core:home', 'role': 'anonymous', 'p50_ms': p50, 'queries': queries}]}
+
+    def test_thresholds(self):
+        self.assertEqual(compare_reports(self._report(10.0, 3), self._report(12.0, 3)), [])
+        # Over the ratio but under the absolute floor
+        self.assertEqual(compare_reports(self._report(0.2, 3), self._report(0.6, 3)), [])
+        regressions = compare_reports(self._report(10.0, 3), self._report(20.0, 4))
+        self.assertEqual({r['metric'] for r in regressions}, {'p50_ms', 'queries'})
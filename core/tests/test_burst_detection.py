@@ -0,0 +1,154 @@
+"""
+Tests for sliding-window burst detection (core.bursts / ab_detect_bursts).
+"""
+from datetime import timedelta
+from django.test import TestCase
+from django.core.management import call_command
+from django.utils import timezone
+from io import StringIO
+from core.bursts import SlidingWindowBurstDetector
+from core.models import ABTestEvent
+from core.traffic import TRAFFIC_CLASS_HUMAN, TRAFFIC_CLASS_SUSPECT
+
+BROWSER_UA = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+
+class SlidingWindowBurstDetectorTest(TestCase):
+    """Test the streaming detector without the database."""
+
+    def setUp(self):
+        self.t0 = timezone.now().replace(second=0, microsecond=0)
+
+    def test_flags_every_event_in_bursting_session_window(self):
+        detector = SlidingWindowBurstDetector(per_session=3, per_ip=0, global_threshold=0)
+        flagged = []
+        for i in range(4):
+            flagged += detector.feed(i, self.t0 + timedelta(seconds=i), 'session-a', None)
+
+        self.assertEqual(sorted(flagged), [0, 1, 2, 3])
+        self.assertEqual(detector.bursts[('session', 'session-a')], 4)
+
+    def test_events_spread_beyond_window_are_not_flagged(self):
+        detector = SlidingWindowBurstDetector(per_session=3, per_ip=0, global_threshold=0)
+        flagged = []
+        for i in range(10):
+            flagged += detector.feed(i, self.t0 + timedelta(seconds=30 * i), 'session-a', None)
+
+        self.assertEqual(flagged, [])
+
+    def test_window_slides_across_minute_boundaries(self):
+        detector = SlidingWindowBurstDetector(per_session=0, per_ip=2, global_threshold=0)
+        # 3 events within 20s, straddling a minute boundary
+        start = self.t0 + timedelta(seconds=50)
+        flagged = []
+        for i in range(3):
+            flagged += detector.feed(i, start + timedelta(seconds=10 * i), 's', '198.51.100.1')
+
+        self.assertEqual(sorted(flagged), [0, 1, 2])
+
+    def test_each_event_is_flagged_once(self):
+        detector = SlidingWindowBurstDetector(per_session=2, per_ip=0, global_threshold=0)
+        flagged = []
+        for i in range(6):
+            flagged += detector.feed(i, self.t0 + timedelta(seconds=i), 'session-a', None)
+
+        self.assertEqual(sorted(flagged), list(range(6)))
+
+
+class DetectBurstsCommandTest(TestCase):
+    """Test ab_detect_bursts over stored events."""
+
+    def setUp(self):
+        ABTestEvent.objects.all().delete()
+
+    def _create(self, session_id, when):
+        event = ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks',
+            variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+            session_id=session_id,
+        )
+        # created_at is auto_now_add; move it (and its bucket) into the past
+        ABTestEvent.objects.filter(pk=event.pk).update(
+            created_at=when,
+            created_minute=when.replace(second=0, microsecond=0),
+        )
+        return event
+
+    def test_created_minute_is_stored_on_insert(self):
+        event = ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks',
+            variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+            session_id='s' * 32,
+        )
+        event.refresh_from_db()
+        self.assertEqual(event.created_minute, event.created_at.replace(second=0, microsecond=0))
+
+    def test_marks_historic_session_burst_as_suspect(self):
+        old = timezone.now() - timedelta(days=30)
+        burst = [self._create('burst' + 'x' * 27, old + timedelta(seconds=i)) for i in range(25)]
+        calm = [self._create('calm' + 'y' * 28, old + timedelta(minutes=5 * i)) for i in range(5)]
+
+        out = StringIO()
+        call_command('ab_detect_bursts', stdout=out)
+
+        self.assertIn('Marked 25 human events as suspect', out.getvalue())
+        self.assertTrue(all(
+            e.traffic_class == TRAFFIC_CLASS_SUSPECT
+            for e in ABTestEvent.objects.filter(id__in=[b.id for b in burst])
+        ))
+        self.assertTrue(all(
+            e.traffic_class == TRAFFIC_CLASS_HUMAN
+            for e in ABTestEvent.objects.filter(id__in=[c.id for c in calm])
+        ))
+
+    def test_burst_verdicts_survive_reclassification(self):
+        old = timezone.now() - timedelta(days=30)
+        burst = [self._create('burst' + 'x' * 27, old + timedelta(seconds=i)) for i in range(25)]
+        calm = [self._create('calm' + 'y' * 28, old + timedelta(minutes=5 * i)) for i in range(5)]
+        call_command('ab_detect_bursts', stdout=StringIO())
+        # As after a CLASSIFIER_VERSION bump: every row is due for re-scoring,
+        # and the browser rules alone would call all of them human
+        ABTestEvent.objects.update(classifier_version=0, user_agent=BROWSER_UA)
+
+        call_command('ab_reclassify_traffic', stdout=StringIO())
+
+        burst_events = ABTestEvent.objects.filter(id__in=[b.id for b in burst])
+        self.assertTrue(all(e.burst_flagged and e.traffic_class == TRAFFIC_CLASS_SUSPECT for e in burst_events))
+        self.assertTrue(all(
+            e.traffic_class == TRAFFIC_CLASS_HUMAN
+            for e in ABTestEvent.objects.filter(id__in=[c.id for c in calm])
+        ))
+
+    def test_since_limits_scan_range(self):
+        old = timezone.now() - timedelta(days=30)
+        for i in range(25):
+            self._create('burst' + 'x' * 27, old + timedelta(seconds=i))
+
+        out = StringIO()
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        call_command('ab_detect_bursts', since=since, stdout=out)
+
+        self.assertIn('Marked 0 human events as suspect', out.getvalue())
+
+    def test_dry_run_does_not_write(self):
+        old = timezone.now() - timedelta(days=30)
+        for i in range(25):
+            self._create('burst' + 'x' * 27, old + timedelta(seconds=i))
+
+        out = StringIO()
+        call_command('ab_detect_bursts', dry_run=True, stdout=out)
+
+        self.assertIn('Would mark 25 human events as suspect', out.getvalue())
+        self.assertFalse(ABTestEvent.objects.filter(traffic_class=TRAFFIC_CLASS_SUSPECT).exists())
+
+    def test_purge_removes_recent_bursts(self):
+        recent = timezone.now() - timedelta(hours=1)
+        for i in range(25):
+            self._create('burst' + 'x' * 27, recent + timedelta(seconds=i))
+        self._create('calm' + 'y' * 28, recent)
+
+        call_command('ab_purge_bots', sleep=0, stdout=StringIO())
+
+        self.assertEqual(ABTestEvent.objects.count(), 1)
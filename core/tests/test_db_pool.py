@@ -0,0 +1,75 @@
+"""
+Tests for the pooled PostgreSQL backend (core.postgresql_pool) and its benchmark.
+
+The pool tests need a local Postgres and psycopg_pool, e.g.
+DATABASE_URL=postgres://localhost/far_storm python manage.py test core.tests.test_db_pool;
+they are skipped on SQLite.
+"""
+import importlib.util
+from unittest import skipUnless
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from benchmarks.dbpool import POOLED_ENGINE, PoolBenchmarkError, _wrapper, connection_setup
+
+HAS_POSTGRES_POOL = connection.vendor == 'postgresql' and importlib.util.find_spec('psycopg_pool') is not None
+
+POOL = {'min_size': 1, 'max_size': 2, 'timeout': 5}
+
+
+class ConnectionSetupBenchmarkTest(SimpleTestCase):
+    """Test the benchmark's guard on non-Postgres databases."""
+
+    @skipUnless(connection.vendor != 'postgresql', 'runs on SQLite only')
+    def test_needs_postgres(self):
+        with self.assertRaises(PoolBenchmarkError):
+            connection_setup(iterations=1, threads=1)
+
+
+@skipUnless(HAS_POSTGRES_POOL, 'needs PostgreSQL and psycopg_pool')
+class PooledBackendTest(TestCase):
+    """Test checkout/return against a real server."""
+
+    def setUp(self):
+        self.wrapper = _wrapper(POOLED_ENGINE, POOL, alias='pool-test')
+        self.addCleanup(self.wrapper.close_pool)
+
+    def backend_pid(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_close_returns_connection_for_reuse(self):
+        first = self.backend_pid()
+        self.wrapper.close()
+        self.assertIsNone(self.wrapper.connection)
+
+        self.assertEqual(self.backend_pid(), first)
+        stats = self.wrapper.pool_stats()
+        self.assertLessEqual(stats['pool_size'], POOL['max_size'])
+        self.wrapper.close()
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        self.wrapper.set_autocommit(False)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE pool_probe (id int)')
+        self.wrapper.close()
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pg_temp.pool_probe')")
+            self.assertIsNone(cursor.fetchone()[0])
+        self.wrapper.close()
+
+    def test_persistent_connections_are_rejected(self):
+        self.wrapper.settings_dict['CONN_MAX_AGE'] = 60
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper.pool
+
+    def test_benchmark_compares_direct_and_pooled(self):
+        report = connection_setup(iterations=5, threads=2)
+
+        for mode in ('direct', 'pooled'):
+            self.assertEqual(report[mode]['cycles'], 10)
+            self.assertEqual(report[mode]['errors'], 0)
+        self.assertIn('saved_p50_ms', report)
@@ -0,0 +1,153 @@
+"""
+Tests for replica/analytics routing (core.db_routers, ReplicaPinMiddleware).
+
+Two extra SQLite files stand in for the replica and the analytics database,
+so a read that is routed correctly sees different rows than "default".
+"""
+import copy
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connections, router
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from core.db_routers import ANALYTICS, DEFAULT, PIN_COOKIE, REPLICA, configured, reads_from
+from core.models import ABHourlyRollup, ABReportSnapshot, ABRollupState, ABTestEvent, Category, Post
+
+
+class FallbackTest(SimpleTestCase):
+    """Test routing when no extra databases are configured."""
+
+    def test_unconfigured_aliases_fall_back_to_default(self):
+        self.assertEqual(configured(ANALYTICS), DEFAULT)
+        self.assertEqual(configured(REPLICA), DEFAULT)
+        with reads_from(ANALYTICS):
+            self.assertEqual(router.db_for_read(ABTestEvent), DEFAULT)
+
+
+class ReplicaRoutingTest(TestCase):
+    """Test reads against separate SQLite files."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered here, not as a class attribute: the test runner checks
+        # class-level databases against settings before any setUpClass runs
+        cls.databases = {DEFAULT, REPLICA, ANALYTICS}
+        cls.tmpdir = tempfile.mkdtemp(prefix='far-storm-routers-')
+        for alias in (REPLICA, ANALYTICS):
+            settings_dict = copy.deepcopy(connections[DEFAULT].settings_dict)
+            settings_dict.update({
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': f'{cls.tmpdir}/{alias}.sqlite3',
+                'OPTIONS': {},
+                'TEST': {'MIRROR': None, 'NAME': None},
+            })
+            connections.settings[alias] = settings_dict
+            call_command('migrate', database=alias, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in (REPLICA, ANALYTICS):
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        shutil.rmtree(cls.tmpdir)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='x')
+        self.category = Category.objects.create(name='Housing', slug='housing')
+        self.url = reverse('core:category_list', args=['housing'])
+
+    def replicate(self, alias=REPLICA):
+        """Copy the category and author to another database, as replication would."""
+        User.objects.using(alias).create(id=self.author.id, username='author')
+        Category.objects.using(alias).create(id=self.category.id, name='Housing', slug='housing')
+
+    def test_public_view_reads_from_replica(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.replicate()
+        Post.objects.using(REPLICA).create(
+            title='Replica post', slug='replica-post', content='x', status='approved',
+            category_id=self.category.id, author_id=self.author.id,
+        )
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Replica post')
+
+    def test_pin_cookie_reads_from_default(self):
+        self.client.cookies[PIN_COOKIE] = '1'
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_post_sets_pin_cookie(self):
+        response = self.client.post(reverse('core:login'), {'username': 'author', 'password': 'x'})
+
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_plain_get_does_not_pin(self):
+        response = self.client.get(self.url)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_after_a_write_go_to_default(self):
+        with reads_from(REPLICA) as route:
+            self.assertFalse(Category.objects.filter(slug='food').exists())
+            Category.objects.create(name='Food', slug='food')
+            self.assertTrue(route.wrote)
+            self.assertTrue(Category.objects.filter(slug='food').exists())
+
+    def test_sessions_and_event_logging_stay_on_default_without_pinning(self):
+        with reads_from(REPLICA) as route:
+            self.assertEqual(router.db_for_read(Session), DEFAULT)
+            ABTestEvent.objects.create(experiment_name='button_label_kudos_vs_thanks', variant='A', event_type='exposure')
+            self.assertFalse(route.wrote)
+
+    def test_analytics_reads_from_analytics_database(self):
+        ABTestEvent.objects.using(ANALYTICS).create(
+            experiment_name='button_label_kudos_vs_thanks', variant='A', event_type='exposure',
+        )
+        self.assertEqual(ABTestEvent.objects.count(), 0)
+        with reads_from(ANALYTICS):
+            self.assertEqual(ABTestEvent.objects.count(), 1)
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_admin_summary_aggregates_on_analytics_database(self):
+        ABHourlyRollup.objects.using(ANALYTICS).create(
+            experiment_name='button_label_kudos_vs_thanks', endpoint='/218b7ae/', variant='kudos',
+            traffic_class='human', hour=timezone.now().replace(minute=0, second=0, microsecond=0),
+            exposures=4321, conversions=123, converting_sessions=100,
+        )
+        self.client.force_login(User.objects.create_superuser(username='admin', password='x'))
+
+        with CaptureQueriesContext(connections[ANALYTICS]) as analytics, \
+                CaptureQueriesContext(connections[DEFAULT]) as default:
+            response = self.client.get(reverse('admin:core_abtestevent_abtest_summary'))
+
+        self.assertContains(response, '4321')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertTrue(any('SUM' in q['sql'] and 'core_abhourlyrollup' in q['sql'] for q in analytics.captured_queries))
+        self.assertFalse(any('core_abhourlyrollup' in q['sql'] for q in default.captured_queries))
+
+    def test_rollup_bookkeeping_does_not_pin(self):
+        with reads_from(ANALYTICS) as route:
+            ABRollupState.objects.create(pk=1)
+            ABReportSnapshot.objects.filter(pk=0).delete()
+            self.assertFalse(route.wrote)
+            self.assertEqual(router.db_for_read(ABHourlyRollup), ANALYTICS)
+
+    def test_related_lookups_follow_the_instance(self):
+        self.replicate()
+        Post.objects.using(REPLICA).create(
+            title='Replica post', slug='replica-post', content='x', status='approved',
+            category_id=self.category.id, author_id=self.author.id,
+        )
+        with reads_from(REPLICA):
+            post = Post.objects.get(slug='replica-post')
+            self.assertEqual(post._state.db, REPLICA)
+            self.assertEqual(post.category._state.db, REPLICA)
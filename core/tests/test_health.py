@@ -0,0 +1,108 @@
+"""
+Tests for the /healthz/live and /healthz/ready endpoints (core.health).
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core import health
+
+
+class HealthzTest(TestCase):
+    """Test liveness, readiness and the cached probe."""
+
+    def setUp(self):
+        health.reset()
+        self.addCleanup(health.reset)
+
+    def test_live_does_no_io(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('core:healthz_live'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_ready_reports_each_check(self):
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+        response = self.client.get(reverse('core:healthz_ready'))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertFalse(data['cached'])
+        self.assertEqual(data['checks']['db:default']['status'], 'ok')
+        self.assertTrue(data['checks']['db:default']['required'])
+        self.assertIn('connection_age_seconds', data['checks']['db:default'])
+        self.assertEqual(data['checks']['cache']['status'], 'ok')
+        self.assertEqual(data['checks']['migrations'], {'status': 'ok', 'unapplied': []})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_anonymous_callers_get_statuses_only(self):
+        with mock.patch('core.health._migration_leaves', return_value={('core', '9999_future')}):
+            response = self.client.get(reverse('core:healthz_ready'))
+
+        data = response.json()
+        self.assertEqual(data['checks']['db:default'], {'status': 'ok', 'required': True})
+        self.assertEqual(data['checks']['migrations'], {'status': 'error'})
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_metrics_token_gets_the_detail(self):
+        response = self.client.get(reverse('core:healthz_ready'), HTTP_AUTHORIZATION='Bearer scrape-me')
+
+        self.assertIn('vendor', response.json()['checks']['db:default'])
+
+    def test_ready_result_is_cached(self):
+        self.client.get(reverse('core:healthz_ready'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('core:healthz_ready'))
+        self.assertTrue(response.json()['cached'])
+
+    @override_settings(HEALTH_CACHE_SECONDS=0)
+    def test_zero_ttl_probes_every_time(self):
+        self.client.get(reverse('core:healthz_ready'))
+        response = self.client.get(reverse('core:healthz_ready'))
+        self.assertFalse(response.json()['cached'])
+
+    def test_unapplied_migration_is_not_ready(self):
+        with mock.patch('core.health._migration_leaves', return_value={('core', '9999_future')}):
+            result = health.probe()
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['checks']['migrations']['unapplied'], ['core.9999_future'])
+
+    def test_unmigrated_abtest_database_is_not_ready(self):
+        def recorder(connection):
+            applied = {} if connection.alias == 'abtest' else dict.fromkeys(health._migration_leaves())
+            return mock.Mock(applied_migrations=mock.Mock(return_value=applied))
+
+        databases = {'default': connections['default'], 'abtest': mock.Mock(alias='abtest')}
+        with mock.patch.object(health, 'abtest_database', return_value='abtest'), \
+                mock.patch.object(health, 'connections', databases), \
+                mock.patch.object(health, 'check_database', return_value={'status': 'ok'}), \
+                mock.patch.object(health, 'MigrationRecorder', side_effect=recorder):
+            result = health.probe()
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['checks']['migrations']['status'], 'ok')
+        self.assertEqual(result['checks']['migrations:abtest']['status'], 'error')
+
+    def test_database_failure_is_not_ready(self):
+        with mock.patch.object(connections['default'], 'cursor', side_effect=OperationalError('down')):
+            response = self.client.get(reverse('core:healthz_ready'))
+
+        self.assertEqual(response.status_code, 503)
+        data = response.json()
+        self.assertEqual(data['status'], 'error')
+        self.assertEqual(
+            data['checks']['db:default'], {'status': 'error', 'error': 'OperationalError', 'required': True},
+        )
+
+    def test_optional_database_failure_stays_ready(self):
+        checks = {'default': {'status': 'ok'}, 'replica': {'status': 'error', 'error': 'OperationalError'}}
+        with mock.patch.object(health, 'connections', {'default': connections['default'], 'replica': None}), \
+                mock.patch.object(health, 'check_database', side_effect=lambda alias: checks[alias]):
+            result = health.probe()
+
+        self.assertEqual(result['status'], 'ok')
+        self.assertFalse(result['checks']['db:replica']['required'])
@@ -0,0 +1,167 @@
+"""
+Tests for the background job queue (core.jobs), the run_jobs worker command
+and the admin-tools job endpoints.
+"""
+import time
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, Client
+from django.utils import timezone
+from core.jobs import STALE_JOB_SECONDS, Heartbeat, UnknownCommand, claim_next_job, enqueue, run_job
+from core.models import ABTestEvent, BackgroundJob
+from core.traffic import CLASSIFIER_VERSION, TRAFFIC_CLASS_BOT
+
+
+class JobQueueTest(TestCase):
+    """Test enqueue/claim/run."""
+
+    def test_enqueue_rejects_unknown_command(self):
+        with self.assertRaises(UnknownCommand):
+            enqueue('no_such_command')
+
+    def test_enqueue_rejects_commands_outside_allowlist(self):
+        for command in ('flush', 'shell', 'migrate', 'run_jobs'):
+            with self.assertRaises(UnknownCommand):
+                enqueue(command)
+
+    def test_dedupe_returns_pending_job(self):
+        first = enqueue('ab_refresh_rollups', dedupe=True)
+        self.assertEqual(enqueue('ab_refresh_rollups', dedupe=True), first)
+        self.assertNotEqual(enqueue('ab_refresh_rollups', options={'rebuild': True}, dedupe=True), first)
+
+    def test_dead_worker_job_is_reaped_before_dedupe_and_claim(self):
+        dead = enqueue('ab_purge_bots', dedupe=True)
+        self.assertEqual(claim_next_job('dead-worker').pk, dead.pk)
+        BackgroundJob.objects.filter(pk=dead.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=STALE_JOB_SECONDS + 1),
+        )
+
+        fresh = enqueue('ab_purge_bots', dedupe=True)
+
+        self.assertNotEqual(fresh.pk, dead.pk)
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, BackgroundJob.STATUS_FAILED)
+        self.assertIn('no heartbeat', dead.error)
+        self.assertEqual(claim_next_job('test-worker').pk, fresh.pk)
+
+    def test_live_running_job_is_not_reaped(self):
+        job = enqueue('ab_purge_bots', dedupe=True)
+        claim_next_job('test-worker')
+
+        self.assertEqual(enqueue('ab_purge_bots', dedupe=True).pk, job.pk)
+
+    def test_claim_and_run(self):
+        job = enqueue('ab_refresh_rollups', options={'batch_size': 10})
+
+        claimed = claim_next_job('test-worker')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, BackgroundJob.STATUS_RUNNING)
+        self.assertIsNone(claim_next_job('test-worker'))
+
+        finished = run_job(claimed)
+        self.assertEqual(finished.status, BackgroundJob.STATUS_SUCCEEDED)
+        self.assertIn('Rollups v', finished.output)
+        self.assertIsNotNone(finished.finished_at)
+
+    def test_failed_command_records_traceback(self):
+        job = enqueue('ab_timeseries', options={'since': 'not a date'})
+        finished = run_job(claim_next_job())
+        self.assertEqual(finished.pk, job.pk)
+        self.assertEqual(finished.status, BackgroundJob.STATUS_FAILED)
+        self.assertIn('Traceback', finished.error)
+
+    def test_run_jobs_command(self):
+        enqueue('ab_refresh_rollups')
+        enqueue('ab_refresh_rollups', options={'rebuild': True})
+
+        out = StringIO()
+        call_command('run_jobs', once=True, stdout=out)
+
+        self.assertIn('Ran 2 job(s)', out.getvalue())
+        self.assertEqual(BackgroundJob.objects.filter(status=BackgroundJob.STATUS_SUCCEEDED).count(), 2)
+
+
+class HeartbeatTest(TransactionTestCase):
+    """Test the side-thread heartbeat (committed rows, so the thread can see them)."""
+
+    def test_heartbeat_moves_while_job_runs(self):
+        job = enqueue('ab_refresh_rollups')
+        claim_next_job('test-worker')
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        with Heartbeat(job.pk, interval=0.01):
+            time.sleep(0.2)
+
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat_at, timezone.now() - timedelta(minutes=1))
+
+
+class JobEndpointsTest(TestCase):
+    """Test the admin-tools endpoints."""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser(username='admin', email='admin@test.com', password='testpass123')
+        self.client.login(username='admin', password='testpass123')
+
+    def test_purge_endpoint_queues_instead_of_running(self):
+        ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks',
+            variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+            session_id='s' * 32,
+            traffic_class=TRAFFIC_CLASS_BOT,
+            classifier_version=CLASSIFIER_VERSION,
+        )
+
+        response = self.client.get('/admin-tools/ab-purge-bots/run/')
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data['status'], BackgroundJob.STATUS_QUEUED)
+        self.assertEqual(ABTestEvent.objects.count(), 1)
+
+        # Repeated clicks reuse the pending job
+        self.assertEqual(self.client.get('/admin-tools/ab-purge-bots/run/').json()['job']['id'], data['job']['id'])
+
+        call_command('run_jobs', once=True, stdout=StringIO())
+        status = self.client.get(data['status_url']).json()
+        self.assertEqual(status['status'], BackgroundJob.STATUS_SUCCEEDED)
+        self.assertEqual(ABTestEvent.objects.count(), 0)
+
+        log = self.client.get(data['log_url'], {'lines': 2}).json()
+        self.assertTrue(log['finished'])
+        self.assertLessEqual(len(log['output'].splitlines()), 2)
+
+    def test_start_and_incremental_log(self):
+        response = self.client.post(
+            '/admin-tools/jobs/start/',
+            {'command': 'ab_refresh_rollups', 'options': {'rebuild': True}},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job']['id']
+        self.assertEqual(BackgroundJob.objects.get(pk=job_id).options, {'rebuild': True})
+
+        call_command('run_jobs', once=True, stdout=StringIO())
+        log = self.client.get(f'/admin-tools/jobs/{job_id}/log/', {'offset': 0}).json()
+        self.assertIn('Dropped existing rollups', log['output'])
+        self.assertEqual(log['next_offset'], len(BackgroundJob.objects.get(pk=job_id).output))
+
+    def test_start_validation(self):
+        for command in ('no_such_command', 'flush'):
+            response = self.client.post(
+                '/admin-tools/jobs/start/', {'command': command}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(BackgroundJob.objects.exists())
+
+    def test_start_requires_superuser(self):
+        User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        client = Client()
+        client.login(username='staff', password='testpass123')
+        response = client.post(
+            '/admin-tools/jobs/start/', {'command': 'ab_refresh_rollups'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,92 @@
+"""
+Tests for the gunicorn load-testing harness (benchmarks.loadtest) and the
+loadtest command.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+from benchmarks.loadtest import LoadTestError, SQLiteLockProbe, parse_mix, summarise
+from core.models import ABTestEvent, Category, Post
+
+
+class ParseMixTest(SimpleTestCase):
+    """Test traffic-mix parsing."""
+
+    def test_parses_weights(self):
+        self.assertEqual(parse_mix('browse=3, abtest=1'), {'browse': 3.0, 'abtest': 1.0})
+
+    def test_rejects_unknown_or_empty_mix(self):
+        for text in ('browse=1,crawl=2', 'browse=x', 'browse=0', ''):
+            with self.assertRaises(LoadTestError):
+                parse_mix(text)
+
+
+class SummariseTest(SimpleTestCase):
+    """Test per-endpoint aggregation."""
+
+    def test_throughput_percentiles_and_errors(self):
+        samples = [('home', 200, 0.010, True, None)] * 9 + [('home', 500, 0.100, False, None)]
+        samples += [('search', 0, 0.5, False, 'ConnectionRefusedError: nope')]
+
+        report = summarise(samples, duration=2.0)
+
+        home = report['endpoints'][0]
+        self.assertEqual(home['endpoint'], 'home')
+        self.assertEqual(home['requests'], 10)
+        self.assertEqual(home['rps'], 5.0)
+        self.assertEqual(home['error_rate'], 0.1)
+        self.assertEqual(home['p50_ms'], 10.0)
+        self.assertEqual(home['statuses'], {'200': 9, '500': 1})
+        self.assertEqual(report['total']['requests'], 11)
+        self.assertEqual(report['sample_errors'], ['ConnectionRefusedError: nope'])
+
+
+class SQLiteLockProbeTest(SimpleTestCase):
+    """Test the SQLite write-lock probe."""
+
+    def test_measures_wait_behind_a_writer(self):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        writer = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        writer.execute('CREATE TABLE t (x INTEGER)')
+        writer.execute('BEGIN IMMEDIATE')
+
+        probe = SQLiteLockProbe(path, interval=0.01, timeout=5.0)
+        probe.start()
+        release = threading.Timer(0.3, writer.execute, ['ROLLBACK'])
+        release.start()
+        release.join()
+        probe.stop()
+        writer.close()
+
+        summary = probe.summary()
+        self.assertGreaterEqual(summary['probes'], 1)
+        self.assertEqual(summary['timeouts'], 0)
+        self.assertGreater(summary['max_wait_ms'], 100)
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    """Test a short run against the live test server."""
+
+    def test_reports_endpoints_and_cleans_up(self):
+        out = StringIO()
+        call_command(
+            'loadtest', url=self.live_server_url, duration=1, processes=1, concurrency=1,
+            approvals=5, mix='browse=1,abtest=1,submit=1,approve=1', stdout=out,
+        )
+
+        output = out.getvalue()
+        for endpoint in ('home', 'abtest', 'submit_post', 'TOTAL'):
+            self.assertIn(endpoint, output)
+        self.assertFalse(Post.objects.filter(slug__startswith='loadtest-').exists())
+        self.assertEqual(ABTestEvent.objects.count(), 0)
+        # The bench_* data set was seeded by this run, so it goes too
+        self.assertFalse(Post.objects.filter(slug__startswith='bench-').exists())
+        self.assertFalse(Category.objects.filter(slug__startswith='bench-').exists())
+        self.assertFalse(User.objects.filter(username__startswith='bench_').exists())
@@ -0,0 +1,147 @@
+"""
+Tests for the Prometheus /metrics endpoint (core.views_metrics,
+core.prometheus) and the multi-worker snapshot store in core.metrics.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from core.metrics import REGISTRY, MetricsRegistry
+from core.models import ABTestEvent
+from core.rollups import refresh_rollups
+
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def scrape(text):
+    """
+    Parse Prometheus text format the way a scraper would, failing on any
+    malformed line. Returns {(name, frozenset(labels)): float} and {family: type}.
+    """
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, family, kind = line.split(' ', 3)
+            assert kind in ('counter', 'gauge', 'histogram'), line
+            types[family] = kind
+            continue
+        if line.startswith('#') or not line:
+            continue
+        match = SAMPLE_RE.match(line)
+        assert match, f'malformed sample: {line!r}'
+        name, _, labels, value = match.groups()
+        family = re.sub(r'_(bucket|sum|count)$', '', name) if name not in types else name
+        assert family in types, f'sample before its TYPE: {line!r}'
+        samples[(name, frozenset(LABEL_RE.findall(labels or '')))] = float(value)
+    return samples, types
+
+
+def check_histograms(samples, types):
+    for family, kind in types.items():
+        if kind != 'histogram':
+            continue
+        series = {}
+        for (name, labels), value in samples.items():
+            if name == f'{family}_bucket':
+                le = dict(labels)['le']
+                series.setdefault(labels - {('le', le)}, []).append((float(le), value))
+        for labels, buckets in series.items():
+            counts = [count for _, count in sorted(buckets)]
+            assert counts == sorted(counts), f'{family} buckets not cumulative'
+            assert counts[-1] == samples[(f'{family}_count', labels)], f'{family} +Inf != _count'
+
+
+@override_settings(METRICS_TOKEN='scrape-secret', METRICS_FLUSH_SECONDS=0)
+class MetricsEndpointTest(TestCase):
+    """Test /metrics output, access control and worker aggregation."""
+
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir)
+        settings_override = override_settings(METRICS_DIR=self.metrics_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        REGISTRY.reset()
+        self.addCleanup(REGISTRY.reset)
+
+    def get_metrics(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples, types = scrape(response.content.decode())
+        check_histograms(samples, types)
+        return samples, types
+
+    def test_requires_staff_or_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 302)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 302)
+
+        staff = User.objects.create_user(username='staff', password='x', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_request_cache_and_worker_metrics(self):
+        self.client.get('/')
+        self.client.get('/')
+        cache.set('metrics-test', 1)
+        cache.get('metrics-test')
+        cache.get('metrics-test-missing')
+
+        samples, types = self.get_metrics()
+
+        home = frozenset({('view', 'core:home'), ('status', '200')})
+        self.assertEqual(samples[('http_requests_total', home)], 2)
+        self.assertEqual(samples[('http_request_duration_seconds_count', home)], 2)
+        self.assertEqual(types['http_request_duration_seconds'], 'histogram')
+        self.assertGreater(samples[('db_queries_per_request_sum', frozenset({('view', 'core:home')}))], 0)
+        self.assertGreaterEqual(samples[('cache_requests_total', frozenset({('result', 'hit')}))], 1)
+        self.assertGreaterEqual(samples[('cache_requests_total', frozenset({('result', 'miss')}))], 1)
+        self.assertGreater(samples[('process_resident_memory_bytes', frozenset({('pid', str(os.getpid()))}))], 0)
+
+    def test_merges_other_worker_snapshots(self):
+        other = MetricsRegistry()
+        other.record('core:home', 200, 0.02, 100)
+        other.record('core:home', 500, 3.0, 100)
+        with open(os.path.join(self.metrics_dir, 'worker-999999999.json'), 'w') as fh:
+            json.dump({'pid': 999999999, 'rss_bytes': 1, 'written_at': 0, 'state': other.to_state()}, fh)
+        self.client.get('/')
+
+        samples, _ = self.get_metrics()
+
+        self.assertEqual(samples[('http_requests_total', frozenset({('view', 'core:home'), ('status', '200')}))], 2)
+        self.assertEqual(samples[('http_requests_total', frozenset({('view', 'core:home'), ('status', '500')}))], 1)
+        self.assertEqual(samples[('metrics_workers', frozenset({('state', 'exited')}))], 1)
+        self.assertNotIn(('process_resident_memory_bytes', frozenset({('pid', '999999999')})), samples)
+
+    def test_ab_rollup_backlog_and_refresh_latency(self):
+        ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks', variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE, endpoint='/218b7ae/', session_id='s1',
+        )
+        samples, _ = self.get_metrics()
+        self.assertEqual(samples[('ab_rollup_backlog_events', frozenset())], 1)
+
+        refresh_rollups()
+        samples, _ = self.get_metrics()
+        self.assertEqual(samples[('ab_rollup_backlog_events', frozenset())], 0)
+        self.assertEqual(samples[('ab_rollup_refresh_seconds_count', frozenset())], 1)
+        self.assertIn(('ab_rollup_last_refresh_timestamp_seconds', frozenset()), samples)
+
+    def test_refresh_latency_from_another_process(self):
+        ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks', variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE, endpoint='/218b7ae/', session_id='s1',
+        )
+        # As in run_jobs: the refresh's in-memory registry is not this worker's
+        with mock.patch('core.rollups.REGISTRY', MetricsRegistry()):
+            refresh_rollups()
+
+        samples, _ = self.get_metrics()
+        self.assertNotIn(('ab_rollup_refresh_seconds_count', frozenset()), samples)
+        self.assertGreater(samples[('ab_rollup_last_refresh_duration_seconds', frozenset())], 0)
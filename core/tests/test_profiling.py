@@ -0,0 +1,117 @@
+"""
+Tests for on-demand request profiling (core.profiling, RequestProfilingMiddleware).
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core.models import Category, RequestProfile
+from core.profiling import StackSampler, load_stats
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class StackSamplerTest(TestCase):
+    """Test the sampling profiler on its own."""
+
+    def test_collapsed_stacks_name_the_running_function(self):
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        busy_loop(0.1)
+        sampler.stop()
+
+        self.assertGreater(sampler.samples, 0)
+        lines = sampler.collapsed().splitlines()
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertTrue(count.isdigit())
+        self.assertIn('busy_loop (core/tests/test_profiling.py:', stack)
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines), sampler.samples)
+        self.assertIn('busy_loop', sampler.summary())
+
+
+@override_settings(
+    PROFILE_SAMPLE_RATE=0.0,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+class RequestProfilingMiddlewareTest(TestCase):
+    """Test the ?_profile= flag, sampling and the admin downloads."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Housing', slug='housing')
+        self.staff = User.objects.create_superuser(username='admin', password='x')
+        self.url = reverse('core:category_list', args=['housing'])
+
+    def test_staff_flag_stores_cprofile_run(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {'_profile': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(response['X-Profile-Id'], str(profile.pk))
+        self.assertEqual((profile.mode, profile.trigger), ('cprofile', 'flag'))
+        self.assertEqual(profile.view_name, 'core:category_list')
+        self.assertEqual(profile.user, self.staff)
+        self.assertIn('cumulative', profile.summary)
+        functions = {name for _, _, name in load_stats(profile.data).stats}
+        self.assertIn('category_list', functions)
+
+    def test_sample_flag_stores_collapsed_stacks(self):
+        self.client.force_login(self.staff)
+        self.client.get(self.url, {'_profile': 'sample'})
+
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.mode, 'sample')
+        self.assertIsNone(profile.data)
+        self.assertIn('samples every', profile.summary)
+
+    def test_flag_ignored_for_anonymous_and_non_staff(self):
+        self.client.get(self.url, {'_profile': '1'})
+        User.objects.create_user(username='reader', password='x')
+        self.client.login(username='reader', password='x')
+        response = self.client.get(self.url, {'_profile': '1'})
+
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0, PROFILE_SAMPLE_MODE='cprofile')
+    def test_sample_rate_profiles_ordinary_requests(self):
+        response = self.client.get(self.url)
+
+        self.assertNotIn('X-Profile-Id', response)
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.mode, profile.trigger), ('cprofile', 'sampled'))
+        self.assertIsNone(profile.user)
+
+    @override_settings(PROFILE_KEEP=2)
+    def test_only_newest_profiles_are_kept(self):
+        self.client.force_login(self.staff)
+        for _ in range(3):
+            self.client.get(self.url, {'_profile': '1'})
+
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+    def test_admin_lists_and_downloads_profiles(self):
+        self.client.force_login(self.staff)
+        self.client.get(self.url, {'_profile': '1'})
+        self.client.get(self.url, {'_profile': 'sample'})
+        cprofile_run = RequestProfile.objects.get(mode='cprofile')
+        sampler_run = RequestProfile.objects.get(mode='sample')
+
+        response = self.client.get(reverse('admin:core_requestprofile_changelist'))
+        self.assertContains(response, cprofile_run.download_name)
+        response = self.client.get(reverse('admin:core_requestprofile_change', args=[cprofile_run.pk]))
+        self.assertContains(response, 'cumulative')
+
+        response = self.client.get(reverse('admin:core_requestprofile_download', args=[cprofile_run.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'filename="profile-{cprofile_run.pk}.prof"', response['Content-Disposition'])
+        self.assertEqual(response.content, bytes(cprofile_run.data))
+
+        response = self.client.get(reverse('admin:core_requestprofile_download', args=[sampler_run.pk]))
+        self.assertIn('.collapsed"', response['Content-Disposition'])
+        self.assertEqual(response.content.decode(), sampler_run.collapsed)
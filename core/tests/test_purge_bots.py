@@ -0,0 +1,110 @@
+"""
+Tests for the chunked, resumable ab_purge_bots management command.
+"""
+from django.test import TestCase
+from django.core.management import call_command
+from io import StringIO
+from core.models import ABTestEvent, MaintenanceCheckpoint
+from core.traffic import CLASSIFIER_VERSION, TRAFFIC_CLASS_HUMAN, TRAFFIC_CLASS_BOT
+
+
+class PurgeBotsCommandTest(TestCase):
+    """Test batching, checkpointing and resume behaviour of ab_purge_bots."""
+
+    def setUp(self):
+        ABTestEvent.objects.all().delete()
+        self.events = []
+        for i in range(20):
+            self.events.append(ABTestEvent.objects.create(
+                experiment_name='button_label_kudos_vs_thanks',
+                variant='kudos',
+                event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                session_id=f'session_{i:04d}_' + 'x' * 20,
+                traffic_class=TRAFFIC_CLASS_BOT if i % 2 else TRAFFIC_CLASS_HUMAN,
+                classifier_version=CLASSIFIER_VERSION,
+            ))
+
+    def _purge(self, **kwargs):
+        out = StringIO()
+        call_command('ab_purge_bots', sleep=0, stdout=out, **kwargs)
+        return out.getvalue()
+
+    def test_deletes_in_batches_and_clears_checkpoint(self):
+        output = self._purge(batch_size=3)
+
+        self.assertEqual(ABTestEvent.objects.count(), 10)
+        self.assertFalse(ABTestEvent.objects.filter(traffic_class=TRAFFIC_CLASS_BOT).exists())
+        self.assertIn('Total deleted: 10 events', output)
+        self.assertIn('rows/sec', output)
+        self.assertGreaterEqual(output.count('   ids '), 7)  # 20 ids / 3 per batch
+        self.assertFalse(MaintenanceCheckpoint.objects.filter(name='ab_purge_bots').exists())
+
+    def test_time_budget_leaves_checkpoint(self):
+        output = self._purge(batch_size=3, max_seconds=0)
+
+        self.assertIn('Run again to resume', output)
+        self.assertEqual(ABTestEvent.objects.count(), 20)
+        self.assertTrue(MaintenanceCheckpoint.objects.filter(name='ab_purge_bots').exists())
+
+    def test_resume_continues_from_checkpoint(self):
+        midpoint = self.events[9].id
+        MaintenanceCheckpoint.objects.create(
+            name='ab_purge_bots',
+            last_id=midpoint,
+            state={'max_id': self.events[-1].id, 'burst_minutes': [], 'totals': {'classified': 5, 'burst': 0}},
+        )
+
+        output = self._purge(batch_size=4)
+
+        self.assertIn('Resuming from checkpoint', output)
+        # Bots at or below the checkpoint are untouched, bots above it are gone
+        self.assertEqual(ABTestEvent.objects.filter(traffic_class=TRAFFIC_CLASS_BOT).count(), 5)
+        self.assertFalse(
+            ABTestEvent.objects.filter(traffic_class=TRAFFIC_CLASS_BOT, id__gt=midpoint).exists()
+        )
+        self.assertIn('Total deleted: 10 events', output)  # 5 carried over + 5 this run
+        self.assertFalse(MaintenanceCheckpoint.objects.filter(name='ab_purge_bots').exists())
+
+    def test_restart_ignores_checkpoint(self):
+        MaintenanceCheckpoint.objects.create(
+            name='ab_purge_bots',
+            last_id=self.events[-1].id,
+            state={'max_id': self.events[-1].id, 'burst_minutes': [], 'totals': {'classified': 0, 'burst': 0}},
+        )
+
+        self._purge(restart=True)
+
+        self.assertEqual(ABTestEvent.objects.count(), 10)
+
+    def test_dry_run_deletes_nothing(self):
+        output = self._purge(dry_run=True)
+
+        self.assertIn('DRY RUN: Would delete 10 events', output)
+        self.assertEqual(ABTestEvent.objects.count(), 20)
+        self.assertFalse(MaintenanceCheckpoint.objects.exists())
+
+    def test_dry_run_restart_keeps_checkpoint(self):
+        MaintenanceCheckpoint.objects.create(
+            name='ab_purge_bots',
+            last_id=self.events[9].id,
+            state={'max_id': self.events[-1].id, 'totals': {'classified': 5, 'burst': 0}},
+        )
+
+        self._purge(dry_run=True, restart=True)
+
+        self.assertEqual(MaintenanceCheckpoint.objects.get(name='ab_purge_bots').last_id, self.events[9].id)
+
+    def test_burst_scan_counts_against_time_budget(self):
+        # 21 events in one minute: enough for the pre-scan to have work to do
+        ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks',
+            variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+            session_id='session_extra_' + 'x' * 20,
+            classifier_version=CLASSIFIER_VERSION,
+        )
+        output = self._purge(max_seconds=0)
+
+        self.assertIn('Burst scan stopped', output)
+        self.assertIn('Run again to resume', output)
+        self.assertEqual(ABTestEvent.objects.count(), 21)
@@ -0,0 +1,74 @@
+"""
+Tests for the per-request instrumentation middleware (core.middleware) and
+the in-memory histograms behind it (core.metrics).
+"""
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.metrics import REGISTRY, Histogram
+from core.models import Category, Post
+
+
+class HistogramTest(SimpleTestCase):
+    """Test bucket counting and quantile estimates."""
+
+    def test_buckets_and_quantiles(self):
+        hist = Histogram((1, 2, 5))
+        for value in (0.5, 1, 1.5, 2, 4, 9):
+            hist.observe(value)
+
+        self.assertEqual(hist.cumulative(), [(1, 2), (2, 4), (5, 5), (float('inf'), 6)])
+        self.assertEqual(hist.count, 6)
+        self.assertEqual(hist.sum, 18)
+        self.assertAlmostEqual(hist.quantile(0.5), 1.5)
+        self.assertEqual(hist.quantile(1.0), 5)
+        self.assertIsNone(Histogram((1,)).quantile(0.5))
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0, SLOW_REQUEST_MS=60000)
+class RequestMetricsMiddlewareTest(TestCase):
+    """Test what the middleware records per view."""
+
+    def setUp(self):
+        REGISTRY.reset()
+        self.addCleanup(REGISTRY.reset)
+        author = User.objects.create_user(username='author', password='x')
+        category = Category.objects.create(name='Housing', slug='housing')
+        for i in range(3):
+            Post.objects.create(
+                title=f'Post {i}', slug=f'post-{i}', content='Body', category=category,
+                author=author, status='approved',
+            )
+
+    def test_records_view_latency_queries_and_size(self):
+        response = self.client.get('/')
+        self.client.get('/')
+
+        metrics = dict(REGISTRY.views())['core:home']
+        self.assertEqual(metrics.requests, 2)
+        self.assertEqual(metrics.sampled, 2)
+        self.assertEqual(metrics.duration.count, 2)
+        self.assertGreater(metrics.queries.sum, 0)
+        self.assertGreater(metrics.db_time.sum, 0)
+        self.assertEqual(metrics.response_size.sum, 2 * len(response.content))
+        self.assertIn('core:home', REGISTRY.summary())
+
+    def test_unsampled_requests_skip_query_tracing(self):
+        with self.settings(REQUEST_METRICS_SAMPLE_RATE=0.0):
+            self.client.get('/')
+
+        metrics = dict(REGISTRY.views())['core:home']
+        self.assertEqual(metrics.requests, 1)
+        self.assertEqual(metrics.sampled, 0)
+        self.assertEqual(metrics.queries.count, 0)
+
+    def test_unresolved_paths_are_grouped(self):
+        self.client.get('/no/such/page/')
+
+        self.assertIn('<unresolved>', dict(REGISTRY.views()))
+
+    def test_slow_requests_are_logged_with_top_queries(self):
+        with self.settings(SLOW_REQUEST_MS=0), self.assertLogs('core.requests', 'WARNING') as logs:
+            self.client.get('/')
+
+        self.assertIn('Slow request GET / (core:home) 200', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
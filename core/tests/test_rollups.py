@@ -0,0 +1,268 @@
+"""
+Tests for the hourly A/B rollups and the sequential (mSPRT) analysis built on them.
+"""
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from core.models import ABHourlyRollup, ABRollupState, ABSequentialState, ABTestEvent
+from core.bursts import mark_suspect
+from core.rollups import affected_cells, invalidate_rollups, refresh_rollups, rollup_queryset
+from core.sequential import sequential_analysis
+from core.stats import msprt_looks
+from core.traffic import TRAFFIC_CLASS_BOT
+
+
+EXPERIMENT = 'button_label_kudos_vs_thanks'
+BASE_HOUR = datetime(2025, 12, 1, 10, tzinfo=dt_timezone.utc)
+
+
+def create_event(variant, event_type, session_id, hours=0, minutes=0, **kwargs):
+    """Create an event and backdate it (created_at is auto_now_add)."""
+    event = ABTestEvent.objects.create(
+        experiment_name=EXPERIMENT,
+        variant=variant,
+        event_type=event_type,
+        session_id=session_id,
+        **kwargs,
+    )
+    moment = BASE_HOUR + timedelta(hours=hours, minutes=minutes)
+    ABTestEvent.objects.filter(pk=event.pk).update(created_at=moment, created_minute=moment.replace(second=0))
+    return event
+
+
+def rollup_totals(**filters):
+    rows = rollup_queryset(EXPERIMENT, **filters)
+    return {
+        (row.variant, row.hour): (row.exposures, row.conversions, row.converting_sessions)
+        for row in rows
+    }
+
+
+class RefreshRollupsTest(TestCase):
+    """Test incremental folding of events into ABHourlyRollup."""
+
+    def test_counts_per_hour_and_first_conversions(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_CONVERSION, 's1' * 10, minutes=5)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_CONVERSION, 's1' * 10, hours=1)
+        create_event('thanks', ABTestEvent.EVENT_TYPE_EXPOSURE, 's2' * 10, hours=1)
+
+        refresh_rollups()
+
+        self.assertEqual(rollup_totals(), {
+            ('kudos', BASE_HOUR): (1, 1, 1),
+            ('kudos', BASE_HOUR + timedelta(hours=1)): (0, 1, 0),
+            ('thanks', BASE_HOUR + timedelta(hours=1)): (1, 0, 0),
+        })
+
+    def test_refresh_only_reads_new_events(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_CONVERSION, 's1' * 10)
+        refresh_rollups(batch_size=1)
+        state = ABRollupState.load()
+        self.assertEqual(state.high_water_mark, ABTestEvent.objects.get().pk)
+
+        # A repeat conversion in a later refresh is not a new converting session
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_CONVERSION, 's1' * 10)
+        refresh_rollups(batch_size=1)
+
+        self.assertEqual(rollup_totals(), {('kudos', BASE_HOUR): (1, 2, 1)})
+
+    def test_non_human_traffic_is_kept_separate(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 'b1' * 10, traffic_class=TRAFFIC_CLASS_BOT)
+
+        refresh_rollups()
+
+        self.assertEqual(rollup_totals(), {('kudos', BASE_HOUR): (1, 0, 0)})
+        self.assertEqual(rollup_totals(include_non_human=True)[('kudos', BASE_HOUR)][0], 1)
+        self.assertEqual(ABHourlyRollup.objects.count(), 2)
+
+    def test_invalidate_bumps_version_and_rebuilds(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+        version = refresh_rollups().version
+
+        state = invalidate_rollups()
+
+        self.assertEqual(state.version, version + 1)
+        self.assertEqual(ABHourlyRollup.objects.count(), 0)
+        refresh_rollups()
+        self.assertEqual(rollup_totals(), {('kudos', BASE_HOUR): (1, 0, 0)})
+
+    def test_invalidating_cells_refolds_only_those_hours(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+        bot = create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's2' * 10, hours=1)
+        create_event('thanks', ABTestEvent.EVENT_TYPE_EXPOSURE, 's3' * 10, hours=2)
+        version = refresh_rollups().version
+        untouched = set(ABHourlyRollup.objects.exclude(hour=BASE_HOUR + timedelta(hours=1)).values_list('pk', flat=True))
+
+        events = ABTestEvent.objects.filter(pk=bot.pk)
+        cells = affected_cells(events)
+        events.update(traffic_class=TRAFFIC_CLASS_BOT)
+        state = invalidate_rollups(cells)
+
+        self.assertEqual(cells, {(EXPERIMENT, BASE_HOUR + timedelta(hours=1))})
+        self.assertEqual(state.version, version + 1)
+        self.assertEqual(state.high_water_mark, ABTestEvent.objects.latest('pk').pk)
+        self.assertEqual(set(ABHourlyRollup.objects.exclude(hour=BASE_HOUR + timedelta(hours=1)).values_list('pk', flat=True)), untouched)
+        self.assertEqual(rollup_totals(), {
+            ('kudos', BASE_HOUR): (1, 0, 0),
+            ('thanks', BASE_HOUR + timedelta(hours=2)): (1, 0, 0),
+        })
+
+    def test_first_conversion_moves_to_a_later_hour(self):
+        first = create_event('kudos', ABTestEvent.EVENT_TYPE_CONVERSION, 's1' * 10)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_CONVERSION, 's1' * 10, hours=3)
+        refresh_rollups()
+
+        mark_suspect([first.pk])
+
+        self.assertEqual(rollup_totals(), {
+            ('kudos', BASE_HOUR + timedelta(hours=3)): (0, 1, 1),
+        })
+        self.assertEqual(rollup_totals(include_non_human=True)[('kudos', BASE_HOUR)], (0, 1, 1))
+
+    def test_purge_invalidates_rollups(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 'b1' * 10, traffic_class=TRAFFIC_CLASS_BOT)
+        version = refresh_rollups().version
+
+        call_command('ab_purge_bots', burst_hours=0, sleep=0, stdout=StringIO())
+
+        self.assertEqual(ABRollupState.load().version, version + 1)
+
+    def test_refresh_command(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+
+        out = StringIO()
+        call_command('ab_refresh_rollups', stdout=out)
+
+        self.assertIn('1 rows', out.getvalue())
+
+
+class MsprtTest(SimpleTestCase):
+    """Test the mixture SPRT statistic."""
+
+    def test_no_difference_is_not_significant(self):
+        look = msprt_looks(100, 1000, 100, 1000)
+        self.assertEqual(look.p_value, 1.0)
+        self.assertLess(look.ci_lower, 0)
+        self.assertGreater(look.ci_upper, 0)
+
+    def test_large_difference_is_significant_and_wider_than_fixed_horizon(self):
+        look = msprt_looks(100, 2000, 200, 2000)
+        self.assertLess(look.p_value, 0.001)
+        self.assertGreater(look.ci_lower, 0)
+        self.assertLess(look.ci_lower, 0.05)
+
+    def test_empty_look_is_uninformative(self):
+        look = msprt_looks([0, 10], [0, 100], [0, 20], [0, 100])
+        self.assertEqual(look.p_value[0], 1.0)
+
+
+class SequentialAnalysisTest(TestCase):
+    """Test incremental sequential analysis from rollups."""
+
+    def _traffic(self, hour, kudos_conversions, thanks_conversions, sessions=50):
+        for variant, conversions in (('kudos', kudos_conversions), ('thanks', thanks_conversions)):
+            for i in range(sessions):
+                session_id = f'{variant}-{hour}-{i:03d}' + 'x' * 12
+                create_event(variant, ABTestEvent.EVENT_TYPE_EXPOSURE, session_id, hours=hour)
+                if i < conversions:
+                    create_event(variant, ABTestEvent.EVENT_TYPE_CONVERSION, session_id, hours=hour)
+
+    def test_state_only_folds_completed_hours(self):
+        self._traffic(0, 5, 25)
+        self._traffic(1, 5, 25)
+        now = BASE_HOUR + timedelta(hours=1, minutes=30)
+
+        result = sequential_analysis(EXPERIMENT, tau=0.2, now=now)
+
+        self.assertEqual((result.variant_a, result.variant_b), ('kudos', 'thanks'))
+        self.assertEqual((result.exposures_a, result.conversions_b), (100, 50))
+        self.assertEqual(result.looks, 2)
+        self.assertEqual(result.last_hour, BASE_HOUR)
+        self.assertLess(result.p_value, 0.05)
+        stored = ABSequentialState.objects.get()
+        self.assertEqual(stored.state['looks'], 1)
+        self.assertEqual(stored.state['counts']['kudos'], [50, 5])
+
+    def test_p_value_never_increases_between_refreshes(self):
+        self._traffic(0, 5, 30)
+        first = sequential_analysis(EXPERIMENT, now=BASE_HOUR + timedelta(hours=1))
+
+        self._traffic(1, 30, 5)
+        second = sequential_analysis(EXPERIMENT, now=BASE_HOUR + timedelta(hours=2))
+
+        self.assertLessEqual(second.p_value, first.p_value)
+        self.assertEqual(second.looks, 2)
+
+    def test_state_is_recomputed_after_rollup_rebuild(self):
+        self._traffic(0, 5, 25)
+        sequential_analysis(EXPERIMENT, now=BASE_HOUR + timedelta(hours=1))
+
+        invalidate_rollups()
+        result = sequential_analysis(EXPERIMENT, now=BASE_HOUR + timedelta(hours=1))
+
+        self.assertEqual(result.looks, 1)
+        self.assertEqual(result.exposures_a, 50)
+
+    def test_single_variant_raises(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+        with self.assertRaises(ValueError):
+            sequential_analysis(EXPERIMENT, now=BASE_HOUR + timedelta(hours=1))
+
+    def test_ab_analyze_sequential_method(self):
+        self._traffic(0, 5, 25)
+
+        out = StringIO()
+        call_command('ab_analyze', method='sequential', tau=0.2, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Sequential Results (mSPRT', output)
+        self.assertIn('Always-valid P-Value', output)
+        self.assertIn('Stop: THANKS wins', output)
+
+
+class TimeseriesCommandTest(TestCase):
+    """Test ab_timeseries output from rollups."""
+
+    def setUp(self):
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's1' * 10)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_CONVERSION, 's1' * 10)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_CONVERSION, 's1' * 10, minutes=10)
+        create_event('kudos', ABTestEvent.EVENT_TYPE_EXPOSURE, 's2' * 10, hours=1)
+        create_event('thanks', ABTestEvent.EVENT_TYPE_EXPOSURE, 's3' * 10, hours=1)
+
+    def test_hourly_json_with_cumulative_rates(self):
+        out = StringIO()
+        call_command('ab_timeseries', granularity='hour', format='json', stdout=out)
+
+        rows = json.loads(out.getvalue())
+        kudos = [row for row in rows if row['variant'] == 'kudos']
+        self.assertEqual([row['exposures'] for row in kudos], [1, 1])
+        self.assertEqual(kudos[0]['conversions'], 2)
+        self.assertEqual(kudos[0]['converting_sessions'], 1)
+        self.assertEqual(kudos[1]['cumulative_exposures'], 2)
+        self.assertEqual(kudos[1]['cumulative_conversion_rate'], 1.0)
+        self.assertEqual(kudos[1]['cumulative_session_conversion_rate'], 0.5)
+
+    def test_daily_csv(self):
+        out = StringIO()
+        call_command('ab_timeseries', granularity='day', format='csv', stdout=out)
+
+        lines = out.getvalue().strip().splitlines()
+        self.assertTrue(lines[0].startswith('period,variant,exposures'))
+        self.assertEqual(len(lines), 3)  # header + one day per variant
+        self.assertIn(',kudos,2,2,1,', lines[1])
+
+    def test_table_output_and_range_filter(self):
+        out = StringIO()
+        call_command('ab_timeseries', granularity='hour', since='2025-12-01T11:00:00+00:00', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('A/B Test Time Series', output)
+        self.assertIn('thanks', output)
+        self.assertNotIn('200.00%', output)
@@ -0,0 +1,51 @@
+"""
+Tests for seed_data's bulk synthetic data options (core.synthetic).
+"""
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from core.models import ABTestEvent, Bookmark, Post
+from core.synthetic import USER_PREFIX
+from core.traffic import TRAFFIC_CLASS_HUMAN
+
+
+class SeedDataScaleTest(TestCase):
+    """Test --scale/--events generation."""
+
+    def seed(self, **options):
+        call_command('seed_data', seed=7, stdout=StringIO(), **options)
+
+    def test_generates_requested_volumes(self):
+        self.seed(scale=0.0002, events=600)
+
+        users = User.objects.filter(username__startswith=USER_PREFIX)
+        self.assertEqual(users.count(), 20)
+        self.assertFalse(users.filter(groups=None).exists())
+
+        posts = Post.objects.filter(slug__startswith='synthetic-post-')
+        self.assertEqual(posts.count(), 200)
+        self.assertFalse(posts.filter(author__isnull=True).exists())
+        self.assertTrue(posts.filter(status='approved', published_at__isnull=False).exists())
+        self.assertTrue(Bookmark.objects.filter(post__in=posts).exists())
+
+        events = ABTestEvent.objects.all()
+        self.assertEqual(events.count(), 600)
+        self.assertTrue(events.filter(traffic_class=TRAFFIC_CLASS_HUMAN).exists())
+        self.assertTrue(events.exclude(traffic_class=TRAFFIC_CLASS_HUMAN).exists())
+        self.assertFalse(events.filter(device_class='').exists())
+        self.assertFalse(events.filter(created_minute__isnull=True).exists())
+
+    def test_rerun_only_adds_events(self):
+        self.seed(scale=0.0001, events=50)
+        self.seed(scale=0.0001, events=50)
+
+        self.assertEqual(User.objects.filter(username__startswith=USER_PREFIX).count(), 10)
+        self.assertEqual(Post.objects.filter(slug__startswith='synthetic-post-').count(), 100)
+        self.assertEqual(ABTestEvent.objects.count(), 100)
+
+    def test_default_run_adds_no_synthetic_data(self):
+        self.seed()
+
+        self.assertFalse(User.objects.filter(username__startswith=USER_PREFIX).exists())
+        self.assertEqual(ABTestEvent.objects.count(), 0)
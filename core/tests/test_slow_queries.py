@@ -0,0 +1,124 @@
+"""
+Tests for the slow-query log (core.slow_queries) and its admin page.
+"""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core import slow_queries
+from core.models import Category, Post, SlowQuery
+from core.slow_queries import WATCHER, fingerprint, flush, is_full_scan, normalize, reset_source, set_source
+
+# Low enough that every statement counts as slow
+EVERYTHING_IS_SLOW = 0.000001
+
+
+class FingerprintTest(TestCase):
+    """Test SQL normalisation."""
+
+    def test_literals_and_in_lists_are_normalised(self):
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s,  %s) LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    def test_full_scan_detection(self):
+        self.assertTrue(is_full_scan('SCAN core_post'))
+        self.assertTrue(is_full_scan('SCAN core_post USING INDEX core_post_created_at'))
+        self.assertFalse(is_full_scan('SEARCH core_post USING INDEX core_post_slug (slug=?)'))
+        self.assertTrue(is_full_scan('[{"Plan": {"Node Type": "Seq Scan"}}]'))
+
+
+@override_settings(
+    SLOW_QUERY_MS=EVERYTHING_IS_SLOW,
+    SLOW_QUERY_FLUSH_SECONDS=0,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+class SlowQueryRecorderTest(TestCase):
+    """Test capture, deduplication and attribution."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='x')
+        self.category = Category.objects.create(name='Housing', slug='housing')
+        Post.objects.create(
+            title='Finding an apartment', slug='apartment', content='Body', category=self.category,
+            author=self.author, status='approved',
+        )
+
+    def tearDown(self):
+        # Drop whatever the test's own queries buffered
+        flush()
+
+    def search_entry(self):
+        return SlowQuery.objects.get(sql__contains='LIKE', sql__icontains='core_post')
+
+    def test_watcher_is_installed(self):
+        self.assertIn(WATCHER, connection.execute_wrappers)
+
+    def test_deduplicates_with_counts_and_explain(self):
+        token = set_source('view:core:home')
+        try:
+            list(Post.objects.filter(title__icontains='apartment'))
+            list(Post.objects.filter(title__icontains='bus'))
+        finally:
+            reset_source(token)
+        flush()
+
+        entry = self.search_entry()
+        self.assertEqual(entry.count, 2)
+        self.assertGreater(entry.total_ms, 0)
+        self.assertGreaterEqual(entry.total_ms, entry.max_ms)
+        self.assertEqual(entry.source, 'view:core:home')
+        self.assertIn("'%bus%'", entry.sample_params)
+        self.assertIn('SCAN core_post', entry.explain)
+        self.assertTrue(is_full_scan(entry.explain))
+        self.assertIsNotNone(entry.explained_at)
+
+    def test_requests_are_attributed_to_the_view(self):
+        self.client.get('/', {'q': 'apartment'})
+        flush()
+
+        self.assertEqual(self.search_entry().source, 'view:core:home')
+
+    def test_disabled_at_zero(self):
+        with self.settings(SLOW_QUERY_MS=0):
+            list(Post.objects.filter(title__icontains='apartment'))
+        flush()
+
+        self.assertFalse(SlowQuery.objects.filter(sql__contains='LIKE').exists())
+
+    def test_nothing_is_written_until_flush(self):
+        list(Post.objects.filter(title__icontains='apartment'))
+
+        self.assertFalse(SlowQuery.objects.filter(sql__contains='LIKE').exists())
+        flush()
+        self.assertTrue(SlowQuery.objects.filter(sql__contains='LIKE').exists())
+
+    def test_flush_merges_into_a_row_another_process_created(self):
+        list(Post.objects.filter(title__icontains='apartment'))
+        key = next(key for key, entry in slow_queries._pending.items() if 'LIKE' in entry['sql'])
+        SlowQuery.objects.create(fingerprint=key, sql='seen elsewhere', count=3, total_ms=30.0, max_ms=10.0)
+        list(Post.objects.filter(title__icontains='bus'))
+        flush()
+
+        entry = SlowQuery.objects.get(fingerprint=key)
+        self.assertEqual(entry.count, 5)
+        self.assertGreater(entry.total_ms, 30.0)
+        self.assertIn('LIKE', entry.sql)
+
+    def test_admin_lists_worst_offenders(self):
+        list(Post.objects.filter(title__icontains='apartment'))
+        flush()
+        admin = User.objects.create_superuser(username='admin', password='x')
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse('admin:core_slowquery_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'core_post')
+
+        response = self.client.get(reverse('admin:core_slowquery_change', args=[self.search_entry().pk]))
+        self.assertContains(response, 'SCAN core_post')
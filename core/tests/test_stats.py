@@ -0,0 +1,250 @@
+"""
+Tests for the shared A/B statistics engine (core.stats).
+"""
+import math
+from io import StringIO
+from statistics import NormalDist
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+import numpy as np
+from core.models import ABTestEvent
+from core.stats import (
+    bayesian_ab_test,
+    beta_posterior,
+    bootstrap_rate_difference,
+    chi2_sf,
+    cohens_h,
+    describe_effect_size,
+    erfc,
+    norm_cdf,
+    norm_ppf,
+    norm_sf,
+    srm_chi_square,
+    two_proportion_ztest,
+    z_critical,
+)
+
+
+class NormalDistributionTest(SimpleTestCase):
+    """Test normal CDF / inverse CDF accuracy against the standard library."""
+
+    def test_ppf_matches_reference_across_range(self):
+        probabilities = np.array([1e-12, 1e-6, 0.001, 0.02425, 0.1, 0.5, 0.8, 0.975, 0.999999])
+        expected = [NormalDist().inv_cdf(p) for p in probabilities]
+        np.testing.assert_allclose(norm_ppf(probabilities), expected, rtol=1e-8)
+
+    def test_ppf_handles_any_confidence_level(self):
+        self.assertAlmostEqual(z_critical(0.95), 1.959963984540054, places=8)
+        self.assertAlmostEqual(z_critical(0.8), NormalDist().inv_cdf(0.9), places=8)
+
+    def test_ppf_edges(self):
+        self.assertEqual(norm_ppf(0.0), -math.inf)
+        self.assertEqual(norm_ppf(1.0), math.inf)
+        self.assertTrue(math.isnan(norm_ppf(1.5)))
+
+    def test_cdf_matches_reference(self):
+        xs = np.linspace(-5, 5, 41)
+        expected = [NormalDist().cdf(x) for x in xs]
+        np.testing.assert_allclose(norm_cdf(xs), expected, rtol=1e-6, atol=1e-12)
+
+    def test_tails_keep_full_precision(self):
+        xs = np.array([-3.0, 0.0, 1.5, 6.0, 9.0, 20.0])
+        np.testing.assert_allclose(erfc(xs), [math.erfc(x) for x in xs], rtol=1e-14)
+        self.assertAlmostEqual(norm_sf(10.0) / 7.61985302416047e-24, 1.0, places=12)
+
+
+class TwoProportionZTestTest(SimpleTestCase):
+    """Test the vectorized two-proportion z-test."""
+
+    def test_scalar_result_matches_textbook_values(self):
+        result = two_proportion_ztest(20, 100, 30, 100)
+
+        self.assertAlmostEqual(result.diff, 0.10)
+        self.assertAlmostEqual(result.relative_lift, 0.5)
+        self.assertAlmostEqual(result.z_score, 1.632993, places=5)
+        self.assertAlmostEqual(result.p_value, 0.102470, places=5)
+        self.assertAlmostEqual(result.ci_lower, -0.019220, places=5)
+        self.assertAlmostEqual(result.ci_upper, 0.219220, places=5)
+        self.assertAlmostEqual(result.cohens_h, cohens_h(0.2, 0.3))
+
+    def test_many_cells_in_one_call(self):
+        rng = np.random.default_rng(7)
+        n = rng.integers(100, 10_000, size=(300, 2))
+        c = rng.binomial(n, 0.1)
+
+        result = two_proportion_ztest(c[:, 0], n[:, 0], c[:, 1], n[:, 1])
+
+        self.assertEqual(result.p_value.shape, (300,))
+        for i in (0, 150, 299):
+            single = two_proportion_ztest(c[i, 0], n[i, 0], c[i, 1], n[i, 1])
+            self.assertAlmostEqual(single.p_value, result.p_value[i])
+
+    def test_empty_cells_are_nan_not_errors(self):
+        result = two_proportion_ztest([0, 5], [0, 50], [3, 0], [30, 50])
+
+        self.assertTrue(np.isnan(result.z_score[0]))
+        self.assertFalse(np.isnan(result.z_score[1]))
+
+    def test_effect_size_labels(self):
+        self.assertEqual(describe_effect_size(0.1), 'negligible')
+        self.assertEqual(describe_effect_size(-0.3), 'small')
+        self.assertEqual(describe_effect_size(0.6), 'medium')
+        self.assertEqual(describe_effect_size(0.9), 'large')
+
+
+class BootstrapTest(SimpleTestCase):
+    """Test bootstrap percentile / BCa intervals over per-session outcomes."""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.control = (rng.random(2000) < 0.10).astype(int)
+        self.treatment = (rng.random(2000) < 0.14).astype(int)
+
+    def test_intervals_agree_with_normal_approximation(self):
+        boot = bootstrap_rate_difference(self.control, self.treatment, iterations=4000, seed=1)
+        wald = two_proportion_ztest(self.control.sum(), 2000, self.treatment.sum(), 2000)
+
+        self.assertAlmostEqual(boot['diff'].estimate, wald.diff)
+        for lower, upper in (boot['diff'].percentile, boot['diff'].bca):
+            self.assertAlmostEqual(lower, wald.ci_lower, delta=0.005)
+            self.assertAlmostEqual(upper, wald.ci_upper, delta=0.005)
+        self.assertLess(boot['lift'].bca[0], boot['lift'].estimate)
+        self.assertGreater(boot['lift'].bca[1], boot['lift'].estimate)
+
+    def test_result_depends_on_seed_not_chunking(self):
+        whole = bootstrap_rate_difference(self.control, self.treatment, iterations=1000, seed=5)
+        chunked = bootstrap_rate_difference(
+            self.control, self.treatment, iterations=1000, seed=5, max_chunk_bytes=160,
+        )
+        again = bootstrap_rate_difference(
+            self.control, self.treatment, iterations=1000, seed=5, max_chunk_bytes=160,
+        )
+
+        self.assertEqual(chunked['iterations'], 1000)
+        self.assertEqual(chunked, again)
+        self.assertAlmostEqual(whole['diff'].bca[0], chunked['diff'].bca[0], delta=0.01)
+
+    def test_workers_get_one_chunk_each(self):
+        with patch('concurrent.futures.ProcessPoolExecutor') as executor:
+            executor.return_value.__enter__.return_value.map = map
+            result = bootstrap_rate_difference(self.control, self.treatment, iterations=1000, seed=5, workers=4)
+
+        executor.assert_called_once_with(max_workers=4)
+        self.assertEqual(result['iterations'], 1000)
+
+    def test_accepts_value_counts(self):
+        raw = bootstrap_rate_difference(self.control, self.treatment, iterations=500, seed=2)
+        counted = bootstrap_rate_difference(
+            (np.array([0, 1]), np.bincount(self.control)),
+            (np.array([0, 1]), np.bincount(self.treatment)),
+            iterations=500,
+            seed=2,
+        )
+        self.assertEqual(raw, counted)
+
+    def test_too_few_sessions_raises(self):
+        with self.assertRaises(ValueError):
+            bootstrap_rate_difference([1], [0, 1], iterations=10)
+
+
+class ChiSquareTest(SimpleTestCase):
+    """Test the chi-square survival function and the SRM test."""
+
+    def test_sf_matches_reference_values(self):
+        self.assertAlmostEqual(chi2_sf(3.841458820694124, 1), 0.05, places=10)
+        self.assertAlmostEqual(chi2_sf(5.991464547107979, 2), 0.05, places=10)
+        self.assertAlmostEqual(chi2_sf(10, 3), 0.018566135463043, places=10)
+        self.assertAlmostEqual(chi2_sf(5, 20), 0.999722648, places=8)
+        self.assertEqual(chi2_sf(0, 4), 1.0)
+
+    def test_one_degree_of_freedom_matches_erfc(self):
+        xs = np.array([0.1, 1, 4, 30, 200])
+        expected = [math.erfc(math.sqrt(x / 2)) for x in xs]
+        np.testing.assert_allclose(chi2_sf(xs, 1), expected, rtol=1e-9)
+
+    def test_srm_over_many_windows_in_one_call(self):
+        result = srm_chi_square([[100, 100], [180, 20], [0, 0]], [0.5, 0.5])
+
+        self.assertEqual(result.df, 1)
+        self.assertAlmostEqual(result.p_value[0], 1.0)
+        self.assertLess(result.p_value[1], 1e-20)
+        self.assertTrue(math.isnan(result.p_value[2]))
+
+    def test_srm_uses_configured_weights(self):
+        self.assertGreater(srm_chi_square([900, 100], [0.9, 0.1]).p_value, 0.5)
+        self.assertEqual(srm_chi_square([50, 50, 3], [1, 1, 0]).p_value, 0.0)
+
+
+class BayesianTest(SimpleTestCase):
+    """Test Beta-Binomial posterior summaries."""
+
+    def test_probability_b_beats_a_matches_normal_approximation(self):
+        result = bayesian_ab_test(200, 1000, 240, 1000, samples=50000, seed=3)
+
+        wald = two_proportion_ztest(200, 1000, 240, 1000)
+        approx = NormalDist().cdf(wald.diff / ((wald.ci_upper - wald.ci_lower) / (2 * 1.959964)))
+        self.assertAlmostEqual(result.prob_b_beats_a, approx, delta=0.01)
+        self.assertLess(result.expected_loss_b, result.expected_loss_a)
+        self.assertLess(result.diff_ci[0], 0.04)
+        self.assertGreater(result.diff_ci[1], 0.04)
+
+    def test_fixed_seed_is_reproducible(self):
+        first = bayesian_ab_test(20, 100, 30, 100, samples=1000, seed=9)
+        second = bayesian_ab_test(20, 100, 30, 100, samples=1000, seed=9)
+        self.assertEqual(first.prob_b_beats_a, second.prob_b_beats_a)
+        self.assertEqual(first.diff_ci, second.diff_ci)
+
+    def test_any_number_of_variants(self):
+        posterior = beta_posterior([10, 30, 12], [100, 100, 100], samples=5000)
+
+        self.assertAlmostEqual(posterior.prob_best.sum(), 1.0)
+        self.assertEqual(int(np.argmax(posterior.prob_best)), 1)
+        self.assertEqual(int(np.argmin(posterior.expected_loss)), 1)
+        self.assertTrue(np.all(posterior.ci_lower < posterior.mean))
+        self.assertTrue(np.all(posterior.ci_upper > posterior.mean))
+
+    def test_more_conversions_than_exposures_is_clipped(self):
+        posterior = beta_posterior([10, 0], [0, 10], samples=100)
+        self.assertTrue(np.all(np.isfinite(posterior.mean)))
+
+
+class AnalyzeCommandOptionsTest(TestCase):
+    """Test ab_analyze --bootstrap and --method=bayes."""
+
+    def setUp(self):
+        for variant, converting in (('kudos', 10), ('thanks', 20)):
+            for i in range(60):
+                session_id = f'{variant}_{i:04d}' + 'x' * 20
+                ABTestEvent.objects.create(
+                    experiment_name='button_label_kudos_vs_thanks',
+                    variant=variant,
+                    event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                    session_id=session_id,
+                )
+                if i < converting:
+                    ABTestEvent.objects.create(
+                        experiment_name='button_label_kudos_vs_thanks',
+                        variant=variant,
+                        event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+                        session_id=session_id,
+                    )
+
+    def test_bootstrap_section_is_reported(self):
+        out = StringIO()
+        call_command('ab_analyze', bootstrap=500, bootstrap_workers=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Bootstrap (500 resamples of sessions, seed 0)', output)
+        self.assertIn('Difference BCa CI', output)
+        self.assertIn('Lift BCa CI', output)
+
+    def test_bayes_method(self):
+        out = StringIO()
+        call_command('ab_analyze', method='bayes', samples=2000, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Bayesian Results (2000 posterior draws, seed 0)', output)
+        self.assertIn('P(thanks > kudos)', output)
+        self.assertIn('Expected loss choosing kudos', output)
+        self.assertNotIn('Z-Score', output)
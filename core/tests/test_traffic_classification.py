@@ -0,0 +1,183 @@
+"""
+Tests for ingest-time traffic classification of A/B test events.
+
+Tests core.traffic rules, classification in the A/B views, and the
+ab_reclassify_traffic / ab_purge_bots commands that rely on the stored verdict.
+"""
+import importlib
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase, Client
+from django.core.management import call_command
+from io import StringIO
+from core.models import ABHourlyRollup, ABRollupState, ABTestEvent
+from core.traffic import (
+    CLASSIFIER_VERSION,
+    TRAFFIC_CLASS_HUMAN,
+    TRAFFIC_CLASS_BOT,
+    TRAFFIC_CLASS_MONITOR,
+    TRAFFIC_CLASS_SUSPECT,
+    classify_traffic,
+)
+
+
+BROWSER_UA = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+SESSION_ID = 'a' * 32
+
+
+class ClassifyTrafficTest(TestCase):
+    """Test the pure classification rules."""
+
+    def test_browser_with_real_session_is_human(self):
+        self.assertEqual(classify_traffic(BROWSER_UA, SESSION_ID), TRAFFIC_CLASS_HUMAN)
+
+    def test_missing_user_agent_is_bot(self):
+        self.assertEqual(classify_traffic('', SESSION_ID), TRAFFIC_CLASS_BOT)
+
+    def test_http_client_is_bot(self):
+        self.assertEqual(classify_traffic('curl/8.4.0', SESSION_ID), TRAFFIC_CLASS_BOT)
+        self.assertEqual(classify_traffic('python-requests/2.31', SESSION_ID), TRAFFIC_CLASS_BOT)
+
+    def test_crawler_is_bot(self):
+        ua = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html) Chrome/120'
+        self.assertEqual(classify_traffic(ua, SESSION_ID), TRAFFIC_CLASS_BOT)
+
+    def test_uptime_checker_is_monitor(self):
+        ua = 'Mozilla/5.0 (compatible; UptimeRobot/2.0) Chrome/120'
+        self.assertEqual(classify_traffic(ua, SESSION_ID), TRAFFIC_CLASS_MONITOR)
+
+    def test_render_session_prefix_is_monitor(self):
+        self.assertEqual(classify_traffic(BROWSER_UA, 'e5e6' + 'b' * 28), TRAFFIC_CLASS_MONITOR)
+
+    def test_short_anonymous_session_is_suspect(self):
+        self.assertEqual(classify_traffic(BROWSER_UA, 'abc'), TRAFFIC_CLASS_SUSPECT)
+
+    def test_short_session_with_user_is_human(self):
+        self.assertEqual(classify_traffic(BROWSER_UA, 'abc', user_id=1), TRAFFIC_CLASS_HUMAN)
+
+
+class IngestClassificationTest(TestCase):
+    """Test that the A/B views store the verdict when events are written."""
+
+    def setUp(self):
+        self.client = Client()
+        ABTestEvent.objects.all().delete()
+
+    def test_exposure_is_classified_at_ingest(self):
+        self.client.get('/218b7ae/', HTTP_USER_AGENT=BROWSER_UA, REMOTE_ADDR='203.0.113.7')
+
+        event = ABTestEvent.objects.get(event_type=ABTestEvent.EVENT_TYPE_EXPOSURE)
+        self.assertEqual(event.traffic_class, TRAFFIC_CLASS_HUMAN)
+        self.assertEqual(event.classifier_version, CLASSIFIER_VERSION)
+        self.assertEqual(event.user_agent, BROWSER_UA)
+        self.assertEqual(event.ip_address, '203.0.113.7')
+
+    def test_click_without_user_agent_is_classified_bot(self):
+        self.client.post('/218b7ae/click/')
+
+        conversion = ABTestEvent.objects.get(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)
+        self.assertEqual(conversion.traffic_class, TRAFFIC_CLASS_BOT)
+        self.assertEqual(conversion.classifier_version, CLASSIFIER_VERSION)
+
+    def test_malformed_forwarded_for_is_ignored(self):
+        self.client.post('/218b7ae/click/', HTTP_USER_AGENT=BROWSER_UA, HTTP_X_FORWARDED_FOR='not-an-ip')
+
+        conversion = ABTestEvent.objects.get(event_type=ABTestEvent.EVENT_TYPE_CONVERSION)
+        self.assertIsNone(conversion.ip_address)
+
+
+class ReclassifyTrafficCommandTest(TestCase):
+    """Test ab_reclassify_traffic management command."""
+
+    def _create(self, session_id, user_agent, **kwargs):
+        return ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks',
+            variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+            session_id=session_id,
+            user_agent=user_agent,
+            **kwargs,
+        )
+
+    def test_reclassifies_unscored_events_in_chunks(self):
+        human = self._create(SESSION_ID, BROWSER_UA)
+        bot = self._create('b' * 32, 'curl/8.4.0')
+        monitor = self._create('e5e6' + 'c' * 28, BROWSER_UA)
+
+        out = StringIO()
+        call_command('ab_reclassify_traffic', chunk_size=2, stdout=out)
+
+        for event in (human, bot, monitor):
+            event.refresh_from_db()
+            self.assertEqual(event.classifier_version, CLASSIFIER_VERSION)
+        self.assertEqual(human.traffic_class, TRAFFIC_CLASS_HUMAN)
+        self.assertEqual(bot.traffic_class, TRAFFIC_CLASS_BOT)
+        self.assertEqual(monitor.traffic_class, TRAFFIC_CLASS_MONITOR)
+        self.assertIn('Reclassified 3 events (2 verdicts changed)', out.getvalue())
+
+    def test_skips_events_already_on_current_version(self):
+        self._create('b' * 32, 'curl/8.4.0', classifier_version=CLASSIFIER_VERSION)
+
+        out = StringIO()
+        call_command('ab_reclassify_traffic', stdout=out)
+
+        self.assertIn('Reclassified 0 events', out.getvalue())
+
+    def test_dry_run_does_not_write(self):
+        bot = self._create('b' * 32, 'curl/8.4.0')
+
+        call_command('ab_reclassify_traffic', dry_run=True, stdout=StringIO())
+
+        bot.refresh_from_db()
+        self.assertEqual(bot.classifier_version, 0)
+        self.assertEqual(bot.traffic_class, TRAFFIC_CLASS_HUMAN)
+
+
+class LegacyBackfillMigrationTest(TestCase):
+    """Test the 0019 data migration that scores events from before classification."""
+
+    def test_unclassified_events_are_scored_and_rollups_dropped(self):
+        bot = ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks',
+            variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+            session_id='b' * 32,
+            user_agent='curl/8.4.0',
+        )
+        self.assertEqual((bot.traffic_class, bot.classifier_version), (TRAFFIC_CLASS_HUMAN, 0))
+        call_command('ab_refresh_rollups', stdout=StringIO())
+        version = ABRollupState.load().version
+
+        migration = importlib.import_module('core.migrations.0019_backfill_abtestevent_traffic_class')
+        # The function only needs schema_editor.connection (SQLite refuses a
+        # real schema editor inside the test transaction)
+        migration.classify_legacy_events(apps, SimpleNamespace(connection=connection))
+
+        bot.refresh_from_db()
+        self.assertEqual((bot.traffic_class, bot.classifier_version), (TRAFFIC_CLASS_BOT, CLASSIFIER_VERSION))
+        self.assertFalse(ABHourlyRollup.objects.exists())
+        self.assertEqual(ABRollupState.load().version, version + 1)
+
+
+class PurgeClassifiedTrafficTest(TestCase):
+    """Test that ab_purge_bots removes events by their stored verdict."""
+
+    def test_purge_deletes_non_human_events_only(self):
+        for traffic_class in (TRAFFIC_CLASS_HUMAN, TRAFFIC_CLASS_BOT, TRAFFIC_CLASS_MONITOR, TRAFFIC_CLASS_SUSPECT):
+            ABTestEvent.objects.create(
+                experiment_name='button_label_kudos_vs_thanks',
+                variant='kudos',
+                event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                session_id=f'session_{traffic_class}_' + 'x' * 20,
+                traffic_class=traffic_class,
+                classifier_version=CLASSIFIER_VERSION,
+            )
+
+        call_command('ab_purge_bots', stdout=StringIO())
+
+        self.assertEqual(
+            list(ABTestEvent.objects.values_list('traffic_class', flat=True)),
+            [TRAFFIC_CLASS_HUMAN],
+        )
@@ -0,0 +1,121 @@
+"""
+Tests for User-Agent segment parsing (core.user_agents), ingest-time segment
+columns, the ab_backfill_user_agents command and ab_analyze --segment.
+"""
+from django.test import TestCase, Client
+from django.core.management import call_command
+from io import StringIO
+from core.models import ABTestEvent, MaintenanceCheckpoint
+from core.user_agents import parse_user_agent
+
+
+CHROME_MAC = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+SAFARI_IPHONE = 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1'
+CHROME_ANDROID_TABLET = 'Mozilla/5.0 (Linux; Android 13; SM-X200) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+EDGE_WINDOWS = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'
+FIREFOX_LINUX = 'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0'
+
+
+class ParseUserAgentTest(TestCase):
+    """Test the substring rules."""
+
+    def test_desktop_browsers(self):
+        self.assertEqual(tuple(parse_user_agent(CHROME_MAC)), ('desktop', 'Chrome', 'macOS'))
+        self.assertEqual(tuple(parse_user_agent(EDGE_WINDOWS)), ('desktop', 'Edge', 'Windows'))
+        self.assertEqual(tuple(parse_user_agent(FIREFOX_LINUX)), ('desktop', 'Firefox', 'Linux'))
+
+    def test_mobile_and_tablet(self):
+        self.assertEqual(tuple(parse_user_agent(SAFARI_IPHONE)), ('mobile', 'Safari', 'iOS'))
+        self.assertEqual(tuple(parse_user_agent(CHROME_ANDROID_TABLET)), ('tablet', 'Chrome', 'Android'))
+
+    def test_bots_and_empty(self):
+        self.assertEqual(parse_user_agent('curl/8.4.0').device_class, 'bot')
+        self.assertEqual(tuple(parse_user_agent('')), ('unknown', 'Other', 'Other'))
+
+    def test_memoized_per_string(self):
+        parse_user_agent.cache_clear()
+        parse_user_agent(CHROME_MAC)
+        parse_user_agent(CHROME_MAC)
+        self.assertEqual(parse_user_agent.cache_info().hits, 1)
+
+
+class IngestSegmentTest(TestCase):
+    """Test that A/B events are written with segment columns."""
+
+    def test_exposure_has_segments(self):
+        Client().get('/218b7ae/', HTTP_USER_AGENT=SAFARI_IPHONE)
+
+        event = ABTestEvent.objects.get()
+        self.assertEqual(
+            (event.device_class, event.browser_family, event.os_family),
+            ('mobile', 'Safari', 'iOS'),
+        )
+
+
+class BackfillUserAgentsCommandTest(TestCase):
+    """Test ab_backfill_user_agents."""
+
+    def _create(self, user_agent):
+        return ABTestEvent.objects.create(
+            experiment_name='button_label_kudos_vs_thanks',
+            variant='kudos',
+            event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+            session_id='s' * 32,
+            user_agent=user_agent,
+        )
+
+    def test_backfills_unparsed_rows_in_chunks(self):
+        events = [self._create(ua) for ua in (CHROME_MAC, SAFARI_IPHONE, CHROME_MAC, '')]
+
+        out = StringIO()
+        call_command('ab_backfill_user_agents', chunk_size=2, stdout=out)
+
+        for event in events:
+            event.refresh_from_db()
+        self.assertEqual(events[0].browser_family, 'Chrome')
+        self.assertEqual(events[1].device_class, 'mobile')
+        self.assertEqual(events[3].device_class, 'unknown')
+        self.assertIn('Backfilled 4 events', out.getvalue())
+        self.assertFalse(MaintenanceCheckpoint.objects.filter(name='ab_backfill_user_agents').exists())
+
+    def test_stopping_early_leaves_checkpoint(self):
+        self._create(CHROME_MAC)
+
+        out = StringIO()
+        call_command('ab_backfill_user_agents', max_seconds=0, stdout=out)
+
+        self.assertIn('Run again to resume', out.getvalue())
+        self.assertTrue(MaintenanceCheckpoint.objects.filter(name='ab_backfill_user_agents').exists())
+
+
+class AnalyzeSegmentTest(TestCase):
+    """Test ab_analyze --segment."""
+
+    def test_segment_breakdown(self):
+        for variant, conversions in (('kudos', 5), ('thanks', 15)):
+            for i in range(40):
+                device = 'mobile' if i % 2 else 'desktop'
+                ABTestEvent.objects.create(
+                    experiment_name='button_label_kudos_vs_thanks',
+                    variant=variant,
+                    event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
+                    session_id=f'{variant}_{i:03d}' + 'x' * 20,
+                    device_class=device,
+                )
+                if i < conversions:
+                    ABTestEvent.objects.create(
+                        experiment_name='button_label_kudos_vs_thanks',
+                        variant=variant,
+                        event_type=ABTestEvent.EVENT_TYPE_CONVERSION,
+                        session_id=f'{variant}_{i:03d}' + 'x' * 20,
+                        device_class=device,
+                    )
+
+        out = StringIO()
+        call_command('ab_analyze', segment='device', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Results by device:', output)
+        self.assertIn('desktop', output)
+        self.assertIn('mobile', output)
+        self.assertIn('multiple comparisons', output)
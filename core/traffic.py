@@ -0,0 +1,134 @@
+"""
+Ingest-time traffic classification for A/B test events.
+
+Every ABTestEvent is scored once when it is written and the verdict is stored
+on the row (traffic_class + classifier_version), so purges and analysis can
+filter on an indexed column instead of re-deriving bot heuristics at query time.
+
+When the rules below change, bump CLASSIFIER_VERSION and re-score history with:
+    python manage.py ab_reclassify_traffic
+"""
+
+import ipaddress
+
+from django.http import HttpRequest
+
+# Bump whenever the rules below change so old verdicts can be found and re-scored
+CLASSIFIER_VERSION = 1
+
+TRAFFIC_CLASS_HUMAN = "human"
+TRAFFIC_CLASS_BOT = "bot"
+TRAFFIC_CLASS_MONITOR = "monitor"
+TRAFFIC_CLASS_SUSPECT = "suspect"
+
+# Everything that is not human; purges and "humans only" analysis key off this
+NON_HUMAN_TRAFFIC_CLASSES = (
+    TRAFFIC_CLASS_BOT,
+    TRAFFIC_CLASS_MONITOR,
+    TRAFFIC_CLASS_SUSPECT,
+)
+
+# Real browsers always send "mozilla" plus one of these engine/brand tokens
+BROWSER_SIGNATURES = ("chrome", "safari", "firefox", "edg", "opr")
+
+# Uptime checkers and health probes (Render's own checker included)
+MONITOR_KEYWORDS = (
+    "render", "uptime", "health", "monitor",
+    "pingdom", "statuscake",
+)
+
+# Crawlers, scrapers, CI systems and plain HTTP clients
+BOT_KEYWORDS = (
+    "bot", "spider", "crawler", "scraper",
+    "github", "gitlab",
+    "curl", "python-requests", "python", "httpclient", "go-http-client",
+)
+
+# Session id prefix observed on Render health-check traffic
+MONITOR_SESSION_PREFIX = "e5e6"
+
+# Real Django session keys are 32 chars; anything this short is synthetic
+MIN_HUMAN_SESSION_ID_LENGTH = 10
+
+
+def classify_user_agent(user_agent: str) -> str:
+    """Classify a raw User-Agent string (fail-closed: unknown clients are bots)."""
+    ua = (user_agent or "").lower()
+
+    # No UA = treat as bot
+    if not ua:
+        return TRAFFIC_CLASS_BOT
+
+    if any(k in ua for k in MONITOR_KEYWORDS):
+        return TRAFFIC_CLASS_MONITOR
+
+    if any(k in ua for k in BOT_KEYWORDS):
+        return TRAFFIC_CLASS_BOT
+
+    # Must look like a real browser
+    if "mozilla" not in ua or not any(sig in ua for sig in BROWSER_SIGNATURES):
+        return TRAFFIC_CLASS_BOT
+
+    return TRAFFIC_CLASS_HUMAN
+
+
+def classify_traffic(user_agent: str, session_id: str, user_id=None) -> str:
+    """
+    Classify one event from the fields stored on ABTestEvent.
+
+    Pure function of its inputs so the same rules can score a live request
+    at ingest time and a stored row during reclassification.
+    """
+    session_id = session_id or ""
+
+    ua_class = classify_user_agent(user_agent)
+    if ua_class != TRAFFIC_CLASS_HUMAN:
+        return ua_class
+
+    if session_id.startswith(MONITOR_SESSION_PREFIX):
+        return TRAFFIC_CLASS_MONITOR
+
+    # Anonymous traffic with a synthetic-looking session id
+    if user_id is None and len(session_id) < MIN_HUMAN_SESSION_ID_LENGTH:
+        return TRAFFIC_CLASS_SUSPECT
+
+    return TRAFFIC_CLASS_HUMAN
+
+
+def get_client_ip(request: HttpRequest):
+    """Best-effort client IP (first X-Forwarded-For hop on Render, else REMOTE_ADDR)."""
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    candidate = forwarded.split(",")[0].strip() if forwarded else request.META.get("REMOTE_ADDR", "")
+
+    # Never let a malformed header reach the inet column
+    try:
+        return str(ipaddress.ip_address(candidate))
+    except ValueError:
+        return None
+
+
+def event_fields_for_request(request: HttpRequest, session_id: str) -> dict:
+    """
+    Build the request-derived ABTestEvent fields, including the traffic verdict.
+
+    Used by the A/B views so every event is written already classified and
+    segmented (device/browser/OS, see core.user_agents).
+    """
+    # core.user_agents builds on classify_user_agent above
+    from .user_agents import user_agent_fields
+
+    user_agent = request.META.get("HTTP_USER_AGENT") or ""
+    user = request.user if request.user.is_authenticated else None
+
+    return {
+        "user_agent": user_agent,
+        "ip_address": get_client_ip(request),
+        "user": user,
+        "traffic_class": classify_traffic(
+            user_agent,
+            session_id,
+            user_id=user.pk if user else None,
+        ),
+        "classifier_version": CLASSIFIER_VERSION,
+        **user_agent_fields(user_agent),
+    }
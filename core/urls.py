@@ -7,12 +7,19 @@ Defines all URL patterns for the application.
 from django.urls import path
 from . import views
 from . import views_admin_tools
+from . import views_health
+from . import views_metrics
 
 app_name = 'core'
 
 urlpatterns = [
     # Health check (must be first for fast response)
     path('health/', views.health_check, name='health'),
+    # Liveness (no I/O) and readiness (cached DB/cache/migration probe)
+    path('healthz/live', views_health.live, name='healthz_live'),
+    path('healthz/ready', views_health.ready, name='healthz_ready'),
+    # Prometheus scrape target (staff or METRICS_TOKEN)
+    path('metrics', views_metrics.metrics, name='metrics'),
     
     # Public pages
     path('', views.home, name='home'),
@@ -44,6 +51,9 @@ urlpatterns = [
         views_admin_tools.ab_purge_bots_run,
         name='ab_purge_bots_run',
     ),
+    path('admin-tools/jobs/start/', views_admin_tools.job_start, name='admin_job_start'),
+    path('admin-tools/jobs/<int:job_id>/', views_admin_tools.job_status, name='admin_job_status'),
+    path('admin-tools/jobs/<int:job_id>/log/', views_admin_tools.job_log, name='admin_job_log'),
     
     # Authentication
     path('signup/', views.signup, name='signup'),
@@ -0,0 +1,84 @@
+"""
+User-Agent parsing into segment dimensions for A/B analysis.
+
+Each ABTestEvent gets device_class, browser_family and os_family at ingest
+(and via "python manage.py ab_backfill_user_agents" for older rows), so
+segment breakdowns are a GROUP BY on indexed columns rather than text parsing
+at query time. Traffic carries only a few hundred distinct UA strings, so
+parse_user_agent() is memoized per string.
+
+The rules are deliberately small substring checks, ordered so that browsers
+which embed other brands' tokens (Edge and Opera send "Chrome", Chrome sends
+"Safari") are matched first.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+from .traffic import TRAFFIC_CLASS_HUMAN, classify_user_agent
+
+DEVICE_DESKTOP = "desktop"
+DEVICE_MOBILE = "mobile"
+DEVICE_TABLET = "tablet"
+DEVICE_BOT = "bot"
+DEVICE_UNKNOWN = "unknown"
+
+DEVICE_CLASSES = (DEVICE_DESKTOP, DEVICE_MOBILE, DEVICE_TABLET, DEVICE_BOT, DEVICE_UNKNOWN)
+
+# (family, tokens) - first match wins
+BROWSER_RULES = (
+    ("Edge", ("edg/", "edga/", "edgios/")),
+    ("Opera", ("opr/", "opera")),
+    ("Samsung Internet", ("samsungbrowser",)),
+    ("Firefox", ("firefox/", "fxios/")),
+    ("Chrome", ("chrome/", "crios/", "chromium/")),
+    ("Safari", ("safari/",)),
+    ("Internet Explorer", ("msie ", "trident/")),
+)
+
+OS_RULES = (
+    ("iOS", ("iphone", "ipad", "ipod")),
+    ("Android", ("android",)),
+    ("Windows", ("windows",)),
+    ("ChromeOS", ("cros",)),
+    ("macOS", ("mac os x", "macintosh")),
+    ("Linux", ("linux",)),
+)
+
+OTHER = "Other"
+
+UserAgentInfo = namedtuple("UserAgentInfo", ["device_class", "browser_family", "os_family"])
+
+
+def _first_match(ua, rules):
+    for family, tokens in rules:
+        if any(token in ua for token in tokens):
+            return family
+    return OTHER
+
+
+@lru_cache(maxsize=4096)
+def parse_user_agent(user_agent: str) -> UserAgentInfo:
+    """Derive (device_class, browser_family, os_family) from a raw User-Agent."""
+    ua = (user_agent or "").lower()
+    if not ua:
+        return UserAgentInfo(DEVICE_UNKNOWN, OTHER, OTHER)
+
+    os_family = _first_match(ua, OS_RULES)
+    browser_family = _first_match(ua, BROWSER_RULES)
+
+    if classify_user_agent(user_agent) != TRAFFIC_CLASS_HUMAN:
+        device_class = DEVICE_BOT
+    elif "ipad" in ua or "tablet" in ua or (os_family == "Android" and "mobile" not in ua):
+        device_class = DEVICE_TABLET
+    elif "mobi" in ua or "iphone" in ua or "ipod" in ua:
+        device_class = DEVICE_MOBILE
+    else:
+        device_class = DEVICE_DESKTOP
+
+    return UserAgentInfo(device_class, browser_family, os_family)
+
+
+def user_agent_fields(user_agent: str) -> dict:
+    """ABTestEvent segment fields for a raw User-Agent."""
+    return parse_user_agent(user_agent or "")._asdict()
@@ -18,8 +18,10 @@ from django.views.decorators.http import require_POST
 from django.views.decorators.cache import never_cache
 from django.views.decorators.vary import vary_on_headers
 import random
+from .db_routers import replica_reads
 from .models import Category, Post, Bookmark, ExternalLink
 from .forms import PostForm, UserRegistrationForm
+from .traffic import TRAFFIC_CLASS_HUMAN, classify_user_agent, event_fields_for_request
 from config.settings import CONTRIBUTOR_GROUP
 
 
@@ -35,29 +37,8 @@ def _ab_session_exposed_key(experiment_name: str, endpoint: str) -> str:
 
 
 def is_bot_request(request: HttpRequest) -> bool:
-    """Strict fail-closed bot detection."""
-    ua = (request.META.get("HTTP_USER_AGENT") or "").lower()
-    
-    # No UA = treat as bot
-    if not ua:
-        return True
-    
-    # Must look like a real browser
-    browser_signatures = ["chrome", "safari", "firefox", "edg", "opr"]
-    if "mozilla" not in ua or not any(sig in ua for sig in browser_signatures):
-        return True
-    
-    # Known bot/monitor/HTTP client signatures
-    bot_keywords = [
-        "bot", "spider", "crawler", "scraper",
-        "render", "uptime", "health", "monitor",
-        "pingdom", "statuscake", "github", "gitlab",
-        "curl", "python-requests", "httpclient", "go-http-client",
-    ]
-    if any(k in ua for k in bot_keywords):
-        return True
-    
-    return False
+    """Strict fail-closed bot detection (same rules as ingest-time classification)."""
+    return classify_user_agent(request.META.get("HTTP_USER_AGENT")) != TRAFFIC_CLASS_HUMAN
 
 
 def _is_navigation_request(request: HttpRequest) -> bool:
@@ -108,6 +89,7 @@ def is_admin(user):
     return user.is_authenticated and user.is_staff
 
 
+@replica_reads
 def home(request):
     """
     Home page: category hub + latest approved posts.
@@ -133,6 +115,7 @@ def home(request):
     return render(request, 'core/home.html', context)
 
 
+@replica_reads
 def category_list(request, slug):
     """
     Category listing page showing approved posts in a category.
@@ -171,6 +154,7 @@ def category_list(request, slug):
     return render(request, 'core/category_list.html', context)
 
 
+@replica_reads
 def post_detail(request, slug):
     """
     Post detail page.
@@ -549,7 +533,7 @@ def abtest_view(request):
             event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
             endpoint=endpoint,
             session_id=session_id,
-            defaults={"variant": variant},
+            defaults={"variant": variant, **event_fields_for_request(request, session_id)},
         )
         request.session[session_key_exposed] = True
         request.session.modified = True
@@ -629,6 +613,9 @@ def abtest_click(request):
         request.session[session_key_variant] = variant
         request.session.modified = True
     
+    # Classified once per request; shared by the backfilled exposure and the conversion
+    event_fields = event_fields_for_request(request, session_id)
+    
     # Backfill exposure if missing (check both session flag and DB)
     if not request.session.get(session_key_exposed):
         # Check DB to ensure we don't create duplicate
@@ -645,7 +632,7 @@ def abtest_click(request):
                 event_type=ABTestEvent.EVENT_TYPE_EXPOSURE,
                 endpoint=endpoint,
                 session_id=session_id,
-                defaults={"variant": variant},
+                defaults={"variant": variant, **event_fields},
             )
         request.session[session_key_exposed] = True
         request.session.modified = True
@@ -657,6 +644,7 @@ def abtest_click(request):
         endpoint=endpoint,
         session_id=session_id,
         variant=variant,
+        **event_fields,
     )
     
     response = JsonResponse({"status": "ok", "variant": variant})
@@ -2,37 +2,55 @@
 Admin-only HTTP endpoints for management tools.
 
 These endpoints allow running management commands via HTTP when shell access
-is not available (e.g., on Render production environment).
+is not available (e.g., on Render production environment). Commands are not
+run inside the request: each endpoint queues a BackgroundJob (core.jobs) for
+the "run_jobs" worker and returns immediately with URLs to poll.
 """
+import json
+
 from django.http import JsonResponse
-from django.core.management import call_command
-from django.views.decorators.http import require_GET
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib.admin.views.decorators import staff_member_required
-from io import StringIO
+from core.jobs import UnknownCommand, enqueue, job_to_dict, tail
+from core.models import BackgroundJob
+
+# Log tail limits for the job log endpoint
+DEFAULT_LOG_LINES = 100
+MAX_LOG_LINES = 2000
+
+
+def _queued_response(job, **extra):
+    """202 response pointing at the job's status and log endpoints."""
+    return JsonResponse(
+        {
+            "status": job.status,
+            "job": job_to_dict(job),
+            "status_url": reverse("core:admin_job_status", args=[job.pk]),
+            "log_url": reverse("core:admin_job_log", args=[job.pk]),
+            **extra,
+        },
+        status=202,
+    )
 
 
 @staff_member_required
 @require_GET
 def ab_purge_bots_dry_run(request):
     """
-    Admin-only endpoint that runs ab_purge_bots in DRY-RUN mode.
-    
-    Use this first to see how many events *would* be deleted.
-    
+    Admin-only endpoint that queues ab_purge_bots in DRY-RUN mode.
+
+    Use this first to see how many events *would* be deleted; the counts
+    appear in the job log.
+
     URL: /admin-tools/ab-purge-bots/dry-run/
     """
-    # Capture command output to include in response
-    out = StringIO()
-    call_command("ab_purge_bots", dry_run=True, stdout=out)
-    output = out.getvalue()
-    
-    return JsonResponse(
-        {
-            "status": "ok",
-            "mode": "dry_run",
-            "detail": "ab_purge_bots dry run completed on this environment.",
-            "output": output,
-        }
+    job = enqueue("ab_purge_bots", options={"dry_run": True}, user=request.user, dedupe=True)
+    return _queued_response(
+        job,
+        mode="dry_run",
+        detail="ab_purge_bots dry run queued; poll status_url until finished.",
     )
 
 
@@ -40,23 +58,89 @@ def ab_purge_bots_dry_run(request):
 @require_GET
 def ab_purge_bots_run(request):
     """
-    Admin-only endpoint that runs ab_purge_bots in REAL delete mode.
-    
-    Only use this after verifying the dry-run looks correct.
-    
+    Admin-only endpoint that queues ab_purge_bots in REAL delete mode.
+
+    Only use this after verifying the dry-run looks correct. Calling it again
+    while the purge is queued or running returns the same job.
+
     URL: /admin-tools/ab-purge-bots/run/
     """
-    # Capture command output to include in response
-    out = StringIO()
-    call_command("ab_purge_bots", stdout=out)
-    output = out.getvalue()
-    
-    return JsonResponse(
-        {
-            "status": "ok",
-            "mode": "run",
-            "detail": "ab_purge_bots executed and bot events were purged on this environment.",
-            "output": output,
-        }
+    job = enqueue("ab_purge_bots", user=request.user, dedupe=True)
+    return _queued_response(
+        job,
+        mode="run",
+        detail="ab_purge_bots queued; poll status_url until finished.",
     )
 
+
+@staff_member_required
+@require_POST
+def job_start(request):
+    """
+    Queue one of BackgroundJob.ALLOWED_COMMANDS (superusers only).
+
+    Body (JSON or form): {"command": "ab_refresh_rollups", "args": [], "options": {"rebuild": true}}
+
+    URL: /admin-tools/jobs/start/
+    """
+    if not request.user.is_superuser:
+        return JsonResponse({"status": "error", "detail": "Superuser required."}, status=403)
+
+    try:
+        if request.content_type == "application/json":
+            payload = json.loads(request.body or b"{}")
+        else:
+            payload = {
+                "command": request.POST.get("command", ""),
+                "args": json.loads(request.POST.get("args") or "[]"),
+                "options": json.loads(request.POST.get("options") or "{}"),
+            }
+    except ValueError:
+        return JsonResponse({"status": "error", "detail": "Invalid JSON."}, status=400)
+
+    args, options = payload.get("args") or [], payload.get("options") or {}
+    if not isinstance(args, list) or not isinstance(options, dict):
+        return JsonResponse({"status": "error", "detail": "args must be a list and options an object."}, status=400)
+
+    try:
+        job = enqueue(payload.get("command", ""), args=args, options=options, user=request.user)
+    except UnknownCommand as exc:
+        return JsonResponse({"status": "error", "detail": str(exc)}, status=400)
+    return _queued_response(job)
+
+
+@staff_member_required
+@require_GET
+def job_status(request, job_id):
+    """
+    Status of a background job.
+
+    URL: /admin-tools/jobs/<id>/
+    """
+    job = get_object_or_404(BackgroundJob, pk=job_id)
+    return JsonResponse(job_to_dict(job))
+
+
+@staff_member_required
+@require_GET
+def job_log(request, job_id):
+    """
+    Output of a background job so far.
+
+    ?lines=N returns the last N lines (default 100). ?offset=N instead returns
+    everything after character N plus the next offset, for incremental polling.
+
+    URL: /admin-tools/jobs/<id>/log/
+    """
+    job = get_object_or_404(BackgroundJob, pk=job_id)
+    response = {"id": job.pk, "status": job.status, "finished": job.is_finished}
+
+    offset = request.GET.get("offset", "")
+    if offset.isdigit():
+        response["output"] = job.output[int(offset):]
+        response["next_offset"] = len(job.output)
+    else:
+        lines = request.GET.get("lines", "")
+        lines = min(int(lines), MAX_LOG_LINES) if lines.isdigit() else DEFAULT_LOG_LINES
+        response["output"] = tail(job.output, lines)
+    return JsonResponse(response)
@@ -0,0 +1,35 @@
+"""
+Liveness and readiness endpoints for Render and uptime monitors.
+
+URL: /healthz/live  - the process is up and serving; no database, cache or
+                      template work, so it is safe to poll as often as wanted.
+URL: /healthz/ready - the app can serve real traffic: databases, cache and
+                      migrations are checked (core.health), with the result
+                      cached for HEALTH_CACHE_SECONDS. 503 when a check that
+                      gates readiness fails (an optional replica or
+                      analytics database does not).
+
+Both are public and return JSON. Anonymous callers get statuses and
+exception class names only; staff and "Authorization: Bearer <METRICS_TOKEN>"
+also get vendors, latencies, pool stats and unapplied migration names.
+"""
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from core.health import public, readiness
+from core.views_metrics import has_scrape_token
+
+
+@never_cache
+def live(request):
+    """Liveness: always ok while the worker can answer."""
+    return JsonResponse({"status": "ok"})
+
+
+@never_cache
+def ready(request):
+    """Readiness: cached DB/cache/migration probe, 503 when not ready."""
+    result, cached = readiness()
+    status = 200 if result["status"] == "ok" else 503
+    if not has_scrape_token(request) and not (request.user.is_active and request.user.is_staff):
+        result = public(result)
+    return JsonResponse(dict(result, cached=cached), status=status)
@@ -0,0 +1,44 @@
+"""
+Prometheus scrape endpoint.
+
+URL: /metrics
+
+Protected like the admin tools (staff session); a scraper can instead send
+"Authorization: Bearer <METRICS_TOKEN>" when that setting is non-empty.
+Each scrape writes this worker's snapshot and merges every worker's
+(core.metrics.collect), so the numbers cover all gunicorn workers whichever
+one answers.
+"""
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from core.metrics import STORE, collect
+from core.prometheus import CONTENT_TYPE, render, rollup_gauges
+
+
+def has_scrape_token(request):
+    """True if the request carries "Authorization: Bearer <METRICS_TOKEN>"."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    return bool(token) and header.startswith("Bearer ") and constant_time_compare(header[len("Bearer "):], token)
+
+
+def _metrics_response(request):
+    STORE.persist()
+    registry, workers = collect()
+    return HttpResponse(render(registry, workers, rollup_gauges()), content_type=CONTENT_TYPE)
+
+
+_staff_metrics = staff_member_required(_metrics_response)
+
+
+@never_cache
+@require_GET
+def metrics(request):
+    """Prometheus text format for all workers (staff or bearer token)."""
+    if has_scrape_token(request):
+        return _metrics_response(request)
+    return _staff_metrics(request)
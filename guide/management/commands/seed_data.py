@@ -9,18 +9,57 @@ This command creates:
 - Sample external links
 
 Run with: python manage.py seed_data
+
+For capacity testing, --scale adds bulk synthetic users, posts and
+bookmarks (100k users and 1M posts per unit; see core.synthetic). --events
+also needs the core app, which owns ABTestEvent.
+
+Run with: python manage.py seed_data --scale=1 [--events=N] [--seed=42]
 """
 
-from django.core.management.base import BaseCommand
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User, Group
-from guide.models import Category, Post, ExternalLink
+from core.synthetic import DEFAULT_BATCH_SIZE, DEFAULT_SEED, ContentModels, generate
+from guide.models import Bookmark, Category, Post, ExternalLink
 from yale_newcomer_survival_guide.settings import READER_GROUP, CONTRIBUTOR_GROUP, ADMIN_GROUP
 
 
 class Command(BaseCommand):
     help = 'Seed initial data: groups, categories, users, posts, and external links'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=0.0,
+            help='Bulk synthetic data: 100k users and 1M posts per unit (default: 0, samples only)',
+        )
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=0,
+            help='Synthetic AB test events (requires the core app; default: 0)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=DEFAULT_SEED,
+            help=f'Random seed for synthetic data (default: {DEFAULT_SEED})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows per bulk INSERT (default: {DEFAULT_BATCH_SIZE})',
+        )
+
     def handle(self, *args, **options):
+        if options['events'] and not apps.is_installed('core'):
+            raise CommandError('--events needs the core app (ABTestEvent) in INSTALLED_APPS')
+
         self.stdout.write('Seeding initial data...\n')
 
         # Create groups
@@ -200,5 +239,22 @@ Good luck with your search!''',
             if created:
                 self.stdout.write(self.style.SUCCESS(f'  ✓ Created external link: {link.title}'))
 
-        self.stdout.write(self.style.SUCCESS('\n✓ Seeding complete!'))
+        scale = max(0.0, options['scale'])
+        if scale or options['events']:
+            self.stdout.write(f'\nGenerating synthetic data (scale={scale}, events={options["events"]:,}, seed={options["seed"]})...')
+            started = time.monotonic()
+            counts = generate(
+                scale=scale,
+                events=max(0, options['events']),
+                seed=options['seed'],
+                models=ContentModels(Category, Post, Bookmark),
+                role_groups={'reader': READER_GROUP, 'contributor': CONTRIBUTOR_GROUP, 'admin': ADMIN_GROUP},
+                batch_size=max(1, options['batch_size']),
+                log=self.stdout.write,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'  ✓ {counts["users"]:,} users, {counts["posts"]:,} posts, {counts["bookmarks"]:,} bookmarks, '
+                f'{counts["events"]:,} events in {time.monotonic() - started:.1f}s'
+            ))
 
+        self.stdout.write(self.style.SUCCESS('\n✓ Seeding complete!'))